@@ -0,0 +1,20 @@
+"""Benchmarks of Where on synthetic data
+
+Description:
+------------
+
+The benchmark suite times parsers, models, estimators and writers on synthetic GNSS, VLBI and SLR data of
+configurable size, see :mod:`benchmarks.synthetic`. Everything runs offline on the CPU, without any apriori files
+except the example files bundled with the tests. Results are stored for each host, by default in benchmarks/results
+which is ignored by git, so that a later run can be compared with an earlier one to detect performance regressions.
+
+Run from the root of the repository, see `python -m benchmarks --help` for all options:
+
+    python -m benchmarks --size=small              # Run all benchmarks, and store the results
+    python -m benchmarks --group=models --compare  # Compare with the latest stored run of the same size
+
+The benchmarks are registered in the bench_*-modules, one module for each group of benchmarks.
+"""
+
+# Benchmark imports
+from benchmarks import bench_estimators, bench_models, bench_parsers, bench_writers  # noqa  Register benchmarks
@@ -0,0 +1,109 @@
+"""Run the benchmark suite
+
+Usage::
+
+    python -m benchmarks [--size=small] [--stations=N] [--days=D] [--rate=S] [--group=G,..] [--name=N,..]
+                         [--repeat=3] [--results=DIR] [--compare[=FILE]] [--tolerance=0.2] [--no-save]
+
+The exit status is 1 if a benchmark fails, or if a comparison finds a regression, so the suite can be used in
+continuous integration.
+"""
+
+# Standard library imports
+import argparse
+import pathlib
+import sys
+import tempfile
+
+# Where imports
+from where.lib import log
+
+# Benchmark imports
+from benchmarks import _harness
+from benchmarks.synthetic import Size
+
+# Predefined sizes of the synthetic data
+SIZES = {
+    "small": Size(stations=10, days=1, rate=300),
+    "medium": Size(stations=50, days=7, rate=300),
+    "large": Size(stations=500, days=30, rate=900),
+}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__.split("\n")[0])
+    parser.add_argument("--size", choices=SIZES, default="small", help="Predefined size of the synthetic data")
+    parser.add_argument("--stations", type=int, help="Number of stations, overrides the predefined size")
+    parser.add_argument("--days", type=float, help="Number of days, overrides the predefined size")
+    parser.add_argument("--rate", type=float, help="Observation interval in seconds, overrides the predefined size")
+    parser.add_argument("--group", default="", help="Comma separated groups of benchmarks to run (default all)")
+    parser.add_argument("--name", default="", help="Comma separated names of benchmarks to run (default all)")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of timed runs of each benchmark")
+    parser.add_argument(
+        "--results", type=pathlib.Path, default=_harness.REPO_DIR / "benchmarks" / "results", help="Stored results"
+    )
+    parser.add_argument(
+        "--compare", nargs="?", const="latest", help="Compare with a result file, or the latest comparable run"
+    )
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Relative change reported as a regression")
+    parser.add_argument("--no-save", action="store_true", help="Do not store the results")
+    args = parser.parse_args()
+
+    size = SIZES[args.size]._replace(
+        **{k: v for k, v in dict(stations=args.stations, days=args.days, rate=args.rate).items() if v is not None}
+    )
+    benchmarks = _harness.benchmarks(groups=_split(args.group), names=_split(args.name))
+    if not benchmarks:
+        print(f"No benchmarks found for group {args.group!r} and name {args.name!r}")
+        return 1
+
+    log.init(log_level="warn")
+    print(f"Running {len(benchmarks)} benchmarks with {size}, best of {args.repeat} runs")
+    print(f"{'Benchmark':<36} {'Observations':>12} {'Best [s]':>10} {'Median [s]':>10} {'us/obs':>8} {'Peak [MB]':>9}")
+    meta = _harness.metadata(size, args.repeat)
+    results = dict()
+    with tempfile.TemporaryDirectory(prefix="where_benchmarks_") as work_dir:
+        _harness.init_config(pathlib.Path(work_dir))
+        for benchmark in benchmarks:
+            key = f"{benchmark.group}.{benchmark.name}"
+            result = results[key] = _harness.run(benchmark, size, repeat=args.repeat)
+            if result["status"] != "ok":
+                print(f"{key:<36} FAILED\n{result['error']}")
+                continue
+            us_per_obs = 1e6 * result["min"] / result["num_obs"] if result["num_obs"] else float("nan")
+            print(
+                f"{key:<36} {result['num_obs']:>12d} {result['min']:>10.3f} {result['median']:>10.3f} "
+                f"{us_per_obs:>8.2f} {result['peak_rss_increase']:>9.0f}"
+            )
+
+    if not args.no_save:
+        print(f"Results stored in {_harness.save(meta, results, args.results)}")
+
+    is_ok = all(r["status"] == "ok" for r in results.values())
+    if args.compare:
+        compare_path = _harness.latest(args.results, meta) if args.compare == "latest" else pathlib.Path(args.compare)
+        if compare_path is None:
+            print(f"No stored run with {size} on {meta['host']} to compare with")
+        else:
+            is_ok = _print_comparison(compare_path, results, args.tolerance) and is_ok
+
+    return 0 if is_ok else 1
+
+
+def _print_comparison(file_path: pathlib.Path, results, tolerance: float) -> bool:
+    """Print comparison with a stored run, returns False if there are regressions"""
+    previous_meta, previous = _harness.load(file_path)
+    print(f"\nComparison with {file_path} (commit {previous_meta['commit']}, {previous_meta['date']})")
+    comparisons = _harness.compare(previous, results, tolerance=tolerance)
+    for cmp in comparisons:
+        print(f"{cmp.key:<36} {cmp.previous:>10.3f} -> {cmp.current:>10.3f} s  {cmp.ratio:>6.2f}x  {cmp.verdict}")
+    return not any(cmp.verdict == "REGRESSION" for cmp in comparisons)
+
+
+def _split(option: str):
+    """Split a comma separated option value"""
+    return [v.strip() for v in option.split(",") if v.strip()]
+
+
+if __name__ == "__main__":
+    sys.exit(main())
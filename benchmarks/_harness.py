@@ -0,0 +1,258 @@
+"""Registration, timing and storage of benchmarks
+
+Description:
+------------
+
+A benchmark is a setup function registered with :func:`register`. The setup function builds its input data for a
+given :class:`~benchmarks.synthetic.Size` and returns the function that is timed together with the number of
+observations it handles::
+
+    @register("models")
+    def gnss_dop(size):
+        dsets = synthetic.gnss_datasets(size)
+        return lambda: [gnss_dop_editor(dset) for dset in dsets], sum(dset.num_obs for dset in dsets)
+
+Setup is not timed. The timed function is run several times, and the fastest run is used for comparisons, since it is
+the least disturbed by other load on the computer.
+
+The results of a run are stored as JSON, one file for each run, in a directory for each host. Runs of the same
+benchmarks with the same size on the same host can then be compared with :func:`compare`, to find regressions.
+"""
+
+# Standard library imports
+from datetime import date, datetime
+import json
+import pathlib
+import platform
+import subprocess
+import sys
+import time
+import traceback
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+# External library imports
+import numpy as np
+
+# Where imports
+import where
+from where.lib import config
+from where.lib import telemetry
+
+# Setup function of a benchmark, returning the timed function and the number of observations
+SetupFunc = Callable[["Size"], Tuple[Callable[[], Any], int]]
+
+
+class Benchmark(NamedTuple):
+    """A registered benchmark"""
+
+    group: str
+    name: str
+    setup: SetupFunc
+    sized: bool  # False if the benchmark uses bundled files, and does not depend on the size
+
+
+class Comparison(NamedTuple):
+    """Timing of a benchmark compared to a previous run"""
+
+    key: str
+    previous: float
+    current: float
+    ratio: float
+    verdict: str
+
+
+_BENCHMARKS: Dict[str, Benchmark] = dict()
+
+REPO_DIR = pathlib.Path(__file__).resolve().parents[1]
+
+# Run date and pipeline of the analysis that the benchmarks pretend to be part of
+RUNDATE = date(2020, 1, 1)
+PIPELINE = "gnss"
+
+
+def init_config(work_dir: pathlib.Path) -> None:
+    """Configure Where for the benchmarks, with all files written below the given work directory
+
+    Datasets are written in the foreground and in full, so that writing them can be timed repeatedly.
+    """
+    config.read_where_config()
+    config.read_files_config()
+    config.set_file_vars(config.create_file_vars(RUNDATE, PIPELINE, user="benchmark", use_options=False))
+    config.files.update_vars(dict(path_work=str(work_dir)))
+    config.where.update_from_dict(dict(background=False, delta=False), section="dataset_writer")
+    config.tech.master_section = PIPELINE
+    config.tech.update_from_dict(dict(write_level="detail"), section=PIPELINE)
+
+
+def work_dir() -> pathlib.Path:
+    """Directory for files written by the benchmarks"""
+    return pathlib.Path(config.files.vars["path_work"])
+
+
+def register(group: str, sized: bool = True) -> Callable[[SetupFunc], SetupFunc]:
+    """Register a benchmark setup function, the name of the benchmark is the name of the function
+
+    Args:
+        group:  Group of benchmarks, for instance 'parsers', 'models', 'estimators' or 'writers'.
+        sized:  False if the benchmark does not depend on the size of the synthetic data.
+
+    Returns:
+        Decorator registering the setup function.
+    """
+
+    def decorator(setup: SetupFunc) -> SetupFunc:
+        benchmark = Benchmark(group=group, name=setup.__name__, setup=setup, sized=sized)
+        _BENCHMARKS[f"{group}.{benchmark.name}"] = benchmark
+        return setup
+
+    return decorator
+
+
+def benchmarks(groups: Optional[Sequence[str]] = None, names: Optional[Sequence[str]] = None) -> List[Benchmark]:
+    """Registered benchmarks, optionally only the given groups and names"""
+    return [
+        b
+        for b in _BENCHMARKS.values()
+        if (not groups or b.group in groups) and (not names or b.name in names or f"{b.group}.{b.name}" in names)
+    ]
+
+
+def run(benchmark: Benchmark, size: "Size", repeat: int = 3) -> Dict[str, Any]:
+    """Set up and time one benchmark
+
+    Errors are caught and stored in the result, so that one failing benchmark does not stop the others.
+
+    Args:
+        benchmark:  The benchmark to run.
+        size:       Size of the synthetic data.
+        repeat:     Number of timed runs.
+
+    Returns:
+        Result with timings in seconds, number of observations and increase in peak memory during setup and timed
+        runs.
+    """
+    result = dict(group=benchmark.group, name=benchmark.name, sized=benchmark.sized)
+    try:
+        with telemetry.measure("benchmark", f"{benchmark.group}.{benchmark.name}") as record:
+            start = time.perf_counter()
+            func, num_obs = benchmark.setup(size)
+            result["setup_time"] = time.perf_counter() - start
+
+            timings = list()
+            for _ in range(max(repeat, 1)):
+                start = time.perf_counter()
+                func()
+                timings.append(time.perf_counter() - start)
+    except Exception:
+        result.update(status="failed", error=traceback.format_exc(limit=-3))
+        return result
+
+    result.update(
+        status="ok",
+        num_obs=num_obs,
+        min=min(timings),
+        median=float(np.median(timings)),
+        timings=timings,
+        peak_rss_increase=record.get("peak_rss_increase", float("nan")),
+    )
+    return result
+
+
+def metadata(size: "Size", repeat: int) -> Dict[str, Any]:
+    """Information about the run, needed to tell whether two runs can be compared"""
+    return dict(
+        date=datetime.now().isoformat(timespec="seconds"),
+        where_version=where.__version__,
+        commit=_git_commit(),
+        host=platform.node(),
+        machine=platform.machine(),
+        processor=platform.processor(),
+        python=platform.python_version(),
+        numpy=np.__version__,
+        size=size._asdict(),
+        repeat=repeat,
+        command=" ".join(sys.argv),
+    )
+
+
+def save(meta: Dict[str, Any], results: Dict[str, Dict[str, Any]], directory: pathlib.Path) -> pathlib.Path:
+    """Store the results of a run as JSON in the directory of the host
+
+    Args:
+        meta:       Information about the run, see :func:`metadata`.
+        results:    Results of each benchmark keyed by group.name.
+        directory:  Directory with stored results.
+
+    Returns:
+        Path to the result file.
+    """
+    timestamp = datetime.fromisoformat(meta["date"]).strftime("%Y%m%d-%H%M%S")
+    file_path = directory / meta["host"] / f"{timestamp}-{meta['commit'] or meta['where_version']}.json"
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(file_path, mode="wt") as fid:
+        json.dump(dict(meta=meta, results=results), fid, indent=2)
+    return file_path
+
+
+def load(file_path: pathlib.Path) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]:
+    """Read stored results, returns information about the run and results of each benchmark"""
+    with open(file_path, mode="rt") as fid:
+        stored = json.load(fid)
+    return stored["meta"], stored["results"]
+
+
+def latest(directory: pathlib.Path, meta: Dict[str, Any]) -> Optional[pathlib.Path]:
+    """Find the latest stored run on the same host with the same size
+
+    Args:
+        directory:  Directory with stored results.
+        meta:       Information about the current run.
+
+    Returns:
+        Path to the result file, None if no comparable run is stored.
+    """
+    for file_path in sorted((directory / meta["host"]).glob("*.json"), reverse=True):
+        stored_meta, _ = load(file_path)
+        if stored_meta["size"] == meta["size"] and stored_meta["date"] < meta["date"]:
+            return file_path
+    return None
+
+
+def compare(
+    previous: Dict[str, Dict[str, Any]], current: Dict[str, Dict[str, Any]], tolerance: float = 0.2
+) -> List[Comparison]:
+    """Compare the fastest runs of benchmarks present in both runs
+
+    Args:
+        previous:   Results of the previous run.
+        current:    Results of the current run.
+        tolerance:  Relative change in time that is reported as a regression or an improvement.
+
+    Returns:
+        Comparison of each benchmark.
+    """
+    comparisons = list()
+    for key, result in current.items():
+        if result["status"] != "ok" or previous.get(key, dict()).get("status") != "ok":
+            continue
+        ratio = result["min"] / previous[key]["min"] if previous[key]["min"] > 0 else float("inf")
+        if ratio > 1 + tolerance:
+            verdict = "REGRESSION"
+        elif ratio < 1 / (1 + tolerance):
+            verdict = "improved"
+        else:
+            verdict = "unchanged"
+        comparisons.append(Comparison(key, previous[key]["min"], result["min"], ratio, verdict))
+    return comparisons
+
+
+def _git_commit() -> Optional[str]:
+    """Short hash of the checked out commit, with a mark if there are local changes, None outside of git"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        is_dirty = subprocess.run(["git", "diff", "--quiet", "HEAD"], cwd=REPO_DIR).returncode != 0
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f"{commit}+dirty" if is_dirty else commit
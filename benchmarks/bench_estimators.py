@@ -0,0 +1,143 @@
+"""Benchmarks of estimators
+
+Description:
+------------
+
+The least squares estimator solves for station positions and clock offsets from the synthetic VLBI delays. The
+estimator works with dense weight and cofactor matrices of size number of observations squared, so only the first
+LSQ_MAX_OBS observations are used. Weak constraints on all parameters keep the normal equations regular also for
+stations with few observations.
+
+The SLR least squares estimation solves for station positions and range biases from the synthetic normal points, in
+the terrestrial frame only, so that no apriori files are needed. It uses the same limit on the number of observations
+as the VLBI estimation.
+
+The Kalman filter estimates position, clock and zenith wet delay of the first station from its synthetic GNSS code
+observations, with the clock as a random walk. The filter stores the covariance matrix of each epoch on file.
+"""
+
+# External library imports
+import numpy as np
+
+# Where imports
+from where.estimation.estimators._kalman import KalmanFilter
+from where.estimation.estimators._lsq import LsqEstimator
+from where.lib import config
+
+# Benchmark imports
+from benchmarks import synthetic
+from benchmarks._harness import register
+
+# Maximum number of observations in the least squares estimation
+LSQ_MAX_OBS = 2000
+
+# Standard deviations of the VLBI delays and of the constraints on the parameters
+VLBI_DELAY_SIGMA = 1e-11  # [s]
+CONSTRAINT_SIGMA = 1.0  # [m] for positions, [s] for clocks
+
+# Standard deviation of the SLR normal points, and offset of the apriori station positions
+SLR_RANGE_SIGMA = 0.01  # [m]
+SLR_APRIORI_OFFSET = 0.05  # [m]
+
+# Standard deviations of the GNSS code observations and of the clock random walk between epochs
+CODE_SIGMA = 0.3  # [m]
+CLOCK_NOISE = 10.0  # [m]
+
+
+@register("estimators")
+def lsq(size):
+    """Least squares estimation of VLBI station positions and clock offsets"""
+    dset = synthetic.vlbi_dataset(size)
+    num_obs = min(dset.num_obs, LSQ_MAX_OBS)
+    stations = sorted(set(dset.station_1[:num_obs]) | set(dset.station_2[:num_obs]))[1:]  # First is reference
+    param_names = [f"{sta}_{p}" for sta in stations for p in ("site_pos_x", "site_pos_y", "site_pos_z", "clock")]
+    num_params = len(param_names)
+
+    # Partial derivatives of delay [s] with respect to position [m] and clock [s], followed by constraints
+    H = np.zeros((num_obs + num_params, num_params, 1))
+    obs_idx = np.arange(num_obs)
+    baseline = dset.site_pos_2.trs.val[:num_obs] - dset.site_pos_1.trs.val[:num_obs]
+    direction = -baseline / np.linalg.norm(baseline, axis=1, keepdims=True)
+    for station_field, sign in (("station_1", 1), ("station_2", -1)):
+        station_idx = np.array([stations.index(s) if s in stations else -1 for s in dset[station_field][:num_obs]])
+        has_param = station_idx >= 0
+        for coord in range(3):
+            H[obs_idx[has_param], 4 * station_idx[has_param] + coord, 0] = (
+                sign * direction[has_param, coord] / synthetic.SPEED_OF_LIGHT
+            )
+        H[obs_idx[has_param], 4 * station_idx[has_param] + 3, 0] = -sign
+    H[num_obs + np.arange(num_params), np.arange(num_params), 0] = 1
+
+    z = np.concatenate([dset.observed_delay[:num_obs], np.zeros(num_params)])
+    sigma = np.concatenate([np.full(num_obs, VLBI_DELAY_SIGMA), np.full(num_params, CONSTRAINT_SIGMA)])
+    W = np.diag(1 / sigma**2)
+
+    def estimate():
+        estimator = LsqEstimator(H=H, z=z, W=W, param_names=param_names)
+        estimator.estimate()
+
+    return estimate, num_obs
+
+
+@register("estimators")
+def slr_lsq(size):
+    """Least squares estimation of SLR station positions and range biases"""
+    dset = synthetic.slr_dataset(size)
+    num_obs = min(dset.num_obs, LSQ_MAX_OBS)
+    stations = sorted(set(dset.station[:num_obs]))
+    param_names = [f"{sta}_{p}" for sta in stations for p in ("site_pos_x", "site_pos_y", "site_pos_z", "range_bias")]
+    num_params = len(param_names)
+
+    # Partial derivatives of range [m] with respect to position [m] and range bias [m], followed by constraints
+    apriori_pos = dset.site_pos.trs.val[:num_obs] + SLR_APRIORI_OFFSET
+    line_of_sight = dset.sat_pos.trs.val[:num_obs] - apriori_pos
+    distance = np.linalg.norm(line_of_sight, axis=1)
+    station_idx = np.array([stations.index(s) for s in dset.station[:num_obs]])
+    obs_idx = np.arange(num_obs)
+    H = np.zeros((num_obs + num_params, num_params, 1))
+    for coord in range(3):
+        H[obs_idx, 4 * station_idx + coord, 0] = -line_of_sight[:, coord] / distance
+    H[obs_idx, 4 * station_idx + 3, 0] = 1
+    H[num_obs + np.arange(num_params), np.arange(num_params), 0] = 1
+
+    z = np.concatenate([dset.obs[:num_obs] - distance, np.zeros(num_params)])
+    sigma = np.concatenate([np.full(num_obs, SLR_RANGE_SIGMA), np.full(num_params, CONSTRAINT_SIGMA)])
+    W = np.diag(1 / sigma**2)
+
+    def estimate():
+        estimator = LsqEstimator(H=H, z=z, W=W, param_names=param_names)
+        estimator.estimate()
+
+    return estimate, num_obs
+
+
+@register("estimators")
+def kalman(size):
+    """Kalman filter and smoother for position, clock and zenith wet delay of one GNSS station"""
+    dset = synthetic.gnss_datasets(size._replace(stations=1))[0]
+    param_names = ["site_pos_x", "site_pos_y", "site_pos_z", "rcv_clock", "trop_wet"]
+    code = np.where(dset.system == "G", dset.obs.C1C, dset.obs.C1X)
+
+    # Partial derivatives of the code observations, relative to a position 10 meters off
+    apriori_pos = dset.site_pos.trs.val + 10
+    line_of_sight = dset.sat_posvel.trs.pos.val - apriori_pos
+    distance = np.linalg.norm(line_of_sight, axis=1)
+    h = np.zeros((dset.num_obs, len(param_names), 1))
+    h[:, :3, 0] = -line_of_sight / distance[:, None]
+    h[:, 3, 0] = 1
+    h[:, 4, 0] = 1 / np.sin(dset.site_pos.elevation)
+    z = code - distance
+
+    # Process noise of the clock is added when the filter steps to the next epoch
+    is_new_epoch = np.ones(dset.num_obs, dtype=bool)
+    is_new_epoch[:-1] = np.diff(dset.time.gps.mjd) > 0
+    Q = {obs: {(3, 3): CLOCK_NOISE**2} for obs in np.nonzero(is_new_epoch)[0]}
+    apriori_stdev = np.array([100, 100, 100, 1e4, 1])
+    r = np.full(dset.num_obs, CODE_SIGMA**2)
+    config.files.path("output_covariance_matrix").parent.mkdir(parents=True, exist_ok=True)
+
+    def estimate():
+        kalman_filter = KalmanFilter(h, z=z, apriori_stdev=apriori_stdev, r=r, Q=Q, param_names=param_names)
+        kalman_filter.filter()
+
+    return estimate, dset.num_obs
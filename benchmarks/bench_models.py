@@ -0,0 +1,121 @@
+"""Benchmarks of models, editors and postprocessors
+
+Description:
+------------
+
+All benchmarks in this group work on the synthetic GNSS datasets, one dataset for each station, and only use parts of
+Where that do not need apriori files. The gridded field benchmarks interpolate a synthetic global grid given every six
+hours, like the VMF1 grids and the non-tidal atmospheric loading.
+"""
+
+# Standard library imports
+from datetime import datetime, timedelta
+
+# External library imports
+import numpy as np
+
+# Where imports
+from where.apriori import _gridded_field
+from where.cleaners.editors import gnss_dop as gnss_dop_editor
+from where.lib import config
+from where.lib import mathp
+from where.postprocessors import gnss_epoch_by_epoch_difference as epoch_difference_postprocessor
+from where.postprocessors import gnss_linear_combination as linear_combination_postprocessor
+
+# Benchmark imports
+from benchmarks import synthetic
+from benchmarks._harness import register
+
+LINEAR_COMBINATIONS = (
+    "code_multipath, code_phase, geometry_free, ionosphere_free, melbourne_wuebbena, narrow_lane, wide_lane"
+)
+
+
+@register("models")
+def gnss_dop(size):
+    """Dilution of precision of each epoch"""
+    dsets = synthetic.gnss_datasets(size)
+    return lambda: [gnss_dop_editor.gnss_dop(dset) for dset in dsets], sum(dset.num_obs for dset in dsets)
+
+
+@register("models")
+def gnss_linear_combination(size):
+    """All linear combinations of code and phase observations"""
+    config.tech.update_from_dict(dict(obs_code="code, phase"), section="gnss_select_obs")
+    config.tech.update_from_dict(dict(linear_combination=LINEAR_COMBINATIONS), section="gnss_linear_combination")
+    dsets = synthetic.gnss_datasets(size)
+    return (
+        lambda: [linear_combination_postprocessor.gnss_linear_combination(dset) for dset in dsets],
+        sum(dset.num_obs for dset in dsets),
+    )
+
+
+@register("models")
+def gnss_epoch_by_epoch_difference(size):
+    """Epoch by epoch differences of all observations"""
+    config.tech.update_from_dict(dict(max_gap=str(1.5 * size.rate)), section="gnss_epoch_by_epoch_difference")
+    dsets = synthetic.gnss_datasets(size)
+    return (
+        lambda: [epoch_difference_postprocessor.gnss_epoch_by_epoch_difference(dset) for dset in dsets],
+        sum(dset.num_obs for dset in dsets),
+    )
+
+
+@register("models")
+def orbit_interpolation(size):
+    """Lagrange interpolation of 15 minute orbits of all satellites to the observation epochs of at most one day
+
+    The interpolation is done point by point, so the number of days is limited to keep the run time reasonable.
+    """
+    size = size._replace(days=min(size.days, 1))
+    orbit_seconds = synthetic.epochs(size, rate=900)
+    _, _, orbit_pos, _ = synthetic.satellite_orbits(synthetic.GNSS_CONSTELLATIONS, orbit_seconds)
+    seconds = synthetic.epochs(size)
+    seconds = seconds[seconds <= orbit_seconds[-1]]
+
+    def interpolate():
+        for sat_num in range(orbit_pos.shape[1]):
+            mathp.moving_window_interpolation(orbit_seconds, orbit_pos[:, sat_num], seconds, window_size=10)
+
+    return interpolate, seconds.size * orbit_pos.shape[1]
+
+
+@register("models")
+def gridded_field_spline(size):
+    """Spline interpolation of a global grid at the station positions"""
+    return _gridded_field_benchmark(size, "spline")
+
+
+@register("models")
+def gridded_field_bilinear(size):
+    """Bilinear interpolation of a global grid at the station positions"""
+    return _gridded_field_benchmark(size, "bilinear")
+
+
+def _gridded_field_benchmark(size, space_interpolation):
+    """Interpolate a synthetic 2 x 2.5 degree grid, given every six hours, in space and time"""
+    dsets = synthetic.gnss_datasets(size)
+    lat = np.radians(np.arange(-90, 90.1, 2.0))
+    lon = np.radians(np.arange(0, 360, 2.5))
+    num_grids = int(np.ceil(size.days * 4)) + 2  # The first grid is before the first epoch, which is in GPS time
+    values = np.sin(lat)[None, :, None] * np.cos(lon)[None, None, :] + np.arange(num_grids)[:, None, None]
+    obs_positions = list()
+    for dset in dsets:
+        x, y, z = dset.site_pos.trs.val[0]
+        site_lon, site_lat = np.arctan2(y, x) % (2 * np.pi), np.arctan2(z, np.hypot(x, y))
+        obs_positions.append((np.full(dset.num_obs, site_lon), np.full(dset.num_obs, site_lat)))
+
+    def interpolate():
+        config.where.update_from_dict(dict(space_interpolation=space_interpolation), section="gridded_fields")
+        field = _gridded_field.GriddedField(
+            start=datetime(2019, 12, 31, 18),
+            interval=timedelta(hours=6),
+            lat=lat,
+            lon=lon,
+            values=values,
+            available=np.ones(num_grids, dtype=bool),
+        )
+        for dset, (obs_lon, obs_lat) in zip(dsets, obs_positions):
+            field(dset.time, obs_lon, obs_lat)
+
+    return interpolate, sum(dset.num_obs for dset in dsets)
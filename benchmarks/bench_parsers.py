@@ -0,0 +1,38 @@
+"""Benchmarks of parsers
+
+Description:
+------------
+
+The SP3-c parser reads a synthetic orbit file covering all days of the benchmark size, while the HAS decoder parser
+reads the example files bundled with the tests. The persistent parse cache is bypassed, so that the parsing itself is
+timed.
+"""
+
+# Where imports
+from where import parsers
+
+# Benchmark imports
+from benchmarks import synthetic
+from benchmarks._harness import REPO_DIR, register, work_dir
+
+
+@register("parsers")
+def orbit_sp3c(size):
+    """Parse an SP3-c file with 5 minute orbits of all GNSS satellites"""
+    file_path = work_dir() / "synthetic.sp3"
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    num_obs = synthetic.write_sp3c(file_path, size)
+    return lambda: parsers.parse_file("orbit_sp3c", file_path, use_cache=False), num_obs
+
+
+@register("parsers", sized=False)
+def gnss_has_decoder(size):
+    """Parse the bundled HAS decoder files with code biases, clock, phase biases and orbit corrections"""
+    file_paths = sorted((REPO_DIR / "tests" / "parsers" / "example_files").glob("*_has_*.csv"))
+    num_obs = sum(len(file_path.read_text().splitlines()) - 1 for file_path in file_paths)
+
+    def parse_all():
+        for file_path in file_paths:
+            parsers.parse_file("gnss_has_decoder", file_path, use_cache=False)
+
+    return parse_all, num_obs
@@ -0,0 +1,144 @@
+"""Benchmarks of writers and dataset files
+
+Description:
+------------
+
+The dataset benchmarks write and read the synthetic GNSS datasets as HDF5 files, one file for each station. The
+lazy read benchmark opens the files without reading the fields, and reads the time and satellite fields on first
+access. The concatenate benchmark writes one dataset file for each day of the first station, and times the
+concatenate tool reading and merging them. The satellite views benchmark picks out the time and observations of each
+satellite through dataset views, the way plots and statistics do. The time string benchmark formats all observation
+epochs the way the writers do.
+"""
+
+# Standard library imports
+from datetime import timedelta
+from typing import List, Tuple
+
+# External library imports
+import numpy as np
+
+# Where imports
+from where.data import _dataset_writer
+from where.data import dataset3 as dataset
+from where.data import time
+from where.tools import concatenate as concatenate_tool
+
+# Benchmark imports
+from benchmarks import synthetic
+from benchmarks._harness import PIPELINE, RUNDATE, register
+
+# Dataset variables of the files written by the benchmarks
+DSET_VARS = dict(pipeline=PIPELINE, stage="benchmark", user="benchmark", id="")
+
+
+@register("writers")
+def dataset_write(size):
+    """Write all fields of the datasets to HDF5 files"""
+    dsets = [_with_vars(dset, label=str(dset.station[0])) for dset in synthetic.gnss_datasets(size)]
+
+    def write():
+        for dset in dsets:
+            dset.write()
+        _dataset_writer.writer.flush()
+
+    return write, sum(dset.num_obs for dset in dsets)
+
+
+@register("writers")
+def dataset_read(size):
+    """Read all fields of the datasets from HDF5 files"""
+    labels, num_obs = _write_datasets(size)
+    return lambda: [dataset.Dataset.read(rundate=RUNDATE, label=label, **DSET_VARS) for label in labels], num_obs
+
+
+@register("writers")
+def dataset_read_fields(size):
+    """Read the time, satellite and observation fields of the datasets from HDF5 files"""
+    labels, num_obs = _write_datasets(size)
+    fields = ["time", "satellite", "obs"]
+    return (
+        lambda: [dataset.Dataset.read(rundate=RUNDATE, label=label, fields=fields, **DSET_VARS) for label in labels],
+        num_obs,
+    )
+
+
+@register("writers")
+def dataset_read_lazy(size):
+    """Open the datasets lazily and read only the time and satellite fields when they are used"""
+    labels, num_obs = _write_datasets(size)
+
+    def read_lazy():
+        for label in labels:
+            dset = dataset.Dataset.read(rundate=RUNDATE, label=label, lazy=True, **DSET_VARS)
+            dset.time, dset.satellite
+
+    return read_lazy, num_obs
+
+
+@register("writers")
+def concatenate(size):
+    """Read and merge the daily datasets of the first station"""
+    dset = synthetic.gnss_datasets(size._replace(stations=1))[0]
+    mjd = np.floor(dset.time.gps.mjd - synthetic.START_MJD).astype(int)
+    num_days = mjd.max() + 1
+    for day in range(num_days):
+        day_dset = dataset.Dataset(
+            num_obs=np.sum(mjd == day), rundate=RUNDATE + timedelta(days=day), label="concatenate", **DSET_VARS
+        )
+        day_dset.update_from(dset.view(mjd == day))
+        day_dset.write()
+    _dataset_writer.writer.flush()
+
+    dset_vars = dict(DSET_VARS, label="concatenate")
+    to_date = RUNDATE + timedelta(days=int(num_days) - 1)
+    return (
+        lambda: concatenate_tool._concatenate_datasets(RUNDATE, to_date, dset_vars, only_for_rundate=False, threads=4),
+        dset.num_obs,
+    )
+
+
+@register("writers")
+def satellite_views(size):
+    """Views of the time and observations of each satellite"""
+    dsets = synthetic.gnss_datasets(size)
+
+    def view_all():
+        values = list()
+        for dset in dsets:
+            for satellite in dset.unique("satellite"):
+                view = dset.view(dset.filter(satellite=satellite))
+                values.append((view.time.gps.mjd, view.obs.C1C))
+        return values
+
+    return view_all, sum(dset.num_obs for dset in dsets)
+
+
+@register("writers")
+def time_strings(size):
+    """Format observation epochs as ISO, SINEX and GPS week strings"""
+    dsets = synthetic.gnss_datasets(size)
+
+    def format_all():
+        for dset in dsets:
+            time.isot_str(dset.time)
+            time.yydddsssss_str(dset.time)
+            time.gps_ws_str(dset.time)
+
+    return format_all, sum(dset.num_obs for dset in dsets)
+
+
+def _with_vars(dset: "Dataset", label: str) -> "Dataset":
+    """Copy a synthetic dataset into a dataset with variables naming its file"""
+    named_dset = dataset.Dataset(num_obs=dset.num_obs, rundate=RUNDATE, label=label, **DSET_VARS)
+    named_dset.update_from(dset)
+    return named_dset
+
+
+def _write_datasets(size: "Size") -> Tuple[List[str], int]:
+    """Write the synthetic GNSS datasets labeled by station, returns the labels and the total number of observations"""
+    dsets = synthetic.gnss_datasets(size)
+    for dset in dsets:
+        _with_vars(dset, label=str(dset.station[0])).write()
+    _dataset_writer.writer.flush()
+    return [str(dset.station[0]) for dset in dsets], sum(dset.num_obs for dset in dsets)
@@ -0,0 +1,86 @@
+"""Benchmark of the GNSS epoch by epoch difference and linear combination postprocessors
+
+Description:
+------------
+
+Builds a synthetic dataset with 1 Hz observations of four constellations (GPS, Galileo, BeiDou and QZSS) over one
+day, and times the `gnss_epoch_by_epoch_difference` and `gnss_linear_combination` postprocessors on it. The dataset
+has roughly 2.7 million observations. Satellites are dropped at random epochs, so that the satellite arcs have gaps.
+
+Run from the root of the repository:
+
+    python benchmarks/gnss_combinations.py [--hours=24] [--repeat=3]
+"""
+
+# Standard library imports
+import argparse
+import time
+
+# External library imports
+import numpy as np
+
+# Where imports
+from where.data import dataset3 as dataset
+from where.lib import config
+from where.postprocessors import gnss_epoch_by_epoch_difference
+from where.postprocessors import gnss_linear_combination
+
+# Number of visible satellites and observation types of each constellation
+CONSTELLATIONS = {
+    "G": (10, ["C1C", "C2W", "L1C", "L2W"]),
+    "E": (8, ["C1X", "C5X", "L1X", "L5X"]),
+    "C": (10, ["C2I", "C7I", "L2I", "L7I"]),
+    "J": (3, ["C1C", "C2L", "L1C", "L2L"]),
+}
+COMBINATIONS = "code_multipath, code_phase, geometry_free, ionosphere_free, melbourne_wuebbena, narrow_lane, wide_lane"
+
+
+def synthetic_dataset(hours: float, rate: float = 1.0, seed: int = 0) -> "Dataset":
+    """Dataset with observations of all constellations, sorted by time"""
+    rng = np.random.default_rng(seed)
+    epochs = np.arange(0, hours * 3600, rate)
+    satellites = [
+        (sys, f"{sys}{num:02d}") for sys, (num_sat, _) in CONSTELLATIONS.items() for num in range(1, num_sat + 1)
+    ]
+    sat_idx = np.tile(np.arange(len(satellites)), epochs.size)
+    epoch_idx = np.repeat(np.arange(epochs.size), len(satellites))
+    keep = rng.random(sat_idx.size) > 0.01
+    sat_idx, epoch_idx = sat_idx[keep], epoch_idx[keep]
+
+    dset = dataset.Dataset(num_obs=sat_idx.size)
+    dset.add_time("time", val=58849 + epochs[epoch_idx] / 86400, scale="gps", fmt="mjd")
+    dset.add_text("system", val=np.array([s for s, _ in satellites])[sat_idx])
+    dset.add_text("satellite", val=np.array([s for _, s in satellites])[sat_idx])
+    dset.meta["obstypes"] = {sys: obstypes for sys, (_, obstypes) in CONSTELLATIONS.items()}
+    for obstype in sorted({o for _, obstypes in CONSTELLATIONS.values() for o in obstypes}):
+        dset.add_float(f"obs.{obstype}", val=rng.normal(2.2e7, 1e3, dset.num_obs), unit="meter")
+    return dset
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--hours", type=float, default=24, help="Length of the synthetic dataset in hours")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of timed runs of each postprocessor")
+    args = parser.parse_args()
+
+    config.read_where_config()
+    config.tech.update_from_dict(dict(obs_code="code, phase"), section="gnss_select_obs")
+    config.tech.update_from_dict(dict(linear_combination=COMBINATIONS), section="gnss_linear_combination")
+    config.tech.update_from_dict(dict(max_gap="1.5"), section="gnss_epoch_by_epoch_difference")
+
+    dset = synthetic_dataset(args.hours)
+    print(f"Synthetic dataset: {dset.num_obs} observations, {len(dset.unique('satellite'))} satellites")
+    for name, postprocessor in (
+        ("gnss_epoch_by_epoch_difference", gnss_epoch_by_epoch_difference.gnss_epoch_by_epoch_difference),
+        ("gnss_linear_combination", gnss_linear_combination.gnss_linear_combination),
+    ):
+        timings = list()
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            postprocessor(dset)
+            timings.append(time.perf_counter() - start)
+        print(f"{name:<32} best {min(timings):8.3f} s, mean {np.mean(timings):8.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+"""Synthetic GNSS, VLBI and SLR observations for the benchmarks
+
+Description:
+------------
+
+The observations are generated from a simple geometry, so that the benchmarks run offline without any apriori files:
+Stations are spread randomly over a spherical Earth, satellites move in circular orbits, and radio sources are fixed
+directions in a celestial frame. The Earth rotates with constant speed about the z-axis, which is all that is needed
+to turn the orbits and the source directions into the terrestrial reference frame.
+
+The size of the data is given by a :class:`Size`, which is the number of stations, the number of days and the
+observation interval. The same size and seed always gives the same observations, so that timings of different runs
+can be compared.
+"""
+
+# Standard library imports
+import pathlib
+from typing import Dict, List, NamedTuple, Tuple
+
+# External library imports
+import numpy as np
+
+# Where imports
+from where.data import dataset3 as dataset
+
+# Geometry of the synthetic Earth
+EARTH_RADIUS = 6_371_000.0  # [m]
+EARTH_ROTATION = 7.292_115_146_7e-5  # [rad/s]
+EARTH_GM = 3.986_004_418e14  # [m**3/s**2]
+SPEED_OF_LIGHT = 299_792_458.0  # [m/s]
+
+# First epoch of all synthetic data, 2020-01-01 00:00
+START_MJD = 58849.0
+
+
+class Size(NamedTuple):
+    """Size of the synthetic data"""
+
+    stations: int
+    days: float
+    rate: float  # Observation interval in seconds
+
+    def __str__(self) -> str:
+        return f"{self.stations} stations, {self.days:g} days, {self.rate:g} s"
+
+
+class Constellation(NamedTuple):
+    """Walker-like constellation of satellites in circular orbits"""
+
+    num_satellites: int
+    num_planes: int
+    radius: float  # [m]
+    inclination: float  # [deg]
+    obstypes: List[str]
+
+
+GNSS_CONSTELLATIONS = {
+    "G": Constellation(24, 6, 26_560e3, 55.0, ["C1C", "C2W", "L1C", "L2W"]),
+    "E": Constellation(24, 3, 29_600e3, 56.0, ["C1X", "C5X", "L1X", "L5X"]),
+}
+SLR_SATELLITES = {
+    "lageos1": Constellation(1, 1, 12_270e3, 109.8, []),
+    "lageos2": Constellation(1, 1, 12_163e3, 52.6, []),
+    "etalon1": Constellation(1, 1, 25_500e3, 64.9, []),
+}
+
+# Elevation cut-off of each technique [deg]
+GNSS_CUTOFF = 10.0
+SLR_CUTOFF = 20.0
+VLBI_CUTOFF = 5.0
+
+# VLBI scans, each scan is observed by a subnetwork of at most VLBI_SCAN_STATIONS stations
+VLBI_SCAN_INTERVAL = 300.0  # [s]
+VLBI_SCAN_STATIONS = 10
+VLBI_NUM_SOURCES = 100
+
+
+def epochs(size: Size, rate: float = None) -> np.ndarray:
+    """Seconds since the first epoch of all observation epochs"""
+    return np.arange(0, size.days * 86400, size.rate if rate is None else rate)
+
+
+def station_positions(num_stations: int, seed: int = 0) -> np.ndarray:
+    """Positions of stations uniformly spread over the surface of the Earth
+
+    Args:
+        num_stations:  Number of stations.
+        seed:          Seed of the random generator.
+
+    Returns:
+        Terrestrial positions with shape (num_stations, 3) in [m].
+    """
+    rng = np.random.default_rng(seed)
+    lat = np.arcsin(rng.uniform(-1, 1, num_stations))
+    lon = rng.uniform(-np.pi, np.pi, num_stations)
+    return EARTH_RADIUS * np.stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)], axis=1)
+
+
+def satellite_orbits(
+    constellations: Dict[str, Constellation], seconds: np.ndarray
+) -> Tuple[List[str], List[str], np.ndarray, np.ndarray]:
+    """Terrestrial positions and velocities of satellites in circular orbits
+
+    Args:
+        constellations:  Constellations keyed by system identifier, or by satellite name for single satellites.
+        seconds:         Epochs as seconds since the first epoch.
+
+    Returns:
+        Satellite names, system identifiers, positions and velocities. Positions and velocities have the shape
+        (num_epochs, num_satellites, 3) and are given in [m] and [m/s].
+    """
+    satellites, systems, planes = list(), list(), list()
+    for system, const in constellations.items():
+        for num in range(const.num_satellites):
+            plane = num % const.num_planes
+            satellites.append(f"{system}{num + 1:02d}" if const.num_satellites > 1 else system)
+            systems.append(system)
+            planes.append(
+                (
+                    const.radius,
+                    np.radians(const.inclination),
+                    2 * np.pi * plane / const.num_planes,  # Right ascension of ascending node
+                    2 * np.pi * (num // const.num_planes) * const.num_planes / const.num_satellites
+                    + 0.5 * plane
+                    + 0.1,
+                )
+            )
+    radius, incl, node, phase = (np.array(p)[None, :] for p in zip(*planes))
+    rate = np.sqrt(EARTH_GM / radius**3)
+    t = seconds[:, None]
+
+    # Position and velocity in the orbital plane, rotated by inclination and node
+    arg = phase + rate * t
+    in_plane = np.stack([np.cos(arg), np.sin(arg)], axis=-1) * radius[..., None]
+    vel_plane = np.stack([-np.sin(arg), np.cos(arg)], axis=-1) * (radius * rate)[..., None]
+    angle = node - EARTH_ROTATION * t  # Node in the rotating terrestrial frame
+    pos = _rotate_plane(in_plane, incl, angle)
+    vel = _rotate_plane(vel_plane, incl, angle)
+    vel += EARTH_ROTATION * np.stack([pos[..., 1], -pos[..., 0], np.zeros(pos.shape[:2])], axis=-1)
+    return satellites, systems, pos, vel
+
+
+def elevation(site_pos: np.ndarray, target_pos: np.ndarray) -> np.ndarray:
+    """Elevation of targets seen from sites on a spherical Earth [rad]"""
+    diff = target_pos - site_pos
+    up = site_pos / np.linalg.norm(site_pos, axis=-1, keepdims=True)
+    return np.arcsin(np.sum(diff * up, axis=-1) / np.linalg.norm(diff, axis=-1))
+
+
+def gnss_datasets(size: Size, seed: int = 0) -> List["Dataset"]:
+    """Datasets with GNSS code and phase observations, one dataset for each station
+
+    Each dataset holds the observations of one receiver, like in the GNSS pipeline, sorted by time and satellite. Each
+    satellite arc gets its own phase ambiguity.
+
+    Args:
+        size:  Number of stations, days and the observation interval.
+        seed:  Seed of the random generator.
+
+    Returns:
+        List of datasets.
+    """
+    rng = np.random.default_rng(seed)
+    seconds = epochs(size)
+    satellites, systems, sat_pos, sat_vel = satellite_orbits(GNSS_CONSTELLATIONS, seconds)
+    satellites, systems = np.array(satellites), np.array(systems)
+    obstypes = sorted({o for const in GNSS_CONSTELLATIONS.values() for o in const.obstypes})
+
+    dsets = list()
+    for station_num, site_pos in enumerate(station_positions(size.stations, seed=seed)):
+        epoch_idx, sat_idx = np.nonzero(elevation(site_pos, sat_pos) > np.radians(GNSS_CUTOFF))
+        num_obs = epoch_idx.size
+        dset = dataset.Dataset(num_obs=num_obs)
+        dset.meta["obstypes"] = {sys: const.obstypes for sys, const in GNSS_CONSTELLATIONS.items()}
+        dset.add_time("time", val=START_MJD + seconds[epoch_idx] / 86400, scale="gps", fmt="mjd")
+        dset.add_text("station", val=np.full(num_obs, f"s{station_num:03d}"))
+        dset.add_text("satellite", val=satellites[sat_idx])
+        dset.add_text("system", val=systems[sat_idx])
+        dset.add_position("site_pos", time=dset.time, system="trs", val=np.repeat(site_pos[None, :], num_obs, axis=0))
+        dset.add_posvel(
+            "sat_posvel",
+            time=dset.time,
+            system="trs",
+            val=np.hstack([sat_pos[epoch_idx, sat_idx], sat_vel[epoch_idx, sat_idx]]),
+        )
+        dset.site_pos.other = dset.sat_posvel  # Only one way, since circular references can not be read from file
+
+        geometric_range = np.linalg.norm(sat_pos[epoch_idx, sat_idx] - site_pos, axis=1)
+        arc_start = np.ones(num_obs, dtype=bool)
+        order = np.lexsort((epoch_idx, sat_idx))
+        arc_start[order[1:]] = (sat_idx[order][1:] != sat_idx[order][:-1]) | (np.diff(epoch_idx[order]) > 1)
+        ambiguity = np.zeros(num_obs)
+        ambiguity[order] = rng.integers(-1000, 1000, num_obs)[np.cumsum(arc_start[order]) - 1] * 0.19
+        for obstype in obstypes:
+            noise = rng.normal(0, 0.3 if obstype.startswith("C") else 0.003, num_obs)
+            value = geometric_range + noise + (ambiguity if obstype.startswith("L") else 0)
+            dset.add_float(f"obs.{obstype}", val=value, unit="meter")
+        dsets.append(dset)
+
+    return dsets
+
+
+def vlbi_dataset(size: Size, seed: int = 0) -> "Dataset":
+    """Dataset with VLBI group delays
+
+    A scan of a random source starts every VLBI_SCAN_INTERVAL seconds. The source is observed by a random subnetwork
+    of the stations seeing it, and each scan gives one observation for every baseline in the subnetwork. The
+    observation interval of the size is not used.
+
+    Args:
+        size:  Number of stations and days.
+        seed:  Seed of the random generator.
+
+    Returns:
+        Dataset with observations of all days.
+    """
+    rng = np.random.default_rng(seed)
+    site_pos = station_positions(size.stations, seed=seed)
+    up = site_pos / EARTH_RADIUS
+    sources = rng.normal(size=(VLBI_NUM_SOURCES, 3))
+    sources /= np.linalg.norm(sources, axis=1, keepdims=True)
+
+    obs_epoch, obs_source, obs_direction, obs_sta_1, obs_sta_2 = list(), list(), list(), list(), list()
+    for epoch in epochs(size, rate=VLBI_SCAN_INTERVAL):
+        source = rng.integers(VLBI_NUM_SOURCES)
+        direction = _rotate_z(sources[source], -EARTH_ROTATION * epoch)
+        visible = np.nonzero(up @ direction > np.sin(np.radians(VLBI_CUTOFF)))[0]
+        if visible.size < 2:
+            continue
+        network = np.sort(rng.choice(visible, min(visible.size, VLBI_SCAN_STATIONS), replace=False))
+        sta_1, sta_2 = np.triu_indices(network.size, k=1)
+        obs_epoch.append(np.full(sta_1.size, epoch))
+        obs_source.append(np.full(sta_1.size, source))
+        obs_direction.append(np.repeat(direction[None, :], sta_1.size, axis=0))
+        obs_sta_1.append(network[sta_1])
+        obs_sta_2.append(network[sta_2])
+
+    epoch, source, sta_1, sta_2 = (
+        np.concatenate(v).astype(int) for v in (obs_epoch, obs_source, obs_sta_1, obs_sta_2)
+    )
+    directions = np.concatenate(obs_direction)
+    num_obs = epoch.size
+    baseline = site_pos[sta_2] - site_pos[sta_1]
+    delay = -np.sum(baseline * directions, axis=1) / SPEED_OF_LIGHT + rng.normal(0, 1e-11, num_obs)
+
+    names = np.array([f"s{num:03d}" for num in range(size.stations)])
+    dset = dataset.Dataset(num_obs=num_obs)
+    dset.add_time("time", val=START_MJD + epoch / 86400, scale="utc", fmt="mjd")
+    dset.add_text("station_1", val=names[sta_1])
+    dset.add_text("station_2", val=names[sta_2])
+    dset.add_text("baseline", val=np.char.add(np.char.add(names[sta_1], "/"), names[sta_2]))
+    dset.add_text("source", val=np.array([f"q{num:03d}" for num in range(VLBI_NUM_SOURCES)])[source])
+    dset.add_position("site_pos_1", time=dset.time, system="trs", val=site_pos[sta_1])
+    dset.add_position("site_pos_2", time=dset.time, system="trs", val=site_pos[sta_2])
+    dset.add_float("observed_delay", val=delay, unit="second")
+    dset.add_float("observed_delay_ferr", val=np.full(num_obs, 1e-11), unit="second")
+    return dset
+
+
+def slr_dataset(size: Size, seed: int = 0) -> "Dataset":
+    """Dataset with SLR normal points
+
+    A normal point is given every observation interval while a satellite is above the elevation cut-off.
+
+    Args:
+        size:  Number of stations, days and the observation interval.
+        seed:  Seed of the random generator.
+
+    Returns:
+        Dataset with observations of all stations, sorted by time.
+    """
+    rng = np.random.default_rng(seed)
+    seconds = epochs(size)
+    satellites, _, sat_pos, _ = satellite_orbits(SLR_SATELLITES, seconds)
+    site_pos = station_positions(size.stations, seed=seed)
+
+    is_visible = elevation(site_pos[None, None, :, :], sat_pos[:, :, None, :]) > np.radians(SLR_CUTOFF)
+    epoch_idx, sat_idx, sta_idx = np.nonzero(is_visible)
+    num_obs = epoch_idx.size
+    geometric_range = np.linalg.norm(sat_pos[epoch_idx, sat_idx] - site_pos[sta_idx], axis=1)
+
+    dset = dataset.Dataset(num_obs=num_obs)
+    dset.add_time("time", val=START_MJD + seconds[epoch_idx] / 86400, scale="utc", fmt="mjd")
+    dset.add_text("station", val=np.array([f"s{num:03d}" for num in range(size.stations)])[sta_idx])
+    dset.add_text("satellite", val=np.array(satellites)[sat_idx])
+    dset.add_position("site_pos", time=dset.time, system="trs", val=site_pos[sta_idx])
+    dset.add_position("sat_pos", time=dset.time, system="trs", val=sat_pos[epoch_idx, sat_idx])
+    dset.add_float("obs", val=geometric_range + rng.normal(0, 0.01, num_obs), unit="meter")
+    return dset
+
+
+def write_sp3c(file_path: pathlib.Path, size: Size, interval: float = 300.0) -> int:
+    """Write the GNSS orbits to an SP3-c file
+
+    Only the header lines read by the SP3-c parser are filled in.
+
+    Args:
+        file_path:  Path of the SP3-c file.
+        size:       Number of days, stations and observation interval are not used.
+        interval:   Interval between orbit epochs in seconds.
+
+    Returns:
+        Number of satellite positions in the file.
+    """
+    seconds = epochs(size, rate=interval)
+    satellites, _, sat_pos, _ = satellite_orbits(GNSS_CONSTELLATIONS, seconds)
+    gps_sec = seconds + 3 * 86400  # 2020-01-01 is a Wednesday, GPS week 2086
+    lines = [
+        f"#cP2020  1  1  0  0  0.00000000 {seconds.size:7d} ORBIT IGb14 HLM  BMK",
+        f"## 2086 {gps_sec[0]:15.8f} {interval:14.8f} {int(START_MJD):5d} 0.0000000000000",
+        f"+  {len(satellites):3d}   " + "".join(satellites[:17]),
+        *["+        " + "".join(satellites[i : i + 17]) for i in range(17, 85, 17)],
+        *["++         " + "  0" * 17] * 5,
+        "%c M  cc GPS ccc cccc cccc cccc cccc ccccc ccccc ccccc ccccc",
+        "%c cc cc ccc ccc cccc cccc cccc cccc ccccc ccccc ccccc ccccc",
+        "%f  1.2500000  1.025000000  0.00000000000  0.000000000000000",
+        "%f  0.0000000  0.000000000  0.00000000000  0.000000000000000",
+        "%i    0    0    0    0      0      0      0      0         0",
+        "%i    0    0    0    0      0      0      0      0         0",
+        *["/* Synthetic orbits for benchmarks"] * 4,
+    ]
+    for epoch, pos in zip(seconds, sat_pos / 1000):
+        hours, rest = divmod(epoch % 86400, 3600)
+        day = 1 + int(epoch // 86400)
+        lines.append(f"*  2020  1 {day:2d} {int(hours):2d} {int(rest // 60):2d} {rest % 60:11.8f}")
+        lines.extend(f"P{sat}{x:14.6f}{y:14.6f}{z:14.6f}{0:14.6f}" for sat, (x, y, z) in zip(satellites, pos))
+    lines.append("EOF")
+
+    file_path.write_text("\n".join(lines) + "\n")
+    return seconds.size * len(satellites)
+
+
+def _rotate_plane(xy: np.ndarray, inclination: np.ndarray, node: np.ndarray) -> np.ndarray:
+    """Rotate vectors in orbital planes to 3D, first about the x-axis by inclination, then about the z-axis by node"""
+    x, y = xy[..., 0], xy[..., 1] * np.cos(inclination)
+    z = xy[..., 1] * np.sin(inclination)
+    return np.stack([x * np.cos(node) - y * np.sin(node), x * np.sin(node) + y * np.cos(node), z], axis=-1)
+
+
+def _rotate_z(vector: np.ndarray, angle: float) -> np.ndarray:
+    """Rotate a vector about the z-axis"""
+    cos, sin = np.cos(angle), np.sin(angle)
+    return np.array([cos * vector[0] - sin * vector[1], sin * vector[0] + cos * vector[1], vector[2]])
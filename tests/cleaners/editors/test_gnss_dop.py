@@ -0,0 +1,51 @@
+"""Tests for the gnss_dop editor
+
+Example:
+--------
+    python -m pytest -s test_gnss_dop.py
+"""
+
+# Third party imports
+import numpy as np
+
+# Midgard imports
+from midgard.gnss.compute_dops import compute_dops
+
+# Where imports
+from where.cleaners.editors.gnss_dop import gnss_dop
+from where.data import dataset3 as dataset
+
+
+def _gnss_dset():
+    """Dataset with satellites above a station at the equator, observed in epochs of 4 to 9 satellites"""
+    rng = np.random.default_rng(2021)
+    time = np.repeat(np.arange(10), rng.integers(4, 10, size=10)) * 30.0
+    num_obs = time.size
+    site_pos = np.array([6_371_000.0, 0, 0])
+    direction = rng.normal(size=(num_obs, 3))
+    direction[:, 0] = np.abs(direction[:, 0]) + 0.3  # Above the horizon of the station
+    direction /= np.linalg.norm(direction, axis=1, keepdims=True)
+
+    dset = dataset.Dataset(num_obs=num_obs)
+    dset.add_time("time", val=58849 + time / 86400, scale="gps", fmt="mjd")
+    dset.add_position("site_pos", time=dset.time, system="trs", val=np.repeat(site_pos[None, :], num_obs, axis=0))
+    dset.add_position("sat_pos", time=dset.time, system="trs", val=site_pos + 2e7 * direction)
+    dset.site_pos.other = dset.sat_pos
+    return dset
+
+
+def test_gnss_dop():
+    """Test that the DOP fields hold the DOP of each epoch computed by Midgard"""
+    dset = _gnss_dset()
+    gnss_dop(dset)
+
+    az, el = dset.site_pos.azimuth, dset.site_pos.elevation
+    for time in dset.unique("time"):
+        idx = dset.filter(time=time)
+        for name, expected in zip(("gdop", "pdop", "tdop", "hdop", "vdop"), compute_dops(az[idx], el[idx])):
+            assert np.allclose(dset[name][idx], expected)
+
+    # Existing fields are updated
+    dset.gdop[:] = 0
+    gnss_dop(dset)
+    assert np.all(dset.gdop > 1)
@@ -0,0 +1,276 @@
+"""Tests for the Where dataset
+
+Example:
+--------
+    python -m pytest -s test_dataset3.py
+"""
+
+# Standard library imports
+import copy
+from datetime import date
+
+# Third party imports
+import h5py
+import numpy as np
+import pytest
+
+# Where imports
+from where.data import _dataset_writer
+from where.data import dataset3 as dataset
+from where.lib import config
+from where.lib import exceptions
+
+# Dataset variables of the files written by the tests
+RUNDATE = date(2020, 1, 1)
+DSET_VARS = dict(rundate=RUNDATE, pipeline="gnss", stage="test", user="test", id="")
+
+
+@pytest.fixture
+def dset():
+    """Small dataset with the most common field types and a reference from a position to the time field"""
+    rng = np.random.default_rng(2021)
+    num_obs = 20
+    dset = dataset.Dataset(num_obs=num_obs)
+    dset.add_time("time", val=58849 + np.arange(num_obs) / 96, scale="utc", fmt="mjd")
+    dset.add_text("satellite", val=np.array(["G01", "G02", "E11", "E12"])[np.arange(num_obs) % 4])
+    dset.add_position("site_pos", time=dset.time, system="trs", val=rng.normal(size=(num_obs, 3)) * 1e6)
+    dset.add_float("obs.C1C", val=rng.normal(size=num_obs), unit="meter")
+    dset.add_float("obs.L1C", val=rng.normal(size=num_obs), unit="meter")
+    dset.add_float("residual", val=rng.normal(size=num_obs), unit="meter")
+    return dset
+
+
+@pytest.fixture
+def dataset_config(tmp_path):
+    """Configuration for writing and reading dataset files below a temporary directory"""
+    config.read_where_config()
+    config.read_files_config()
+    config.set_file_vars(config.create_file_vars(RUNDATE, "gnss", user="test", use_options=False))
+    config.files.update_vars(dict(path_work=str(tmp_path)))
+    config.tech.master_section = "gnss"
+    config.tech.update_from_dict(dict(write_level="detail"), section="gnss")
+    yield
+    dataset.Dataset.flush_writes()
+    config.tech.clear()
+
+
+@pytest.fixture
+def delta_config(dataset_config):
+    """Configuration for writing dataset files with unchanged fields linked to earlier files"""
+    config.where.update("dataset_writer", "delta", "True", source="test_dataset3")
+    yield
+    dataset.Dataset.flush_writes()
+    config.read_where_config()
+
+
+def _write(dset, label):
+    """Write a dataset to a file with the given label"""
+    stored = dataset.Dataset(num_obs=dset.num_obs, label=label, **DSET_VARS)
+    stored.update_from(dset)
+    stored.write()
+    dataset.Dataset.flush_writes()
+
+
+def _assert_equal_fields(dset, other):
+    """Assert that two datasets have the same fields with the same values"""
+    assert dset.fields == other.fields
+    assert dset.num_obs == other.num_obs
+    assert np.array_equal(dset.time.utc.jd1, other.time.utc.jd1)
+    assert np.array_equal(dset.time.utc.jd2, other.time.utc.jd2)
+    assert np.array_equal(dset.site_pos.trs.val, other.site_pos.trs.val)
+    for field in ("satellite", "obs.C1C", "obs.L1C", "residual"):
+        assert np.array_equal(dset[field], other[field])
+
+
+@pytest.mark.parametrize("idx", [np.arange(20) % 4 == 1, np.array([3, 7, 8, 15]), slice(5, 12)])
+def test_view_equals_subset(dset, idx):
+    """Test that a view has the same values as a subset of the dataset"""
+    bool_idx = np.zeros(dset.num_obs, dtype=bool)
+    bool_idx[idx] = True
+    expected = copy.deepcopy(dset)
+    expected.subset(bool_idx)
+
+    _assert_equal_fields(dset.view(idx), expected)
+
+
+def test_view_is_read_only(dset):
+    """Test that the data of a view can not be changed, and that the viewed dataset is not changed by the view"""
+    dset.meta.add("C1C", 1.0, section="display_factors")
+    original = copy.deepcopy(dset)
+    view = dset.view(dset.filter(satellite="G01"))
+
+    with pytest.raises(ValueError):
+        view.residual[0] = 0
+    with pytest.raises(ValueError):
+        view.obs.C1C[:] = 0
+
+    view.add_float("extra", val=np.ones(view.num_obs))
+    assert "extra" in view.fields and "extra" not in dset.fields
+    assert np.array_equal(view.extra, np.ones(view.num_obs))
+    _assert_equal_fields(dset, original)
+
+    view.meta.add("L1C", 2.0, section="display_factors")
+    assert view.meta["display_factors"] == dict(C1C=1.0, L1C=2.0)
+    assert dset.meta["display_factors"] == dict(C1C=1.0)
+
+
+def test_view_keeps_references(dset):
+    """Test that fields referring to other fields refer to the fields of the view"""
+    view = dset.view(np.array([1, 4, 9]))
+
+    assert view.site_pos.time is view.time
+    assert np.array_equal(view.time.utc.jd1, dset.time.utc.jd1[[1, 4, 9]])
+
+
+def test_slice_view_shares_memory(dset):
+    """Test that a view of a contiguous range of observations shares memory with the dataset"""
+    view = dset.view(np.arange(20) < 8)
+    assert np.shares_memory(view.residual, dset.residual)
+    assert np.shares_memory(view.obs.C1C, dset.obs.C1C)
+
+    view = dset.view(np.array([1, 4, 9]))
+    assert not np.shares_memory(view.residual, dset.residual)
+
+
+def test_view_is_independent_of_later_subsets(dset):
+    """Test that subsetting the viewed dataset does not change a view"""
+    view = dset.view(dset.filter(satellite="G01"))
+    num_obs = view.num_obs
+    dset.subset(dset.filter(satellite="E11"))
+
+    assert view.num_obs == num_obs
+    assert np.all(view.satellite == "G01")
+
+
+def test_view_of_view(dset):
+    """Test that a view of a view is a view of the dataset, and that both views can be used afterwards"""
+    view = dset.view(np.arange(20) % 2 == 0)
+    view_of_view = view.view(slice(2, 6))
+
+    assert np.array_equal(view_of_view.obs.C1C, dset.obs.C1C[4:12:2])
+    assert np.array_equal(view.obs.C1C, dset.obs.C1C[::2])
+    assert view.fields == view_of_view.fields == dset.fields
+    assert view_of_view.site_pos.time is view_of_view.time
+
+
+def test_lazy_read(dset, dataset_config):
+    """Test that a lazily read dataset reads fields when they are first accessed, with the same values as a read"""
+    _write(dset, label=0)
+    expected = dataset.Dataset.read(label=0, **DSET_VARS)
+    lazy = dataset.Dataset.read(label=0, lazy=True, **DSET_VARS)
+
+    assert lazy.fields == expected.fields
+    assert not any(lazy._fields.is_loaded(name) for name in lazy._fields)
+    assert np.array_equal(lazy.satellite, expected.satellite)
+    assert lazy._fields.is_loaded("satellite") and not lazy._fields.is_loaded("obs")
+    _assert_equal_fields(lazy, expected)
+    assert lazy.site_pos.time is lazy.time
+
+    projected = dataset.Dataset.read(label=0, lazy=True, fields=["time", "obs"], **DSET_VARS)
+    assert projected.fields == ["obs", "obs.C1C", "obs.L1C", "time"]
+    with pytest.raises(ValueError):
+        dataset.Dataset.read(label=0, lazy=True, fields=["missing"], **DSET_VARS)
+
+
+def test_view_of_lazy_read(dset, dataset_config):
+    """Test views and views of views of a lazily read dataset"""
+    _write(dset, label=0)
+    lazy = dataset.Dataset.read(label=0, lazy=True, **DSET_VARS)
+    view = lazy.view(lazy.filter(satellite="G02"))
+    view_of_view = view.view(np.array([0, 2]))
+
+    assert view.fields == view_of_view.fields == dset.fields
+    assert np.array_equal(view_of_view.obs.C1C, dset.obs.C1C[[1, 9]])
+    assert np.array_equal(view.obs.C1C, dset.obs.C1C[1::4])
+    assert np.array_equal(lazy.obs.C1C, dset.obs.C1C)
+    assert view_of_view.site_pos.time is view_of_view.time
+
+
+def test_lazy_read_of_changed_file(dset, dataset_config):
+    """Test that fields are not read after the file, or a file that fields are linked to, has changed"""
+    _write(dset, label=0)
+    lazy = dataset.Dataset.read(label=0, lazy=True, **DSET_VARS)
+    lazy.satellite
+    _write(dset.view(slice(0, 10)), label=0)
+    with pytest.raises(exceptions.DatasetFileChangedError):
+        lazy.obs
+
+    # Write an identical dataset, where the fields are linked to an earlier file if the dataset writer uses links
+    _write(dset, label=0)
+    _write(dset, label=1)
+    lazy = dataset.Dataset.read(label=1, lazy=True, **DSET_VARS)
+    file_path = config.files.path("dataset", file_vars=dict(config.files.vars, stage="test", label=1))
+    with h5py.File(file_path, mode="r") as h5_file:
+        link = h5_file.get("obs", getlink=True)
+    if isinstance(link, h5py.ExternalLink):
+        with h5py.File(file_path.parent / link.filename, mode="r+") as h5_file:
+            h5_file.attrs["changed"] = True
+        with pytest.raises(exceptions.DatasetFileChangedError):
+            lazy.obs
+
+
+def _link(label, field_name):
+    """External link of a field in a dataset file, None if the field is stored in the file"""
+    file_path = config.files.path("dataset", file_vars=dict(config.files.vars, stage="test", label=label))
+    with h5py.File(file_path, mode="r") as h5_file:
+        link = h5_file.get(field_name, getlink=True)
+    return link if isinstance(link, h5py.ExternalLink) else None
+
+
+def test_linked_file_overwritten_by_other_writer(dset, delta_config, monkeypatch):
+    """Test that fields linked to a file are copied before the file is overwritten, also by another process"""
+    _write(dset, label=0)
+    _write(dset, label=1)
+    assert _link(1, "residual") is not None
+
+    # A new writer does not know about the links, like the writer of a later run
+    monkeypatch.setattr(_dataset_writer, "writer", _dataset_writer.DatasetWriter())
+    changed = copy.deepcopy(dset)
+    changed.residual[:] = 0
+    _write(changed, label=0)
+
+    assert _link(1, "residual") is None
+    assert np.array_equal(dataset.Dataset.read(label=1, **DSET_VARS).residual, dset.residual)
+
+
+def test_no_links_to_file_changed_by_other_writer(dset, delta_config, monkeypatch):
+    """Test that fields are not linked to a file that has been overwritten by another process"""
+    _write(dset, label=0)
+    writer = _dataset_writer.writer
+    changed = copy.deepcopy(dset)
+    changed.residual[:] = 0
+    monkeypatch.setattr(_dataset_writer, "writer", _dataset_writer.DatasetWriter())
+    _write(changed, label=0)
+
+    monkeypatch.setattr(_dataset_writer, "writer", writer)
+    _write(dset, label=2)
+
+    assert _link(2, "residual") is None
+    assert np.array_equal(dataset.Dataset.read(label=2, **DSET_VARS).residual, dset.residual)
+
+
+def test_no_links_by_default(dset, dataset_config):
+    """Test that all fields are stored in the dataset files unless delta writing is turned on"""
+    _write(dset, label=0)
+    _write(dset, label=1)
+
+    assert all(_link(1, field_name) is None for field_name in ("time", "site_pos", "residual"))
+
+
+def test_link_index_reads_files_once(dset, delta_config, monkeypatch):
+    """Test that the links of dataset files are only read from file the first time a directory is used"""
+    monkeypatch.setattr(_dataset_writer, "writer", _dataset_writer.DatasetWriter())
+    _write(dset, label=0)
+    read_paths = list()
+    read_links = _dataset_writer._read_links
+    monkeypatch.setattr(_dataset_writer, "_read_links", lambda path: read_paths.append(path) or read_links(path))
+
+    _write(dset, label=1)
+    _write(dset, label=2)
+    changed = copy.deepcopy(dset)
+    changed.residual[:] = 0
+    _write(changed, label=0)
+
+    assert read_paths == []
+    assert _link(1, "residual") is None and _link(2, "residual") is None
+    assert np.array_equal(dataset.Dataset.read(label=2, **DSET_VARS).residual, dset.residual)
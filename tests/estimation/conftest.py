@@ -0,0 +1,22 @@
+"""Common fixtures for the estimation tests
+
+"""
+
+# Standard library imports
+from datetime import date
+
+# Third party imports
+import pytest
+
+# Where imports
+from where.lib import config
+
+
+@pytest.fixture
+def kalman_config(tmp_path):
+    """Configuration for writing the covariance file of the Kalman filter below a temporary directory"""
+    config.read_where_config()
+    config.read_files_config()
+    config.set_file_vars(config.create_file_vars(date(2020, 1, 1), "gnss", user="test", use_options=False))
+    config.files.update_vars(dict(path_work=str(tmp_path)))
+    config.files.path("output_covariance_matrix").parent.mkdir(parents=True, exist_ok=True)
@@ -0,0 +1,160 @@
+"""Tests for the Kalman filter
+
+Example:
+--------
+    python -m pytest -s test_kalman.py
+"""
+
+# Third party imports
+import numpy as np
+import scipy.sparse
+
+# Where imports
+from where.estimation.estimators import cpwl
+from where.estimation.estimators._kalman import KalmanFilter
+from where.estimation.parameters import SparsePartials
+
+
+def _filter_input(num_obs=80, n=12, step=4, num_constraints=3):
+    """Observations of a few parameters each, followed by dense pseudo-observations of all parameters
+
+    Every step observations, the last parameter drifts with the one before it, and process noise is added to both.
+    """
+    rng = np.random.default_rng(2021)
+    h = rng.normal(size=(num_obs, n)) * (rng.uniform(size=(num_obs, n)) < 0.25)
+    h[np.arange(num_obs), rng.integers(n, size=num_obs)] = 1  # At least one non-zero for each observation
+    h = SparsePartials.from_dense(h).vstack(rng.normal(size=(num_constraints, n)))
+    num_obs += num_constraints
+
+    transition = np.eye(n)
+    transition[-1, -2] = 0.5
+    phi, Q = list(), dict()
+    for epoch in range(num_obs):
+        if epoch % step == step - 1:
+            phi.append(scipy.sparse.csr_matrix(transition))
+            Q[epoch] = {(n - 2, n - 2): 0.1, (n - 1, n - 1): 0.01}
+        else:
+            phi.append(1)
+
+    return dict(
+        h=h,
+        z=rng.normal(size=num_obs),
+        apriori_stdev=rng.uniform(1, 10, size=n),
+        phi=phi,
+        r=rng.uniform(0.5, 2.0, size=num_obs),
+        Q=Q,
+    )
+
+
+def _kept_input(filter_input, keep_idx):
+    """Input of a new filter on the kept observations"""
+    kept_epochs = np.flatnonzero(keep_idx)
+    return dict(
+        filter_input,
+        h=filter_input["h"][keep_idx],
+        z=filter_input["z"][keep_idx],
+        r=filter_input["r"][keep_idx],
+        phi=[phi for phi, keep in zip(filter_input["phi"], keep_idx) if keep],
+        Q={new: filter_input["Q"][old] for new, old in enumerate(kept_epochs) if old in filter_input["Q"]},
+    )
+
+
+def _dense_kalman(h, z, apriori_stdev, phi, r, Q):
+    """Textbook Kalman filter and Rauch-Tung-Striebel smoother with dense matrices
+
+    Returns:
+        Tuple of Numpy arrays: Updated states, updated covariances and smoothed states.
+    """
+    H = h.toarray()[:, :, 0]
+    num_obs, n = H.shape
+    x, P = np.zeros(n), np.diag(apriori_stdev ** 2)
+    x_hat, p_hat = np.zeros((num_obs, n)), np.zeros((num_obs, n, n))
+    transitions = [np.eye(n) if isinstance(p, int) else p.toarray() for p in phi]
+    for epoch in range(num_obs):
+        k = P @ H[epoch] / (H[epoch] @ P @ H[epoch] + r[epoch])
+        x_hat[epoch] = x + k * (z[epoch] - H[epoch] @ x)
+        p_hat[epoch] = P - np.outer(k, H[epoch] @ P)
+        x, P = transitions[epoch] @ x_hat[epoch], transitions[epoch] @ p_hat[epoch] @ transitions[epoch].T
+        for (idx1, idx2), noise in Q.get(epoch, {}).items():
+            P[idx1, idx2] += noise
+
+    x_smooth = x_hat.copy()
+    for epoch in range(num_obs - 2, -1, -1):
+        p_pred = transitions[epoch] @ p_hat[epoch] @ transitions[epoch].T
+        for (idx1, idx2), noise in Q.get(epoch, {}).items():
+            p_pred[idx1, idx2] += noise
+        gain = p_hat[epoch] @ transitions[epoch].T @ np.linalg.inv(p_pred)
+        x_smooth[epoch] = x_hat[epoch] + gain @ (x_smooth[epoch + 1] - transitions[epoch] @ x_hat[epoch])
+
+    return x_hat, p_hat, x_smooth
+
+
+def test_sparse_partials_match_dense_filter(kalman_config):
+    """Test that the Kalman filter with sparse partials gives the results of a dense Kalman filter"""
+    filter_input = _filter_input()
+    kalman = KalmanFilter(**filter_input)
+    kalman.filter()
+    x_hat, p_hat, x_smooth = _dense_kalman(**filter_input)
+
+    # Rows are ragged, the dense pseudo-observations do not widen the other rows
+    assert filter_input["h"].indices.size == np.count_nonzero(filter_input["h"].toarray())
+    assert np.allclose(kalman.x_hat[:, :, 0], x_hat, rtol=1e-10, atol=1e-12)
+    assert np.allclose(kalman.x_smooth[:, :, 0], x_smooth, rtol=1e-10, atol=1e-12)
+    for epoch in (0, 40, kalman.num_obs - 1):
+        assert np.allclose(kalman._get_p_hat(epoch), p_hat[epoch], rtol=1e-10, atol=1e-12)
+
+
+def test_refilter_matches_new_filter(kalman_config):
+    """Test that refiltering after removing observations gives the results of a new filter on the kept observations"""
+    filter_input = _filter_input()
+    keep_idx = np.ones(len(filter_input["z"]), dtype=bool)
+    keep_idx[[17, 18, 45]] = False
+    kept_input = _kept_input(filter_input, keep_idx)
+    epochs = (0, 16, 17, 50, len(kept_input["z"]) - 1)
+
+    # Both filters use the same covariance file, so the expected results are read before the refiltered filter is run
+    expected = KalmanFilter(**kept_input)
+    expected.filter()
+    expected_p_hat = [expected._get_p_hat(epoch) for epoch in epochs]
+    expected.cleanup()
+
+    kalman = KalmanFilter(**filter_input)
+    kalman.filter()
+    kalman.refilter(keep_idx, **{k: v for k, v in kept_input.items() if k != "apriori_stdev"})
+
+    assert kalman.num_obs == expected.num_obs
+    assert np.allclose(kalman.x_hat, expected.x_hat, rtol=1e-10, atol=1e-12)
+    assert np.allclose(kalman.x_smooth, expected.x_smooth, rtol=1e-10, atol=1e-12)
+    for epoch, p_hat in zip(epochs, expected_p_hat):
+        assert np.allclose(kalman._get_p_hat(epoch), p_hat, rtol=1e-10, atol=1e-12)
+    kalman.cleanup()
+
+
+def test_can_refilter_rejects_changed_input(kalman_config):
+    """Test that a previous filter is only refiltered when the input of the kept observations is unchanged"""
+    filter_input = _filter_input()
+    num_obs = len(filter_input["z"])
+    param_names = [f"param-{idx}" for idx in range(len(filter_input["apriori_stdev"]))]
+    previous = KalmanFilter(**filter_input, param_names=param_names)
+    keep_idx = np.ones(num_obs - 3, dtype=bool)  # Pseudo-observations at the end are always kept
+    keep_idx[[17, 45]] = False
+    kept = _kept_input(filter_input, np.concatenate((keep_idx, [True] * 3)))
+    args = dict(
+        h=kept["h"], z=kept["z"], r=kept["r"], apriori_stdev=filter_input["apriori_stdev"], param_names=param_names
+    )
+
+    def can_refilter(keep_idx=keep_idx, **changed):
+        return cpwl._can_refilter(previous, keep_idx, **dict(args, **changed))
+
+    changed_h = kept["h"].toarray()
+    changed_h[5, 0, 0] += 1
+
+    assert can_refilter()
+    assert not can_refilter(keep_idx=None)
+    assert not can_refilter(keep_idx=np.ones(num_obs + 1, dtype=bool))
+    assert not can_refilter(keep_idx=np.ones(num_obs - 3, dtype=bool))
+    assert not can_refilter(z=kept["z"] + np.eye(1, len(kept["z"]), 5)[0])
+    assert not can_refilter(r=kept["r"] * 2)
+    assert not can_refilter(h=SparsePartials.from_dense(changed_h))
+    assert not can_refilter(apriori_stdev=filter_input["apriori_stdev"] * 2)
+    assert not can_refilter(param_names=param_names[::-1])
@@ -0,0 +1,100 @@
+"""Tests for the general least square estimator
+
+Example:
+--------
+    python -m pytest -s test_lsq_estimator.py
+"""
+
+# Standard library imports
+import copy
+
+# Third party imports
+import numpy as np
+import pytest
+
+# Where imports
+from where import estimation
+from where.data import dataset3 as dataset
+from where.estimation.estimators._lsq import LsqEstimator
+from where.lib import config
+
+
+def test_remove_observations():
+    """Test that downdating the normal equations gives the same solution as estimating from scratch"""
+    rng = np.random.default_rng(2021)
+    H = rng.normal(size=(50, 3, 1))
+    z = rng.normal(size=50)
+    W = np.diag(rng.uniform(0.5, 2.0, size=50))
+    keep_idx = np.ones(50, dtype=bool)
+    keep_idx[[3, 17, 18, 42]] = False
+
+    downdated = LsqEstimator(H=H, z=z, W=W)
+    downdated.estimate()
+    downdated.remove_observations(keep_idx)
+
+    expected = LsqEstimator(H=H[keep_idx], z=z[keep_idx], W=W[np.ix_(keep_idx, keep_idx)])
+    expected.estimate()
+
+    assert downdated.num_obs == expected.num_obs == 46
+    assert downdated.degree_of_freedom == expected.degree_of_freedom
+    assert np.allclose(downdated.x_hat, expected.x_hat)
+    assert np.allclose(downdated.v, expected.v)
+    assert np.allclose(downdated.Cx, expected.Cx)
+
+
+@pytest.fixture
+def lsq_config():
+    """Configuration of the lsq estimator, as used in the estimate stage of the pipelines"""
+    options = dict(
+        estimate_method="lsq",
+        estimate_epochwise="False",
+        convergence_limit="1e-6",
+        observation_weight="1",
+        elevation_weighting="none",
+    )
+    for key, value in options.items():
+        config.tech.update("test_lsq", key, value, source=__file__)
+    config.tech.master_section = "test_lsq"
+    yield
+    config.tech.clear()
+
+
+def test_estimate_incremental(lsq_config):
+    """Test that the estimate stage can downdate the lsq estimator after observations are removed"""
+    rng = np.random.default_rng(2021)
+    dset = dataset.Dataset(num_obs=50, pipeline="vlbi")
+    param_names = ["gnss_rcv_clock", "gnss_rcv_clock_drift"]
+    for name in param_names:
+        dset.add_float(f"partial.{name}", val=rng.normal(size=50))
+    dset.add_float("observed", val=rng.normal(size=50))
+    dset.add_float("calc", val=np.zeros(50))
+    dset.add_float("residual", val=np.zeros(50))
+    partial_vectors = dict(estimate_constant=param_names, estimate_stochastic=[])
+    obs_noise = np.ones(50)
+
+    # Call the estimator as the estimate stage of the VLBI pipeline does with estimate_incremental
+    solution = estimation.call(
+        "estimate_method", dset, partial_vectors, obs_noise, previous=None, keep_idx=None, keep_solution=True
+    )
+    keep_idx = np.abs(dset.residual) < 1.5
+    dset.subset(keep_idx)
+    expected_dset = copy.deepcopy(dset)
+    downdated = estimation.call(
+        "estimate_method",
+        dset,
+        partial_vectors,
+        obs_noise[keep_idx],
+        previous=solution,
+        keep_idx=keep_idx,
+        keep_solution=True,
+    )
+    downdated.cleanup()
+
+    expected = estimation.call("estimate_method", expected_dset, partial_vectors, obs_noise[keep_idx])
+
+    assert downdated is solution
+    assert downdated.num_obs == expected.num_obs == np.sum(keep_idx) < 50
+    assert np.allclose(downdated.x_hat, expected.x_hat)
+    assert np.allclose(dset.residual, expected_dset.residual)
+    for name in param_names:
+        assert np.allclose(dset[f"estimate_{name}"], expected_dset[f"estimate_{name}"])
@@ -0,0 +1,68 @@
+"""Tests for the epochwise chi2 and rms rejectors
+
+Example:
+--------
+    python -m pytest -s test_rejectors.py
+"""
+
+# Third party imports
+import numpy as np
+import pytest
+
+# Midgard imports
+from midgard.gnss.solution_validation import sol_validation
+
+# Where imports
+from where.data import dataset3 as dataset
+from where.estimation.rejectors.chi2 import chi2
+from where.estimation.rejectors.rms import rms
+from where.lib import config
+
+
+@pytest.fixture
+def rejector_config():
+    """Configuration of the rejectors for epochwise estimation"""
+    config.tech.master_section = "gnss"
+    config.tech.update_from_dict(dict(estimate_epochwise="True"), section="gnss")
+    config.tech.update_from_dict(dict(field="residual", alpha="0.05"), section="chi2")
+    config.tech.update_from_dict(dict(field="residual", outlier_limit="2"), section="rms")
+    yield
+    config.tech.clear()
+
+
+@pytest.fixture
+def dset():
+    """Dataset with residuals of epochs with 2 to 11 observations, in random order and with some outliers"""
+    rng = np.random.default_rng(2021)
+    time = np.repeat(np.arange(20), rng.integers(2, 12, size=20)) * 30.0
+    rng.shuffle(time)
+    residual = rng.normal(size=time.size)
+    residual[rng.integers(time.size, size=5)] *= 10
+
+    dset = dataset.Dataset(num_obs=time.size)
+    dset.add_time("time", val=58849 + time / 86400, scale="gps", fmt="mjd")
+    dset.add_float("residual", val=residual, unit="meter")
+    return dset
+
+
+def test_chi2(rejector_config, dset):
+    """Test the chi2 rejector against validating the normalized residuals of each epoch with Midgard"""
+    keep_idx = chi2(dset)
+
+    for time in dset.unique("time"):
+        idx = dset.filter(time=time)
+        residual = dset.residual[idx]
+        expected = sol_validation((residual - residual.mean()) / residual.std(), 0.05, 4)
+        assert np.all(keep_idx[idx] == expected)
+    assert keep_idx.any() and not keep_idx.all()
+
+
+def test_rms(rejector_config, dset):
+    """Test the rms rejector against comparing the residuals with the rms of each epoch"""
+    keep_idx = rms(dset)
+
+    for time in dset.unique("time"):
+        idx = dset.filter(time=time)
+        expected = np.abs(dset.residual[idx]) < 2 * dset.rms("residual", idx=idx)
+        assert np.array_equal(keep_idx[idx], expected)
+    assert keep_idx.any() and not keep_idx.all()
@@ -0,0 +1,32 @@
+"""Tests for the sparse partial derivatives
+
+Example:
+--------
+    python -m pytest -s test_sparse_partials.py
+"""
+
+# Third party imports
+import numpy as np
+
+# Where imports
+from where.estimation.parameters import SparsePartials
+
+
+def test_sparse_partials_match_dense():
+    """Test that the sparse partial derivatives give the same products as the dense design matrix"""
+    rng = np.random.default_rng(2021)
+    h = rng.normal(size=(50, 8, 1)) * (rng.uniform(size=(50, 8, 1)) < 0.3)
+    x = rng.normal(size=(50, 8, 1))
+    keep_idx = np.ones(50, dtype=bool)
+    keep_idx[[3, 17, 18, 42]] = False
+    constraints = rng.normal(size=(3, 8))
+
+    partials = SparsePartials.from_dense(h)
+
+    assert partials.shape == h.shape
+    assert np.array_equal(partials.toarray(), h)
+    assert np.allclose(partials.dot(x), (x.transpose(0, 2, 1) @ h)[:, 0, 0])
+    assert np.array_equal(partials.column(5), h[:, 5, 0])
+    assert partials[keep_idx] == SparsePartials.from_dense(h[keep_idx])
+    assert partials.vstack(constraints) == SparsePartials.from_dense(np.vstack((h, constraints[:, :, None])))
+    assert partials[keep_idx] != partials[1:]
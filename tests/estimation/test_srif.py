@@ -0,0 +1,114 @@
+"""Tests for the square root information filter
+
+Example:
+--------
+    python -m pytest -s test_srif.py
+"""
+
+# Third party imports
+import numpy as np
+import pytest
+import scipy.sparse
+
+# Where imports
+from where.estimation.estimators._kalman import KalmanFilter
+from where.estimation.estimators._srif import SquareRootInformationFilter
+
+
+def _filter_input(num_obs=60, num_params=4, step=5, transition_idx=(-1, -2)):
+    """Random observations of parameters where one of the last two parameters changes with the other
+
+    After every step observations, the state is propagated by a sparse state transition with 0.5 at transition_idx,
+    and process noise is added to the last two parameters.
+    """
+    rng = np.random.default_rng(2021)
+    h = rng.normal(size=(num_obs, num_params, 1))
+    z = rng.normal(size=num_obs)
+    r = rng.uniform(0.5, 2.0, size=num_obs)
+    apriori_stdev = np.array([1.0, 2.0, 10.0, 100.0])[:num_params]
+
+    transition = np.eye(num_params)
+    transition[transition_idx] = 0.5
+    phi, Q = list(), dict()
+    for epoch in range(num_obs):
+        if epoch % step == step - 1:
+            phi.append(scipy.sparse.csr_matrix(transition))
+            Q[epoch] = {(num_params - 2, num_params - 2): 0.1, (num_params - 1, num_params - 1): 0.01}
+        else:
+            phi.append(1)
+    return dict(h=h, z=z, apriori_stdev=apriori_stdev, phi=phi, r=r, Q=Q)
+
+
+def test_constant_parameters():
+    """Test that the filter gives the least squares solution with apriori constraints for constant parameters"""
+    rng = np.random.default_rng(2021)
+    h = rng.normal(size=(50, 4, 1))
+    z = rng.normal(size=50)
+    r = rng.uniform(0.5, 2.0, size=50)
+    apriori_stdev = np.array([1.0, 2.0, 10.0, 100.0])
+    phi = [1] * 49 + [np.eye(4)]
+
+    srif = SquareRootInformationFilter(h, z=z, apriori_stdev=apriori_stdev, phi=phi, r=r)
+    srif.filter()
+
+    H = h[:, :, 0]
+    N = H.T @ np.diag(1 / r) @ H + np.diag(1 / apriori_stdev ** 2)
+    x_expected = np.linalg.solve(N, H.T @ (z / r))
+
+    assert np.allclose(srif.x_hat[-1, :, 0], x_expected)
+    assert np.allclose(srif.x_smooth[:, :, 0], x_expected)
+    assert np.allclose(srif._get_p_hat(49), np.linalg.inv(N))
+
+
+@pytest.mark.parametrize(
+    "transition_idx",
+    [(-2, -1), (-1, -2), (-1, -1)],
+    ids=["rate", "lower_triangular", "not_nilpotent"],
+)
+def test_process_noise_matches_kalman_filter(kalman_config, transition_idx):
+    """Test that the filter and smoother agree with the Kalman filter for sparse state transitions and process noise
+
+    The rate transition keeps the information factor triangular, the lower triangular transition does not, and the
+    scaled parameter is not inverted as I - E. All epochs are kept, so that the filter gives the filtered state after
+    each observation.
+    """
+    filter_input = _filter_input(transition_idx=transition_idx)
+    num_obs = len(filter_input["z"])
+    srif = SquareRootInformationFilter(**filter_input, keep_epochs=range(num_obs))
+    srif.filter()
+    kalman = KalmanFilter(**filter_input)
+    kalman.filter()
+
+    assert np.allclose(srif.x_hat, kalman.x_hat, rtol=1e-10, atol=1e-12)
+    assert np.allclose(srif.x_hat_ferr, kalman.x_hat_ferr, rtol=1e-10, atol=1e-12)
+    assert np.allclose(srif.x_smooth, kalman.x_smooth, rtol=1e-10, atol=1e-12)
+    for epoch in (0, num_obs // 2, num_obs - 1):
+        assert np.allclose(srif._get_p_hat(epoch), kalman._get_p_hat(epoch), rtol=1e-10, atol=1e-12)
+
+
+def test_refilter_runs_new_filter():
+    """Test that refiltering gives the same result as a new filter on the remaining observations"""
+    filter_input = _filter_input()
+    num_obs = len(filter_input["z"])
+    keep_idx = np.ones(num_obs, dtype=bool)
+    keep_idx[[12, num_obs - 1]] = False
+    kept_epochs = np.flatnonzero(keep_idx)
+    kept_input = dict(
+        filter_input,
+        h=filter_input["h"][keep_idx],
+        z=filter_input["z"][keep_idx],
+        r=filter_input["r"][keep_idx],
+        phi=[phi for phi, keep in zip(filter_input["phi"], keep_idx) if keep],
+        Q={new: filter_input["Q"][old] for new, old in enumerate(kept_epochs) if old in filter_input["Q"]},
+    )
+
+    srif = SquareRootInformationFilter(**filter_input)
+    srif.filter()
+    srif.refilter(keep_idx, **{k: v for k, v in kept_input.items() if k != "apriori_stdev"})
+    expected = SquareRootInformationFilter(**kept_input)
+    expected.filter()
+
+    assert srif.num_obs == num_obs - 2
+    assert np.allclose(srif.x_hat, expected.x_hat)
+    assert np.allclose(srif.x_smooth, expected.x_smooth)
+    assert np.allclose(srif._get_p_hat(num_obs - 3), expected._get_p_hat(num_obs - 3))
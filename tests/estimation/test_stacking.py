@@ -0,0 +1,99 @@
+"""Tests for stacking of normal equations
+
+Example:
+--------
+    python -m pytest -s test_stacking.py
+"""
+
+# Third party imports
+import numpy as np
+
+# Where imports
+from where.estimation.stacking import NeqStack
+
+
+def _session(rng, names, x_true, apriori, num_obs=40):
+    """Normal equations of a session with observations of the given parameters, relative to the session apriori
+
+    Returns:
+        Design matrix, observations, normal equation matrix, right hand side and weighted square sum of o-c.
+    """
+    A = rng.normal(size=(num_obs, len(names)))
+    obs = A @ np.array([x_true[n] for n in names]) + rng.normal(0, 0.1, num_obs)
+    o_c = obs - A @ apriori
+    return A, obs, A.T @ A, A.T @ o_c, o_c @ o_c
+
+
+def _direct_solution(sessions, names):
+    """Least squares solution for all parameters of all sessions, with absolute values as unknowns"""
+    index = {n: i for i, n in enumerate(names)}
+    A = np.zeros((sum(len(obs) for _, _, obs in sessions), len(names)))
+    row = 0
+    for session_names, A_session, obs in sessions:
+        A[row : row + len(obs), [index[n] for n in session_names]] = A_session
+        row += len(obs)
+    obs = np.concatenate([obs for _, _, obs in sessions])
+    N = A.T @ A
+    return np.linalg.solve(N, A.T @ obs), np.linalg.inv(N)
+
+
+def test_stack_matches_direct_solution():
+    """Test that stacked sessions with different apriori values, parameter order and local parameters give the direct
+    least squares solution, with the estimate being the common apriori plus the stacked solution
+    """
+    rng = np.random.default_rng(2021)
+    x_true = {"trf-a": 10.0, "trf-b": -5.0, "trf-c": 2.0, "clk-1": 0.3, "clk-2": -0.7}
+    names_1 = ["trf-a", "clk-1", "trf-b"]
+    names_2 = ["trf-c", "trf-b", "clk-2", "trf-a"]
+    apriori_1 = np.array([9.0, 0.0, -4.5])
+    apriori_2 = np.array([2.5, -5.2, 0.0, 10.4])
+
+    stack = NeqStack(global_parameters=["trf"])
+    sessions = list()
+    for names, apriori in ((names_1, apriori_1), (names_2, apriori_2)):
+        A, obs, N, b, ltpl = _session(rng, names, x_true, apriori)
+        stack.add(names, N, b, num_obs=len(obs), ltpl=ltpl, apriori=apriori)
+        sessions.append((names, A, obs))
+    solution, Q_xx, variance_factor = stack.solve()
+
+    all_names = ["trf-a", "trf-b", "trf-c", "clk-1", "clk-2"]
+    x_direct, Q_direct = _direct_solution(sessions, all_names)
+    residual = np.concatenate(
+        [obs - A @ x_direct[[all_names.index(n) for n in names]] for names, A, obs in sessions]
+    )
+    idx = [all_names.index(n) for n in stack.names]
+
+    assert stack.names == ["trf-a", "trf-b", "trf-c"]
+    assert np.allclose(stack.apriori, [9.0, -4.5, 2.5])
+    assert np.allclose(stack.apriori + solution, x_direct[idx])
+    assert np.allclose(variance_factor, residual @ residual / (len(residual) - len(all_names)))
+    assert np.allclose(Q_xx, variance_factor * Q_direct[np.ix_(idx, idx)])
+
+
+def test_stack_velocities_matches_direct_solution():
+    """Test that positions of sessions at different epochs are stacked into positions at the reference epoch and
+    velocities
+    """
+    rng = np.random.default_rng(2021)
+    position, velocity, reference_epoch = np.array([100.0, 200.0]), np.array([0.5, -0.2]), 2020.0
+    names = ["trf-a", "trf-b"]
+
+    stack = NeqStack(
+        global_parameters=["trf"], velocity_name=lambda name: f"vel-{name[4:]}", reference_epoch=reference_epoch
+    )
+    rows, observations = list(), list()
+    for epoch in (2018.0, 2019.5, 2021.0, 2023.0):
+        dt = epoch - reference_epoch
+        x_true = dict(zip(names, position + dt * velocity))
+        A, obs, N, b, _ = _session(rng, names, x_true, apriori=np.zeros(2))
+        stack.add(names, N, b, epoch=epoch)
+        rows.append(np.hstack((A, dt * A)))
+        observations.append(obs)
+    solution, _, _ = stack.solve()
+
+    A_direct, obs_direct = np.concatenate(rows), np.concatenate(observations)
+    x_direct = np.linalg.lstsq(A_direct, obs_direct, rcond=None)[0]
+
+    assert stack.names == ["trf-a", "trf-b", "vel-a", "vel-b"]
+    assert np.allclose(solution, x_direct)
+    assert np.allclose(solution, np.hstack((position, velocity)), atol=0.1)
@@ -0,0 +1,104 @@
+"""Tests for batched computations over observation epochs
+
+Example:
+--------
+    python -m pytest -s test_epochs.py
+"""
+
+# Third party imports
+import numpy as np
+import pytest
+
+# Midgard imports
+from midgard.gnss.compute_dops import compute_dops
+from midgard.gnss.solution_validation import sol_validation
+
+# Where imports
+from where.data import dataset3 as dataset
+from where.lib import epochs
+
+
+@pytest.fixture
+def observations():
+    """Epochs with 2 to 9 observations each, in random order, with azimuth, elevation and residuals"""
+    rng = np.random.default_rng(2021)
+    time = np.repeat(np.arange(12), rng.integers(2, 10, size=12)) * 30.0
+    rng.shuffle(time)
+    num_obs = time.size
+    az = rng.uniform(0, 2 * np.pi, num_obs)
+    el = rng.uniform(np.radians(5), np.radians(90), num_obs)
+    residual = rng.normal(size=num_obs)
+    return time, az, el, residual
+
+
+def _per_epoch(time, func, *values):
+    """Reference result, calling func for the values of each epoch ordered by time"""
+    return np.array([func(*(v[time == t] for v in values)) for t in np.unique(time)])
+
+
+def test_epoch_groups_reductions(observations):
+    """Test the reductions of each epoch against looping over the epochs"""
+    time, _, _, residual = observations
+    groups = epochs.EpochGroups(time)
+
+    assert groups.num_epochs == np.unique(time).size
+    assert np.array_equal(groups.counts, _per_epoch(time, len, time))
+    assert np.allclose(groups.sum(residual), _per_epoch(time, np.sum, residual))
+    assert np.allclose(groups.mean(residual), _per_epoch(time, np.mean, residual))
+    assert np.allclose(groups.std(residual), _per_epoch(time, np.std, residual))
+    assert np.allclose(groups.rms(residual), _per_epoch(time, lambda v: np.sqrt(np.mean(v ** 2)), residual))
+    assert np.array_equal(groups.broadcast(np.unique(time)), time)
+
+
+def test_epoch_groups_pad(observations):
+    """Test that padded arrays hold the values of each epoch, and that the mask marks them"""
+    time, _, _, residual = observations
+    groups = epochs.EpochGroups(time)
+    padded = groups.pad(residual)
+    mask = groups.mask()
+
+    assert padded.shape == mask.shape == (groups.num_epochs, groups.counts.max())
+    assert np.all(np.isnan(padded[~mask]))
+    for epoch, t in enumerate(np.unique(time)):
+        assert np.array_equal(np.sort(padded[epoch, mask[epoch]]), np.sort(residual[time == t]))
+
+
+def test_epoch_groups_time_field(observations):
+    """Test that observations are grouped by the epochs of a time field"""
+    time, _, _, residual = observations
+    dset = dataset.Dataset(num_obs=time.size)
+    dset.add_time("time", val=58849 + time / 86400, scale="gps", fmt="mjd")
+    groups = epochs.EpochGroups(dset.time)
+
+    assert np.array_equal(groups.counts, epochs.EpochGroups(time).counts)
+    assert np.array_equal(groups.epoch_idx, epochs.EpochGroups(time).epoch_idx)
+
+
+def test_compute_dops(observations):
+    """Test the dilution of precision against the DOP of each epoch computed by Midgard"""
+    time, az, el, _ = observations
+    is_used = np.ones(time.size, dtype=bool)
+    is_used[np.flatnonzero(time == time[0])[3:]] = False  # Three satellites is too few for a solution
+    time, az, el = time[is_used], az[is_used], el[is_used]
+
+    dops = epochs.compute_dops(az, el, epochs.EpochGroups(time))
+
+    for t in np.unique(time):
+        idx = time == t
+        if idx.sum() < 4:
+            assert all(np.all(np.isnan(dop[idx])) for dop in dops.values())
+            continue
+        for name, expected in zip(("gdop", "pdop", "tdop", "hdop", "vdop"), compute_dops(az[idx], el[idx])):
+            assert np.allclose(dops[name][idx], expected)
+
+
+def test_chi2_test(observations):
+    """Test the chi-square test against the validation of each epoch by Midgard"""
+    time, _, _, residual = observations
+    residual = residual * 1.5  # Let some epochs fail the test
+
+    passed = epochs.chi2_test(residual, 0.05, 4, epochs.EpochGroups(time))
+
+    expected = _per_epoch(time, lambda v: sol_validation(v, 0.05, 4), residual)
+    assert np.array_equal(passed, expected)
+    assert passed.any() and not passed.all()
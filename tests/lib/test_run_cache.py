@@ -0,0 +1,144 @@
+"""Tests for the run cache
+
+Example:
+--------
+    python -m pytest -s test_run_cache.py
+"""
+
+# Standard library imports
+from datetime import date
+
+# Third party imports
+import numpy as np
+import pytest
+
+# Midgard imports
+from midgard.files import dependencies
+
+# Where imports
+from where.data import dataset3 as dataset
+from where.lib import config
+from where.lib import run_cache
+
+# Dataset variables of the files written by the tests
+RUNDATE = date(2020, 1, 1)
+STAGE_VARS = dict(user="test", id="", station="abcd")
+
+
+@pytest.fixture
+def cache_config(tmp_path):
+    """Configuration with the run cache enabled, and work and data directories below a temporary directory"""
+    config.read_where_config()
+    config.read_files_config()
+    config.set_file_vars(config.create_file_vars(RUNDATE, "gnss", user="test", use_options=False))
+    _set_paths(tmp_path / "first")
+    config.files.update_vars(dict(path_work=str(tmp_path / "work")))
+    config.where.update("run_cache", "enabled", "True", source="test_run_cache")
+    config.tech.master_section = "gnss"
+    config.tech.update_from_dict(dict(write_level="detail"), section="gnss")
+    yield tmp_path
+    dataset.Dataset.flush_writes()
+    config.tech.clear()
+    config.read_where_config()
+
+
+def _set_paths(path_data):
+    """Use a new data directory containing one input file"""
+    config.files.update_vars(dict(path_data=str(path_data)))
+    path_data.mkdir(parents=True, exist_ok=True)
+    input_path = path_data / "rinex.obs"
+    if not input_path.exists():
+        input_path.write_text("observations\n")
+    return input_path
+
+
+def _run_stage(input_path):
+    """Run a stage reading an input file and writing a dataset, and store it in the run cache"""
+    dep_path = config.files.path("depends", file_vars=dict(STAGE_VARS, stage="read"))
+    dependencies.init(dep_path, fast_check=not run_cache.use_content_hash())
+    dependencies.add(input_path, label="gnss_rinex_obs")
+    stage_cache = run_cache.StageCache(RUNDATE, "gnss", "read", None, **STAGE_VARS)
+
+    dset = dataset.Dataset(num_obs=3, rundate=RUNDATE, pipeline="gnss", stage="read", label="abcd", **STAGE_VARS)
+    dset.add_float("obs", val=np.arange(3.0), unit="meter")
+    dset.write()
+    dataset.Dataset.flush_writes()
+    dependencies.write()
+    stage_cache.store(dep_path)
+    return config.files.path("dataset", file_vars=dict(STAGE_VARS, stage="read", label="abcd"))
+
+
+def _restore():
+    """Try to restore the stage from the run cache"""
+    dep_path = config.files.path("depends", file_vars=dict(STAGE_VARS, stage="read"))
+    dependencies.init(dep_path, fast_check=not run_cache.use_content_hash())
+    return run_cache.StageCache(RUNDATE, "gnss", "read", None, **STAGE_VARS).restore()
+
+
+def _read_obs():
+    """Read the observations of the dataset written by the stage"""
+    return dataset.Dataset.read(rundate=RUNDATE, pipeline="gnss", stage="read", label="abcd", **STAGE_VARS).obs
+
+
+def test_hit(cache_config):
+    """A stage with unchanged configuration and input files is restored from the cache"""
+    dset_path = _run_stage(_set_paths(cache_config / "first"))
+    dset_path.unlink()
+
+    assert _restore()
+    assert dset_path.exists()
+    assert np.array_equal(_read_obs(), np.arange(3.0))
+
+
+def test_miss_changed_config(cache_config):
+    """A stage is not restored after the configuration has changed"""
+    _run_stage(_set_paths(cache_config / "first"))
+    config.tech.update_from_dict(dict(elevation_mask="15"), section="gnss")
+
+    assert not _restore()
+
+
+def test_miss_disabled(cache_config):
+    """Nothing is restored unless the cache is enabled"""
+    _run_stage(_set_paths(cache_config / "first"))
+    config.where.update("run_cache", "enabled", "False", source="test_run_cache")
+
+    assert not _restore()
+
+
+def test_invalidated_by_changed_input(cache_config):
+    """A stage is not restored after the content of an input file has changed"""
+    input_path = _set_paths(cache_config / "first")
+    _run_stage(input_path)
+    input_path.write_text("other observations\n")
+
+    assert not _restore()
+
+
+def test_hit_other_data_directory(cache_config):
+    """Input files are looked up relative to the data directory of the current configuration"""
+    first_path = _set_paths(cache_config / "first")
+    _run_stage(first_path)
+
+    second_path = _set_paths(cache_config / "second")
+    assert _restore()
+
+    second_path.write_text("other observations\n")
+    assert not _restore()
+    assert first_path.read_text() == "observations\n"
+
+
+def test_evict_least_recently_used(cache_config):
+    """The least recently used entries are removed when the cache grows too large"""
+    input_path = _set_paths(cache_config / "first")
+    _run_stage(input_path)
+    (entry_path,) = config.files.path("run_cache").glob("gnss/read/*/")
+    entry_size = sum(p.stat().st_size for p in entry_path.iterdir())
+    config.where.update("run_cache", "max_size", str(1.5 * entry_size / 2 ** 20), source="test_run_cache")
+
+    input_path.write_text("other observations\n")
+    _run_stage(input_path)
+
+    assert len(list(config.files.path("run_cache").glob("gnss/read/*/"))) == 1
+    assert not entry_path.exists()
+    assert _restore()
@@ -0,0 +1,37 @@
+"""Tests for the performance telemetry
+
+Example:
+--------
+    python -m pytest -s test_telemetry.py
+"""
+
+# Third party imports
+import numpy as np
+import pytest
+
+# Where imports
+from where.lib import config
+from where.lib import telemetry
+
+
+@pytest.mark.skipif(not telemetry.reset_peak_rss(), reason="Resetting the peak memory requires Linux")
+def test_peak_rss_of_nested_measurements():
+    """Test that the peak memory of a block is recorded after it is freed, and is included in the enclosing block"""
+    config.read_where_config()
+    size_mb = 200
+    telemetry._RECORDS.clear()
+
+    earlier = np.ones(size_mb * 2 ** 17)
+    del earlier  # An earlier peak of the process is not counted
+    with telemetry.measure("stage", "outer"):
+        with telemetry.measure("model", "large"):
+            large = np.ones(size_mb * 2 ** 17)
+            del large
+        with telemetry.measure("model", "small"):
+            np.ones(1000)
+
+    peaks = {r["name"]: r["peak_rss_increase"] for r in telemetry._RECORDS}
+    telemetry._RECORDS.clear()
+    assert peaks["large"] > 0.9 * size_mb
+    assert peaks["small"] < 0.1 * size_mb
+    assert peaks["outer"] >= peaks["large"]
@@ -0,0 +1,46 @@
+"""Tests for the radio troposphere models
+
+Example:
+--------
+    python -m pytest -s test_troposphere_radio.py
+"""
+
+# Standard library imports
+from datetime import datetime, timedelta
+
+# Third party imports
+import numpy as np
+
+# Where imports
+from where.apriori._gridded_field import GriddedField
+from where.data.time import Time
+from where.models.delay import troposphere_radio
+
+
+def test_vmf1_gridded_mapping_function_with_missing_grid(monkeypatch):
+    """Test that only observations needing a missing VMF1 grid get nan mapping functions"""
+    rng = np.random.default_rng(2021)
+    lat, lon = np.radians(np.arange(-90, 91, 10)), np.radians(np.arange(0, 360, 10))
+    values = {name: rng.uniform(1.1e-3, 1.3e-3, size=(5, lat.size, lon.size)) for name in ("ah", "aw")}
+
+    def vmf1_grid(available):
+        start, interval = datetime(2020, 1, 1), timedelta(hours=6)
+        return {name: GriddedField(start, interval, lat, lon, val, available) for name, val in values.items()}
+
+    # Observations every hour from 01:00 to 23:00, the grid at 12:00 is needed for observations from 07:00 to 17:00
+    time = Time(58849 + np.arange(1, 24) / 24, scale="utc", fmt="mjd")
+    latitude, longitude = np.radians(np.full(23, 59.9)), np.radians(np.full(23, 10.8))
+    height, zenith_distance = np.full(23, 100.0), np.radians(np.linspace(10, 80, 23))
+    args = (latitude, longitude, height, time, zenith_distance)
+
+    monkeypatch.setattr(troposphere_radio.apriori, "get", lambda *_, **__: vmf1_grid(np.ones(5, dtype=bool)))
+    mh_all, mw_all = troposphere_radio.vmf1_gridded_mapping_function(*args)
+
+    monkeypatch.setattr(troposphere_radio.apriori, "get", lambda *_, **__: vmf1_grid(np.arange(5) != 2))
+    mh, mw = troposphere_radio.vmf1_gridded_mapping_function(*args)
+
+    is_missing = (np.arange(1, 24) > 6) & (np.arange(1, 24) < 18)
+    assert np.all(np.isnan(mh[is_missing])) and np.all(np.isnan(mw[is_missing]))
+    assert np.array_equal(mh[~is_missing], mh_all[~is_missing])
+    assert np.array_equal(mw[~is_missing], mw_all[~is_missing])
+    assert not np.any(np.isnan(mh_all))
@@ -0,0 +1,133 @@
+"""Tests for the parse cache of the parsers-package
+
+Example:
+--------
+    python -m pytest -s test_parse_cache.py
+"""
+
+# Standard library imports
+from datetime import date, datetime
+
+# Third party imports
+import numpy as np
+import pytest
+
+# Midgard imports
+from midgard.data.time import Time
+
+# Where imports
+from where import parsers
+from where.lib import config
+from where.parsers import _parse_cache
+
+# Number of lines in the CSV files parsed by the tests, large enough that the columns are stored as separate arrays
+NUM_LINES = 1000
+
+
+@pytest.fixture
+def cache_config(tmp_path):
+    """Configuration with the parse cache enabled for the CSV parser, and the work directory below tmp_path"""
+    config.read_where_config()
+    config.read_files_config()
+    config.set_file_vars(config.create_file_vars(date(2020, 1, 1), "gnss", user="test", use_options=False))
+    config.files.update_vars(dict(path_work=str(tmp_path / "work")))
+    config.where.update("files", "parse_cache", "True", source="test_parse_cache")
+    config.where.update("files", "parse_cache_parsers", "csv_", source="test_parse_cache")
+    yield tmp_path
+    config.read_where_config()
+
+
+def _write_csv(file_path, scale):
+    """Write a CSV file with two columns, where the second column is scaled"""
+    values = np.arange(NUM_LINES)
+    file_path.write_text("x,y\n" + "".join(f"{x},{scale * x}\n" for x in values))
+    return values * scale
+
+
+def _entries():
+    """Names of the entries in the parse cache of the CSV parser"""
+    cache_dir = config.files.path("parse_cache") / "csv_"
+    return sorted(p.name for p in cache_dir.iterdir() if p.is_dir() and p.name != "index")
+
+
+def _roundtrip(state):
+    """Extract arrays from state and restore them again"""
+    arrays = list()
+    skeleton = _parse_cache._extract_arrays(state, arrays)
+    return _parse_cache._restore_arrays(skeleton, lambda idx: arrays[idx]), arrays
+
+
+def test_roundtrip_arrays():
+    """Test that large arrays are extracted and restored"""
+    state = dict(data=dict(x=np.arange(1000.0), y=np.arange(3), names=["a", "b"]), meta=dict(created=datetime.now()))
+    restored, arrays = _roundtrip(state)
+
+    assert len(arrays) == 1
+    assert np.all(restored["data"]["x"] == state["data"]["x"])
+    assert np.all(restored["data"]["y"] == state["data"]["y"])
+    assert restored["data"]["names"] == state["data"]["names"]
+    assert restored["meta"] == state["meta"]
+
+
+def test_roundtrip_time():
+    """Test that time arrays are restored with scale and format"""
+    time = Time(val=[58000.0, 58000.5], scale="gps", fmt="mjd")
+    restored, _ = _roundtrip(dict(time=time))
+
+    assert restored["time"].scale == "gps"
+    assert restored["time"].fmt == "mjd"
+    assert np.all(restored["time"].mjd == time.mjd)
+
+
+def test_unsupported_types():
+    """Test that unsupported values are refused"""
+    with pytest.raises(TypeError):
+        _roundtrip(dict(data=dict(obj=object())))
+
+
+def test_cache_hit(cache_config):
+    """Test that a file parsed a second time is read from the cache"""
+    file_path = cache_config / "data.csv"
+    expected = _write_csv(file_path, scale=2)
+
+    parsed = parsers.parse_file("csv_", file_path)
+    cached = parsers.parse_file("csv_", file_path)
+
+    assert len(_entries()) == 1
+    assert not isinstance(parsed.data["y"], np.memmap)
+    assert isinstance(cached.data["y"], np.memmap)  # Arrays in the cache are memory-mapped
+    assert np.array_equal(cached.data["y"], expected)
+    assert cached.file_path == file_path
+
+
+def test_changed_file_invalidates_cache(cache_config):
+    """Test that a file is parsed again after its content has changed"""
+    file_path = cache_config / "data.csv"
+    _write_csv(file_path, scale=2)
+    parsers.parse_file("csv_", file_path)
+
+    expected = _write_csv(file_path, scale=30)
+    parsed = parsers.parse_file("csv_", file_path)
+
+    assert not isinstance(parsed.data["y"], np.memmap)
+    assert np.array_equal(parsed.data["y"], expected)
+    assert len(_entries()) == 2
+    assert np.array_equal(parsers.parse_file("csv_", file_path).data["y"], expected)
+
+
+def test_evict_least_recently_used(cache_config):
+    """Test that the least recently used entries and their index files are deleted when the cache grows too large"""
+    first_path, second_path = cache_config / "first.csv", cache_config / "second.csv"
+    _write_csv(first_path, scale=2)
+    parsers.parse_file("csv_", first_path)
+    (first_entry,) = _entries()
+    entry_size = sum(p.stat().st_size for p in (config.files.path("parse_cache") / "csv_" / first_entry).rglob("*"))
+    config.where.update("files", "parse_cache_max_size", str(1.5 * entry_size / 2 ** 20), source="test_parse_cache")
+
+    _write_csv(second_path, scale=3)
+    parsers.parse_file("csv_", second_path)
+
+    index_dir = config.files.path("parse_cache") / "csv_" / "index"
+    assert len(_entries()) == 1 and first_entry not in _entries()
+    assert [p.read_text() for p in index_dir.iterdir()] == _entries()
+    assert isinstance(parsers.parse_file("csv_", second_path).data["y"], np.memmap)
@@ -25,6 +25,8 @@ Option               Description
 ===================  ===========================================================
 -D, --delete         Delete existing analysis results.
     --doy            Specify date as <year day-of-year>.
+    --explain-rerun  Show which dependencies caused a stage to be rerun, and
+                     why it was not restored from the run cache.
 -E, --edit           Edit the configuration of an analysis.
 -F, --force          Run all stages even if no dependencies have changed.
 -I, --interactive    Start an interactive session with analysis data available.
@@ -99,6 +101,7 @@ from where import pipelines
 from where import setup
 from where.lib import config
 from where.lib import log
+from where.lib import pandoc
 from where.lib import util
 
 
@@ -143,6 +146,9 @@ def main():
     with Timer(f"Finish pipeline {pipeline.upper()} in"):
         pipelines.run(rundate, pipeline, *pipeline_args, **pipeline_kwargs)
 
+    # Wait for reports converted in the background
+    pandoc.wait()
+
 
 # Run main function only when running as script
 if __name__ == "__main__":
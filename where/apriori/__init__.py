@@ -15,12 +15,9 @@ should be called need to be decorated with the :func:`~midgard.dev.plugins.regis
 The decorated function will be called through the :func:`get`. Parameters to the registered function should be passed
 as named keyword arguments.
 
-
-
+The data returned by :func:`get` are cached in memory, and optionally on disk, see :mod:`where.apriori._cache`.
 
 """
-# Standard library imports
-from functools import lru_cache
 
 # Midgard imports
 from midgard.dev import plugins
@@ -28,6 +25,7 @@ from midgard.dev import exceptions
 
 # Where imports (more imports are done locally to avoid circular imports)
 from where.lib import log
+from where.apriori import _cache
 
 # Make functions in subpackages available as apriori-plugins
 from where.apriori.orbit import get_orbit  # noqa
@@ -50,15 +48,35 @@ def names():
     return plugins.names(package_name=__name__)
 
 
-@lru_cache()
 def get(datasource_name, **kwargs):
     """Read data from the given data source
 
+    The data are cached, keyed by the data source, the arguments and the configuration options the data source depends
+    on. See :mod:`where.apriori._cache` for details.
+
     Simple data sources that only return data directly from a parser does not need an explicit apriori-file. This is
     handled by looking in the parser-directory if a data source is not found in the apriori directory.
 
     The import of where.parsers is done locally to avoid circular imports.
 
+    Args:
+        datasource_name (String):   Name of apriori data source
+        kwargs:                     Input arguments to the data source
+
+    Returns:
+        The data from the data source (data type depends on source)
+    """
+    return _cache.cache.get(datasource_name, kwargs, lambda: _get(datasource_name, **kwargs))
+
+
+def cache_clear():
+    """Clear the in-memory cache of apriori data"""
+    _cache.cache.clear()
+
+
+def _get(datasource_name, **kwargs):
+    """Read data from the given data source without using the cache
+
     Args:
         datasource_name (String):   Name of apriori data source
         kwargs:                     Input arguments to the data source
@@ -0,0 +1,307 @@
+"""Cache of data returned by apriori data sources
+
+Description:
+------------
+
+Apriori data sources like EOP tables, ephemerides, reference frames and catalogues are typically requested several
+times during an analysis. The results of :func:`where.apriori.get` are therefore cached in two tiers:
+
+    memory   A bounded in-memory cache with least-recently-used eviction. The size is given by the `memory_entries`
+             option in the [apriori_cache] section of the Where configuration.
+    disk     An optional persistent cache under the work directory, shared by parallel Where processes. Only data
+             sources listed in the `disk_sources` option, and whose data can be pickled, are stored on disk.
+
+The cache entries are keyed explicitly by
+
+    * the name of the data source and the keyword arguments. Time arguments are identified by time scale, format and
+      a hash of the Julian days, arrays by a hash of their content.
+    * the values of the configuration options the data source depends on (see `CONFIG_OPTIONS`).
+
+Entries in the disk cache also record the files that were parsed while the data were built. A disk entry is only used
+if none of these files have changed.
+
+Cache hits, misses and build times are logged at the `time` log level, and summarized when the program exits.
+"""
+
+# Standard library imports
+import atexit
+import collections
+from datetime import date, datetime, timedelta
+import hashlib
+import os
+import pathlib
+import pickle
+import time as time_module
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# External library imports
+import numpy as np
+
+# Where imports
+import where
+from where.lib import config
+from where.lib import log
+
+# Bump if the layout of the disk entries change
+CACHE_VERSION = "1"
+
+# Configuration options that the data returned by a data source depend on, given as <configuration>.<option>
+CONFIG_OPTIONS = {
+    "crf": ("tech.celestial_reference_frames",),
+    "eop": (
+        "tech.eop_sources",
+        "tech.eop_models",
+        "tech.eop_interpolation_method",
+        "tech.eop_interpolation_window",
+        "tech.eop_pole_model",
+        "tech.eop_cpo_model",
+        "tech.eop_remove_leap_seconds",
+    ),
+    "ephemerides": ("tech.ephemerides",),
+    "trf": ("tech.reference_frames",),
+}
+
+
+class AprioriCache:
+    """Two-tier cache of apriori data
+
+    Args:
+        memory_entries:  Maximal number of entries in the in-memory cache.
+        disk_sources:    Names of data sources stored in the disk cache.
+    """
+
+    def __init__(self, memory_entries: Optional[int] = None, disk_sources: Optional[Tuple[str, ...]] = None) -> None:
+        self._memory_entries = memory_entries
+        self._disk_sources = disk_sources
+        self._memory = collections.OrderedDict()
+        self.statistics = collections.defaultdict(lambda: dict(hits=0, disk_hits=0, misses=0, build_time=0.0))
+
+    @property
+    def memory_entries(self) -> int:
+        """Maximal number of entries in the in-memory cache"""
+        if self._memory_entries is None:
+            return max(config.where.apriori_cache.get("memory_entries", default=32).int, 0)
+        return self._memory_entries
+
+    def use_disk(self, datasource_name: str) -> bool:
+        """Check if a data source is stored in the disk cache
+
+        Args:
+            datasource_name:  Name of apriori data source.
+
+        Returns:
+            True if the data of the data source should be stored on disk.
+        """
+        if self._disk_sources is not None:
+            return datasource_name in self._disk_sources
+        if not config.where.apriori_cache.get("disk", default=False).bool:
+            return False
+        return datasource_name in config.where.apriori_cache.get("disk_sources", default="").list
+
+    def get(self, datasource_name: str, kwargs: Dict[str, Any], build: Callable[[], Any]) -> Any:
+        """Get data from the cache, building and storing them if necessary
+
+        Args:
+            datasource_name:  Name of apriori data source.
+            kwargs:           Input arguments to the data source.
+            build:            Function building the data, called without arguments.
+
+        Returns:
+            The data from the data source.
+        """
+        stats = self.statistics[datasource_name]
+        try:
+            key = cache_key(datasource_name, kwargs)
+        except TypeError as err:
+            log.debug(f"Apriori data {datasource_name!r} are not cached: {err}")
+            stats["misses"] += 1
+            return self._build(datasource_name, build)
+
+        # In-memory cache
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            stats["hits"] += 1
+            return self._memory[key]
+
+        # Disk cache
+        use_disk = self.use_disk(datasource_name)
+        if use_disk:
+            found, data = self._read_disk(datasource_name, key)
+            if found:
+                stats["disk_hits"] += 1
+                self._store_memory(key, data)
+                return data
+
+        # Build data
+        stats["misses"] += 1
+        if use_disk:
+            from where import parsers  # Local import to avoid circular imports
+
+            with parsers.record_parsed_files() as file_paths:
+                data = self._build(datasource_name, build)
+            self._write_disk(datasource_name, key, data, file_paths)
+        else:
+            data = self._build(datasource_name, build)
+        self._store_memory(key, data)
+        return data
+
+    def clear(self) -> None:
+        """Clear the in-memory cache"""
+        self._memory.clear()
+
+    def log_statistics(self) -> None:
+        """Log cache hits, misses and build times for each data source"""
+        for datasource_name, stats in sorted(self.statistics.items()):
+            log.time(
+                f"Apriori cache {datasource_name}: {stats['hits']} hits, {stats['disk_hits']} disk hits, "
+                f"{stats['misses']} misses, {stats['build_time']:.4f} seconds building"
+            )
+
+    def _build(self, datasource_name: str, build: Callable[[], Any]) -> Any:
+        """Build data and record the build time"""
+        start_time = time_module.perf_counter()
+        data = build()
+        build_time = time_module.perf_counter() - start_time
+        self.statistics[datasource_name]["build_time"] += build_time
+        log.time(f"Build apriori {datasource_name} (cache miss) in {build_time:.4f} seconds")
+        return data
+
+    def _store_memory(self, key: str, data: Any) -> None:
+        """Store data in the in-memory cache, evicting the least recently used entries"""
+        if self.memory_entries < 1:
+            return
+        self._memory[key] = data
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _read_disk(self, datasource_name: str, key: str) -> Tuple[bool, Any]:
+        """Read data from the disk cache
+
+        The entry is ignored if any of the files it was built from have changed.
+
+        Returns:
+            Tuple with flag telling if data were found, and the data.
+        """
+        entry_path = _disk_path(datasource_name, key)
+        try:
+            with open(entry_path, mode="rb") as fid:
+                entry = pickle.load(fid)
+        except FileNotFoundError:
+            return False, None
+        except Exception as err:  # Unpickling may raise almost any exception
+            log.warn(f"Ignoring corrupt apriori cache entry {entry_path}: {err}")
+            entry_path.unlink(missing_ok=True)
+            return False, None
+
+        for file_path, file_info in entry["files"].items():
+            if _file_info(file_path) != file_info:
+                log.debug(f"Apriori cache entry {entry_path} is outdated, {file_path} has changed")
+                return False, None
+
+        log.debug(f"Read apriori {datasource_name} from cache {entry_path}")
+        return True, entry["data"]
+
+    def _write_disk(self, datasource_name: str, key: str, data: Any, file_paths: set) -> None:
+        """Store data in the disk cache
+
+        Data that can not be pickled, or that do not survive a pickle roundtrip, are not stored.
+        """
+        entry = dict(files={str(p): _file_info(p) for p in sorted(file_paths)}, data=data)
+        try:
+            entry_bytes = pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.loads(entry_bytes)
+        except Exception as err:  # Pickling may raise almost any exception
+            log.debug(f"Apriori {datasource_name} is not stored in disk cache: {err}")
+            return
+
+        entry_path = _disk_path(datasource_name, key)
+        tmp_path = entry_path.with_name(f".{entry_path.name}.{os.getpid()}")
+        try:
+            entry_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path.write_bytes(entry_bytes)
+            os.replace(tmp_path, entry_path)
+            log.debug(f"Stored apriori {datasource_name} in cache {entry_path}")
+        except OSError as err:
+            log.debug(f"Could not store apriori {datasource_name} in disk cache: {err}")
+            tmp_path.unlink(missing_ok=True)
+
+
+def cache_key(datasource_name: str, kwargs: Dict[str, Any]) -> str:
+    """Explicit key of the data of a data source
+
+    Args:
+        datasource_name:  Name of apriori data source.
+        kwargs:           Input arguments to the data source.
+
+    Returns:
+        Hexadecimal hash string.
+
+    Raises:
+        TypeError:  If an argument can not be identified reliably.
+    """
+    options = [(o, _config_value(o)) for o in CONFIG_OPTIONS.get(datasource_name, ())]
+    key_parts = (CACHE_VERSION, datasource_name, _key_part(kwargs), repr(options))
+    return hashlib.sha256(repr(key_parts).encode()).hexdigest()
+
+
+def _key_part(value: Any) -> Any:
+    """Stable representation of an argument used in the cache key
+
+    Args:
+        value:  Argument to a data source.
+
+    Returns:
+        Representation of value, consisting of strings and tuples.
+
+    Raises:
+        TypeError:  If the value can not be identified reliably.
+    """
+    if isinstance(value, np.ndarray) and hasattr(value, "jd1") and hasattr(value, "scale"):  # Time arrays
+        jds = np.ascontiguousarray(value.jd1).tobytes() + np.ascontiguousarray(value.jd2).tobytes()
+        return (
+            "time",
+            type(value).__name__,
+            value.scale,
+            getattr(value, "fmt", None),
+            np.shape(value),
+            hashlib.sha256(jds).hexdigest(),
+        )
+    elif type(value) is np.ndarray and value.dtype != object:
+        content = hashlib.sha256(np.ascontiguousarray(value).tobytes()).hexdigest()
+        return ("array", str(value.dtype), value.shape, content)
+    elif isinstance(value, dict):
+        return ("dict",) + tuple(sorted((str(k), _key_part(v)) for k, v in value.items()))
+    elif isinstance(value, (list, tuple)):
+        return (type(value).__name__,) + tuple(_key_part(v) for v in value)
+    elif isinstance(value, (str, bytes, int, float, bool, type(None), np.generic, date, datetime, timedelta)):
+        return repr(value)
+    elif isinstance(value, pathlib.PurePath):
+        return ("path", str(value))
+
+    raise TypeError(f"Arguments of type {type(value).__name__!r} are not supported")
+
+
+def _config_value(option: str) -> str:
+    """Value of a configuration option given as <configuration>.<option>, for instance tech.eop_sources"""
+    config_name, _, key = option.partition(".")
+    return getattr(config, config_name).get(key, default="").str
+
+
+def _disk_path(datasource_name: str, key: str) -> pathlib.PosixPath:
+    """Path to an entry in the disk cache"""
+    version_key = hashlib.sha256(f"{where.__version__}\x1f{key}".encode()).hexdigest()
+    return config.files.path("apriori_cache") / datasource_name / f"{version_key}.pickle"
+
+
+def _file_info(file_path: str) -> Optional[Tuple[int, int]]:
+    """Size and modification time of a file, None if the file does not exist"""
+    try:
+        file_stat = os.stat(file_path)
+    except OSError:
+        return None
+    return (file_stat.st_size, file_stat.st_mtime_ns)
+
+
+# The cache used by apriori.get
+cache = AprioriCache()
+atexit.register(cache.log_statistics)
@@ -0,0 +1,329 @@
+"""Gridded geophysical fields with vectorized interpolation in space and time
+
+Description:
+------------
+
+Several apriori data sources, like the VMF1 troposphere grids and the non-tidal atmospheric loading, are given as
+global latitude/longitude grids at regular epochs, typically every 6 hours. :func:`read_gridded_fields` reads all grids
+needed for the given observation epochs once, and stacks them in a 3-D array with axes (time, latitude, longitude) for
+each field::
+
+    fields = read_gridded_fields("vmf1_grid", time, names=("values",), file_vars=dict(type="zh"))
+    zhd = fields["values"](time, longitude, latitude)
+
+The returned :class:`GriddedField` objects interpolate for arrays of observation epochs and positions in one call. In
+space the interpolation method is given by the `space_interpolation` option in the [gridded_fields] section of the
+Where configuration:
+
+    spline     Bivariate spline interpolation in each grid. The spline of each grid epoch is evaluated once for all
+               observations needing it.
+    bilinear   Bilinear interpolation of the four surrounding grid values, periodic in longitude. Fully vectorized,
+               and only touches the grid values that are needed.
+
+Grid stacks larger than the `memmap_size` option are stored as .npy-files in the apriori cache directory and memory
+mapped, so that multi-year runs do not need to keep all grids in memory. These files are reused by later runs as long
+as the grid files have not changed.
+"""
+
+# Standard library imports
+from datetime import datetime, timedelta
+import hashlib
+import os
+import pathlib
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# External library imports
+import numpy as np
+from scipy.interpolate import RectBivariateSpline
+
+# Midgard imports
+from midgard.files import dependencies
+
+# Where imports
+from where import parsers
+from where.lib import config
+from where.lib import log
+
+# Bump if the layout of the memory mapped files change
+CACHE_VERSION = "1"
+
+_MJD_EPOCH = datetime(1858, 11, 17)
+
+
+class GriddedField:
+    """A field given on a regular latitude/longitude grid at regular epochs
+
+    Args:
+        start:               Epoch of the first grid, in UTC.
+        interval:            Time between grids.
+        lat:                 Increasing latitudes of the grid [rad].
+        lon:                 Increasing longitudes of the grid [rad].
+        values:              Array with shape (num_epochs, num_lat, num_lon).
+        available:           Boolean array, False for grid epochs without data.
+        time_interpolation:  Either `linear` or `previous` (use the last grid before each epoch).
+    """
+
+    def __init__(
+        self,
+        start: datetime,
+        interval: timedelta,
+        lat: np.ndarray,
+        lon: np.ndarray,
+        values: np.ndarray,
+        available: np.ndarray,
+        time_interpolation: str = "linear",
+    ) -> None:
+        self.start = start
+        self.interval = interval
+        self.lat = lat
+        self.lon = lon
+        self.values = values
+        self.available = available
+        self.time_interpolation = time_interpolation
+        self._splines = dict()
+
+    def __call__(self, time: "Time", longitude: np.ndarray, latitude: np.ndarray) -> np.ndarray:
+        """Interpolate in space and time
+
+        Args:
+            time:       Epoch(s) of the observations.
+            longitude:  Longitude(s) in [rad].
+            latitude:   Latitude(s) in [rad].
+
+        Returns:
+            Interpolated value(s), a scalar if longitude is a scalar.
+
+        Raises:
+            KeyError:  If a grid needed for the interpolation is not available.
+        """
+        is_scalar = np.ndim(longitude) == 0
+        steps = np.atleast_1d(self._steps(time))
+        lon, lat, steps = np.broadcast_arrays(np.atleast_1d(longitude), np.atleast_1d(latitude), steps)
+        epoch_idx, fraction = self._epoch_idx(steps)
+
+        values = self._interpolate_space(epoch_idx, lon, lat)
+        if self.time_interpolation == "linear":
+            is_between = fraction > 0
+            next_values = self._interpolate_space(epoch_idx[is_between] + 1, lon[is_between], lat[is_between])
+            values[is_between] += fraction[is_between] * (next_values - values[is_between])
+
+        return values[0] if is_scalar else values
+
+    def is_available(self, time: "Time") -> np.ndarray:
+        """Check which epochs have the grids needed for interpolation
+
+        Args:
+            time:  Epoch(s) of the observations.
+
+        Returns:
+            Boolean array, True for epochs that can be interpolated.
+        """
+        epoch_idx, fraction = self._epoch_idx(np.atleast_1d(self._steps(time)))
+        available = self._has_grid(epoch_idx)
+        if self.time_interpolation == "linear":
+            is_between = fraction > 0
+            available[is_between] &= self._has_grid(epoch_idx[is_between] + 1)
+        return available
+
+    def _has_grid(self, epoch_idx: np.ndarray) -> np.ndarray:
+        """Check which grid epochs are available"""
+        is_inside = (epoch_idx >= 0) & (epoch_idx < len(self.available))
+        return is_inside & self.available[np.clip(epoch_idx, 0, len(self.available) - 1)]
+
+    @staticmethod
+    def _epoch_idx(steps: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Index of the grid epoch before each step, and the fraction of the interval to the next grid epoch"""
+        epoch_idx = np.floor(steps + 1e-9).astype(int)
+        return epoch_idx, np.clip(steps - epoch_idx, 0, 1)
+
+    def _steps(self, time: "Time") -> np.ndarray:
+        """Epochs as number of grid intervals since the first grid"""
+        start_mjd = (self.start - _MJD_EPOCH).total_seconds() / 86400
+        days = (np.asarray(time.utc.jd1) - 2400000.5 - start_mjd) + np.asarray(time.utc.jd2)
+        return days * 86400 / self.interval.total_seconds()
+
+    def _interpolate_space(self, epoch_idx: np.ndarray, lon: np.ndarray, lat: np.ndarray) -> np.ndarray:
+        """Interpolate in the grids of the given epochs"""
+        has_grid = self._has_grid(epoch_idx)
+        if not np.all(has_grid):
+            bad_idx = epoch_idx[~has_grid][0]
+            raise KeyError(f"No grid available for {self.start + bad_idx * self.interval}")
+
+        method = config.where.gridded_fields.get("space_interpolation", default="spline").str
+        if method == "bilinear":
+            return self._bilinear(epoch_idx, lon, lat)
+        elif method != "spline":
+            log.fatal(f"Unknown space_interpolation {method!r} for gridded fields. Use 'spline' or 'bilinear'")
+
+        values = np.empty(lon.shape)
+        for idx in np.unique(epoch_idx):
+            is_epoch = epoch_idx == idx
+            values[is_epoch] = self._spline(idx)(lon[is_epoch], lat[is_epoch], grid=False)
+        return values
+
+    def _spline(self, epoch_idx: int) -> RectBivariateSpline:
+        """Spline interpolator for the grid of one epoch, created when first needed"""
+        if epoch_idx not in self._splines:
+            self._splines[epoch_idx] = RectBivariateSpline(self.lon, self.lat, np.asarray(self.values[epoch_idx]).T)
+        return self._splines[epoch_idx]
+
+    def _bilinear(self, epoch_idx: np.ndarray, lon: np.ndarray, lat: np.ndarray) -> np.ndarray:
+        """Bilinear interpolation, periodic in longitude"""
+        num_lat, num_lon = len(self.lat), len(self.lon)
+        lat_pos = np.clip((lat - self.lat[0]) / (self.lat[1] - self.lat[0]), 0, num_lat - 1)
+        lon_pos = ((lon - self.lon[0]) / (self.lon[1] - self.lon[0])) % num_lon
+        lat_0 = np.minimum(lat_pos.astype(int), num_lat - 2)
+        lon_0 = lon_pos.astype(int) % num_lon
+        lon_1 = (lon_0 + 1) % num_lon
+        w_lat, w_lon = lat_pos - lat_0, lon_pos - np.floor(lon_pos)
+
+        grid = self.values
+        return (
+            (1 - w_lat) * (1 - w_lon) * grid[epoch_idx, lat_0, lon_0]
+            + (1 - w_lat) * w_lon * grid[epoch_idx, lat_0, lon_1]
+            + w_lat * (1 - w_lon) * grid[epoch_idx, lat_0 + 1, lon_0]
+            + w_lat * w_lon * grid[epoch_idx, lat_0 + 1, lon_1]
+        )
+
+
+def read_gridded_fields(
+    file_key: str,
+    time: "Time",
+    names: Sequence[str],
+    interval: timedelta = timedelta(hours=6),
+    multipliers: Optional[Dict[str, float]] = None,
+    file_vars: Optional[Dict[str, str]] = None,
+    time_interpolation: str = "linear",
+) -> Dict[str, GriddedField]:
+    """Read the grids needed to interpolate at the given epochs
+
+    Grids are read from the grid epoch before the first observation to the grid epoch after the last observation.
+
+    Args:
+        file_key:            Key of the grid files in the file configuration, with date variables for each grid epoch.
+        time:                Observation epochs.
+        names:               Names of the fields in the parsed data.
+        interval:            Time between grids.
+        multipliers:         Optional factor for each field.
+        file_vars:           Additional file variables.
+        time_interpolation:  Either `linear` or `previous`.
+
+    Returns:
+        Gridded field for each name.
+    """
+    utc = np.atleast_1d(time.utc.datetime)
+    start, end = _floor(min(utc), interval), _floor(max(utc), interval)
+    epochs = [start + i * interval for i in range((end - start) // interval + 2)]
+    file_vars_list = [dict(config.date_vars(e), **(file_vars or dict())) for e in epochs]
+    multipliers = multipliers or dict()
+
+    # Reuse memory mapped grids from an earlier run if the grid files are unchanged
+    grids = _read_cache(_cache_path(file_key, names, multipliers, file_vars_list), names)
+    if grids is None:
+        grids = _read_grids(file_key, names, multipliers, file_vars_list)
+    else:
+        for fvars in file_vars_list:
+            dependencies.add(config.files.path(file_key, file_vars=fvars, use_aliases=True), label=file_key)
+
+    if not grids:
+        grids = dict(lat=np.zeros(2), lon=np.zeros(2), available=np.zeros(len(epochs), dtype=bool))
+        grids.update({n: np.zeros((len(epochs), 2, 2)) for n in names})
+    return {
+        n: GriddedField(start, interval, grids["lat"], grids["lon"], grids[n], grids["available"], time_interpolation)
+        for n in names
+    }
+
+
+def _floor(epoch: datetime, interval: timedelta) -> datetime:
+    """Latest grid epoch before or at the given epoch, grids start at midnight"""
+    midnight = epoch.replace(hour=0, minute=0, second=0, microsecond=0)
+    return midnight + interval * ((epoch - midnight) // interval)
+
+
+def _read_grids(
+    file_key: str, names: Sequence[str], multipliers: Dict[str, float], file_vars_list: List[Dict[str, str]]
+) -> Dict[str, np.ndarray]:
+    """Parse the grid files, and stack the grids of each field
+
+    Stacks larger than the memmap_size option are written directly to memory mapped files, one grid at a time.
+    """
+    grids = dict(available=np.zeros(len(file_vars_list), dtype=bool))
+    tmp_paths = dict()
+    for idx, fvars in enumerate(file_vars_list):
+        chunk = parsers.parse_key(file_key=file_key, file_vars=fvars).as_dict()
+        if not chunk:
+            continue
+
+        if "lat" not in grids:
+            grids.update(lat=chunk["lat"], lon=chunk["lon"])
+            shape = (len(file_vars_list),) + chunk[names[0]].shape
+            size = len(names) * np.prod(shape) * np.dtype(float).itemsize
+            if size > config.where.gridded_fields.get("memmap_size", default=256).float * 2**20:
+                tmp_dir = config.files.path("apriori_cache") / "gridded_fields" / file_key
+                tmp_dir.mkdir(parents=True, exist_ok=True)
+                tmp_paths = {n: tmp_dir / f".{n}.{os.getpid()}.npy" for n in names}
+                grids.update({n: np.lib.format.open_memmap(p, mode="w+", shape=shape) for n, p in tmp_paths.items()})
+            else:
+                grids.update({n: np.zeros(shape) for n in names})
+
+        grids["available"][idx] = True
+        for name in names:
+            grids[name][idx] = chunk[name] * multipliers.get(name, 1)
+
+    if tmp_paths:
+        # Key is computed after parsing, since missing files may have been downloaded
+        grids = _store_cache(_cache_path(file_key, names, multipliers, file_vars_list), grids, tmp_paths)
+    return grids if "lat" in grids else dict()
+
+
+def _cache_path(
+    file_key: str, names: Sequence[str], multipliers: Dict[str, float], file_vars_list: List[Dict[str, str]]
+) -> pathlib.Path:
+    """Path to memory mapped grids, keyed by the grid files and their size and modification time"""
+    file_infos = list()
+    for fvars in file_vars_list:
+        file_path = config.files.path(file_key, file_vars=fvars, use_aliases=True)
+        try:
+            file_stat = os.stat(file_path)
+            file_infos.append((str(file_path), file_stat.st_size, file_stat.st_mtime_ns))
+        except OSError:
+            file_infos.append((str(file_path), None, None))
+    key_parts = (CACHE_VERSION, file_key, tuple(names), sorted(multipliers.items()), file_infos)
+    key = hashlib.sha256(repr(key_parts).encode()).hexdigest()
+    return config.files.path("apriori_cache") / "gridded_fields" / file_key / key
+
+
+def _read_cache(cache_path: pathlib.Path, names: Sequence[str]) -> Optional[Dict[str, np.ndarray]]:
+    """Open memory mapped grids, None if they are not available"""
+    try:
+        with np.load(cache_path.with_suffix(".npz")) as axes:
+            grids = {k: axes[k] for k in ("lat", "lon", "available")}
+        for name in names:
+            grids[name] = np.load(cache_path.with_name(f"{cache_path.name}-{name}.npy"), mmap_mode="r")
+    except (OSError, ValueError, KeyError):
+        return None
+    log.debug(f"Using memory mapped grids {cache_path}")
+    return grids
+
+
+def _store_cache(
+    cache_path: pathlib.Path, grids: Dict[str, np.ndarray], tmp_paths: Dict[str, pathlib.Path]
+) -> Dict[str, np.ndarray]:
+    """Move memory mapped grids into the cache, and return memory mapped grids opened read only
+
+    The axes are stored last, so that a partly written cache entry is never used.
+    """
+    try:
+        for name, tmp_path in tmp_paths.items():
+            grids[name].flush()
+            os.replace(tmp_path, cache_path.with_name(f"{cache_path.name}-{name}.npy"))
+        npz_path = cache_path.with_suffix(".npz")
+        tmp_path = npz_path.with_name(f".{npz_path.name}.{os.getpid()}")
+        with open(tmp_path, mode="wb") as fid:
+            np.savez(fid, lat=grids["lat"], lon=grids["lon"], available=grids["available"])
+        os.replace(tmp_path, npz_path)
+    except OSError as err:
+        log.debug(f"Could not store memory mapped grids {cache_path}: {err}")
+        return grids
+
+    return _read_cache(cache_path, list(tmp_paths)) or grids
@@ -121,6 +121,12 @@ The following example shows the steps that underlies computing Earth's position
 
 Note that the vectors in the SPK-files are in kilometers and kilometers per day (for velocity).
 
+Each segment is evaluated once for the unique epochs of a Time object, and the result is shared by all paths using the
+segment. For instance, the Earth to Earth-Moon barycenter segment is only evaluated once when computing vectors from
+the Earth to both the Sun and the Moon. If the `span_cache` option in the [ephemerides] section of the Where
+configuration is set, the Chebyshev coefficients covering the time span of the Ephemerides-instance are copied from
+the memory mapped SPK-file into memory the first time a segment is evaluated.
+
 TODO:
 -----
 
@@ -133,10 +139,11 @@ GCRS are not applied. What are the consequences, if we do not consider these cor
 """
 
 # Standard library imports
+import copy
 from functools import lru_cache
 
 # External library imports
-from jplephem.spk import SPK
+from jplephem.spk import SPK, T0
 from jplephem import names as eph_names
 import numpy as np
 
@@ -201,6 +208,10 @@ class Ephemerides:
         # Parse segments in SPK file
         self._names, self._segments = self._parse_segments()
 
+        # Segments with the Chebyshev coefficients covering the time span in memory
+        self._span_cache = config.where.get("span_cache", section="ephemerides", default=True).bool
+        self._span_segments = dict()
+
     @property
     def names(self):
         """List names of objects available in the current ephemerides file.
@@ -225,7 +236,7 @@ class Ephemerides:
         time = self.time if time is None else time
         vector = np.zeros((3,) + time.shape)
         for segment, factor in self._find_path(from_name, to_name):
-            vector += self._spk[segment].compute(time.tdb.jd) * factor
+            vector += self._compute_segment(segment, time) * factor
 
         return vector.T * Unit.kilometer2meter
 
@@ -333,7 +344,7 @@ class Ephemerides:
         time = self.time if time is None else time
         vector = np.zeros((3,) + time.shape)
         for segment, factor in self._find_path(from_name, to_name):
-            vector += self._spk[segment].compute_and_differentiate(time.tdb.jd)[1] * factor
+            vector += self._compute_segment(segment, time, differentiate=True) * factor
 
         return vector.T * Unit.kilometer2meter / Unit.day2second
 
@@ -388,6 +399,52 @@ class Ephemerides:
         else:
             return (time.gcrs2itrs @ vel_gcrs[:, :, None])[:, :, 0]
 
+    @lru_cache()
+    def _compute_segment(self, segment, time, differentiate=False):
+        """Evaluate one segment for the unique epochs of the given time
+
+        Args:
+            segment (Tuple):       Ids of center and target object of segment.
+            time (Time):           Time epochs for which to evaluate the segment.
+            differentiate (Bool):  Whether to compute velocities instead of positions.
+
+        Returns:
+            Array: Positions [km] or velocities [km/day], with shape (3,) + time.shape.
+        """
+        jd = np.asarray(time.tdb.jd)
+        unique_jd, inverse = np.unique(jd, return_inverse=True)
+        spk_segment = self._spk_segment(segment, unique_jd)
+        if differentiate:
+            values = spk_segment.compute_and_differentiate(unique_jd)[1]
+        else:
+            values = spk_segment.compute(unique_jd)
+
+        return values[:, inverse.ravel()].reshape((3,) + jd.shape)
+
+    def _spk_segment(self, segment, jd):
+        """Get the SPK segment to evaluate for the given sorted epochs
+
+        The first time a segment is needed, a copy of the segment holding the Chebyshev coefficients covering the time
+        span of this instance in memory is created if the span cache is used. The copy is used for all epochs within
+        the time span.
+
+        Args:
+            segment (Tuple):     Ids of center and target object of segment.
+            jd (Numpy array):    Sorted epochs as Julian Day in TDB.
+
+        Returns:
+            Segment: Segment of the SPK-file, or a copy of it with the coefficients covering the time span.
+        """
+        if not self._span_cache or self.time is None:
+            return self._spk[segment]
+
+        if segment not in self._span_segments:
+            self._span_segments[segment] = _span_segment(self._spk[segment], np.asarray(self.time.tdb.jd))
+        span_segment = self._span_segments[segment]
+        if span_segment is None or jd[0] < span_segment.start_jd or jd[-1] > span_segment.end_jd:
+            return self._spk[segment]
+        return span_segment
+
     def _parse_segments(self):
         """Read all segments in the SPK-file
 
@@ -456,3 +513,32 @@ class Ephemerides:
                     tail = self._generate_path(segment_to, to_id, previous=from_id)
                     if tail:
                         return [(from_id, segment_to)] + tail
+
+
+def _span_segment(segment, jd):
+    """Copy an SPK segment, keeping only the Chebyshev coefficients needed for the given epochs in memory
+
+    The copy is evaluated by jplephem as the original segment, but without indexing into the memory mapped SPK-file.
+    One extra record is kept at each end of the time span.
+
+    Args:
+        segment (Segment):   Segment of the SPK-file.
+        jd (Numpy array):    Epochs as Julian Day in TDB.
+
+    Returns:
+        Segment: Copy of the segment, or None for segment types that jplephem does not map into memory.
+    """
+    try:
+        init, intlen, coefficients = segment._data
+    except (TypeError, ValueError):
+        return None
+
+    num_records = coefficients.shape[2]
+    seconds = (np.array([np.min(jd), np.max(jd)]) - T0) * Unit.day2second - init
+    first, last = np.clip(np.floor(seconds / intlen).astype(int) + np.array([-1, 1]), 0, num_records - 1)
+
+    span_segment = copy.copy(segment)
+    span_segment._data = (init + first * intlen, intlen, np.ascontiguousarray(coefficients[:, :, first : last + 1]))
+    span_segment.start_jd = max(T0 + (init + first * intlen) * Unit.second2day, segment.start_jd)
+    span_segment.end_jd = min(T0 + (init + (last + 1) * intlen) * Unit.second2day, segment.end_jd)
+    return span_segment
@@ -29,11 +29,12 @@ from midgard.dev import plugins
 from midgard.files import dependencies
 from midgard.math.constant import constant
 from midgard.math.unit import Unit
-from midgard.parsers import rinex_nav
+from midgard.gnss import gnss
 
 # Where imports
 from where.data import dataset3 as dataset
 from where import cleaners
+from where import parsers
 from where.apriori import orbit
 from where.lib import config
 from where.lib import log
@@ -169,7 +170,7 @@ class BroadcastOrbit(orbit.AprioriOrbit):
                 dset_temp = dataset.Dataset(
                     rundate=date_to_read, pipeline=dset_raw.vars["pipeline"], stage="temporary"
                 )
-                parser = rinex_nav.get_rinex2_or_rinex3(file_path)
+                parser = parsers.parse_file(_rinex_nav_parser_name(file_path), file_path=file_path)
                 dset_temp.update_from(parser.as_dataset())
                 file_paths.append(str(parser.file_path))
                 dependencies.add(str(parser.file_path), label=self.file_key.format(system=sys))  # Used for output writing
@@ -1216,3 +1217,22 @@ class BroadcastOrbit(orbit.AprioriOrbit):
         bdict.update({"v_ecef": v_ecef, "v_orb": v_orb})
 
 
+def _rinex_nav_parser_name(file_path: "pathlib.PosixPath") -> str:
+    """Get name of parser for reading a RINEX navigation file in format 2.11, 2.12 or 3.xx
+
+    The same parsers as Midgard's rinex_nav.get_rinex2_or_rinex3 are used, but the parsing is done with
+    where.parsers.parse_file, so that the parse cache can be used.
+
+    Args:
+        file_path:  File path to broadcast orbit file.
+
+    Returns:
+        Parser name.
+    """
+    version = gnss.get_rinex_file_version(file_path=file_path)
+    if version.startswith("2"):
+        return "rinex212_nav" if version == "2.12" else "rinex2_nav"
+    elif version.startswith("3"):
+        return "rinex3_nav"
+
+    log.fatal(f"Unknown RINEX format {version} is used in file {file_path}")
@@ -17,7 +17,7 @@ Example:
 
 # Standard library imports
 from datetime import timedelta
-from typing import List, Union
+from typing import Dict, List, Tuple, Union
 
 # External library imports
 import numpy as np
@@ -29,6 +29,7 @@ from midgard.math import nputil
 # Where imports
 from where import apriori, cleaners, parsers
 from where.apriori import orbit
+from where.data.time import Time
 from where.lib import config, log, util
 
 
@@ -72,6 +73,7 @@ class HasOrbit(orbit.AprioriOrbit):
         super().__init__(rundate=rundate)
         self.file_key = file_key
         self.day_offset = day_offset
+        self._message_index = dict()
         
         
     def _read(self, dset_raw):
@@ -442,7 +444,7 @@ class HasOrbit(orbit.AprioriOrbit):
                     # Get correct HAS message for given observations times by determining the indices to HAS message dataset
                     dset_has_idx = self._get_has_message_idx(dset, system=sys, signal=has_signal_type)
                     
-                    values[idx] = self.dset_edit.code_bias[dset_has_idx][idx]
+                    values[idx] = self.dset_edit.code_bias[dset_has_idx[idx]]
 
                     # Add HAS code bias correction information to meta variable
                     dset.meta["has_corrected_obstypes"].setdefault(sys, dict()).setdefault(has_signal_type, list())
@@ -505,7 +507,7 @@ class HasOrbit(orbit.AprioriOrbit):
                     # Get correct HAS message for given observation times by determining the indices to HAS message dataset
                     dset_has_idx = self._get_has_message_idx(dset, system=sys, signal=has_signal_type)
                     
-                    values[idx] = self.dset_edit.phase_bias[dset_has_idx][idx]
+                    values[idx] = self.dset_edit.phase_bias[dset_has_idx[idx]]
 
                     # Add HAS phase bias correction information to meta variable
                     dset.meta["has_corrected_obstypes"].setdefault(sys, dict()).setdefault(has_signal_type, list())
@@ -666,6 +668,9 @@ class HasOrbit(orbit.AprioriOrbit):
         messages. In addition filtering related to given GNSS system identifier and signal is needed for code and 
         phase bias information.
 
+        The HAS message epochs are sorted once for each satellite (and signal), so that the HAS messages for all
+        observation epochs of a satellite are found at once by binary search.
+
         Args:
             dset:   A Dataset containing model data.
             time:   Define time fields to be used. It can be for example 'time' or 'sat_time'. 'time' is related to 
@@ -714,73 +719,121 @@ class HasOrbit(orbit.AprioriOrbit):
         indices = np.full(dset.num_obs, -1, dtype=int) # -1 is chosen to guarantee that not a wrong index is used 
                                                        # for getting correct HAS message
 
-        has_epoch_mjd = self._add_dim(self.dset_edit[time_key].gps.mjd) 
-        for idx_dset, (sat, obs_epoch) in enumerate(zip(dset.satellite, dset[time])):
+        message_index = self._get_message_index(time_key, system=system, signal=signal)
+        if system == "G" and signal == "L2 CL":
+            # TODO-MURKS: Better solution for handling of L2 CL signal type. L2 CL bias corrections are not available
+            #             for all satellites.
+            fallback_index = self._get_message_index(time_key, system=system, signal="L2 P")
+        else:
+            fallback_index = dict()
+
+        obs_mjd = self._add_dim(dset[time].gps.mjd)
+        for sat in dset.unique("satellite"):
 
             # Skip not relevant GNSS satellites, if GNSS system is defined
-            if system:
-                if not sat[0:1] == system:
-                    continue
-                        
-            if signal:
-                idx_has = self.dset_edit.filter(satellite=sat, system=system, signal=signal)
-               
-                if np.any(idx_has) == False:
-                    # TODO-MURKS: Better solution for handling of L2 CL signal type. L2 CL bias corrections are not available for all satellites.
-                    if system == "G" and signal == "L2 CL":
-                        idx_has = self.dset_edit.filter(satellite=sat, system=system, signal="L2 P")
-
-                        if np.any(idx_has) == False:
-                            log.fatal(f"No valid HAS message could be found for satellite {sat}, GNSS signal {system}:{signal} and "
-                                      f"observation epoch {obs_epoch.isot}. Use 'gnss_clean_orbit_has' remover.")
-
-                        log.debug(f"HAS bias correction for signal 'G:{signal}' does not exists for satellite {sat}, "
-                                  f"therefore use of corrections for signal 'G:L2 P' satellite {sat}.")
-
-                    else:
-                        log.fatal(f"No valid HAS message could be found for satellite {sat}, GNSS signal {system}:{signal} and "
-                                  f"observation epoch {obs_epoch.isot}. Use 'gnss_clean_orbit_has' remover.")            
-            else: 
-                idx_has = self.dset_edit.filter(satellite=sat)
-               
-                if np.any(idx_has) == False:
-                    log.fatal(f"No valid HAS message could be found for satellite {sat}, and observation epoch "
-                             f"{obs_epoch.isot}. Use 'gnss_clean_orbit_has' remover.")
-
-            nearest_idx = self._get_nearest_idx(has_epoch_mjd[idx_has], obs_epoch, time_key, positive) 
-            indices[idx_dset] = idx_has.nonzero()[0][nearest_idx]
+            if system and not sat[0:1] == system:
+                continue
+
+            idx_dset = dset.filter(satellite=sat)
+            if sat in message_index:
+                has_epoch_mjd, has_idx = message_index[sat]
+            elif sat in fallback_index:
+                log.debug(f"HAS bias correction for signal 'G:{signal}' does not exists for satellite {sat}, "
+                          f"therefore use of corrections for signal 'G:L2 P' satellite {sat}.")
+                has_epoch_mjd, has_idx = fallback_index[sat]
+            else:
+                signal_txt = f", GNSS signal {system}:{signal}" if signal else ""
+                log.fatal(f"No valid HAS message could be found for satellite {sat}{signal_txt} and observation "
+                          f"epoch {dset[time][idx_dset][0].isot}. Use 'gnss_clean_orbit_has' remover.")
+
+            indices[idx_dset] = self._get_nearest_idx(has_epoch_mjd, has_idx, obs_mjd[idx_dset], time_key, positive)
 
         return indices
 
+
+    def _get_message_index(
+                self, 
+                time_key: str, 
+                system: Union[str, None] = None, 
+                signal: Union[str, None] = None,
+        ) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+        """Get HAS message epochs sorted in time for each satellite
+
+        The index is only determined once for each combination of time key, system and signal.
+
+        Args:
+            time_key: HAS message time field, either 'tom' or 'time'.
+            system:   Satellite system of code or phase bias HAS messages, used together with 'signal'.
+            signal:   Satellite signal of code or phase bias HAS messages, used together with 'system'.
+
+        Returns:
+            Dictionary with satellite as key and a tuple with sorted HAS message epochs (MJD) and the corresponding 
+            HAS message indices as value.
+        """
+        key = (time_key, system, signal)
+        if key not in self._message_index:
+            has_epoch_mjd = self._add_dim(self.dset_edit[time_key].gps.mjd)
+            satellites = self._add_dim(self.dset_edit.satellite)
+            if signal:
+                idx_signal = self.dset_edit.filter(system=system, signal=signal)
+            else:
+                idx_signal = np.ones(self.dset_edit.num_obs, dtype=bool)
+
+            # Stable sorting keeps HAS messages with identical epochs in the order of the HAS message dataset
+            self._message_index[key] = dict()
+            for sat in np.unique(satellites[idx_signal]):
+                has_idx = np.flatnonzero(np.logical_and(idx_signal, satellites == sat))
+                has_idx = has_idx[np.argsort(has_epoch_mjd[has_idx], kind="stable")]
+                self._message_index[key][sat] = (has_epoch_mjd[has_idx], has_idx)
+
+        return self._message_index[key]
+
     
-    def _get_nearest_idx(self, has_epoch_mjd: np.ndarray, obs_epoch: "Time", time_key: str, positive: bool) -> np.ndarray: 
-        """Get nearest HAS message data index for given observation epoch
+    def _get_nearest_idx(
+                self, 
+                has_epoch_mjd: np.ndarray, 
+                has_idx: np.ndarray, 
+                obs_mjd: np.ndarray, 
+                time_key: str, 
+                positive: bool,
+        ) -> np.ndarray: 
+        """Get nearest HAS message data indices for given observation epochs
         
+        If several HAS messages have the same epoch, the first one in the HAS message dataset is used.
+
         Args:
-            has_epoch_mjd:  HAS message epoch filtered e.g. after satellite and GNSS IOD
-            obs_epoch: 	    Observation epoch as Time object
+            has_epoch_mjd:  HAS message epochs of one satellite (and signal) sorted in time
+            has_idx:        HAS message dataset indices corresponding to has_epoch_mjd
+            obs_mjd:        Observation epochs as MJD in GPS time scale
             time_key:       Time key
             positive:       Difference between observation epoch and HAS message epoch has to be positive
 
         Returns:
             Nearest HAS messages indices for given observation epochs
-            for given observation epoch
         """
-        diff = obs_epoch.gps.mjd - has_epoch_mjd
+        num_has = has_epoch_mjd.size
 
-        if positive:
-            data = np.array([99999 if v < 0  else v for v in diff])
-            if np.all(data == 99999): # No HAS message epochs larger than observation epoch
-                log.fatal(f"No valid HAS message could be found before observation epoch {obs_epoch.gps.isot} (nearest HAS " 
-                          f"message receiver reception time: {min(self.dset_edit[time_key].gps.isot)})")
-            
-            nearest_idx = data.argmin()
-        else:
-            nearest_idx = np.array([abs(diff)]).argmin()
-            
-        return nearest_idx
-        
+        # First HAS message of each group of identical epochs
+        first_idx = has_idx[np.searchsorted(has_epoch_mjd, has_epoch_mjd, side="left")]
 
-        
+        # Last HAS message epoch before or at the observation epoch, and first HAS message epoch after it
+        before = np.searchsorted(has_epoch_mjd, obs_mjd, side="right") - 1
+        after = before + 1
 
+        if positive:
+            if np.any(before < 0): # No HAS message epochs before observation epoch
+                obs_epoch = Time(np.min(obs_mjd[before < 0]), fmt="mjd", scale="gps")
+                log.fatal(f"No valid HAS message could be found before observation epoch {obs_epoch.isot} (nearest HAS " 
+                          f"message receiver reception time: {min(self.dset_edit[time_key].gps.isot)})")
+            return first_idx[before]
+
+        before_clipped = np.maximum(before, 0)
+        after_clipped = np.minimum(after, num_has - 1)
+        diff_before = np.where(before >= 0, obs_mjd - has_epoch_mjd[before_clipped], np.inf)
+        diff_after = np.where(after < num_has, has_epoch_mjd[after_clipped] - obs_mjd, np.inf)
+        use_after = np.logical_or(
+            diff_after < diff_before,
+            np.logical_and(diff_after == diff_before, first_idx[after_clipped] < first_idx[before_clipped]),
+        )
 
+        return np.where(use_after, first_idx[after_clipped], first_idx[before_clipped])
@@ -0,0 +1,161 @@
+"""Vectorized evaluation of positions in a Sinex-based reference frame
+
+Description:
+------------
+
+Reference frames like ITRF give the position of each site as a piecewise linear model, with one position and velocity
+for each solution interval, and for ITRF2014 and later a model of post-seismic deformations (PSD) consisting of
+exponential and logarithmic terms in the local east, north and up directions, see Appendix C in :cite:'itrf2014'.
+
+:class:`PackedTrf` packs the solution intervals and PSD terms of all sites into arrays, so that positions for many
+(site, epoch) pairs are evaluated in one vectorized call::
+
+    packed = PackedTrf(data, ellipsoid=ell)
+    pos = packed.pos_trs(["nyal", "wett", "nyal"], mjd=[58000.0, 58000.0, 58100.0])
+
+The `data` is the dictionary read by the reference frame factories, with `ref_epoch`, `pos_vel` and optionally `psd`
+for each site.
+"""
+
+# Standard library imports
+from datetime import datetime
+from typing import Any, Dict, Sequence, Union
+
+# External library imports
+import numpy as np
+
+# Midgard imports
+from midgard.math.unit import Unit
+
+# Where imports
+from where.data.position import Position, PositionDelta
+
+# Epochs are clipped to this range of MJDs when looking up solution intervals, that is 1900-01-01 to 2200-01-01
+_MJD_MIN, _MJD_MAX = 15020.0, 124593.0
+_MJD_SPAN = 2**17  # Larger than _MJD_MAX - _MJD_MIN, used to separate the intervals of different sites
+_MJD_EPOCH = datetime(1858, 11, 17)
+
+
+class PackedTrf:
+    """Solution intervals and post-seismic deformations of all sites in a reference frame, packed into arrays
+
+    Args:
+        data:       Information about each site, as read by the reference frame factory.
+        ellipsoid:  Ellipsoid used for the local east, north and up directions of the PSD model.
+    """
+
+    def __init__(self, data: Dict[str, Dict[str, Any]], ellipsoid: Any = None) -> None:
+        self.ellipsoid = ellipsoid
+        self.sites = list(data.keys())
+        self._site_idx = {s: i for i, s in enumerate(self.sites)}
+        self.ref_epoch = np.array([_mjd(data[s]["ref_epoch"]) for s in self.sites])
+
+        # Solution intervals, sorted by site and start epoch
+        intervals = [
+            (
+                self._site_idx[s],
+                _mjd(pv["start"]),
+                _mjd(pv["end"]),
+                [pv[k] for k in ("STAX", "STAY", "STAZ")],
+                [pv.get(k, 0.0) for k in ("VELX", "VELY", "VELZ")],
+            )
+            for s in self.sites
+            for pv in data[s]["pos_vel"].values()
+        ]
+        intervals.sort(key=lambda i: (i[0], i[1]))
+        self._interval_site = np.array([i[0] for i in intervals], dtype=int)
+        self._interval_start = np.array([i[1] for i in intervals])
+        self._interval_end = np.array([i[2] for i in intervals])
+        self._interval_pos = np.array([i[3] for i in intervals], dtype=float).reshape(-1, 3)
+        self._interval_vel = np.array([i[4] for i in intervals], dtype=float).reshape(-1, 3)
+        self._interval_key = self._key(self._interval_site, self._interval_start)
+
+        # Post-seismic deformation terms, sorted by site. Component is 0, 1, 2 for east, north, up
+        terms = list()
+        for site in self.sites:
+            for param in data[site].get("psd", dict()).values():
+                epoch = _mjd(param["epoch"])
+                for component, L in enumerate("ENH"):
+                    for is_log, kind in enumerate(("EXP", "LOG")):
+                        amplitudes = param.get(f"A{kind}_{L}", list())
+                        relaxations = param.get(f"T{kind}_{L}", list())
+                        for a, t in zip(amplitudes, relaxations):
+                            terms.append((self._site_idx[site], epoch, component, is_log, a, t))
+        terms.sort(key=lambda t: t[0])
+        self._psd_site = np.array([t[0] for t in terms], dtype=int)
+        self._psd_epoch = np.array([t[1] for t in terms])
+        self._psd_component = np.array([t[2] for t in terms], dtype=int)
+        self._psd_is_log = np.array([t[3] for t in terms], dtype=bool)
+        self._psd_amplitude = np.array([t[4] for t in terms], dtype=float)
+        self._psd_relaxation = np.array([t[5] for t in terms], dtype=float)
+        self._psd_first = np.searchsorted(self._psd_site, np.arange(len(self.sites)))
+        self._psd_count = np.bincount(self._psd_site, minlength=len(self.sites))
+
+    def index(self, sites: Union[str, Sequence[str]]) -> np.ndarray:
+        """Indices of sites in the packed arrays
+
+        Raises:
+            KeyError:  If a site is not in the reference frame.
+        """
+        return np.array([self._site_idx[s] for s in np.atleast_1d(sites)], dtype=int)
+
+    def pos_trs(self, sites: Union[str, Sequence[str]], mjd: Union[float, np.ndarray]) -> np.ndarray:
+        """Positions of sites at given epochs
+
+        The sites and epochs are broadcast against each other. Epochs outside all solution intervals of a site give
+        zero positions.
+
+        Args:
+            sites:  Keys of the sites.
+            mjd:    Epochs as modified Julian dates in UTC.
+
+        Returns:
+            Array with one 3-vector position for each (site, epoch) pair.
+        """
+        site_idx, mjd = np.broadcast_arrays(self.index(sites), np.atleast_1d(np.asarray(mjd, dtype=float)))
+
+        # Find the last solution interval starting before each epoch, and check that the epoch is before its end
+        interval = np.searchsorted(self._interval_key, self._key(site_idx, mjd), side="right") - 1
+        interval_idx = np.maximum(interval, 0)
+        is_valid = (
+            (interval >= 0)
+            & (self._interval_site[interval_idx] == site_idx)
+            & (mjd < self._interval_end[interval_idx])
+        )
+
+        interval_years = (mjd - self.ref_epoch[site_idx]) * Unit.day2julian_years
+        pos = self._interval_pos[interval_idx] + interval_years[:, None] * self._interval_vel[interval_idx]
+        pos[~is_valid] = 0
+        if self._psd_site.size and np.any(self._psd_count[site_idx]):
+            pos = self._add_psd(site_idx, mjd, pos)
+        return pos
+
+    def _add_psd(self, site_idx: np.ndarray, mjd: np.ndarray, pos: np.ndarray) -> np.ndarray:
+        """Add post-seismic deformations to positions, see Appendix C in :cite:'itrf2014'"""
+        # Expand each (site, epoch) pair to one row for each PSD term of the site
+        counts = self._psd_count[site_idx]
+        pair = np.repeat(np.arange(site_idx.size), counts)
+        term = np.repeat(self._psd_first[site_idx] - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+
+        delta_t = (mjd[pair] - self._psd_epoch[term]) * Unit.day2julian_years
+        is_after = delta_t > 0
+        scaled_t = np.where(is_after, delta_t, 0) / self._psd_relaxation[term]
+        value = np.where(self._psd_is_log[term], np.log1p(scaled_t), -np.expm1(-scaled_t))
+        denu = np.zeros(pos.shape)
+        np.add.at(denu, (pair, self._psd_component[term]), self._psd_amplitude[term] * value * is_after)
+
+        has_psd = counts > 0
+        ref_pos = Position(pos[has_psd], system="trs", ellipsoid=self.ellipsoid)
+        pos = pos.copy()
+        pos[has_psd] += np.asarray(PositionDelta(denu[has_psd], system="enu", ref_pos=ref_pos).trs)
+        return pos
+
+    @staticmethod
+    def _key(site_idx: np.ndarray, mjd: np.ndarray) -> np.ndarray:
+        """Sort key combining site and epoch, so that all intervals are searched in one call"""
+        return site_idx * float(_MJD_SPAN) + (np.clip(mjd, _MJD_MIN, _MJD_MAX) - _MJD_MIN)
+
+
+def _mjd(epoch: datetime) -> float:
+    """Convert a datetime to modified Julian date, including datetime.min and datetime.max"""
+    return (epoch - _MJD_EPOCH).total_seconds() * Unit.second2day
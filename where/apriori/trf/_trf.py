@@ -11,6 +11,7 @@ import abc
 
 # External library imports
 import numpy as np
+from scipy import spatial
 
 # Where imports
 from where.lib import config
@@ -41,6 +42,7 @@ class Trf(collections.UserDict):
         self._factories = list()
         for reference_frame in self.reference_frames:
             self._factories.append(trf.get_trf_factory(time, reference_frame))
+        self._site_index = None
 
     def __missing__(self, key):
         """A TRF site identified by key
@@ -70,17 +72,42 @@ class Trf(collections.UserDict):
 
         return sorted(sites)
 
-    def closest(self, pos, max_distance=None):
+    @property
+    def site_index(self):
+        """KD-tree of the positions of all real sites, used for nearest-site and radius queries
+
+        The tree is built once from the positions at the mean epoch, taking each site from the first reference frame
+        that defines it.
+
+        Returns:
+            Tuple:  KD-tree of positions and list of site keys in the same order.
+        """
+        if self._site_index is None:
+            positions = dict()
+            for factory in self._factories:
+                for key, pos in factory.site_positions().items():
+                    positions.setdefault(key, pos)
+            keys = sorted(positions)
+            tree = spatial.cKDTree(np.array([positions[k] for k in keys]).reshape(-1, 3))
+            self._site_index = (tree, keys)
+        return self._site_index
+
+    def closest(self, pos, max_distance=None, num_candidates=4):
         """Find site closest to the given position
 
+        The nearest sites in the site index are compared using their positions at all epochs.
+
         Args:
             pos (Array):           3-vector with x, y and z-coordinates.
             max_distance (float):  Maximum distance around `pos` to look for a site [meter].
+            num_candidates (int):  Number of nearest sites in the site index that are compared.
 
         Returns:
             TrfSite: Site closest to the given position. Raises `ValueError` if no site is found within `max_distance`.
         """
-        distances = {k: self[k].distance_to(pos) for k in self.sites if self[k].real}
+        tree, keys = self.site_index
+        _, candidates = tree.query(_mean_pos(pos), k=min(num_candidates, len(keys)))
+        distances = {keys[i]: self[keys[i]].distance_to(pos) for i in np.atleast_1d(candidates)}
         closest = min(distances, key=distances.get)
 
         # Check that distance is within threshold
@@ -92,9 +119,24 @@ class Trf(collections.UserDict):
         else:
             raise ValueError(
                 "No site found within {} meters of ({:.2f}, {:.2f}, {:.2f}) in '{!r}'"
-                "".format(max_distance, *np.mean(pos.itrs, axis=0), self)
+                "".format(max_distance, *_mean_pos(pos), self)
             )
 
+    def sites_within(self, pos, radius):
+        """Find all sites within a distance of the given position
+
+        Args:
+            pos (Array):     3-vector with x, y and z-coordinates.
+            radius (float):  Distance around `pos` to look for sites [meter].
+
+        Returns:
+            List: TrfSites within the radius, sorted by distance.
+        """
+        tree, keys = self.site_index
+        candidates = tree.query_ball_point(_mean_pos(pos), r=radius)
+        distances = {keys[i]: self[keys[i]].distance_to(pos) for i in candidates}
+        return [self[k] for k in sorted(distances, key=distances.get) if distances[k] <= radius]
+
     def named_site(self, name):
         """Find site with given name
         """
@@ -146,6 +188,24 @@ class TrfFactory(abc.ABC):
         """
         return self.data.keys()
 
+    def site_positions(self):
+        """Positions of all real sites, averaged over the time epochs
+
+        Used to build the site index of the Trf. Subclasses may override this with a faster implementation.
+
+        Returns:
+            Dict:  3-vector position for each site with a well defined position.
+        """
+        positions = dict()
+        for key in self.sites:
+            try:
+                site = self.site(key)
+            except (exceptions.UnknownSiteError, exceptions.MissingDataError):
+                continue
+            if site.real:
+                positions[key] = _mean_pos(site.pos)
+        return positions
+
     def site(self, key):
         """Positions and information about one site in the reference frame
 
@@ -247,3 +307,8 @@ class TrfSite:
             pos = self.pos.trs.mean(axis=0)
         pos_str = "({:.2f}, {:.2f}, {:.2f})".format(*pos)
         return f"{type(self).__name__}({self.name!r}, {pos_str}, {self.source!r})"
+
+
+def _mean_pos(pos):
+    """Mean position, as a 3-vector, of a position or array of positions"""
+    return np.mean(np.asarray(getattr(pos, "trs", pos)).reshape(-1, 3), axis=0)
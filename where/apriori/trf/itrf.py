@@ -11,6 +11,7 @@ References:
 -----------
 
 """
+# Standard library imports
 from datetime import datetime
 
 # External library imports
@@ -19,12 +20,11 @@ import numpy as np
 # Midgard imports
 from midgard.dev import plugins
 from midgard.math import ellipsoid
-from midgard.math.unit import Unit
 
 # Where imports
 from where.apriori.trf import TrfFactory
-from where.data.position import Position, PositionDelta
-from where.data.time import Time
+from where.apriori.trf._packed import PackedTrf
+from where.data.position import Position
 from where.lib import config
 from where.lib import exceptions
 from where.lib import log
@@ -63,6 +63,7 @@ class Itrf(TrfFactory):
                 file_path = config.files.path(file_key)
                 log.fatal(f"No ITRF reference frame files found ({file_path}). Find and download one at {url}.")
         self.version = f"{self.solution}_{self.format}"
+        self._packed = None
 
     @property
     def file_paths(self):
@@ -136,12 +137,42 @@ class Itrf(TrfFactory):
 
         return data_snx
 
+    @property
+    def packed(self):
+        """Solution intervals and post-seismic deformations of all sites packed for vectorized evaluation"""
+        if self._packed is None:
+            ell = ellipsoid.get(config.tech.reference_ellipsoid.str.upper())
+            self._packed = PackedTrf(self.data, ellipsoid=ell)
+        return self._packed
+
+    def pos_trs(self, sites, time):
+        """Calculate positions for many (site, epoch) pairs in one call
+
+        Args:
+            sites (List):  Keys of sites, broadcast against the time epochs.
+            time (Time):   Time epochs.
+
+        Returns:
+            Array:  Positions, one 3-vector for each (site, epoch) pair.
+        """
+        return self.packed.pos_trs(sites, time.utc.mjd)
+
+    def site_positions(self):
+        """Positions of all sites at the mean epoch, evaluated in one call
+
+        Returns:
+            Dict:  3-vector position for each site with a well defined position.
+        """
+        sites = list(self.sites)
+        pos = self.packed.pos_trs(sites, self.time.utc.mean.mjd)
+        return {s: p for s, p in zip(sites, pos) if p.any()}
+
     def _calculate_pos_trs(self, site):
         """Calculate positions for the given time epochs
 
         The positions are calculated as simple linear offsets based on the reference epoch. If there is a post-seismic
         deformations model for a station the motion due to that model is added to the linear velocity model. Makes sure
-        to pick out the correct time interval to use.
+        to pick out the correct time interval to use. See :mod:`where.apriori.trf._packed`.
 
         Args:
             site (String):    Key saying which site to calculate position for.
@@ -149,53 +180,10 @@ class Itrf(TrfFactory):
         Returns:
             Array:  Positions, one 3-vector for each time epoch.
         """
-        station_info = self.data[site]
-        ref_epoch = Time(station_info["ref_epoch"], scale="utc", fmt="datetime")
-
-        pos = np.zeros((self.time.size, 3))
-        for pv in station_info["pos_vel"].values():
-            idx = np.logical_and(self.time.utc.datetime >= pv["start"], self.time.utc.datetime < pv["end"])
-            if idx.ndim == 0:
-                idx = np.array([idx])
-            if not any(idx):
-                continue
-            ref_pos = np.array([pv["STAX"], pv["STAY"], pv["STAZ"]])
-            ref_vel = np.array([pv["VELX"], pv["VELY"], pv["VELZ"]])
-            interval_years = (self.time - ref_epoch).jd * Unit.day2julian_years
-            if isinstance(interval_years, float):
-                interval_years = np.array([interval_years])
-            pos[idx, :] = ref_pos + interval_years[idx, None] * ref_vel[None, :]
-            
+        pos = self.pos_trs(site, self.time)
         if not pos.any():
             # All positions are zero
             raise exceptions.MissingDataError(f"Position for {site} is not well defined in {self}")
 
-        ell = ellipsoid.get(config.tech.reference_ellipsoid.str.upper())
-        pos_trs = Position(np.squeeze(pos), system="trs", ellipsoid=ell, time=self.time)
-
-        # Post-seismic deformations, see Appendix C in :cite:'itrf2014'
-        if "psd" in station_info:
-            psd = station_info["psd"]
-            denu = dict(H=np.zeros(self.time.size), E=np.zeros(self.time.size), N=np.zeros(self.time.size))
-            for param in psd.values():
-                t_0 = Time(param["epoch"], fmt="datetime", scale="utc")
-                delta_t = (self.time - t_0).jd * Unit.day2julian_years
-                if isinstance(delta_t, float):
-                    delta_t = np.array([delta_t])
-                idx = delta_t > 0
-                for L in "ENH":
-                    aexp = np.array(param.get("AEXP_" + L, list()))
-                    texp = np.array(param.get("TEXP_" + L, list()))
-                    for a, t in zip(aexp, texp):
-                        denu[L][idx] += a * (1 - np.exp(-delta_t[idx] / t))
-                    alog = np.array(param.get("ALOG_" + L, list()))
-                    tlog = np.array(param.get("TLOG_" + L, list()))
-                    for a, t in zip(alog, tlog):
-                        denu[L][idx] += a * np.log(1 + delta_t[idx] / t)
-
-            denu = np.vstack((denu["E"], denu["N"], denu["H"])).T
-
-            pos_delta = PositionDelta(np.squeeze(denu), system="enu", ellipsoid=ell, ref_pos=pos_trs, time=self.time)
-            pos_trs += pos_delta.trs
-
+        pos_trs = Position(np.squeeze(pos), system="trs", ellipsoid=self.packed.ellipsoid, time=self.time)
         return np.squeeze(pos_trs)
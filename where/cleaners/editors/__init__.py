@@ -13,12 +13,10 @@ needs to be decorated with the :func:`~midgard.dev.plugins.register` decorator a
         ...
 
 """
-# Midgard imports
-from midgard.dev import plugins
-
 # Where imports
 from where.lib import config
 from where.lib import log
+from where.lib import telemetry
 
 
 def apply_editors(config_key, dset):
@@ -31,4 +29,4 @@ def apply_editors(config_key, dset):
     prefix = dset.vars["pipeline"]
     editors = config.tech[config_key].list
     log.info(f"Applying editors")
-    return plugins.call_all(package_name=__name__, plugins=editors, prefix=prefix, dset=dset)
+    return telemetry.call_all("editor", package_name=__name__, plugins=editors, prefix=prefix, dset=dset)
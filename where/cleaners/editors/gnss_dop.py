@@ -12,15 +12,11 @@ epoch. Following dilution of precisions are added:
     VDOP - Vertical DOP
 
 """
-# External library imports
-import numpy as np
-
 # Midgard imports
 from midgard.dev import plugins
-from midgard.gnss.compute_dops import compute_dops
-
 
 # Where imports
+from where.lib import epochs
 from where.lib import log
 
 # Name of section in configuration
@@ -34,20 +30,9 @@ def gnss_dop(dset: "Dataset") -> None:
     Args:
         dset:     A Dataset containing model data.
     """
-    dops = {
-        "gdop": np.zeros((dset.num_obs)),
-        "pdop": np.zeros((dset.num_obs)),
-        "tdop": np.zeros((dset.num_obs)),
-        "hdop": np.zeros((dset.num_obs)),
-        "vdop": np.zeros((dset.num_obs)),
-    }
-
     # TODO: Check number of satellite observations !!!
-    for time in dset.unique("time"):
-        idx = dset.filter(time=time)
-        dops["gdop"][idx], dops["pdop"][idx], dops["tdop"][idx], dops["hdop"][idx], dops["vdop"][idx] = compute_dops(
-            dset.site_pos.azimuth[idx], dset.site_pos.elevation[idx]
-        )
+    groups = epochs.EpochGroups(dset.time)
+    dops = epochs.compute_dops(dset.site_pos.azimuth, dset.site_pos.elevation, groups)
 
     for dop, val in dops.items():
         if dop in dset.fields:
@@ -25,6 +25,7 @@ from midgard.dev import plugins
 # Where imports
 from where.lib import config
 from where.lib import log
+from where.lib import telemetry
 
 
 def apply_removers(config_key: str, dset: "Dataset") -> None:
@@ -37,7 +38,7 @@ def apply_removers(config_key: str, dset: "Dataset") -> None:
     prefix = dset.vars["pipeline"]
     removers = config.tech[config_key].list
     log.info("Applying removers")
-    keep_idxs = plugins.call_all(package_name=__name__, plugins=removers, prefix=prefix, dset=dset)
+    keep_idxs = telemetry.call_all("remover", package_name=__name__, plugins=removers, prefix=prefix, dset=dset)
 
     all_keep_idx = np.ones(dset.num_obs, dtype=bool)
     for remover, remover_keep_idx in keep_idxs.items():
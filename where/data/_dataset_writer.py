@@ -0,0 +1,377 @@
+"""Background and incremental writing of datasets
+
+Description:
+------------
+
+The pipelines write the dataset to file after each stage and iteration, although most fields have not changed since
+the previous write. The dataset writer speeds this up in two ways:
+
+    delta        Each top-level field is fingerprinted. A field with the same content, at the same write level, as a
+                 field already written by this writer to another dataset file in the same directory is not written
+                 again. Instead, the field is stored as an HDF5 external link to the group in the other file. Datasets
+                 with links are read with `Dataset.read` (or h5py) as usual.
+    background   The HDF5 files are written by a background thread. The fields that are written are copied when the
+                 dataset is submitted, so the analysis can continue changing it. The number of pending writes is
+                 bounded by a queue, and all pending writes are flushed at the end of each stage and before datasets
+                 are read or deleted.
+
+Links always point to the file where the data are physically stored, and are only made while that file is unchanged
+since this writer wrote it. Before a dataset file is overwritten or deleted by Where, the other dataset files in the
+same directory are checked for links to it, and the linked groups are copied into the linking files. This also covers
+links made by earlier runs or other processes. Files that are deleted or moved outside of Where may break the links
+of other dataset files of the same analysis.
+
+The links of the dataset files are kept in an index for each directory. The index is read from the files the first
+time a directory is used, and afterwards only files that have been added or changed by others are read again.
+
+The behavior is configured in the [dataset_writer] section of the Where configuration. Delta writing is off by
+default.
+"""
+
+# Standard library imports
+import atexit
+import copy
+import enum
+import hashlib
+import os
+import pathlib
+import queue
+import threading
+from typing import Any, Dict, Optional, Set, Tuple
+
+# Third party imports
+import h5py
+import numpy as np
+
+# Midgard imports
+from midgard.collections import enums
+from midgard.data import _h5utils
+
+# Where imports
+from where.lib import config
+from where.lib import log
+
+# Attributes of data objects that are caches, and not part of the content of a field
+_SKIP_ATTRIBUTES = {"_cache", "_dependent_objs"}
+
+
+class DatasetWriter:
+    """Writer of dataset files, optionally in a background thread"""
+
+    def __init__(self) -> None:
+        self._queue = None
+        self._thread = None
+        self._error = None
+        self._lock = threading.Lock()
+
+        # Physical location of written fields: (field name, write level, fingerprint) -> file path
+        self._locations: Dict[Tuple[str, str, str], pathlib.Path] = dict()
+
+        # Modification time and size of the files when they were last written or changed by this writer
+        self._file_stats: Dict[pathlib.Path, Tuple[int, int]] = dict()
+
+        # External links of the files in each directory: directory -> file path -> (file stat, target -> field names),
+        # and the modification time and size of the directories when their index was last brought up to date
+        self._link_index: Dict[pathlib.Path, Dict[pathlib.Path, Tuple[Any, Dict[pathlib.Path, Set[str]]]]] = dict()
+        self._dir_stats: Dict[pathlib.Path, Tuple[int, int]] = dict()
+
+    def submit(self, dset: "Dataset", file_path: pathlib.Path, write_level: str) -> None:
+        """Write a dataset to file, in the background if configured
+
+        Args:
+            dset:         The dataset that should be written.
+            file_path:    Path to the dataset file.
+            write_level:  Fields with lower write level than this are not written.
+        """
+        file_path = pathlib.Path(file_path).resolve()
+        write_level = enums.get_value("write_level", write_level)
+        delta = config.where.dataset_writer.get("delta", default=False).bool
+        if not config.where.dataset_writer.get("background", default=True).bool:
+            self.flush()
+            self._write(dset, file_path, write_level, delta)
+            return
+
+        log.debug(f"Queue writing of dataset to {file_path} with {write_level}")
+        snapshot = _snapshot(dset, write_level)
+        self._start()
+        self._queue.put((snapshot, file_path, write_level, delta))
+
+    def flush(self) -> None:
+        """Wait until all pending writes are done
+
+        Raises errors that occured while writing in the background.
+        """
+        if self._queue is not None:
+            self._queue.join()
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def release(self, file_path: pathlib.Path) -> None:
+        """Prepare a dataset file for being deleted or overwritten
+
+        Groups in the file that other dataset files link to are copied into the linking files.
+
+        Args:
+            file_path:  Path to the dataset file.
+        """
+        self.flush()
+        with self._lock:
+            self._release(pathlib.Path(file_path).resolve())
+
+    def _start(self) -> None:
+        """Start the background writer thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        queue_size = max(config.where.dataset_writer.get("queue_size", default=2).int, 1)
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._work, name="dataset_writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def _work(self) -> None:
+        """Write datasets from the queue, run in the background writer thread"""
+        while True:
+            snapshot, file_path, write_level, delta = self._queue.get()
+            try:
+                if self._error is None:
+                    self._write(snapshot, file_path, write_level, delta)
+            except Exception as err:  # Errors are raised in the main thread by flush()
+                self._error = err
+            finally:
+                self._queue.task_done()
+
+    def _write(self, dset: "Dataset", file_path: pathlib.Path, write_level: enum.Enum, delta: bool) -> None:
+        """Write a dataset to file, linking to unchanged fields in other files
+
+        Follows the layout of `midgard.data.dataset.Dataset.write`.
+        """
+        with self._lock:
+            log.debug(f"Write dataset to {file_path} with {write_level}")
+            self._release(file_path)
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            is_indexed = self._dir_stats.get(file_path.parent) == _file_stat(file_path.parent)
+            tmp_path = file_path.with_name(f".{file_path.name}.{os.getpid()}")
+
+            memo = dset._construct_memo()
+            written, linked = dict(), dict()
+            try:
+                with h5py.File(tmp_path, mode="w") as h5_file:
+                    for field_name, field in dset._fields.items():
+                        if field.write_level < write_level:
+                            continue
+                        key = (field_name, write_level.name, _fingerprint(field)) if delta else None
+                        target_path = self._locations.get(key)
+                        if target_path is not None and self._can_link(target_path, file_path):
+                            h5_file[field_name] = h5py.ExternalLink(target_path.name, field_name)
+                            linked[field_name] = target_path
+                        else:
+                            field.write(h5_file.create_group(field_name), memo, write_level=write_level)
+                            written[field_name] = key
+
+                    dset.meta.write(h5_file.create_group("__meta__"))
+
+                    fields = {fn: f.fieldtype for fn, f in dset._fields.items() if f.write_level >= write_level}
+                    h5_file.attrs["fields"] = _h5utils.encode_h5attr(fields)
+                    h5_file.attrs["num_obs"] = dset.num_obs
+                    h5_file.attrs["vars"] = _h5utils.encode_h5attr(dset.vars)
+                    h5_file.attrs["version"] = dset.version
+                os.replace(tmp_path, file_path)
+            except BaseException:
+                tmp_path.unlink(missing_ok=True)
+                raise
+
+            # Update book keeping
+            self._file_stats[file_path] = _file_stat(file_path)
+            links = dict()
+            for field_name, target_path in linked.items():
+                links.setdefault(target_path, set()).add(field_name)
+            self._index_links(file_path, links)
+            if is_indexed:
+                self._dir_stats[file_path.parent] = _file_stat(file_path.parent)
+            for key in written.values():
+                if key is not None and key[2] is not None:
+                    self._locations[key] = file_path
+            if linked:
+                log.debug(f"Linked {len(linked)} unchanged fields in {file_path}: {', '.join(linked)}")
+
+    def _can_link(self, target_path: pathlib.Path, file_path: pathlib.Path) -> bool:
+        """Check that a file can be linked to, that is in the same directory and unchanged since it was written"""
+        if target_path.parent != file_path.parent or target_path not in self._file_stats:
+            return False
+        return _file_stat(target_path) == self._file_stats[target_path]
+
+    def _release(self, file_path: pathlib.Path) -> None:
+        """Copy groups that other files link to into the linking files, and forget the file"""
+        for linking_path, field_names in self._linking_files(file_path).items():
+            log.debug(f"Copy {', '.join(sorted(field_names))} from {file_path} to {linking_path}")
+            with h5py.File(file_path, mode="r") as h5_source, h5py.File(linking_path, mode="r+") as h5_target:
+                for field_name in field_names:
+                    del h5_target[field_name]
+                    h5_source.copy(h5_source[field_name], h5_target, name=field_name)
+            for key, location in self._locations.items():
+                if location == file_path and key[0] in field_names:
+                    self._locations[key] = linking_path
+            if linking_path in self._file_stats:
+                self._file_stats[linking_path] = _file_stat(linking_path)
+            _, links = self._link_index[linking_path.parent][linking_path]
+            self._index_links(linking_path, {t: f for t, f in links.items() if t != file_path})
+
+        # Forget locations in the file
+        self._locations = {k: p for k, p in self._locations.items() if p != file_path}
+        self._file_stats.pop(file_path, None)
+
+    def _linking_files(self, file_path: pathlib.Path) -> Dict[pathlib.Path, Set[str]]:
+        """Find dataset files with external links to the given file
+
+        Only files in the same directory are checked, using the link index of the directory.
+
+        Returns:
+            Names of the linked fields for each linking file.
+        """
+        index = self._update_link_index(file_path.parent, file_path.suffix)
+        linking_files = dict()
+        for path, (file_stat, links) in list(index.items()):
+            if file_path not in links:
+                continue
+            if _file_stat(path) != file_stat:  # Changed in place by others, for instance copied links
+                self._index_links(path, _read_links(path))
+                links = index[path][1]
+            if links.get(file_path):
+                linking_files[path] = links[file_path]
+        return linking_files
+
+    def _update_link_index(
+        self, directory: pathlib.Path, suffix: str
+    ) -> Dict[pathlib.Path, Tuple[Any, Dict[pathlib.Path, Set[str]]]]:
+        """Bring the link index of a directory up to date, reading only files that are new or changed
+
+        The directory is only listed when its modification time or size has changed since the index was updated.
+
+        Returns:
+            Link index of the directory, with file stat and linked fields for each target of each file.
+        """
+        index = self._link_index.setdefault(directory, dict())
+        dir_stat = _file_stat(directory)
+        if dir_stat is None or self._dir_stats.get(directory) == dir_stat:
+            return index
+
+        paths = {p for p in directory.glob(f"*{suffix}") if not p.name.startswith(".")}
+        for path in set(index) - paths:
+            del index[path]
+        for path in paths:
+            if path not in index or _file_stat(path) != index[path][0]:
+                self._index_links(path, _read_links(path))
+        self._dir_stats[directory] = dir_stat
+        return index
+
+    def _index_links(self, file_path: pathlib.Path, links: Dict[pathlib.Path, Set[str]]) -> None:
+        """Store the external links of a file, with the current stat of the file, in the link index"""
+        self._link_index.setdefault(file_path.parent, dict())[file_path] = (_file_stat(file_path), links)
+
+
+def _snapshot(dset: "Dataset", write_level: enum.Enum) -> "Dataset":
+    """Copy of the parts of a dataset that are written with the given write level
+
+    Fields with lower write level are not copied. Fields that are referred to by copied fields, like the time of a
+    position, are copied as part of the referring fields.
+    """
+    memo = dict()
+    snapshot = copy.copy(dset)
+    snapshot._fields = {
+        name: copy.deepcopy(field, memo) for name, field in dset._fields.items() if field.write_level >= write_level
+    }
+    snapshot.meta = copy.deepcopy(dset.meta, memo)
+    snapshot.vars = dset.vars.copy()
+    return snapshot
+
+
+def _read_links(file_path: pathlib.Path) -> Dict[pathlib.Path, Set[str]]:
+    """Read the external links of a dataset file
+
+    Returns:
+        Names of the linked fields for each target file, empty if the file can not be read.
+    """
+    try:
+        with h5py.File(file_path, mode="r") as h5_file:
+            links = {name: h5_file.get(name, getlink=True) for name in h5_file}
+    except OSError:
+        log.debug(f"Could not read links of {file_path}")
+        return dict()
+
+    targets = dict()
+    for name, link in links.items():
+        if isinstance(link, h5py.ExternalLink):
+            targets.setdefault((file_path.parent / link.filename).resolve(), set()).add(name)
+    return targets
+
+
+def _file_stat(file_path: pathlib.Path) -> Optional[Tuple[int, int]]:
+    """Modification time and size of a file, None if the file does not exist"""
+    try:
+        file_stat = os.stat(file_path)
+    except OSError:
+        return None
+    return file_stat.st_mtime_ns, file_stat.st_size
+
+
+def _fingerprint(field: Any) -> Optional[str]:
+    """Hash of the content of a dataset field
+
+    Returns:
+        Hexadecimal hash string, or None if the content of the field can not be fingerprinted reliably.
+    """
+    hasher = hashlib.sha256()
+    try:
+        _hash_value(hasher, field, dict())
+    except TypeError:
+        return None
+    return hasher.hexdigest()
+
+
+def _hash_value(hasher: "hashlib._Hash", value: Any, seen: Dict[int, int]) -> None:
+    """Add a value, including nested attributes and references, to a hash
+
+    Args:
+        hasher:  Hash object that is updated.
+        value:   Value to hash.
+        seen:    Objects already hashed, used to represent shared references and avoid infinite recursion.
+
+    Raises:
+        TypeError:  If the value contains objects that can not be hashed reliably.
+    """
+    if isinstance(value, (str, bytes, int, float, complex, bool, type(None), np.generic, enum.Enum)):
+        hasher.update(f"{type(value).__name__}:{value!r}\x1f".encode())
+        return
+
+    if id(value) in seen:
+        hasher.update(f"ref:{seen[id(value)]}\x1f".encode())
+        return
+    seen[id(value)] = len(seen)
+
+    hasher.update(f"{type(value).__module__}.{type(value).__qualname__}\x1f".encode())
+    if isinstance(value, np.ndarray):
+        if value.dtype == object:
+            raise TypeError("Arrays of objects are not supported")
+        hasher.update(f"{value.dtype.str}:{value.shape}\x1f".encode())
+        hasher.update(np.ascontiguousarray(np.asarray(value)).tobytes())
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            _hash_value(hasher, key, seen)
+            _hash_value(hasher, item, seen)
+        return
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        for item in sorted(value, key=repr) if isinstance(value, (set, frozenset)) else value:
+            _hash_value(hasher, item, seen)
+        return
+    elif not hasattr(value, "__dict__"):
+        raise TypeError(f"Values of type {type(value).__name__!r} are not supported")
+
+    for name, attr in sorted(getattr(value, "__dict__", dict()).items()):
+        if name not in _SKIP_ATTRIBUTES:
+            hasher.update(f"{name}=".encode())
+            _hash_value(hasher, attr, seen)
+
+
+# The writer used by Dataset.write
+writer = DatasetWriter()
@@ -13,18 +13,31 @@ like earth orientation parameters.
 from where.data import fieldtypes  # noqa
 
 # Standard library imports
+from collections.abc import MutableMapping
+import copy
 from datetime import date
 import getpass
+import hashlib
 import os
-from typing import Dict, Optional, Union
+import pathlib
+import re
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+# Third party imports
+import h5py
+import numpy as np
 
 # Midgard imports
+from midgard.data import _h5utils
 from midgard.data import dataset as mg_dataset
 from midgard.data.dataset import Dataset as MgDataset
 
 # Where imports
 import where
+from where.data import _dataset_writer
 from where.lib import config
+from where.lib import exceptions
+from where.lib import log
 
 
 class Dataset(MgDataset):
@@ -47,6 +60,7 @@ class Dataset(MgDataset):
         super().__init__(num_obs=num_obs)
         self.vars.update(self._dset_vars(rundate=rundate, pipeline=pipeline, stage=stage, label=label, **dset_args))
         self.analysis = self._analysis_vars(rundate, user, id)  # Dataset variables that will not be stored on file.
+        self._input_fingerprints = dict()  # Fingerprints of inputs to model evaluations, not stored on file.
 
     @classmethod
     def read(
@@ -57,9 +71,21 @@ class Dataset(MgDataset):
         label: Union[str, int],
         user: str = "",
         id: str = "",
+        fields: Optional[Sequence[str]] = None,
+        lazy: bool = False,
         **dset_args: str,
     ) -> "Dataset":
-        """Read a dataset from file"""
+        """Read a dataset from file
+
+        If `fields` is given, only those top-level fields (for instance `time` or `obs`) are read. Fields that they
+        refer to, like the time of a position, are read as part of the referring fields.
+
+        If `lazy` is True, only the dataset variables, meta data and names of the fields are read, and each field is
+        read from file the first time it is accessed. This is useful for inspecting large datasets, where only some of
+        the fields are used. Subsetting, copying or writing the dataset reads all fields. The file must not be
+        changed while fields are still to be read, otherwise reading a field raises DatasetFileChangedError.
+        """
+        _dataset_writer.writer.flush()
 
         dset_vars = cls._dset_vars(rundate=rundate, pipeline=pipeline, stage=stage, label=label, **dset_args)
         analysis_vars = cls._analysis_vars(rundate, user, id)
@@ -82,27 +108,199 @@ class Dataset(MgDataset):
 
         file_path = config.files.path("dataset", file_vars=file_vars)
 
-        dset = super().read(file_path)
+        if lazy:
+            dset = cls._read_lazy(file_path, fields)
+        elif fields is None:
+            dset = super().read(file_path)
+        else:
+            dset = cls._read_fields(file_path, fields)
         dset.vars.update(dset_vars)
         dset.analysis = analysis_vars  # Dataset variables that will not be stored on file.
         return dset
 
-    def delete_stage(self, stage, **kwargs):
+    @classmethod
+    def _read_fields(cls, file_path: pathlib.Path, fields: Sequence[str]) -> "Dataset":
+        """Read the given top-level fields of a dataset file, see `midgard.data.dataset.Dataset.read`"""
+        # Dictionary to keep track of references in the data structure
+        memo = dict()
+        with h5py.File(file_path, mode="r") as h5_file:
+            dset = cls(num_obs=h5_file.attrs["num_obs"])
+            dset.vars.update(_h5utils.decode_h5attr(h5_file.attrs["vars"]))
+
+            file_fields = _h5utils.decode_h5attr(h5_file.attrs["fields"])
+            missing = set(fields) - set(file_fields)
+            if missing:
+                raise ValueError(f"Fields {', '.join(sorted(missing))} not found in {file_path}")
+            for fieldname, fieldtype in file_fields.items():
+                if fieldname not in fields:
+                    continue
+                field = fieldtypes.function(fieldtype).read(h5_file[fieldname], memo)
+                dset._fields[fieldname] = field
+                memo[fieldname] = field.data
+
+            dset.meta.read(h5_file["__meta__"])
+        return dset
+
+    @classmethod
+    def _read_lazy(cls, file_path: pathlib.Path, fields: Optional[Sequence[str]] = None) -> "Dataset":
+        """Open a dataset file without reading the fields, see `read`"""
+        log.debug(f"Open dataset {file_path}")
+        with h5py.File(file_path, mode="r") as h5_file:
+            dset = cls(num_obs=h5_file.attrs["num_obs"])
+            dset.vars.update(_h5utils.decode_h5attr(h5_file.attrs["vars"]))
+
+            file_fields = _h5utils.decode_h5attr(h5_file.attrs["fields"])
+            if fields is not None:
+                missing = set(fields) - set(file_fields)
+                if missing:
+                    raise ValueError(f"Fields {', '.join(sorted(missing))} not found in {file_path}")
+                file_fields = {name: fieldtype for name, fieldtype in file_fields.items() if name in fields}
+            nested_names = {name: _nested_field_names(h5_file[name]) for name in file_fields}
+            linked_paths = _linked_paths(h5_file, file_path, file_fields)
+
+            dset.meta.read(h5_file["__meta__"])
+        dset._fields = _FileFields(file_path, file_fields, nested_names, linked_paths)
+        return dset
+
+    @staticmethod
+    def delete_stage(stage, **kwargs):
+        """Delete the dataset files of a stage"""
+        _dataset_writer.writer.flush()
         file_vars = dict(stage=stage)
         file_vars.update(kwargs)
         file_paths = config.files.glob_paths("dataset", file_vars=file_vars)
         for file_path in file_paths:
+            _dataset_writer.writer.release(file_path)
             os.remove(file_path)
 
+    @staticmethod
+    def flush_writes() -> None:
+        """Wait until all datasets written in the background are stored on file"""
+        _dataset_writer.writer.flush()
+
+    def view(self, idx: Union[np.ndarray, slice]) -> "Dataset":
+        """Lightweight read-only view of some of the observations
+
+        The fields of the view are subset from the fields of this dataset the first time they are accessed, so only
+        the fields that are actually used are copied. If the observations form one contiguous range, the fields are
+        numpy views sharing memory with this dataset. The data of the view are read-only, while new fields can be
+        added to the view without changing this dataset. Fields that are not accessed before this dataset is changed
+        in place will show the change.
+
+        Args:
+            idx:  Boolean index, integer index or slice of the observations in the view.
+
+        Returns:
+            Dataset with the given observations.
+        """
+        obs_idx = np.arange(self.num_obs)[idx]
+        view = self.__class__(num_obs=obs_idx.size)
+        view.vars.update(self.vars)
+        view.analysis = self.analysis.copy()
+        view.meta = copy.deepcopy(self.meta)
+        view._fields = _ViewFields(self._fields, _as_slice(obs_idx))
+        return view
+
+    @property
+    def fields(self) -> List[str]:
+        """Names of fields and nested fields in the dataset, without loading the fields of a view or a lazy read"""
+        if isinstance(self._fields, _LazyFields):
+            return self._fields.field_names()
+        return sorted(_field_names(self._fields))
+
+    def subset(self, idx: np.array) -> None:
+        """Remove observations from all fields based on index
+
+        Model inputs that are unchanged when the observations are removed are recorded again for the remaining
+        observations. The model output is subset together with the inputs, and is therefore still up to date.
+        """
+        unchanged = {k: v[:2] for k, v in self._input_fingerprints.items() if not self.inputs_changed(k)}
+        super().subset(idx)
+        self._input_fingerprints.clear()
+        for key, (field_names, extra) in unchanged.items():
+            self.record_inputs(key, field_names, extra)
+
+    def record_inputs(self, key: str, field_names: Sequence[str], extra: str = "") -> None:
+        """Record the current state of the input fields of a model evaluation
+
+        Fields with the suffixes used for stations (for instance `site_pos_1` and `site_pos_2` for `site_pos`) and all
+        fields in a collection are included.
+
+        Args:
+            key:          Identifier of the model evaluation.
+            field_names:  Names of input fields.
+            extra:        Other input that the evaluation depends on, for instance a representation of arguments.
+        """
+        fingerprint = self._fingerprint(field_names, extra)
+        if fingerprint is None:
+            self._input_fingerprints.pop(key, None)
+        else:
+            self._input_fingerprints[key] = (tuple(field_names), extra, fingerprint)
+
+    def inputs_changed(
+        self, key: str, field_names: Optional[Sequence[str]] = None, extra: Optional[str] = None
+    ) -> bool:
+        """Check if the input fields of a model evaluation have changed since they were recorded
+
+        Args:
+            key:          Identifier of the model evaluation.
+            field_names:  Names of input fields, default is the recorded names.
+            extra:        Other input that the evaluation depends on, default is the recorded value.
+
+        Returns:
+            True if the inputs have changed or were never recorded, False otherwise.
+        """
+        if key not in self._input_fingerprints:
+            return True
+        recorded_names, recorded_extra, fingerprint = self._input_fingerprints[key]
+        if field_names is not None and tuple(field_names) != recorded_names:
+            return True
+        if extra is not None and extra != recorded_extra:
+            return True
+        return self._fingerprint(recorded_names, recorded_extra) != fingerprint
+
+    def _fingerprint(self, field_names: Sequence[str], extra: str) -> Optional[str]:
+        """Hash of the content of fields
+
+        Returns:
+            Hexadecimal hash string, or None if the fields can not be fingerprinted reliably.
+        """
+        hasher = hashlib.sha256(f"{self.num_obs}\x1f{extra}".encode())
+        all_fields = self.fields
+        for name in field_names:
+            pattern = re.compile(rf"{re.escape(name)}(_\d+)?(\..+)?")
+            matching_fields = sorted(f for f in all_fields if pattern.fullmatch(f))
+            hasher.update(f"\x1e{name}:{','.join(matching_fields)}".encode())
+            for field_name in matching_fields:
+                data = self[field_name]
+                if hasattr(data, "jd1") and hasattr(data, "jd2"):  # Time arrays
+                    arrays = [data.jd1, data.jd2]
+                    hasher.update(str(data.scale).encode())
+                elif isinstance(data, np.ndarray) and data.dtype != object:
+                    arrays = [data]
+                    hasher.update(f"{type(data).__name__}:{getattr(data, 'system', '')}".encode())
+                else:
+                    return None
+                for array in arrays:
+                    hasher.update(np.ascontiguousarray(np.asarray(array)).tobytes())
+        return hasher.hexdigest()
+
     def write(self, write_level: str = None) -> None:
-        """Write a dataset to file"""
+        """Write a dataset to file
+
+        The dataset is written in the background, and fields that are unchanged since an earlier write are stored as
+        links to the earlier file, see :mod:`where.data._dataset_writer`. Fields that are not loaded yet are loaded
+        first, since the dataset may be written to the file they are loaded from.
+        """
+        if isinstance(self._fields, _LazyFields):
+            self._fields.load_all()
         file_vars = self.vars.copy()
         for k, v in self.analysis.items():
             if k not in file_vars:
                 file_vars[k] = v
         file_path = config.files.path("dataset", file_vars=file_vars)
         write_level = config.tech.write_level.str if write_level is None else write_level
-        super().write(file_path, write_level=write_level)
+        _dataset_writer.writer.submit(self, file_path, write_level=write_level)
 
     def write_as(
         self,
@@ -143,5 +341,218 @@ class Dataset(MgDataset):
         return analysis_vars
 
 
+class _LazyFields(MutableMapping):
+    """Fields of a dataset that are loaded the first time they are accessed
+
+    Subclasses implement `_load` to create a field, and `_nested_names` to list the nested fields of a collection
+    before it is loaded. Iterating over the names of the fields does not load them, while iterating over the fields
+    themselves, as when subsetting or writing the dataset, loads all of them.
+    """
+
+    def __init__(self, names: Sequence[str]) -> None:
+        self._fields = dict.fromkeys(names)
+        self._pending = set(self._fields)
+
+    def _load(self, name: str) -> "FieldType":
+        """Create a field that has not been loaded yet"""
+        raise NotImplementedError
+
+    def _nested_names(self, name: str) -> List[str]:
+        """Names of the nested fields of a field that has not been loaded yet"""
+        raise NotImplementedError
+
+    def is_loaded(self, name: str) -> bool:
+        """Check if a field has been loaded"""
+        return name in self._fields and name not in self._pending
+
+    def load_all(self) -> None:
+        """Load all fields that have not been loaded yet"""
+        for name in list(self._fields):
+            self[name]
+
+    def nested_names(self, name: str) -> List[str]:
+        """Names of the nested fields of a field, without loading the field"""
+        if name in self._pending:
+            return self._nested_names(name)
+        return _nested_names(self._fields[name])
+
+    def field_names(self) -> List[str]:
+        """Names of fields and nested fields, without loading the fields"""
+        all_fields = list()
+        for name in self._fields:
+            all_fields.append(name)
+            all_fields.extend(f"{name}.{f}" for f in self.nested_names(name))
+        return sorted(all_fields)
+
+    def __getitem__(self, name: str) -> "FieldType":
+        if name in self._pending:
+            self._fields[name] = self._load(name)
+            self._pending.remove(name)
+        return self._fields[name]
+
+    def __setitem__(self, name: str, field: "FieldType") -> None:
+        self._pending.discard(name)
+        self._fields[name] = field
+
+    def __delitem__(self, name: str) -> None:
+        self._pending.discard(name)
+        del self._fields[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._fields
+
+    def __iter__(self):
+        return iter(self._fields)
+
+    def __len__(self) -> int:
+        return len(self._fields)
+
+
+class _ViewFields(_LazyFields):
+    """Fields of a dataset view, subset from the fields of the viewed dataset when first accessed
+
+    The fields of the viewed dataset are shallow copied when the view is created, so that later subsets of the viewed
+    dataset do not affect the view. Fields of the viewed dataset that are not loaded yet, for instance when viewing a
+    view, are loaded in the viewed dataset when they are first accessed in the view. All fields share one memo, so
+    that references between fields, like the time of a position, are kept in the view.
+    """
+
+    def __init__(self, fields: Dict[str, "FieldType"], idx: Union[np.ndarray, slice]) -> None:
+        super().__init__(fields)
+        self._parent = fields if isinstance(fields, _LazyFields) else None
+        self._sources = {
+            name: _shallow_copy(fields[name]) if self._parent is None or self._parent.is_loaded(name) else None
+            for name in self._fields
+        }
+        self._idx = idx
+        self._memo = dict()
+
+    def _load(self, name: str) -> "FieldType":
+        """Subset a field of the viewed dataset"""
+        source = self._sources.pop(name)
+        field = _shallow_copy(self._parent[name]) if source is None else source
+        field.subset(self._idx, self._memo)
+        _set_read_only(field)
+        return field
+
+    def _nested_names(self, name: str) -> List[str]:
+        """Names of the nested fields of a field of the viewed dataset"""
+        source = self._sources[name]
+        return self._parent.nested_names(name) if source is None else _nested_names(source)
+
+
+class _FileFields(_LazyFields):
+    """Fields of a dataset file, read from the file when first accessed
+
+    All fields share one memo, so that references between fields, like the time of a position, are kept as when
+    reading the whole file. The file, and the files that fields are linked to, must not change while fields are still
+    to be read.
+    """
+
+    def __init__(
+        self,
+        file_path: pathlib.Path,
+        file_fields: Dict[str, str],
+        nested_names: Dict[str, List[str]],
+        linked_paths: Sequence[pathlib.Path] = (),
+    ) -> None:
+        super().__init__(file_fields)
+        self._file_path = file_path
+        self._file_fields = file_fields
+        self._nested = nested_names
+        self._memo = dict()
+        self._file_stats = {path: _file_stat(path) for path in [file_path, *linked_paths]}
+
+    def _load(self, name: str) -> "FieldType":
+        """Read a field from the dataset file"""
+        _dataset_writer.writer.flush()
+        for path, file_stat in self._file_stats.items():
+            if _file_stat(path) != file_stat:
+                raise exceptions.DatasetFileChangedError(
+                    f"Can not read field {name!r} from {self._file_path}, {path} has changed"
+                )
+
+        log.debug(f"Read field {name!r} from {self._file_path}")
+        with h5py.File(self._file_path, mode="r") as h5_file:
+            field = fieldtypes.function(self._file_fields[name]).read(h5_file[name], self._memo)
+        self._memo[name] = field.data
+        return field
+
+    def _nested_names(self, name: str) -> List[str]:
+        """Names of the nested fields of a field on file"""
+        return self._nested[name]
+
+
+def _shallow_copy(field: "FieldType") -> "FieldType":
+    """Copy a field without copying its data, collections are copied recursively"""
+    field = field.copy()
+    if field.fieldtype == "collection":
+        field.data = copy.copy(field.data)
+        field.data._fields = {name: _shallow_copy(f) for name, f in field.data._fields.items()}
+    return field
+
+
+def _field_names(fields: Dict[str, "FieldType"]) -> List[str]:
+    """Names of fields and nested fields"""
+    all_fields = list()
+    for fieldname, field in fields.items():
+        all_fields.append(fieldname)
+        all_fields.extend([f"{fieldname}.{f}" for f in _nested_names(field)])
+    return all_fields
+
+
+def _nested_names(field: "FieldType") -> List[str]:
+    """Names of the nested fields of a field, empty for fields that are not collections"""
+    try:
+        return field.fields
+    except AttributeError:
+        return []
+
+
+def _nested_field_names(h5_group: h5py.Group) -> List[str]:
+    """Names of nested fields in a collection on file, in the same format as `Collection.fields`"""
+    if "fields" not in h5_group.attrs:
+        return []
+    all_fields = list()
+    for fieldname in _h5utils.decode_h5attr(h5_group.attrs["fields"]):
+        all_fields.append(fieldname)
+        all_fields.extend([f"{fieldname}.{f}" for f in _nested_field_names(h5_group[fieldname])])
+    return sorted(all_fields)
+
+
+def _linked_paths(h5_file: h5py.File, file_path: pathlib.Path, fieldnames: Sequence[str]) -> List[pathlib.Path]:
+    """Files that fields are stored in as external links, see :mod:`where.data._dataset_writer`"""
+    linked_paths = set()
+    for fieldname in fieldnames:
+        link = h5_file.get(fieldname, getlink=True)
+        if isinstance(link, h5py.ExternalLink):
+            linked_paths.add(file_path.parent / link.filename)
+    return sorted(linked_paths)
+
+
+def _file_stat(file_path: pathlib.Path) -> Tuple[int, int]:
+    """Modification time and size of a file, used to detect that the file has changed"""
+    stat = os.stat(file_path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _set_read_only(field: "FieldType") -> None:
+    """Make the data of a field, and of all fields in a collection, read-only"""
+    if field.fieldtype == "collection":
+        for subfield in field.data._fields.values():
+            _set_read_only(subfield)
+    elif isinstance(field.data, np.ndarray):
+        field.data.flags.writeable = False
+
+
+def _as_slice(obs_idx: np.ndarray) -> Union[np.ndarray, slice]:
+    """Use a slice for a contiguous range of observations, so that subsets of numpy arrays are views"""
+    if obs_idx.size == 0:
+        return slice(0, 0)
+    if np.all(np.diff(obs_idx) == 1):
+        return slice(int(obs_idx[0]), int(obs_idx[-1]) + 1)
+    return obs_idx
+
+
 for field_type in fieldtypes.names():
     setattr(Dataset, f"add_{field_type}", mg_dataset._add_field_factory(field_type))
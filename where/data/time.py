@@ -1,9 +1,15 @@
 """Time data
 
-Extends the Midgard time classes with additional time scales
+Extends the Midgard time classes with additional time scales, and with functions formatting whole time arrays as
+strings. The formatting functions work on the Julian days of the array instead of creating one scalar Time object for
+each epoch, and should be used when writing text columns, for instance::
+
+    dset.add_text("date", val=time.strftime(dset.time, "%Y/%m/%d %H:%M:%S"))
+    dset.add_text("time_gpsweek", val=time.gps_ws_str(dset.time))
 
 """
 # Standard library imports
+import re
 from typing import Any, Callable, Dict, List, Tuple, TypeVar
 
 # Third party imports
@@ -17,7 +23,7 @@ from midgard.math.unit import Unit
 
 # Where imports
 from where import apriori
-from where.ext import iers_2010 as iers
+from where.ext import iers_2010_wrapper as iers_wrapper
 from where.ext import sofa_wrapper as sofa
 
 # Type specification: scalar float or numpy array
@@ -57,20 +63,12 @@ def delta_tdb_tcb(time: "TimeArray") -> "np_float":
 
 
 def delta_tcb_tcg(time: "TimeArray") -> "np_float":
-    # See Note 1) in hf2002_iers for time scales explanation
+    # See Note 1) in hf2002_iers for time scales explanation. The wrapper caches the values for each time array
     if time.scale == "tcb":
-        if time.size == 1:
-            tcb_tcg = iers.hf2002_iers(time.tdb.jd)
-        else:
-            tcb_tcg = np.array([iers.hf2002_iers(t) for t in time.tdb.jd])
-        return -tcb_tcg * Unit.second2day
+        return -iers_wrapper.hf2002_iers(time.tdb) * Unit.second2day
     else:
         # time scale is tcg
-        if time.size == 1:
-            tcb_tcg = iers.hf2002_iers(time.tt.jd)
-        else:
-            tcb_tcg = np.array([iers.hf2002_iers(t) for t in time.tt.jd])
-        return tcb_tcg * Unit.second2day
+        return iers_wrapper.hf2002_iers(time.tt) * Unit.second2day
 
 
 #
@@ -158,6 +156,154 @@ class TdbTimeDelta(mg_time.TimeDeltaArray):
 
     scale = "tdb"
 
+
+######################################################################################################################
+# Vectorized string formatting
+######################################################################################################################
+
+# Julian day of the numpy datetime64 epoch 1970-01-01
+_JD_UNIX_EPOCH = 2_440_587.5
+
+# Width of zero padded fields for the format directives supported by strftime
+_DIRECTIVE_WIDTHS = dict(Y=4, y=2, m=2, d=2, j=3, H=2, M=2, S=2, f=6)
+
+
+def to_datetime64(time: "TimeArray") -> np.ndarray:
+    """Convert a time array to numpy datetime64 with microsecond resolution
+
+    Like the datetime format, the time is not converted to another time scale.
+
+    Args:
+        time:  Time array (or scalar Time).
+
+    Returns:
+        Array of datetime64[us] with the same shape as time.
+    """
+    days = np.asarray(time.jd1 - _JD_UNIX_EPOCH, dtype=float)
+    usec = np.round(days * Unit.day2microsecond + np.asarray(time.jd2) * Unit.day2microsecond)
+    return usec.astype(np.int64).astype("datetime64[us]")
+
+
+def _date_components(time: "TimeArray") -> Dict[str, np.ndarray]:
+    """Integer calendar components of a time array, keyed by strftime directive"""
+    dt = np.atleast_1d(to_datetime64(time))
+    days = dt.astype("datetime64[D]")
+    years = days.astype("datetime64[Y]")
+    months = days.astype("datetime64[M]")
+    usec_of_day = (dt - days).astype(np.int64)
+    sec_of_day = usec_of_day // 1_000_000
+    year = years.astype(np.int64) + 1970
+    return dict(
+        Y=year,
+        y=year % 100,
+        m=months.astype(np.int64) % 12 + 1,
+        d=(days - months).astype(np.int64) + 1,
+        j=(days - years).astype(np.int64) + 1,
+        H=sec_of_day // 3600,
+        M=sec_of_day // 60 % 60,
+        S=sec_of_day % 60,
+        f=usec_of_day % 1_000_000,
+        s=sec_of_day,
+    )
+
+
+def _compose(parts: List[Any], shape: Tuple[int, ...]) -> np.ndarray:
+    """Compose fixed width strings from literal strings and (integers, width) tuples
+
+    The characters are written into a byte matrix with one row per element, so that no Python code runs per element.
+    """
+    width = sum(len(p) if isinstance(p, str) else p[1] for p in parts)
+    chars = np.empty(shape + (width,), dtype=np.uint8)
+    col = 0
+    for part in parts:
+        if isinstance(part, str):
+            chars[..., col : col + len(part)] = np.frombuffer(part.encode("ascii"), dtype=np.uint8)
+            col += len(part)
+            continue
+
+        values, num_digits = part
+        values = np.asarray(values, dtype=np.int64)
+        for digit in range(num_digits):
+            chars[..., col + num_digits - 1 - digit] = values // 10 ** digit % 10 + ord("0")
+        col += num_digits
+
+    return chars.view(f"S{max(width, 1)}")[..., 0].astype(str) if width else np.full(shape, "")
+
+
+def _as_input(time: "TimeArray", strings: np.ndarray) -> Any:
+    """Return a single string for scalar times, and an array otherwise"""
+    return strings[0] if np.ndim(time.jd1) == 0 else strings
+
+
+def strftime(time: "TimeArray", fmt: str) -> Any:
+    """Format a time array as strings
+
+    Works like datetime.strftime applied to each element of `time.datetime`, but only the zero padded numeric
+    directives %Y, %y, %m, %d, %j, %H, %M, %S and %f, as well as %%, are supported. Fractional seconds are truncated.
+
+    Args:
+        time:  Time array (or scalar Time).
+        fmt:   Format string, for instance "%Y/%m/%d %H:%M:%S".
+
+    Returns:
+        Array of strings, or a string if time is a scalar.
+    """
+    components = _date_components(time)
+    parts = list()
+    for token in re.split(r"(%.)", fmt):
+        if not token.startswith("%"):
+            parts.append(token)
+        elif token == "%%":
+            parts.append("%")
+        elif token[1:] in _DIRECTIVE_WIDTHS:
+            parts.append((components[token[1:]], _DIRECTIVE_WIDTHS[token[1:]]))
+        else:
+            raise ValueError(f"Format directive {token!r} is not supported. Use one of {', '.join(_DIRECTIVE_WIDTHS)}")
+
+    return _as_input(time, _compose(parts, components["Y"].shape))
+
+
+def isot_str(time: "TimeArray") -> Any:
+    """Format a time array as ISO 8601 strings with whole seconds, YYYY-MM-DDTHH:MM:SS
+
+    Args:
+        time:  Time array (or scalar Time).
+
+    Returns:
+        Array of strings, or a string if time is a scalar.
+    """
+    return strftime(time, "%Y-%m-%dT%H:%M:%S")
+
+
+def yydddsssss_str(time: "TimeArray") -> Any:
+    """Format a time array as 2-digit year, day of year and second of day, YY:DDD:SSSSS, like SINEX epochs
+
+    Args:
+        time:  Time array (or scalar Time).
+
+    Returns:
+        Array of strings, or a string if time is a scalar.
+    """
+    c = _date_components(time)
+    return _as_input(time, _compose([(c["y"], 2), ":", (c["j"], 3), ":", (c["s"], 5)], c["Y"].shape))
+
+
+def gps_ws_str(time: "TimeArray") -> Any:
+    """Format a time array as GPS week, day of week and second of week, WWWWD:SSSSSS
+
+    The time is converted to GPS time scale, and the second of week is rounded to whole seconds.
+
+    Args:
+        time:  Time array (or scalar Time).
+
+    Returns:
+        Array of strings, or a string if time is a scalar.
+    """
+    gps_ws = time.gps.gps_ws
+    week, day, seconds = (np.atleast_1d(v) for v in (gps_ws.week, gps_ws.day, gps_ws.seconds))
+    return _as_input(time, _compose([(week, 4), (day, 1), ":", (np.rint(seconds), 6)], week.shape))
+
+
 # Define shorthands for available formats, scales and conversions
 Time.FORMATS = list(mg_time.TimeArray._formats().keys())
 TimeDelta.FORMATS = list(mg_time.TimeDeltaArray._formats().keys())
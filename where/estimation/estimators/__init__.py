@@ -19,6 +19,10 @@ derivatives it should obtain them by itself calling the :func:`where.estimation.
     from where import estimation
     partial_vectors = estimation.partial_vectors(dset, 'estimate', 'estimate_stochastic')
 
+Estimators may support updating a previous solution after observations have been removed, instead of estimating from
+scratch. Such estimators take the previous solution and a boolean index of the kept observations as the additional
+arguments `previous` and `keep_idx`, see for instance :func:`where.estimation.estimators.cpwl.estimate_cpwl`.
+
 """
 # Third party imports
 import numpy as np
@@ -31,9 +35,10 @@ from midgard.math.unit import Unit
 from where import apriori
 from where.lib import config
 from where.lib import log
+from where.lib import telemetry
 
 
-def call(config_key, dset, partial_vectors, obs_noise):
+def call(config_key, dset, partial_vectors, obs_noise, **estimator_args):
     """Call an estimator
 
     Args:
@@ -41,16 +46,22 @@ def call(config_key, dset, partial_vectors, obs_noise):
         dset (Dataset):          Model run data.
         partial_vectors (Dict):  Names and values of the partial derivatives for each partial config key.
         obs_noise (Array):       Observation noise, numpy array with one float value for each observation.
+        estimator_args:          Additional arguments to the estimator, see the individual estimators.
+
+    Returns:
+        The return value of the estimator, typically the estimator object or None.
     """
     estimator_name = config.tech[config_key].str
     if estimator_name:
-        plugins.call(
-            package_name=__name__,
-            plugin_name=estimator_name,
-            dset=dset,
-            partial_vectors=partial_vectors,
-            obs_noise=obs_noise,
-        )
+        with telemetry.measure("estimator", estimator_name, dset=dset):
+            return plugins.call(
+                package_name=__name__,
+                plugin_name=estimator_name,
+                dset=dset,
+                partial_vectors=partial_vectors,
+                obs_noise=obs_noise,
+                **estimator_args,
+            )
 
 
 def partial_config_keys(estimator_config_key):
@@ -7,6 +7,10 @@ Kalman filter and the modified Bryson-Frazier smoother is covered in the book "F
 Sequential Estimation" by Bierman :cite:`bierman2006`. However, there are some typos but a corrected version of the
 algorithm is listed in :cite:`gibbs2011`.
 
+The partial derivatives are stored as (index, value) pairs for each observation, see
+:class:`~where.estimation.parameters.SparsePartials`. Each update of the filter and the smoother only touches the rows
+and columns of the covariance matrix that are coupled to the parameters observed by that observation, so the work per
+observation scales with the number of non-zeros instead of with n squared.
 """
 
 # External library imports
@@ -20,6 +24,7 @@ import os
 from midgard.math.unit import Unit
 
 # Where imports
+from where.estimation.parameters import SparsePartials
 from where.lib import log
 from where.lib import config
 
@@ -33,7 +38,7 @@ class KalmanFilter(object):
 
     Notation:
 
-    h:                 Partial derivatives                                          # num_obs x n x 1
+    h:                 Partial derivatives (SparsePartials)                         # num_obs x n x 1
     x:                 Predicted state estimate (x-tilde)                           # num_obs x n x 1
     x_hat:             Updated state estimate (x-hat)                               # num_obs x n x 1
     sigma:             Residual covariance                                          # num_obs
@@ -54,14 +59,14 @@ class KalmanFilter(object):
         """Initialize the Kalman filter
 
         Args:
-            h (Numpy array):               Partial derivatives          (num_obs x n x 1)
+            h (SparsePartials):            Partial derivatives, dense arrays are converted (num_obs x n x 1)
             z (Numpy array):               Observations                 (num_obs)
             apriori_stdev (Numpy array):   Apriori standard deviation   (n)
             phi (Numpy array):             State transition             (num_obs x n x n)
             r (Numpy array):               Observation noise covariance (num_obs)
             Q (Numpy array):               Process noise covariance     (num_obs x n x n)
         """
-        self.h = h
+        self.h = h if isinstance(h, SparsePartials) else SparsePartials.from_dense(h)
         self.num_obs, self.n, _ = self.h.shape
         self.apriori_stdev = np.ones(self.n) if apriori_stdev is None else apriori_stdev
 
@@ -75,51 +80,57 @@ class KalmanFilter(object):
         self.param_names = param_names if param_names else []
         self.innovation = np.zeros(self.num_obs)
         self.sigma = np.zeros(self.num_obs)
+        self.k = np.zeros((self.num_obs, self.n, 1))
+        self._init_covariance_file()
 
+    def _init_covariance_file(self):
+        """Create the file storing the updated covariance matrix of each epoch"""
         self.p_hat_file_path = config.files.path("output_covariance_matrix")
         self.p_hat_file = h5py.File(self.p_hat_file_path, "w")
         self.p_hat_file.attrs["labels"] = ", ".join(self.param_names)
         self.p_hat_file.close()
 
-    def filter(self):
+    def filter(self, start_epoch=0):
         """Run the Kalman filter forward and backward
+
+        Args:
+            start_epoch (Int):  First epoch of the forward filter. Results for earlier epochs are kept from a previous
+                                run, see :meth:`refilter`.
         """
         # Initialize
-        x_tilde = np.zeros((self.n, 1))
-        p_tilde = np.diag(self.apriori_stdev ** 2)
-        k = np.zeros((self.num_obs, self.n, 1))
+        if start_epoch == 0:
+            x_tilde = np.zeros((self.n, 1))
+            p_tilde = np.diag(self.apriori_stdev ** 2)
+        else:
+            p_hat = self._get_p_hat(start_epoch - 1)
+            x_tilde, p_tilde = self._predict(start_epoch - 1, self.x_hat[start_epoch - 1], p_hat)
         lam = np.zeros((self.n, 1))
 
         # Makes calculations easier to read (and gives a slight speed-up)
-        h = self.h
+        h_row = self.h.row
         z = self.z
         phi = self.phi
         r = self.r
-        Q = self.Q
+        k = self.k
         x_hat = self.x_hat
         x_smooth = self.x_smooth
-        I = np.eye(self.n)
         innovation = self.innovation
         sigma = self.sigma
 
         # Run filter forward over all observations
-        for epoch in range(self.num_obs):
-            innovation[epoch] = z[epoch] - h[epoch].T @ x_tilde
-            sigma[epoch] = (h[epoch].T @ p_tilde @ h[epoch]) + r[epoch]
-            k[epoch] = p_tilde @ h[epoch] / sigma[epoch]
+        for epoch in range(start_epoch, self.num_obs):
+            idx, val = h_row(epoch)
+            ph = p_tilde[:, idx] @ val
+            innovation[epoch] = z[epoch] - val @ x_tilde[idx, 0]
+            sigma[epoch] = val @ ph[idx] + r[epoch]
+            k[epoch, :, 0] = ph / sigma[epoch]
             x_hat[epoch] = x_tilde + k[epoch] * innovation[epoch]
-            p_hat = (I - k[epoch] @ h[epoch].T) @ p_tilde
-
-            if isinstance(phi[epoch], int):
-                # phi is identity matrix. Save computation time by skipping multiplication with identity matrix
-                x_tilde = x_hat[epoch]
-                p_tilde = p_hat
-            else:
-                x_tilde = phi[epoch] @ x_hat[epoch]
-                p_tilde = phi[epoch] @ p_hat @ phi[epoch].T
 
-            for (idx1, idx2), noise in Q.get(epoch, {}).items():
-                p_tilde[idx1, idx2] += noise
+            # p_hat = (I - k h^T) p_tilde only changes the rows and columns coupled to the observed parameters
+            touched = np.flatnonzero(ph)
+            p_hat = p_tilde
+            p_hat[np.ix_(touched, touched)] -= np.outer(k[epoch, touched, 0], ph[touched])
+            x_tilde, p_tilde = self._predict(epoch, x_hat[epoch], p_hat)
 
             self._set_p_hat(epoch, p_hat)
             self.x_hat_ferr[epoch, :] = np.sqrt(np.diagonal(p_hat))
@@ -129,17 +140,57 @@ class KalmanFilter(object):
             # TODO smooth covariance matrix
             p_hat = self._get_p_hat(epoch)
             x_smooth[epoch] = x_hat[epoch] + p_hat.T @ lam
-            if isinstance(phi[epoch - 1], int):
-                # phi is identity matrix. Remove it from equation to speed up computation
-                lam = (
-                    h[epoch] * innovation[epoch] / sigma[epoch]
-                    + (I - k[epoch] @ h[epoch].T).T @ lam
-                )
-            else:
-                lam = (
-                    phi[epoch - 1].T @ h[epoch] * innovation[epoch] / sigma[epoch]
-                    + phi[epoch - 1].T @ (I - k[epoch] @ h[epoch].T).T @ lam
-                )
+
+            # lam = phi^T (h innovation / sigma + (I - k h^T)^T lam), where h is non-zero only at the indices
+            idx, val = h_row(epoch)
+            np.add.at(lam[:, 0], idx, val * (innovation[epoch] / sigma[epoch] - k[epoch, :, 0] @ lam[:, 0]))
+            if not isinstance(phi[epoch - 1], int):
+                # phi is identity matrix if it is an int. Skip the multiplication to speed up computation
+                lam = phi[epoch - 1].T @ lam
+
+    def refilter(self, keep_idx, h, z=None, phi=None, r=None, Q=None):
+        """Update the filter results after observations have been removed
+
+        The filter results before the first removed observation do not depend on the removed observations, and are
+        kept. The filter is rerun forward from the first removed observation, followed by a full smoothing. The
+        inputs must be the same as for a new filter on the remaining observations, only the observations before the
+        first removed one are assumed to be unchanged.
+
+        Args:
+            keep_idx (Numpy array):  Boolean index of observations that are kept (num_obs_old).
+            h (SparsePartials):      Partial derivatives          (num_obs x n x 1)
+            z (Numpy array):         Observations                 (num_obs)
+            phi (Numpy array):       State transition             (num_obs x n x n)
+            r (Numpy array):         Observation noise covariance (num_obs)
+            Q (Numpy array):         Process noise covariance     (num_obs x n x n)
+        """
+        num_obs_old = self.num_obs
+        keep_idx = np.concatenate((keep_idx, np.ones(num_obs_old - len(keep_idx), dtype=bool)))
+        start_epoch = int(np.argmin(keep_idx)) if not keep_idx.all() else num_obs_old
+
+        self.h = h if isinstance(h, SparsePartials) else SparsePartials.from_dense(h)
+        self.num_obs = self.h.shape[0]
+        self.z = np.zeros((self.num_obs)) if z is None else z
+        self.phi = np.eye(self.n).repeat(self.num_obs).reshape(self.n, self.n, -1).T if phi is None else phi
+        self.r = np.ones((self.num_obs)) if r is None else r
+        self.Q = dict() if Q is None else Q
+
+        # Keep results before the first removed observation
+        def _resize(values):
+            return np.concatenate((values[:start_epoch], np.zeros((self.num_obs - start_epoch,) + values.shape[1:])))
+
+        self.x_hat = _resize(self.x_hat)
+        self.x_hat_ferr = _resize(self.x_hat_ferr)
+        self.k = _resize(self.k)
+        self.innovation = _resize(self.innovation)
+        self.sigma = _resize(self.sigma)
+        self.x_smooth = np.zeros((self.num_obs, self.n, 1))
+        with h5py.File(self.p_hat_file_path, "a") as fid:
+            for epoch in range(start_epoch, num_obs_old):
+                del fid[str(epoch)]
+
+        log.info(f"Refiltering {self.num_obs - start_epoch} of {self.num_obs} observations")
+        self.filter(start_epoch=start_epoch)
 
     def update_dataset(self, dset, param_names, normal_idx, num_unknowns):
         """Update the given dataset with results from the filtering
@@ -256,10 +307,10 @@ class KalmanFilter(object):
 
             # Estimate vectors
             fieldname = f"estimate.{param_name}"
-            value = self.h[: dset.num_obs, idx, 0] * self.x_smooth[: dset.num_obs, idx, 0]
+            value = self.h.column(idx)[: dset.num_obs] * self.x_smooth[: dset.num_obs, idx, 0]
             dset.add_float(fieldname, val=value, unit="meter", write_level="analysis")
 
-        value = (self.x_smooth.transpose(0, 2, 1) @ self.h)[: dset.num_obs, 0, 0]
+        value = self.h.dot(self.x_smooth)[: dset.num_obs]
         fieldname = "est"
         if fieldname in dset.fields:
             dset[fieldname][:] = value
@@ -292,12 +343,12 @@ class KalmanFilter(object):
         if False:
             stat_idx = slice(normal_idx.stop, self.n, None)
             R = np.diag(self.r[: last_obs + 1])
-            H_L = self.h[: last_obs + 1, stat_idx, 0]
+            H_L = self.h.toarray()[: last_obs + 1, stat_idx, 0]
             c_L = p_tilde_0[stat_idx, stat_idx]
             R_tilde = H_L @ c_L @ H_L.T + R
             R_tilde_inv = np.linalg.inv(R_tilde)
 
-            H_g = self.h[: last_obs + 1, normal_idx, 0]
+            H_g = self.h.toarray()[: last_obs + 1, normal_idx, 0]
 
             NN = H_g.T @ R_tilde_inv @ H_g
             bb = H_g.T @ R_tilde_inv @ self.z[: last_obs + 1]
@@ -308,6 +359,31 @@ class KalmanFilter(object):
         # end test
         return N, b
 
+    def _predict(self, epoch, x_hat, p_hat):
+        """Predict state and covariance at the next epoch
+
+        Args:
+            epoch (Int):           Epoch of the updated state.
+            x_hat (Numpy array):   Updated state estimate (n x 1).
+            p_hat (Numpy array):   Updated estimate covariance (n x n).
+
+        Returns:
+            Tuple of Numpy arrays: Predicted state estimate (n x 1) and predicted estimate covariance (n x n).
+        """
+        phi = self.phi[epoch]
+        if isinstance(phi, int):
+            # phi is identity matrix. Save computation time by skipping multiplication with identity matrix
+            x_tilde = x_hat
+            p_tilde = p_hat.copy()
+        else:
+            x_tilde = phi @ x_hat
+            p_tilde = phi @ p_hat @ phi.T
+
+        for (idx1, idx2), noise in self.Q.get(epoch, {}).items():
+            p_tilde[idx1, idx2] += noise
+
+        return x_tilde, p_tilde
+
     def _set_p_hat(self, epoch, data):
         with h5py.File(self.p_hat_file_path, "a") as fid:
             fid.create_dataset(str(epoch), data=data)
@@ -29,6 +29,7 @@ class LsqEstimator(object):
     sigma0:            Estimated standard deviation of unit weight      # 1
     sigmax:            Standard deviation of the unknowns               # num_unknowns x 1
     N:                 Normal equation                                  # num_unknowns x num_unknowns
+    b:                 Right hand side of normal equation               # num_unknowns x 1
     Qx:                Cofactor matrix of the unknowns                  # num_unknowns x num_unknowns
     Cx:                Covariance matrix of the unknowns                # num_unknowns x num_unknowns
     Ql:                Cofactor matrix of the estimated observations    # num_obs x num_obs
@@ -70,6 +71,7 @@ class LsqEstimator(object):
         self.dx = np.zeros((self.num_unknowns))
         self.x_hat = np.zeros((self.num_unknowns))
         self.N = np.zeros((self.num_unknowns, self.num_unknowns))
+        self.b = np.zeros((self.num_unknowns))
         self.Cx = np.zeros((self.num_unknowns, self.num_unknowns))
         self.Qx = np.zeros((self.num_unknowns, self.num_unknowns))
         self.v = np.zeros((self.num_obs))
@@ -83,13 +85,61 @@ class LsqEstimator(object):
         H = self.H
         z = self.z
         W = self.W
+
+        # Normal equations
+        self.N = H.T @ W @ H
+        self.b = H.T @ W @ z
+        self._solve()
+
+    def remove_observations(self, keep_idx: np.ndarray) -> None:
+        """Update the solution after observations have been removed
+
+        The contribution of the removed observations is subtracted from the normal equations (downdating), instead of
+        forming the normal equations from scratch. If the removed observations are correlated with the kept
+        observations, the normal equations are formed from scratch.
+
+        Args:
+            keep_idx:  Boolean index of observations that are kept  (num_obs)
+        """
+        remove_idx = np.logical_not(keep_idx)
+        if np.any(self.W[np.ix_(keep_idx, remove_idx)]):
+            log.debug("Removed observations are correlated with kept observations. Forming new normal equations.")
+            self.H, self.z, self.W = self.H[keep_idx], self.z[keep_idx], self.W[np.ix_(keep_idx, keep_idx)]
+            self.num_obs = self.H.shape[0]
+            self.degree_of_freedom = self.num_obs - self.num_unknowns
+            self.estimate()
+            return
+
+        # Downdate normal equations
+        H_rem = self.H[remove_idx]
+        W_rem = self.W[np.ix_(remove_idx, remove_idx)]
+        self.N = self.N - H_rem.T @ W_rem @ H_rem
+        self.b = self.b - H_rem.T @ W_rem @ self.z[remove_idx]
+
+        self.H, self.z, self.W = self.H[keep_idx], self.z[keep_idx], self.W[np.ix_(keep_idx, keep_idx)]
+        self.num_obs = self.H.shape[0]
+        self.degree_of_freedom = self.num_obs - self.num_unknowns
+        if self.degree_of_freedom < 0:
+            log.error(f"Degree of freedom is {self.degree_of_freedom} < 0. Estimate fewer parameters.")
+        self._solve()
+
+    def cleanup(self) -> None:
+        """The normal equations are kept in memory, so there is nothing to clean up"""
+        pass
+
+    def _solve(self) -> None:
+        """Solve the normal equations and compute residuals and statistics
+        """
+        # Makes calculations easier to read (and gives a slight speed-up)
+        H = self.H
+        z = self.z
+        W = self.W
         x0 = self.x0
 
         # Solution of normal equations
-        self.N = H.T @ W @ H
         if not np.isfinite(np.linalg.cond(self.N)):
             log.warn("Error by computing the inverse of normal equation matrix N.")
-        self.dx = np.linalg.inv(self.N) @ H.T @ W @ z
+        self.dx = np.linalg.inv(self.N) @ self.b
         self.x_hat = x0 - self.dx
 
         # Estimated residuals
@@ -0,0 +1,324 @@
+"""Square root information filter
+
+Description:
+------------
+
+The square root information filter (SRIF) and the Dyer-McReynolds smoother are covered in the book "Factorization
+Methods for Discrete Sequential Estimation" by Bierman :cite:`bierman2006`.
+
+Instead of the covariance matrix P, the filter propagates an upper triangular information factor R and an information
+state zeta, such that R x = zeta + v, where v has unit covariance. Observations and process noise are added by QR
+factorizations of stacked matrices, which keeps the factor well conditioned also on long arcs, since P = R^-1 R^-T is
+never formed during filtering. The smoother only needs the process noise factors of each time update, so nothing is
+stored per epoch unless process noise is added.
+
+Observations are added to the triangular factor by a triangular-pentagonal QR factorization, which only works on the
+new rows, and state transitions of the form phi = I + E with E E = 0, like the rate parameters of the continuous
+piecewise linear model, are inverted as I - E without solving a sparse system.
+"""
+
+# External library imports
+import numpy as np
+import scipy.linalg
+import scipy.sparse
+import scipy.sparse.linalg
+
+# Where imports
+from where.estimation.estimators._kalman import KalmanFilter
+from where.estimation.parameters import SparsePartials
+from where.lib import log
+
+# Block size of the QR factorization of new observations
+QR_BLOCK_SIZE = 32
+
+
+class SquareRootInformationFilter(KalmanFilter):
+    """A square root information filter and smoother
+
+    The filter has the same input and results as :class:`~where.estimation.estimators._kalman.KalmanFilter`, and uses
+    the same methods for updating the dataset. Observations between two time updates, that is observations with an
+    identity state transition and no process noise, are added in one QR factorization. Their filtered states are the
+    states after the last of these observations.
+
+    Notation, in addition to the notation of the Kalman filter:
+
+    r_hat:             Updated information factor (upper triangular)                # n x n  (not stored)
+    zeta:              Updated information state                                    # n      (not stored)
+    r_w:               Process noise information factors of each time update        # dict()
+    keep_epochs:       Epochs where the updated information factor is kept          # set()
+
+    The innovation, sigma and k fields of the Kalman filter are not calculated.
+    """
+
+    def __init__(self, h, z=None, apriori_stdev=None, phi=None, r=None, Q=None, param_names=None, keep_epochs=None):
+        """Initialize the square root information filter
+
+        Args:
+            h (SparsePartials):            Partial derivatives, dense arrays are converted (num_obs x n x 1)
+            z (Numpy array):               Observations                 (num_obs)
+            apriori_stdev (Numpy array):   Apriori standard deviation   (n)
+            phi (Numpy array):             State transition             (num_obs x n x n)
+            r (Numpy array):               Observation noise covariance (num_obs)
+            Q (Numpy array):               Process noise covariance     (num_obs x n x n)
+            keep_epochs (List):            Epochs where the covariance is needed later, default the last epoch.
+        """
+        super().__init__(h, z=z, apriori_stdev=apriori_stdev, phi=phi, r=r, Q=Q, param_names=param_names)
+        self.keep_epochs = {self.num_obs - 1} if keep_epochs is None else set(keep_epochs)
+        self.r_w = dict()
+        self._r_hat = dict()
+
+    def _init_covariance_file(self):
+        """The information factors are kept in memory, so no covariance file is needed"""
+        pass
+
+    def filter(self, start_epoch=0):
+        """Run the square root information filter forward and the smoother backward
+
+        Args:
+            start_epoch (Int):  Must be 0, the filter can not be restarted at a later epoch.
+        """
+        if start_epoch != 0:
+            raise NotImplementedError("The square root information filter can only be run from the first epoch")
+
+        # Initialize with the apriori information, corresponding to x_tilde = 0
+        n = self.n
+        r_hat = np.diag(1 / self.apriori_stdev)
+        zeta = np.zeros(n)
+        self.r_w.clear()
+        self._r_hat.clear()
+        steps = self._steps()
+
+        # Run filter forward over all steps
+        for first, last in steps:
+            r_hat, zeta = self._measurement_update(r_hat, zeta, first, last)
+            self.x_hat[first : last + 1, :, 0] = scipy.linalg.solve_triangular(r_hat, zeta)
+            self.x_hat_ferr[first : last + 1, :] = np.sqrt(np.sum(_inverse_triangular(r_hat) ** 2, axis=1))
+            if last in self.keep_epochs:
+                self._r_hat[last] = r_hat.copy()
+            if last < self.num_obs - 1:
+                r_hat, zeta = self._time_update(r_hat, zeta, last)
+
+        # Run smoother backwards over all steps, starting from the filtered state at the last epoch
+        x_star = self.x_hat[self.num_obs - 1, :, 0].copy()
+        for step_idx in range(len(steps) - 1, -1, -1):
+            first, last = steps[step_idx]
+            self.x_smooth[first : last + 1, :, 0] = x_star
+            if step_idx > 0:
+                x_star = self._smooth_time_update(x_star, steps[step_idx - 1][1])
+
+    def refilter(self, keep_idx, h, z=None, phi=None, r=None, Q=None):
+        """Update the filter results after observations have been removed
+
+        The information of each epoch is not stored, so the filter is run again from the first epoch on the remaining
+        observations. The kept epochs are moved along with the observations, and the last epoch is kept if it was
+        kept before.
+
+        Args:
+            keep_idx (Numpy array):  Boolean index of observations that are kept (num_obs_old).
+            h (SparsePartials):      Partial derivatives          (num_obs x n x 1)
+            z (Numpy array):         Observations                 (num_obs)
+            phi (Numpy array):       State transition             (num_obs x n x n)
+            r (Numpy array):         Observation noise covariance (num_obs)
+            Q (Numpy array):         Process noise covariance     (num_obs x n x n)
+        """
+        num_obs_old = self.num_obs
+        keep_idx = np.concatenate((keep_idx, np.ones(num_obs_old - len(keep_idx), dtype=bool)))
+        new_epochs = np.cumsum(keep_idx) - 1
+        keep_epochs = {int(new_epochs[epoch]) for epoch in self.keep_epochs if keep_idx[epoch]}
+
+        self.h = h if isinstance(h, SparsePartials) else SparsePartials.from_dense(h)
+        self.num_obs = self.h.shape[0]
+        self.z = np.zeros((self.num_obs)) if z is None else z
+        self.phi = np.eye(self.n).repeat(self.num_obs).reshape(self.n, self.n, -1).T if phi is None else phi
+        self.r = np.ones((self.num_obs)) if r is None else r
+        self.Q = dict() if Q is None else Q
+        if num_obs_old - 1 in self.keep_epochs:
+            keep_epochs.add(self.num_obs - 1)
+        self.keep_epochs = keep_epochs
+
+        self.x_hat = np.zeros((self.num_obs, self.n, 1))
+        self.x_hat_ferr = np.zeros((self.num_obs, self.n))
+        self.x_smooth = np.zeros((self.num_obs, self.n, 1))
+        self.innovation = np.zeros(self.num_obs)
+        self.sigma = np.zeros(self.num_obs)
+        self.k = np.zeros((self.num_obs, self.n, 1))
+
+        log.info(f"Refiltering all {self.num_obs} observations")
+        self.filter()
+
+    def cleanup(self):
+        """The information factors are kept in memory, so there is nothing to clean up"""
+        pass
+
+    def _steps(self):
+        """Split the observations into steps separated by time updates
+
+        A step ends where the state transition is not identity, where process noise is added, or at an epoch where the
+        information factor should be kept.
+
+        Returns:
+            List of tuples: First and last epoch of each step.
+        """
+        ends = [
+            epoch
+            for epoch in range(self.num_obs - 1)
+            if not isinstance(self.phi[epoch], int) or self.Q.get(epoch) or epoch in self.keep_epochs
+        ]
+        ends.append(self.num_obs - 1)
+        return [(first, last) for first, last in zip([0] + [e + 1 for e in ends[:-1]], ends)]
+
+    def _measurement_update(self, r_hat, zeta, first, last):
+        """Add the observations of one step to the information
+
+        The whitened observations are stacked below the information and triangularized by a QR factorization. When
+        the information factor is triangular, only the new rows are eliminated, at a cost of O(n^2 m) for m
+        observations.
+
+        Args:
+            r_hat (Numpy array):  Information factor before the observations (n x n).
+            zeta (Numpy array):   Information state before the observations (n).
+            first (Int):          First epoch of the step.
+            last (Int):           Last epoch of the step.
+
+        Returns:
+            Tuple of Numpy arrays: Updated information factor (n x n) and information state (n).
+        """
+        n = self.n
+        obs_idx = slice(first, last + 1)
+        num_obs = last + 1 - first
+        weight = 1 / np.sqrt(self.r[obs_idx])
+
+        # The information state is an extra column of the triangular factor, with zero information in the corner
+        a = np.zeros((n + 1, n + 1))
+        a[:n, :n] = r_hat
+        a[:n, n] = zeta
+        b = np.zeros((num_obs, n + 1))
+        h = self.h[obs_idx]
+        np.add.at(b, (h.obs_index, h.indices), h.values * weight[h.obs_index])
+        b[:, n] = self.z[obs_idx] * weight
+
+        if np.any(np.tril(r_hat, -1)):
+            # A general state transition leaves the factor full, so all rows are triangularized
+            a = np.linalg.qr(np.vstack((a[:n], b)), mode="r")
+        else:
+            a, _, _, info = scipy.linalg.lapack.dtpqrt(0, min(n + 1, QR_BLOCK_SIZE), a, b)
+            if info != 0:
+                log.fatal(f"QR factorization of the observations of epochs {first}-{last} failed with info={info}")
+        return a[:n, :n], a[:n, n]
+
+    def _time_update(self, r_hat, zeta, epoch):
+        """Propagate the information to the next epoch
+
+        With x_next = phi x + G w, where G picks out the parameters with process noise w, the information R x = zeta
+        becomes R phi^-1 x_next - R phi^-1 G w = zeta. This is stacked below the information of the process noise, and
+        triangularized. The rows belonging to w are kept for the smoother. Without process noise R phi^-1 is used as
+        it is, which is still triangular when phi is upper triangular.
+
+        Args:
+            r_hat (Numpy array):  Updated information factor at the epoch (n x n).
+            zeta (Numpy array):   Updated information state at the epoch (n).
+            epoch (Int):          Epoch of the updated information.
+
+        Returns:
+            Tuple of Numpy arrays: Predicted information factor (n x n) and information state (n) at the next epoch.
+        """
+        phi = self.phi[epoch]
+        r_d = r_hat if isinstance(phi, int) else _solve(phi.T, r_hat.T).T
+        noise = self.Q.get(epoch)
+        if not noise:
+            # Without process noise the factor is triangularized by the next measurement update
+            return r_d, zeta
+
+        n = self.n
+        noise_idx = sorted({idx for pair in noise for idx in pair})
+        num_noise = len(noise_idx)
+        q = np.zeros((num_noise, num_noise))
+        for (idx1, idx2), value in noise.items():
+            q[noise_idx.index(idx1), noise_idx.index(idx2)] += value
+        r_noise = scipy.linalg.solve_triangular(np.linalg.cholesky(q), np.eye(num_noise), lower=True)
+
+        a = np.zeros((num_noise + n, num_noise + n + 1))
+        a[:num_noise, :num_noise] = r_noise
+        a[num_noise:, :num_noise] = -r_d[:, noise_idx]
+        a[num_noise:, num_noise:-1] = r_d
+        a[num_noise:, -1] = zeta
+
+        a = np.linalg.qr(a, mode="r")
+        self.r_w[epoch] = (noise_idx, a[:num_noise, :num_noise], a[:num_noise, num_noise:-1], a[:num_noise, -1])
+        return a[num_noise:, num_noise:-1], a[num_noise:, -1]
+
+    def _smooth_time_update(self, x_star, epoch):
+        """Step the smoothed state back over the time update after the given epoch
+
+        The smoothed process noise is w = R_w^-1 (z_w - R_wx x_next), and the smoothed state x = phi^-1 (x_next - G w).
+
+        Args:
+            x_star (Numpy array):  Smoothed state at the epoch after the time update (n).
+            epoch (Int):           Epoch before the time update.
+
+        Returns:
+            Numpy array: Smoothed state at the epoch (n).
+        """
+        x_star = x_star.copy()
+        if epoch in self.r_w:
+            noise_idx, r_noise, r_noise_x, z_noise = self.r_w[epoch]
+            x_star[noise_idx] -= scipy.linalg.solve_triangular(r_noise, z_noise - r_noise_x @ x_star)
+
+        phi = self.phi[epoch]
+        return x_star if isinstance(phi, int) else _solve(phi, x_star)
+
+    def _set_p_hat(self, epoch, data):
+        """The updated covariance is not stored"""
+        pass
+
+    def _get_p_hat(self, epoch):
+        """Updated covariance at one of the kept epochs
+
+        Args:
+            epoch (Int):  Epoch, must be one of the keep_epochs given when initializing the filter.
+
+        Returns:
+            Numpy array: Updated estimate covariance (n x n).
+        """
+        if epoch not in self._r_hat:
+            log.fatal(f"Information factor of epoch {epoch} is not kept by the square root information filter")
+        r_inv = _inverse_triangular(self._r_hat[epoch])
+        return r_inv @ r_inv.T
+
+
+def _solve(phi, b):
+    """Solve phi x = b for a dense or sparse state transition
+
+    A sparse state transition phi = I + E where E E = 0, like the transitions of the continuous piecewise linear model
+    where rate parameters integrate into their parameters, has the inverse I - E. The solution is then found with one
+    sparse product, without factorizing phi.
+
+    Args:
+        phi (Array):  State transition, Numpy array or scipy sparse matrix (n x n).
+        b (Array):    Right hand side (n or n x m).
+
+    Returns:
+        Numpy array: Solution x (n or n x m).
+    """
+    if scipy.sparse.issparse(phi):
+        e = (phi - scipy.sparse.identity(phi.shape[0], format="csr")).tocsr()
+        e.eliminate_zeros()
+        if (e @ e).count_nonzero() == 0:
+            return b - e @ b
+        return scipy.sparse.linalg.spsolve(phi.tocsc(), b)
+    return np.linalg.solve(phi, b)
+
+
+def _inverse_triangular(r):
+    """Invert an upper triangular matrix
+
+    Args:
+        r (Numpy array):  Upper triangular matrix, with zeros below the diagonal (n x n).
+
+    Returns:
+        Numpy array: Upper triangular inverse (n x n).
+    """
+    r_inv, info = scipy.linalg.lapack.dtrtri(r)
+    if info != 0:
+        log.fatal(f"Information factor is singular, inversion failed with info={info}")
+    return r_inv
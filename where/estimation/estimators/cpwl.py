@@ -16,6 +16,7 @@ from midgard.math.unit import Unit
 # Where imports
 from where import apriori
 from where.estimation.estimators._kalman import KalmanFilter
+from where.estimation.parameters import sparse_partials
 from where.lib import config
 from where.lib import log
 
@@ -33,34 +34,86 @@ def partial_config_keys():
 
 
 @plugins.register
-def estimate_cpwl(dset, partial_vectors, obs_noise):
+def estimate_cpwl(dset, partial_vectors, obs_noise, previous=None, keep_idx=None, keep_solution=False):
     """Estimate with continuous piecewise linear functions
 
     TODO: Describe phi and Q
 
+    If the Kalman filter of a previous estimation is given together with the observations kept since then, only the
+    part of the filter after the first removed observation is rerun. This is only done if the filter input of the
+    kept observations is unchanged, otherwise a new filter is run.
+
     Args:
         dset (Dataset):          Model run data.
         partial_vectors (Dict):  Names and values of the partial derivatives for each partial config key.
         obs_noise (Array):       Observation noise, numpy array with one float value for each observation.
+        previous (KalmanFilter): Kalman filter of a previous estimation, which was run with keep_solution=True.
+        keep_idx (Array):        Boolean index of the observations of the previous estimation that are kept.
+        keep_solution (Bool):    Keep the covariance file of the filter, so it can be passed as previous later. The
+                                 caller is responsible for calling cleanup() on the returned filter.
+
+    Returns:
+        KalmanFilter: The Kalman filter.
     """
-    # Organize partial derivatives (state vectors) into a matrix
+    h, z, phi, obs_noise, Q, apriori_stdev, param_names, n_constant, num_unknowns = state_space_model(
+        dset, partial_vectors, obs_noise
+    )
+
+    # Initialize and run the Kalman filter, or rerun the previous filter after the first removed observation
+    if previous is not None and _can_refilter(previous, keep_idx, h, z, obs_noise, apriori_stdev, param_names):
+        kalman = previous
+        kalman.refilter(keep_idx, h, z=z, phi=phi, r=obs_noise, Q=Q)
+    else:
+        if previous is not None:
+            previous.cleanup()
+        kalman = KalmanFilter(h, z=z, apriori_stdev=apriori_stdev, phi=phi, r=obs_noise, Q=Q, param_names=param_names)
+        kalman.filter()
+
+    # Update the dataset with results from the filter
+    kalman.update_dataset(dset, param_names=param_names, normal_idx=slice(0, n_constant), num_unknowns=num_unknowns)
+    if not keep_solution:
+        kalman.cleanup()
+
+    return kalman
+
+
+def state_space_model(dset, partial_vectors, obs_noise):
+    """Set up the state space model of the continuous piecewise linear functions
+
+    Constant parameters are copied from the partial fields, while each stochastic parameter gets an additional rate
+    parameter. The state transition phi lets the rate parameters integrate into their parameters between epochs, and
+    the process noise Q is added to the rate parameters each time a knot of the piecewise linear function is passed.
+    Constraints are added as pseudo-observations at the end.
+
+    Args:
+        dset (Dataset):          Model run data.
+        partial_vectors (Dict):  Names and values of the partial derivatives for each partial config key.
+        obs_noise (Array):       Observation noise, numpy array with one float value for each observation.
+
+    Returns:
+        Tuple: Partial derivatives h (SparsePartials), observations z, state transitions phi, observation noise
+               including pseudo-observations, process noise Q, apriori standard deviations, names of parameters,
+               number of constant parameters and number of unknowns.
+    """
+    # Organize partial derivatives (state vectors) into a sparse matrix with the non-zeros of each observation
     n_constant = len(partial_vectors["estimate_constant"])
     n_stochastic = len(partial_vectors["estimate_stochastic"])
     n = n_constant + 2 * n_stochastic
     num_unknowns = n
     num_obs = dset.num_obs
-    h = np.zeros((num_obs, n, 1))
+    columns = dict()
     param_names = list()
 
     # Constant parameters are simply copied from the partial fields
     for idx, name in enumerate(partial_vectors["estimate_constant"]):
-        h[:, idx, 0] = dset["partial." + name][:]
+        columns[name] = idx
         param_names.append(name)
 
     # Stochastic parameters are estimated as CPWL functions by adding a rate parameter
     for idx, name in enumerate(partial_vectors["estimate_stochastic"]):
-        h[:, n_constant + idx * 2, 0] = dset["partial." + name][:]
+        columns[name] = n_constant + idx * 2
         param_names.extend([name, name + "_rate_"])  # Trailing underscore in rate_ means field is not added to dset
+    h = sparse_partials(dset, columns, n)
 
     # Read information about parameters from config files
     ref_time = np.ones(n) * dset.time.utc[0].mjd
@@ -177,7 +230,7 @@ def estimate_cpwl(dset, partial_vectors, obs_noise):
 
         num_constraints = d.shape[1]
         try:
-            h = np.vstack((h, (np.linalg.inv(d.T @ d) @ d.T)[:, :, None]))
+            h = h.vstack(np.linalg.inv(d.T @ d) @ d.T)
         except np.linalg.linalg.LinAlgError:
             pass
 
@@ -208,15 +261,40 @@ def estimate_cpwl(dset, partial_vectors, obs_noise):
                 nnr_sigma = config.tech.minimum_crf.sigma.float * Unit(nnr_unit, "rad") # Convert to radians
                 obs_noise = np.hstack((obs_noise, np.array([nnr_sigma ** 2] * 3)))
                 num_constraints += 3
-                h = np.vstack((h, H2[:, :, None]))
+                h = h.vstack(H2)
 
         z = np.hstack((z, np.zeros(num_constraints))).T
         phi = phi + [scipy.sparse.csr_matrix(np.eye(n))] * num_constraints
 
-    # Initialize and run the Kalman filter
-    kalman = KalmanFilter(h, z=z, apriori_stdev=apriori_stdev, phi=phi, r=obs_noise, Q=Q, param_names=param_names)
-    kalman.filter()
+    return h, z, phi, obs_noise, Q, apriori_stdev, param_names, n_constant, num_unknowns
 
-    # Update the dataset with results from the filter
-    kalman.update_dataset(dset, param_names=param_names, normal_idx=slice(0, n_constant), num_unknowns=num_unknowns)
-    kalman.cleanup()
+
+def _can_refilter(previous, keep_idx, h, z, r, apriori_stdev, param_names):
+    """Check if a previous Kalman filter can be rerun on a subset of its observations
+
+    The input to the filter for the kept observations, including pseudo-observations, must be unchanged.
+
+    Args:
+        previous (KalmanFilter):   Kalman filter of a previous estimation.
+        keep_idx (Array):          Boolean index of the observations of the previous estimation that are kept.
+        h (SparsePartials):        Partial derivatives of the new estimation (num_obs x n x 1).
+        z (Array):                 Observations of the new estimation (num_obs).
+        r (Array):                 Observation noise covariance of the new estimation (num_obs).
+        apriori_stdev (Array):     Apriori standard deviation of the new estimation (n).
+        param_names (List):        Names of parameters of the new estimation.
+
+    Returns:
+        Bool: True if the previous filter can be rerun.
+    """
+    if keep_idx is None or len(keep_idx) > previous.num_obs:
+        return False
+    old_idx = np.concatenate((keep_idx, np.ones(previous.num_obs - len(keep_idx), dtype=bool)))
+    if previous.param_names != param_names or np.sum(old_idx) != len(z):
+        return False
+
+    return (
+        np.array_equal(previous.apriori_stdev, apriori_stdev)
+        and previous.h[old_idx] == h
+        and np.array_equal(previous.z[old_idx], z)
+        and np.array_equal(previous.r[old_idx], r)
+    )
@@ -5,7 +5,7 @@ Description:
 
 """
 # Standard library imports
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 # External library imports
 import numpy as np
@@ -33,16 +33,33 @@ def partial_config_keys():
 
 
 @plugins.register
-def estimate_lsq(dset: "Dataset", partial_vectors: Dict[str, List[str]], obs_noise: np.ndarray) -> None:
+def estimate_lsq(
+    dset: "Dataset",
+    partial_vectors: Dict[str, List[str]],
+    obs_noise: np.ndarray,
+    previous: Optional[LsqEstimator] = None,
+    keep_idx: Optional[np.ndarray] = None,
+    keep_solution: bool = False,
+) -> Optional[LsqEstimator]:
     """Estimate with least square method
 
     The dataset will be updated with least square estimation solution. In addition a convergence status is returned
     via dataset meta variable, which says if the convergence limit is fulfilled.
 
+    If the estimator of a previous estimation is given together with the observations kept since then, the normal
+    equations of the previous estimation are downdated by the removed observations. This is only done when estimating
+    over the whole time period, and if the input of the kept observations is unchanged.
+
     Args:
         dset (Dataset):          A dataset containing the data.
         partial_vectors (Dict):  Names and values of the partial derivatives for each partial config key.
         TODO: Used for generation of weight matrix in Kalman filtering? obs_noise (Array):       Observation noise, numpy array with one float value for each observation. 
+        previous:                Least square estimator of a previous estimation.
+        keep_idx:                Boolean index of the observations of the previous estimation that are kept.
+        keep_solution:           Not used, the normal equations are always kept in the estimator.
+
+    Returns:
+        Least square estimator, None for epochwise estimation.
     """
     # Initialize variables
     estimate_convergence = (
@@ -107,9 +124,14 @@ def estimate_lsq(dset: "Dataset", partial_vectors: Dict[str, List[str]], obs_noi
             estimate = np.concatenate((estimate, _get_estimate(lsq)), axis=0) if estimate.size else _get_estimate(lsq)
     else:
 
-        # Initialize and run the estimator
-        lsq = LsqEstimator(H=H, z=z, x0=x0[0], W=W, param_names=param_names)
-        lsq.estimate()
+        # Initialize and run the estimator, or downdate the previous estimator by the removed observations
+        if previous is not None and _can_downdate(previous, keep_idx, H, z, W, param_names):
+            lsq = previous
+            lsq.x0 = x0[0]
+            lsq.remove_observations(keep_idx)
+        else:
+            lsq = LsqEstimator(H=H, z=z, x0=x0[0], W=W, param_names=param_names)
+            lsq.estimate()
 
         # Check if estimated correction is less than convergence limit
         if np.all(lsq.dx <= convergence_limit):
@@ -125,6 +147,41 @@ def estimate_lsq(dset: "Dataset", partial_vectors: Dict[str, List[str]], obs_noi
     # Update the dataset with results from the estimator
     _update_dataset(dset, param_names, estimate, estimate_convergence)
 
+    return None if config.tech.estimate_epochwise.bool else lsq
+
+
+def _can_downdate(
+    previous: LsqEstimator,
+    keep_idx: Optional[np.ndarray],
+    H: np.ndarray,
+    z: np.ndarray,
+    W: np.ndarray,
+    param_names: List[str],
+) -> bool:
+    """Check if a previous estimator can be downdated to a subset of its observations
+
+    The apriori values of the parameters may change, since they do not enter the normal equations.
+
+    Args:
+        previous:     Least square estimator of a previous estimation.
+        keep_idx:     Boolean index of the observations of the previous estimation that are kept.
+        H:            Design matrix of the new estimation.
+        z:            Observed residual of the new estimation.
+        W:            Observation weight matrix of the new estimation.
+        param_names:  Parameter names of the new estimation.
+
+    Returns:
+        True if the input of the kept observations is unchanged.
+    """
+    if keep_idx is None or len(keep_idx) != previous.num_obs or previous.param_names != param_names:
+        return False
+
+    return (
+        np.array_equal(previous.H[keep_idx], H[:, :, 0])
+        and np.array_equal(previous.z[keep_idx], z)
+        and np.array_equal(previous.W[np.ix_(keep_idx, keep_idx)], W)
+    )
+
 
 def _get_estimate(lsq: "LsqEstimator") -> np.ndarray:
     """Get estimation solution
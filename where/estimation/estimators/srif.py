@@ -0,0 +1,72 @@
+"""Continuous PieceWise Linear estimator using a square root information filter
+
+Description:
+------------
+
+Estimates the same continuous piecewise linear model as the :mod:`~where.estimation.estimators.cpwl` estimator, but
+with a square root information filter and smoother instead of the Kalman filter, see
+:class:`~where.estimation.estimators._srif.SquareRootInformationFilter`. The filter propagates triangular information
+factors instead of covariance matrices, which is numerically more robust on long sessions, and does not store the
+covariance matrix of each epoch on file.
+
+"""
+
+# Midgard imports
+from midgard.dev import plugins
+
+# Where imports
+from where.estimation.estimators._srif import SquareRootInformationFilter
+from where.estimation.estimators.cpwl import state_space_model
+
+
+@plugins.register_named("partial_config_keys")
+def partial_config_keys():
+    """List the types of partials needed by the estimator
+
+    The SRIF estimator uses both constant and stochastic parameters.
+
+    Returns:
+        Tuple: Strings with names of config keys listing which partial models to run.
+    """
+    return ("estimate_constant", "estimate_stochastic")
+
+
+@plugins.register
+def estimate_srif(dset, partial_vectors, obs_noise, previous=None, keep_idx=None, keep_solution=False):
+    """Estimate with continuous piecewise linear functions using a square root information filter
+
+    The filter does not store the state of each epoch, so a new filter is always run. The arguments previous, keep_idx
+    and keep_solution are accepted so that the estimator can be used in incremental estimation like the cpwl estimator.
+
+    Args:
+        dset (Dataset):          Model run data.
+        partial_vectors (Dict):  Names and values of the partial derivatives for each partial config key.
+        obs_noise (Array):       Observation noise, numpy array with one float value for each observation.
+        previous (SquareRootInformationFilter): Filter of a previous estimation, not used.
+        keep_idx (Array):        Boolean index of the observations of the previous estimation that are kept, not used.
+        keep_solution (Bool):    Not used, the filter keeps its results in memory.
+
+    Returns:
+        SquareRootInformationFilter: The square root information filter.
+    """
+    h, z, phi, obs_noise, Q, apriori_stdev, param_names, n_constant, num_unknowns = state_space_model(
+        dset, partial_vectors, obs_noise
+    )
+
+    # The covariance at the last observation is needed for the normal equations, also if there are pseudo-observations
+    srif = SquareRootInformationFilter(
+        h,
+        z=z,
+        apriori_stdev=apriori_stdev,
+        phi=phi,
+        r=obs_noise,
+        Q=Q,
+        param_names=param_names,
+        keep_epochs=[dset.num_obs - 1],
+    )
+    srif.filter()
+
+    # Update the dataset with results from the filter
+    srif.update_dataset(dset, param_names=param_names, normal_idx=slice(0, n_constant), num_unknowns=num_unknowns)
+
+    return srif
@@ -23,7 +23,6 @@ import datetime
 import numpy as np
 
 # Midgard imports
-from midgard.dev import plugins
 from midgard.math.unit import Unit
 
 # Where imports
@@ -31,6 +30,7 @@ from where.data.time import Time
 from where.estimation import estimators
 from where.lib import config
 from where.lib import log
+from where.lib import telemetry
 
 
 def partial_vectors(dset, estimator_config_key):
@@ -57,7 +57,7 @@ def partial_vectors(dset, estimator_config_key):
     for config_key in estimators.partial_config_keys(estimator_config_key):
         partial_vectors[config_key] = list()
         partials = config.tech[config_key].list
-        partial_data = plugins.call_all(package_name=__name__, plugins=partials, prefix=prefix, dset=dset)
+        partial_data = telemetry.call_all("partial", package_name=__name__, plugins=partials, prefix=prefix, dset=dset)
 
         for param, (data, names, data_unit) in partial_data.items():
             param_unit_cfg = config.tech[param].unit
@@ -80,6 +80,226 @@ def partial_vectors(dset, estimator_config_key):
 
     return partial_vectors
 
+
+def sparse_partials(dset, columns, n):
+    """Collect the partial derivatives in the dataset as (index, value) pairs for each observation
+
+    Only the non-zero partial derivatives are stored, so the size of the result scales with the number of non-zeros
+    instead of with the number of observations times the number of parameters.
+
+    Args:
+        dset (Dataset):   A Dataset containing the partial fields added by :func:`partial_vectors`.
+        columns (Dict):   Column in the state vector of each partial derivative, keyed by partial name.
+        n (Int):          Number of parameters in the state vector.
+
+    Returns:
+        SparsePartials: The non-zero partial derivatives of each observation.
+    """
+    obs, cols, vals = [np.zeros(0, dtype=int)], [np.zeros(0, dtype=int)], [np.zeros(0)]
+    for name, column in columns.items():
+        values = dset[f"partial.{name}"]
+        nonzero = np.flatnonzero(values)
+        obs.append(nonzero)
+        cols.append(np.full(nonzero.size, column))
+        vals.append(np.asarray(values)[nonzero])
+
+    return SparsePartials.from_triplets(
+        np.concatenate(obs), np.concatenate(cols), np.concatenate(vals), num_obs=dset.num_obs, n=n
+    )
+
+
+class SparsePartials(object):
+    """Partial derivatives stored as (index, value) pairs for each observation
+
+    The non-zero partial derivatives are stored row by row in compressed sparse row (CSR) format, sorted by column
+    within each row. The non-zeros of observation obs are indices[indptr[obs]:indptr[obs + 1]] and the corresponding
+    values. Rows are stored raggedly, so dense rows like pseudo-observations do not add work for the other rows.
+
+    Notation:
+
+    indptr:            Start of the non-zeros of each observation                   # num_obs + 1
+    indices:           Column of each non-zero partial derivative                   # num_nonzero
+    values:            Value of each non-zero partial derivative                    # num_nonzero
+    n:                 Number of parameters
+    """
+
+    def __init__(self, indptr, indices, values, n):
+        """Initialize the sparse partial derivatives
+
+        Args:
+            indptr (Numpy array):   Start of the non-zeros of each observation   (num_obs + 1)
+            indices (Numpy array):  Column of each non-zero partial derivative   (num_nonzero)
+            values (Numpy array):   Value of each non-zero partial derivative    (num_nonzero)
+            n (Int):                Number of parameters.
+        """
+        self.indptr = indptr
+        self.indices = indices
+        self.values = values
+        self.n = n
+
+    @classmethod
+    def from_triplets(cls, obs, cols, vals, num_obs, n):
+        """Create sparse partial derivatives from (observation, column, value) triplets
+
+        Args:
+            obs (Numpy array):   Observation index of each partial derivative.
+            cols (Numpy array):  Column of each partial derivative.
+            vals (Numpy array):  Value of each partial derivative.
+            num_obs (Int):       Number of observations.
+            n (Int):             Number of parameters.
+
+        Returns:
+            SparsePartials: The non-zero partial derivatives.
+        """
+        nonzero = vals != 0
+        order = np.lexsort((cols[nonzero], obs[nonzero]))
+        obs, cols, vals = obs[nonzero][order], cols[nonzero][order], vals[nonzero][order]
+        indptr = np.concatenate(([0], np.cumsum(np.bincount(obs, minlength=num_obs))))
+
+        return cls(indptr, cols.astype(int), vals.astype(float), n)
+
+    @classmethod
+    def from_dense(cls, h):
+        """Create sparse partial derivatives from a dense design matrix
+
+        Args:
+            h (Numpy array):  Partial derivatives   (num_obs x n x 1 or num_obs x n)
+
+        Returns:
+            SparsePartials: The non-zero partial derivatives.
+        """
+        num_obs, n = h.shape[:2]
+        obs, cols = np.nonzero(h.reshape(num_obs, n))
+        return cls.from_triplets(obs, cols, h.reshape(num_obs, n)[obs, cols], num_obs=num_obs, n=n)
+
+    @property
+    def shape(self):
+        """Shape of the corresponding dense design matrix (num_obs x n x 1)"""
+        return (self.num_obs, self.n, 1)
+
+    @property
+    def num_obs(self):
+        return self.indptr.size - 1
+
+    @property
+    def obs_index(self):
+        """Observation of each non-zero partial derivative"""
+        return np.repeat(np.arange(self.num_obs), np.diff(self.indptr))
+
+    def row(self, obs):
+        """Columns and values of the non-zero partial derivatives of one observation
+
+        Args:
+            obs (Int):  Index of the observation.
+
+        Returns:
+            Tuple of Numpy arrays: Columns and values of the non-zeros.
+        """
+        start, end = self.indptr[obs], self.indptr[obs + 1]
+        return self.indices[start:end], self.values[start:end]
+
+    def __getitem__(self, idx):
+        """Pick out the partial derivatives of some observations"""
+        rows = np.arange(self.num_obs)[idx]
+        counts = np.diff(self.indptr)[rows]
+        indptr = np.concatenate(([0], np.cumsum(counts)))
+        positions = np.repeat(self.indptr[rows] - indptr[:-1], counts) + np.arange(indptr[-1])
+        return self.__class__(indptr, self.indices[positions], self.values[positions], self.n)
+
+    def __eq__(self, other):
+        """Compare the non-zero partial derivatives"""
+        if not isinstance(other, SparsePartials):
+            return NotImplemented
+        return (
+            self.shape == other.shape
+            and np.array_equal(self.indptr, other.indptr)
+            and np.array_equal(self.indices, other.indices)
+            and np.array_equal(self.values, other.values)
+        )
+
+    __hash__ = None
+
+    def vstack(self, rows):
+        """Append dense rows of partial derivatives, for instance pseudo-observations
+
+        Args:
+            rows (Numpy array):  Partial derivatives of the new observations   (num_new x n x 1 or num_new x n)
+
+        Returns:
+            SparsePartials: The partial derivatives of all observations.
+        """
+        other = self.from_dense(rows)
+        return self.__class__(
+            np.concatenate((self.indptr, other.indptr[1:] + self.indptr[-1])),
+            np.concatenate((self.indices, other.indices)),
+            np.concatenate((self.values, other.values)),
+            self.n,
+        )
+
+    def column(self, idx):
+        """Partial derivatives with respect to one parameter for all observations
+
+        Args:
+            idx (Int):  Column of the parameter.
+
+        Returns:
+            Numpy array: Partial derivatives (num_obs).
+        """
+        is_column = self.indices == idx
+        return np.bincount(self.obs_index[is_column], weights=self.values[is_column], minlength=self.num_obs)
+
+    def dot(self, x):
+        """Product of the partial derivatives and one state vector for each observation
+
+        Args:
+            x (Numpy array):  State vectors (num_obs x n x 1 or num_obs x n)
+
+        Returns:
+            Numpy array: Products h^T x for each observation (num_obs).
+        """
+        x = x.reshape(-1, self.n)
+        obs_index = self.obs_index
+        return np.bincount(obs_index, weights=self.values * x[obs_index, self.indices], minlength=self.num_obs)
+
+    def toarray(self):
+        """Dense design matrix
+
+        Returns:
+            Numpy array: Partial derivatives (num_obs x n x 1).
+        """
+        h = np.zeros(self.shape)
+        np.add.at(h[:, :, 0], (self.obs_index, self.indices), self.values)
+        return h
+
+
+def can_reuse_partial_vectors(dset, partial_vectors, time_span):
+    """Check if partial derivatives can be reused after observations have been removed
+
+    The partial derivatives are stored as fields in the dataset, and are subset together with the observations. They
+    are equal to newly calculated partial derivatives as long as the set of parameters is unchanged. This is the case
+    if the time span of the observations is unchanged (piecewise linear offsets depend on it), and every parameter
+    still has observations with non-zero partial derivatives.
+
+    Args:
+        dset (Dataset):          A Dataset containing model run data.
+        partial_vectors (Dict):  Names of the partial derivatives for each partial config key, see partial_vectors.
+        time_span (Tuple):       First and last epoch (utc mjd) of the observations when the partials were calculated.
+
+    Returns:
+        Bool: True if the partial derivatives can be reused.
+    """
+    if dset.num_obs == 0 or (dset.time.utc.mjd.min(), dset.time.utc.mjd.max()) != tuple(time_span):
+        return False
+
+    for names in partial_vectors.values():
+        for name in names:
+            field_name = f"partial.{name}"
+            if field_name not in dset.fields or not np.any(dset[field_name]):
+                return False
+
+    return True
+
+
 def pwlo(config_key, param, dset, data, names):
     """ Set up constant parameters as piecewise local offsets
     
@@ -18,7 +18,7 @@ be decorated with the :func:`~midgard.dev.plugins.register` decorator as follows
 
 """
 # Standard library imports
-from typing import Any, Dict
+from typing import Any, Dict, Tuple, Union
 
 # External library imports
 import numpy as np
@@ -31,16 +31,19 @@ from where.lib import config
 from where.lib import log
 
 
-def apply_observation_rejectors(config_key: str, dset: "Dataset", independent: bool) -> np.ndarray:
+def apply_observation_rejectors(
+    config_key: str, dset: "Dataset", independent: bool, return_keep_idx: bool = False
+) -> Union["Dataset", Tuple["Dataset", np.ndarray]]:
     """Apply all configured observation rejectors
 
     Args:
-        config_key:     The configuration key listing which rejectors to apply.
-        dset:           Dataset containing analysis data.
-        independent:    Flag to indicate whether the rejectors are applied independently or sequentially
+        config_key:       The configuration key listing which rejectors to apply.
+        dset:             Dataset containing analysis data.
+        independent:      Flag to indicate whether the rejectors are applied independently or sequentially
+        return_keep_idx:  Also return a boolean index of the kept observations, relative to the original dataset.
 
     Returns:
-        Dataset with rejected observation
+        Dataset with rejected observation, and optionally the index of kept observations.
     """
     prefix = dset.vars["pipeline"]
     rejectors = config.tech[config_key].list
@@ -55,11 +58,14 @@ def apply_observation_rejectors(config_key: str, dset: "Dataset", independent: b
             all_keep_idx = np.logical_and(all_keep_idx, rejector_keep_idx)
         else:
             dset.subset(rejector_keep_idx)
+            all_keep_idx[all_keep_idx] = rejector_keep_idx
         log.info(f"Found {sum(~rejector_keep_idx):5d} observations based on {rejector}")
 
     if independent:
         dset.subset(all_keep_idx)
     log.info(f"Removing {num_obs_before - dset.num_obs} of {num_obs_before} observations")
+    if return_keep_idx:
+        return dset, all_keep_idx
     return dset
 
 
@@ -9,10 +9,10 @@ import numpy as np
 
 # Midgard imports
 from midgard.dev import plugins
-from midgard.gnss.solution_validation import sol_validation
 
 # Where imports
 from where.lib import config
+from where.lib import epochs
 
 
 # Name of section in configuration
@@ -33,9 +33,9 @@ def chi2(dset):
     alpha = config.tech[_SECTION].alpha.float
 
     num_params = 4  # TODO
-    keep_idx = np.ones(dset.num_obs, dtype=bool)
-    for time in dset.unique("time"):
-        idx = dset.filter(time=time)
-        residual_norm = (dset.residual[idx] - np.mean(dset.residual[idx])) / np.std(dset.residual[idx])
-        keep_idx[idx] = sol_validation(residual_norm, alpha, num_params)
-    return keep_idx
+    groups = epochs.EpochGroups(dset.time)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        residual_norm = (dset.residual - groups.broadcast(groups.mean(dset.residual))) / groups.broadcast(
+            groups.std(dset.residual)
+        )
+    return groups.broadcast(epochs.chi2_test(residual_norm, alpha, num_params, groups))
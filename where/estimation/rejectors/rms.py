@@ -11,6 +11,7 @@ from midgard.dev import plugins
 
 # Where imports
 from where.lib import config
+from where.lib import epochs
 
 # Name of section in configuration
 _SECTION = "_".join(__name__.split(".")[-1:])
@@ -31,10 +32,8 @@ def rms(dset: "Dataset") -> np.ndarray:
 
     # Epochwise estimation or over whole time period
     if config.tech.estimate_epochwise.bool:
-        keep_idx = np.ones(dset.num_obs, dtype=bool)
-        for time in dset.unique("time"):
-            idx = dset.filter(time=time)
-            keep_idx[idx] = np.abs(dset[field][idx]) < outlier_limit * dset.rms(field, idx=idx)
+        groups = epochs.EpochGroups(dset.time)
+        keep_idx = np.abs(dset[field]) < outlier_limit * groups.broadcast(groups.rms(dset[field]))
     else:
         keep_idx = np.abs(dset[field]) < outlier_limit * dset.rms(field)
 
@@ -0,0 +1,361 @@
+"""Stacking of normal equations from several sessions
+
+Description:
+------------
+
+Combines the normal equations of many sessions (VLBI sessions, daily GNSS solutions, SINEX files) into one normal
+equation system for the global parameters, typically station positions and velocities, source positions and EOP.
+
+The normal equations are streamed into a :class:`NeqStack` one session at a time. For each session
+
+    1. Parameters that are not global (for instance clocks and troposphere parameters that are still in the normal
+       equations) are eliminated with the Schur complement, :cite:`thaller2008` eq. 2.25.
+    2. Optionally, station positions at the session epoch are transformed to positions at a reference epoch and
+       velocities, x(t) = x(t_0) + (t - t_0) * v.
+    3. The reduced normal equations are added to the global normal equations, using a global index of parameter names.
+
+The normal equations of each session are relative to the apriori values of that session. If the apriori values are
+given, the normal equations are referred to common apriori values (the first apriori value seen for each parameter)
+before they are added.
+
+Memory use is therefore bounded by the number of global parameters, not by the number of sessions. The stacked
+normal equations are stored as one dense matrix, which grows as new global parameters appear.
+
+Minimum constraints (NNT/NNR/NNS to a TRF and NNR to a CRF) are formed like in
+:func:`where.estimation.estimators.solve_neq`, and the constrained normal equations are solved with a Cholesky
+factorization.
+"""
+
+# Standard library imports
+import fnmatch
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# External library imports
+import numpy as np
+import scipy.linalg
+
+# Where imports
+from where.lib import log
+
+
+class NeqStack:
+    """Normal equations accumulated from several sessions
+
+    Args:
+        global_parameters:  Patterns (fnmatch-style) of parameter types that are kept. Other parameters are eliminated.
+        velocity_name:      Function returning the name of the velocity parameter of a position parameter, or None
+                            if the parameter does not have a velocity. If not given, velocities are not estimated.
+        reference_epoch:    Reference epoch of positions when velocities are estimated, in decimal years.
+    """
+
+    def __init__(
+        self,
+        global_parameters: Sequence[str],
+        velocity_name: Optional[Callable[[str], Optional[str]]] = None,
+        reference_epoch: Optional[float] = None,
+    ) -> None:
+        self.global_parameters = tuple(global_parameters)
+        self.velocity_name = velocity_name
+        self.reference_epoch = reference_epoch
+
+        self.names: List[str] = list()
+        self._index: Dict[str, int] = dict()
+        self._apriori: Dict[str, float] = dict()
+        self._N = np.zeros((0, 0))
+        self._b = np.zeros(0)
+
+        self.num_sessions = 0
+        self.num_obs = 0
+        self.num_eliminated = 0
+        self.ltpl = 0.0  # Weighted square sum of o-c, reduced by the eliminated parameters
+        self.has_statistics = True
+
+    @property
+    def N(self) -> np.ndarray:
+        """Stacked normal equation matrix"""
+        n = len(self.names)
+        return self._N[:n, :n]
+
+    @property
+    def b(self) -> np.ndarray:
+        """Stacked right hand side of the normal equations"""
+        return self._b[: len(self.names)]
+
+    @property
+    def apriori(self) -> np.ndarray:
+        """Common apriori values of the stacked parameters, NaN if unknown"""
+        return np.array([self._apriori.get(n, np.nan) for n in self.names])
+
+    def is_global(self, name: str) -> bool:
+        """Check if a parameter is kept in the stacked normal equations
+
+        Args:
+            name:  Parameter name, on the form <parameter type>-<parameter>.
+
+        Returns:
+            True if the parameter type matches one of the global parameter patterns.
+        """
+        parameter_type = name.split("-", maxsplit=1)[0]
+        return any(fnmatch.fnmatchcase(parameter_type, p) for p in self.global_parameters)
+
+    def add(
+        self,
+        names: Sequence[str],
+        N: np.ndarray,
+        b: np.ndarray,
+        epoch: Optional[float] = None,
+        num_obs: Optional[int] = None,
+        ltpl: Optional[float] = None,
+        apriori: Optional[Sequence[float]] = None,
+    ) -> None:
+        """Add the normal equations of one session
+
+        Args:
+            names:    Names of the parameters of the session.
+            N:        Normal equation matrix of the session.
+            b:        Right hand side of the normal equations of the session.
+            epoch:    Epoch of the session in decimal years, used when velocities are estimated.
+            num_obs:  Number of observations in the session, used for statistics.
+            ltpl:     Weighted square sum of o-c of the session, used for statistics.
+            apriori:  Apriori values of the parameters of the session, NaN if unknown.
+        """
+        names = np.asarray(names, dtype=str)
+        N = np.asarray(N, dtype=float)
+        b = np.asarray(b, dtype=float).reshape(-1)
+        is_global = np.array([self.is_global(n) for n in names], dtype=bool)
+        g_idx, l_idx = np.flatnonzero(is_global), np.flatnonzero(~is_global)
+        global_names = list(names[g_idx])
+
+        # Parameters in the stacked normal equations, positions at the session epoch are transformed to positions at
+        # the reference epoch and velocities
+        if self.velocity_name is None:
+            stacked_names, T = global_names, np.eye(len(global_names))
+        elif epoch is None or self.reference_epoch is None:
+            raise ValueError("Epochs are needed to estimate velocities")
+        else:
+            stacked_names, T = self._velocity_transformation(global_names, epoch - self.reference_epoch)
+
+        # Refer the normal equations to the common apriori values
+        if apriori is not None:
+            dx = self._apriori_difference(stacked_names, T, np.asarray(apriori, dtype=float)[g_idx])
+            if ltpl is not None:
+                ltpl = ltpl - 2 * dx @ b[g_idx] + dx @ N[np.ix_(g_idx, g_idx)] @ dx
+            b = b - N[:, g_idx] @ dx
+
+        # Eliminate session-local parameters, thaller2008: eq. 2.25
+        N_red, b_red = N[np.ix_(g_idx, g_idx)], b[g_idx]
+        if l_idx.size:
+            N_gl = N[np.ix_(g_idx, l_idx)]
+            N_ll_inv_lg, N_ll_inv_bl = _solve_local(N[np.ix_(l_idx, l_idx)], np.column_stack((N_gl.T, b[l_idx])))
+            N_red = N_red - N_gl @ N_ll_inv_lg
+            b_red = b_red - N_gl @ N_ll_inv_bl
+            if ltpl is not None:
+                ltpl = ltpl - b[l_idx] @ N_ll_inv_bl
+            self.num_eliminated += l_idx.size
+        N_red, b_red = T.T @ N_red @ T, T.T @ b_red
+
+        # Add to the stacked normal equations
+        idx = self._global_index(stacked_names)
+        self._N[np.ix_(idx, idx)] += N_red
+        self._b[idx] += b_red
+
+        # Statistics
+        self.num_sessions += 1
+        if num_obs is None or ltpl is None:
+            self.has_statistics = False
+        else:
+            self.num_obs += num_obs
+            self.ltpl += ltpl
+
+    def minimum_trf_matrix(
+        self,
+        positions: Dict[str, Tuple[Sequence[str], np.ndarray]],
+        nnt: bool = True,
+        nnr: bool = True,
+        nns: bool = False,
+    ) -> np.ndarray:
+        """Condition equations for minimum constraints on station positions
+
+        If velocities are estimated, the same conditions are added for the velocities.
+
+        Args:
+            positions:  For each station, names of the x, y and z position parameters, and apriori position.
+            nnt:        Use no-net-translation conditions.
+            nnr:        Use no-net-rotation conditions.
+            nns:        Use no-net-scale condition.
+
+        Returns:
+            Matrix with one row for each condition, and one column for each parameter.
+        """
+        columns = [c for c, use in zip(range(7), (nnt, nnt, nnt, nns, nnr, nnr, nnr)) if use]
+        if not columns:
+            return np.zeros((0, len(self.names)))
+
+        name_sets = [[names for names, _ in positions.values()]]
+        if self.velocity_name is not None:
+            name_sets.append([[self.velocity_name(n) for n in names] for names, _ in positions.values()])
+
+        H = list()
+        for name_set in name_sets:
+            B = np.zeros((len(self.names), 7))
+            for names, (_, pos) in zip(name_set, positions.values()):
+                if not all(n in self._index for n in names):
+                    continue
+                x0, y0, z0 = pos
+                # IERS 2010 Conventions eq. 4.8
+                B[self._index[names[0]], :] = np.array([1, 0, 0, x0, 0, z0, -y0])
+                B[self._index[names[1]], :] = np.array([0, 1, 0, y0, -z0, 0, x0])
+                B[self._index[names[2]], :] = np.array([0, 0, 1, z0, y0, -x0, 0])
+            d = B[:, columns]
+            if not d.any():
+                continue
+            # thaller2008: eq 2.57
+            H.append(np.linalg.inv(d.T @ d) @ d.T)
+        return np.concatenate(H) if H else np.zeros((0, len(self.names)))
+
+    def nnr_crf_matrix(self, directions: Dict[str, Tuple[Sequence[str], Tuple[float, float]]]) -> np.ndarray:
+        """Condition equations for no-net-rotation of source positions
+
+        Args:
+            directions:  For each source, names of the right ascension and declination parameters, and apriori right
+                         ascension and declination in radians.
+
+        Returns:
+            Matrix with three rows and one column for each parameter.
+        """
+        H = np.zeros((3, len(self.names)))
+        for (ra_name, dec_name), (ra, dec) in directions.values():
+            if ra_name in self._index:
+                H[0, self._index[ra_name]] = -np.cos(ra) * np.sin(dec) * np.cos(dec)
+                H[1, self._index[ra_name]] = -np.sin(ra) * np.sin(dec) * np.cos(dec)
+                H[2, self._index[ra_name]] = np.cos(dec) ** 2
+            if dec_name in self._index:
+                H[0, self._index[dec_name]] = np.sin(ra)
+                H[1, self._index[dec_name]] = -np.cos(ra)
+        return H
+
+    def solve(
+        self, H: Optional[np.ndarray] = None, H_sigma: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray, Optional[float]]:
+        """Solve the stacked normal equations
+
+        Args:
+            H:        Condition equations, one row for each condition.
+            H_sigma:  Standard deviation of each condition.
+
+        Returns:
+            Tuple with solution, covariance matrix and variance factor (None if statistics are not available).
+
+        Raises:
+            numpy.linalg.LinAlgError:  If the constrained normal equations are not positive definite.
+        """
+        N = self.N.copy()
+        if H is not None and len(H):
+            # Minimum constraints, thaller2008: eq 2.58
+            N += H.T @ np.diag(1 / np.asarray(H_sigma) ** 2) @ H
+
+        try:
+            cho = scipy.linalg.cho_factor(N)
+        except scipy.linalg.LinAlgError as err:
+            raise np.linalg.LinAlgError(f"Stacked normal equations are singular: {err}") from None
+        x = scipy.linalg.cho_solve(cho, self.b)
+        N_inv = scipy.linalg.cho_solve(cho, np.eye(len(self.names)))
+
+        variance_factor = None
+        deg_freedom = self.num_obs - self.num_eliminated - len(self.names) + (0 if H is None else len(H))
+        if self.has_statistics and deg_freedom > 0:
+            variance_factor = (self.ltpl - x @ self.b) / deg_freedom
+            log.info(f"Variance factor = {variance_factor:.4f}, degrees of freedom = {deg_freedom:d}")
+        Q_xx = N_inv if variance_factor is None else variance_factor * N_inv
+
+        return x, Q_xx, variance_factor
+
+    def _global_index(self, names: List[str]) -> np.ndarray:
+        """Indices of parameters in the stacked normal equations, adding new parameters as needed"""
+        for name in names:
+            if name not in self._index:
+                self._index[name] = len(self.names)
+                self.names.append(name)
+
+        # Grow the stacked normal equations, doubling the capacity to limit the number of copies
+        n = len(self.names)
+        if n > len(self._b):
+            capacity = max(n, 2 * len(self._b))
+            N, b = np.zeros((capacity, capacity)), np.zeros(capacity)
+            num_old = len(self._b)
+            N[:num_old, :num_old] = self._N
+            b[:num_old] = self._b
+            self._N, self._b = N, b
+
+        return np.array([self._index[n] for n in names], dtype=int)
+
+    def _apriori_difference(self, stacked_names: List[str], T: np.ndarray, apriori: np.ndarray) -> np.ndarray:
+        """Difference between the common apriori values and the apriori values of a session
+
+        Parameters that are new to the stack get the apriori value of the session, and velocities get zero apriori.
+
+        Args:
+            stacked_names:  Names of the parameters in the stacked normal equations.
+            T:              Transformation from stacked parameters to session parameters.
+            apriori:        Apriori values of the session parameters, NaN if unknown.
+
+        Returns:
+            Common apriori values transformed to the session, minus apriori values of the session.
+        """
+        for name, value in zip(stacked_names, apriori):
+            if name in self._apriori or np.isnan(value):
+                continue
+            self._apriori[name] = value
+            velocity_name = None if self.velocity_name is None else self.velocity_name(name)
+            if velocity_name is not None:
+                self._apriori.setdefault(velocity_name, 0.0)
+
+        common = np.array([self._apriori.get(n, np.nan) for n in stacked_names])
+        is_unknown = np.isnan(apriori) | ((T != 0) @ np.isnan(common))
+        dx = T @ np.nan_to_num(common) - apriori
+        dx[is_unknown] = 0
+        return dx
+
+    def _velocity_transformation(self, names: List[str], dt: float) -> Tuple[List[str], np.ndarray]:
+        """Transformation from positions at the session epoch to positions at the reference epoch and velocities
+
+        Args:
+            names:  Names of the parameters of the session.
+            dt:     Session epoch minus reference epoch in years.
+
+        Returns:
+            Tuple with names of the transformed parameters and the transformation matrix.
+        """
+        new_names = list(names)
+        velocity_columns = list()
+        for row, name in enumerate(names):
+            velocity_name = self.velocity_name(name)
+            if velocity_name is not None:
+                velocity_columns.append((row, len(new_names)))
+                new_names.append(velocity_name)
+
+        T = np.zeros((len(names), len(new_names)))
+        T[np.arange(len(names)), np.arange(len(names))] = 1
+        for row, column in velocity_columns:
+            T[row, column] = dt
+        return new_names, T
+
+
+def _solve_local(N_ll: np.ndarray, rhs: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Solve N_ll @ X = rhs for the parameters that are eliminated
+
+    Parameters that are not determined by the session (singular N_ll) are handled with a pseudo-inverse.
+
+    Args:
+        N_ll:  Normal equation matrix of the eliminated parameters.
+        rhs:   Right hand sides, the last column is the right hand side of the normal equations.
+
+    Returns:
+        Tuple with N_ll^-1 @ N_lg and N_ll^-1 @ b_l.
+    """
+    try:
+        X = scipy.linalg.cho_solve(scipy.linalg.cho_factor(N_ll), rhs)
+    except scipy.linalg.LinAlgError:
+        log.debug("Normal equations of eliminated parameters are singular. Using pseudo-inverse.")
+        X = np.linalg.pinv(N_ll) @ rhs
+    return X[:, :-1], X[:, -1]
@@ -20,10 +20,15 @@ from functools import lru_cache
 
 # Third party imports
 import numpy as np
+from scipy import interpolate
 
 # Where imports
 from where.ext import iers_2010 as iers
 
+# Step (in days) of the grid HF2002 is evaluated on when interpolating to densely spaced epochs. The series only has
+# terms with periods of several days or longer, so the interpolation error is far below the accuracy of the series.
+HF2002_GRID_STEP = 1 / 24
+
 
 @lru_cache()
 def ortho_eop(time):
@@ -105,3 +110,31 @@ def rg_zont2(time):
         # Only loop over unique epochs
         _, idx, r_idx = np.unique(np.asarray(time), return_index=True, return_inverse=True)
         return np.array([iers.rg_zont2(t) for t in t_julian_centuries[idx]])[r_idx]
+
+
+@lru_cache()
+def hf2002_iers(time):
+    """Computes TCB-TCG at the geocenter based on the HF2002 series
+
+    The series is only evaluated once for each unique epoch. If the epochs are densely spaced, the series is evaluated
+    on a regular grid with step HF2002_GRID_STEP covering the epochs instead, and interpolated with a cubic spline.
+
+    Args:
+            time:    epochs in TT or TDB time scale (see where.data.time for more info)
+
+    Returns:
+        TCB-TCG (seconds)
+    """
+    if time.size == 1:
+        return iers.hf2002_iers(time.jd)
+
+    # Only evaluate unique epochs
+    jd, r_idx = np.unique(time.jd, return_inverse=True)
+    num_grid = int(np.ceil((jd[-1] - jd[0]) / HF2002_GRID_STEP)) + 5
+    if num_grid >= jd.size:
+        return np.array([iers.hf2002_iers(t) for t in jd])[r_idx]
+
+    # Interpolate from a regular grid, padded with two grid points on each side
+    grid = HF2002_GRID_STEP * np.arange(-2, num_grid - 2)
+    values = np.array([iers.hf2002_iers(t) for t in jd[0] + grid])
+    return interpolate.CubicSpline(grid, values)(jd - jd[0])[r_idx]
@@ -0,0 +1,170 @@
+"""Library for batched computations over the observation epochs of a dataset
+
+Description:
+------------
+
+Many cleaners and rejectors work epoch by epoch, for instance computing dilution of precision (DOP) from the geometry
+of the satellites observed at each epoch. Looping over `dset.unique("time")` and filtering the full dataset for each
+epoch costs O(epochs x observations). Instead, the observations are sorted by epoch once in an :class:`EpochGroups`
+object, and all epochs are handled together with stacked numpy operations:
+
+    groups = epochs.EpochGroups(dset.time)
+    dops = epochs.compute_dops(dset.site_pos.azimuth, dset.site_pos.elevation, groups)
+    rms = groups.broadcast(groups.rms(dset.residual))
+
+Per-epoch values are arrays with one element for each epoch, ordered by time. They are mapped back to one value for
+each observation with :meth:`EpochGroups.broadcast`.
+"""
+
+# Standard library imports
+from typing import Dict
+
+# External library imports
+import numpy as np
+from scipy import stats
+
+# Where imports
+from where.lib import log
+
+
+class EpochGroups:
+    """Observations grouped by epoch
+
+    Args:
+        time:  Time of each observation, either a Time array or an array of numbers.
+    """
+
+    def __init__(self, time: np.ndarray) -> None:
+        if hasattr(time, "jd1") and hasattr(time, "jd2"):
+            keys = (np.atleast_1d(np.asarray(time.jd2)), np.atleast_1d(np.asarray(time.jd1)))
+        else:
+            keys = (np.atleast_1d(np.asarray(time)),)
+        self.num_obs = keys[0].size
+
+        # Sort observations by epoch once
+        self.order = np.lexsort(keys)
+        sorted_keys = [k[self.order] for k in keys]
+        is_new = np.ones(self.num_obs, dtype=bool)
+        if self.num_obs:
+            is_new[1:] = np.any([k[1:] != k[:-1] for k in sorted_keys], axis=0)
+
+        # Epoch of each observation, first observation and number of observations for each epoch
+        epoch_sorted = np.cumsum(is_new) - 1
+        self.epoch_idx = np.empty(self.num_obs, dtype=int)
+        self.epoch_idx[self.order] = epoch_sorted
+        self.first = self.order[is_new]
+        self.counts = np.bincount(epoch_sorted, minlength=is_new.sum())
+        self.num_epochs = self.counts.size
+        self.max_count = self.counts.max() if self.num_epochs else 0
+
+        # Position of each observation within its epoch, used for padding
+        starts = np.flatnonzero(is_new)
+        self.slot = np.empty(self.num_obs, dtype=int)
+        self.slot[self.order] = np.arange(self.num_obs) - starts[epoch_sorted]
+
+    def pad(self, values: np.ndarray, fill: float = np.nan) -> np.ndarray:
+        """Arrange values in an array with one row for each epoch
+
+        Args:
+            values:  Array with one value (or row of values) for each observation.
+            fill:    Value used for padding epochs with fewer observations than the maximum.
+
+        Returns:
+            Array with shape (num_epochs, max_count, ...).
+        """
+        values = np.asarray(values)
+        padded = np.full(
+            (self.num_epochs, self.max_count) + values.shape[1:], fill, dtype=np.result_type(values, fill)
+        )
+        padded[self.epoch_idx, self.slot] = values
+        return padded
+
+    def mask(self) -> np.ndarray:
+        """Boolean array with shape (num_epochs, max_count), True for elements of padded arrays with observations"""
+        return np.arange(self.max_count)[None, :] < self.counts[:, None]
+
+    def broadcast(self, per_epoch: np.ndarray) -> np.ndarray:
+        """Map values for each epoch to each observation"""
+        return np.asarray(per_epoch)[self.epoch_idx]
+
+    def sum(self, values: np.ndarray) -> np.ndarray:
+        """Sum of values for each epoch"""
+        return np.bincount(self.epoch_idx, weights=values, minlength=self.num_epochs)
+
+    def mean(self, values: np.ndarray) -> np.ndarray:
+        """Mean of values for each epoch"""
+        return self.sum(values) / self.counts
+
+    def std(self, values: np.ndarray) -> np.ndarray:
+        """Standard deviation (population) of values for each epoch"""
+        deviation = values - self.broadcast(self.mean(values))
+        return np.sqrt(self.mean(deviation**2))
+
+    def rms(self, values: np.ndarray) -> np.ndarray:
+        """Root mean square of values for each epoch"""
+        return np.sqrt(self.mean(np.square(values)))
+
+
+def compute_dops(az: np.ndarray, el: np.ndarray, groups: EpochGroups) -> Dict[str, np.ndarray]:
+    """Compute dilution of precision (DOP) for all observation epochs
+
+    Vectorized version of `midgard.gnss.compute_dops.compute_dops`. The design matrices of all epochs are assembled in
+    one padded array, where padded rows are zero and do not contribute to the cofactor matrix Q = (H^T H)^-1.
+
+    Args:
+        az:      Satellite azimuth angle for each observation (radians).
+        el:      Satellite elevation angle for each observation (radians).
+        groups:  Observations grouped by epoch.
+
+    Returns:
+        GDOP, PDOP, TDOP, HDOP and VDOP for each observation, NaN for epochs where Q is singular.
+    """
+    az, el = np.asarray(az), np.asarray(el)
+    H = np.stack((-np.cos(el) * np.cos(az), -np.cos(el) * np.sin(az), -np.sin(el), np.ones(el.shape)), axis=1)
+    H_padded = groups.pad(H, fill=0)  # num_epochs x max_count x 4
+    N = np.einsum("eki,ekj->eij", H_padded, H_padded)
+
+    Q = np.full(N.shape, np.nan)
+    # Epochs with fewer than 4 satellites, or degenerate geometry, give (numerically) singular matrices
+    is_invertible = np.linalg.cond(N) < 1 / np.finfo(float).eps if N.size else np.zeros(0, dtype=bool)
+    Q[is_invertible] = np.linalg.inv(N[is_invertible])
+    if not is_invertible.all():
+        log.warn(
+            f"Error by computing the inverse of the co-factor matrix Q (DOP determination) for "
+            f"{np.sum(~is_invertible)} epochs."
+        )
+
+    q = np.diagonal(Q, axis1=1, axis2=2)
+    dops = dict(
+        gdop=np.sqrt(q.sum(axis=1)),
+        pdop=np.sqrt(q[:, :3].sum(axis=1)),
+        tdop=np.sqrt(q[:, 3]),
+        hdop=np.sqrt(q[:, :2].sum(axis=1)),
+        vdop=np.sqrt(q[:, 2]),
+    )
+    return {k: groups.broadcast(v) for k, v in dops.items()}
+
+
+def chi2_test(residuals: np.ndarray, alpha: float, num_params: int, groups: EpochGroups) -> np.ndarray:
+    """Chi-square test of the residuals of each epoch
+
+    Vectorized version of `midgard.gnss.solution_validation.sol_validation`, applied to each epoch.
+
+    Args:
+        residuals:   Residuals, one for each observation.
+        alpha:       Alpha significance level.
+        num_params:  Number of parameters estimated at each epoch.
+        groups:      Observations grouped by epoch.
+
+    Returns:
+        Boolean array, True for each epoch passing the test.
+    """
+    residuals = np.asarray(residuals)
+    deg_freedom = groups.counts - num_params - 1
+    square_sum = groups.sum(residuals**2)
+    with np.errstate(invalid="ignore"):
+        chi_sqr = stats.chi2.ppf(1 - alpha, df=np.maximum(deg_freedom, 0))
+    passed = (deg_freedom >= 0) & ~(square_sum > chi_sqr)
+    if np.any(deg_freedom < 0):
+        log.warn(f"Chi-square test not passed for {np.sum(deg_freedom < 0)} epochs with degree of freedom < 0")
+    return passed
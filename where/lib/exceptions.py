@@ -34,6 +34,10 @@ class FieldDoesNotExistError(WhereException):
     pass
 
 
+class DatasetFileChangedError(WhereException):
+    pass
+
+
 class MissingDataError(WhereException):
     pass
 
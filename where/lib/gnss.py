@@ -24,6 +24,7 @@ get_initial_flight_time(dset, sat_clock_corr=None, rel_clock_corr=None)  -> Midg
 get_line_of_sight(dset)                        -> Midgard: Position library
 get_rinex_file_version(file_key, file_vars)    -> Is that needed in the future?
 linear_combination(dset)                       -> Midgard: gnss
+satellite_arcs(dset, max_gap)                  -> Midgard: gnss
 llh2xyz(lat, lon, h)                           -> midgard.math.transformation.llh2trs
 plot_skyplot(dset)                             -> Midgard: plot
 
@@ -311,14 +312,68 @@ def get_rinex_file_version(file_key=None, file_vars=None, file_path=None):
     return version, file_path
 
 
-def linear_combination(type_: str, dset: "Dataset") -> Dict[str, Dict[str, Any]]:
+class SystemObservations:
+    """Observations of all GNSS gathered by their position in the meta variable 'obstypes'
+
+    The observation types used for a linear combination depend on the GNSS, for instance `C1C` for GPS and `C1X` for
+    Galileo. The observations are gathered once for all systems, so that linear combinations are calculated for all
+    observations in one pass with coefficients given for each observation.
+
+    NOTE: The GNSS observation types defined in meta variable 'obstypes' has a defined order, which is determined by
+          the given observation types for each GNSS and the priority list.
+
+    Args:
+        dset:    Dataset
+    """
+
+    def __init__(self, dset: "Dataset") -> None:
+        self.dset = dset
+        self.systems, sys_idx = np.unique(dset.system, return_inverse=True)
+        self._idx = {sys: sys_idx == num for num, sys in enumerate(self.systems)}
+        self._sys_idx = sys_idx
+        self._values = dict()
+
+    def require(self, num_obstypes: int, message: str) -> None:
+        """Check that each GNSS has at least the given number of observation types
+
+        Raises:
+            ValueError:  If a GNSS has fewer observation types.
+        """
+        if any(len(self.dset.meta["obstypes"][sys]) < num_obstypes for sys in self.systems):
+            raise ValueError(message)
+
+    def obstypes(self, obs_num: int) -> Dict[str, str]:
+        """Observation type at the given position in 'obstypes' for each GNSS"""
+        return {sys: self.dset.meta["obstypes"][sys][obs_num] for sys in self.systems}
+
+    def values(self, obs_num: int) -> np.ndarray:
+        """Observations of the observation type at the given position in 'obstypes' of each GNSS"""
+        if obs_num not in self._values:
+            values = np.zeros(self.dset.num_obs)
+            for sys, obstype in self.obstypes(obs_num).items():
+                idx = self._idx[sys]
+                values[idx] = self.dset.obs[obstype][idx]
+            self._values[obs_num] = values
+        return self._values[obs_num]
+
+    def freq(self, obs_num: int) -> np.ndarray:
+        """Frequency of the observation type at the given position in 'obstypes' for each observation"""
+        obstypes = self.obstypes(obs_num)
+        sys_freq = [getattr(enums, "gnss_freq_" + sys)["f" + obstypes[sys][1]] for sys in self.systems]
+        return np.array(sys_freq, dtype=float)[self._sys_idx]
+
+
+def linear_combination(
+    type_: str, dset: "Dataset", system_obs: SystemObservations = None
+) -> Dict[str, Dict[str, Any]]:
     """Calculate linear combination of observations for given linear combination type and same observation type
     (code, phase, doppler, snr)
 
     Args:
-        dset:    Dataset
-        type_:   Type of linear combination, which can be 'geometry_free', 'ionosphere_free', 'narrow_lane' or 
-                 'wide_lane'.
+        dset:        Dataset
+        type_:       Type of linear combination, which can be 'geometry_free', 'ionosphere_free', 'narrow_lane' or
+                     'wide_lane'.
+        system_obs:  Observations gathered for all GNSS, can be shared between several linear combinations.
 
     Returns:
         Dictionary with observation type as key (code, phase, doppler and/or snr) and dictionary with array with 
@@ -330,168 +385,151 @@ def linear_combination(type_: str, dset: "Dataset") -> Dict[str, Dict[str, Any]]
         "narrow_lane": narrowlane_linear_combination,
         "wide_lane": widelane_linear_combination,
     }
+    if type_ not in func:
+        log.fatal(f"Linear combination '{type_}' is not defined.")
+    system_obs = SystemObservations(dset) if system_obs is None else system_obs
 
-    cfg_obs_code = config.tech.gnss_select_obs.obs_code.list
     linear_comb = dict()
-    for obs_code in cfg_obs_code:
-        linear_comb[obs_code] = dict(val = np.zeros(dset.num_obs))
-
-    for sys in dset.unique("system"):
-        idx = dset.filter(system=sys)
-
-        # Get observations for the 1st and 2nd frequency
-        #
-        # NOTE: The GNSS observation types defined in meta variable 'obstypes' has a defined order, which is determined
-        #       by the given observation types for each GNSS and the priority list.
-        #
-        obs_num = 0
-        for obs_code in cfg_obs_code:
-
-            obs_1 = dset.meta["obstypes"][sys][obs_num]
-            obs_2 = dset.meta["obstypes"][sys][obs_num + 1]
-            linear_comb[obs_code].setdefault("sys_obs", dict()).update({sys: [obs_1, obs_2]})
-
-            log.debug(
-                f"Generate {type_} combination for GNSS '{sys}' and {obs_code} observations {obs_1} and {obs_2}."
+    for num, obs_code in enumerate(config.tech.gnss_select_obs.obs_code.list):
+        obs_num = 2 * num
+        obs_1, obs_2 = system_obs.obstypes(obs_num), system_obs.obstypes(obs_num + 1)
+        sys_obs = {sys: [obs_1[sys], obs_2[sys]] for sys in system_obs.systems}
+        log.debug(f"Generate {type_} combination for {obs_code} observations {sys_obs}.")
+
+        if type_ == "geometry_free":
+            val = func[type_](system_obs.values(obs_num), system_obs.values(obs_num + 1))
+        else:
+            val = func[type_](
+                system_obs.values(obs_num),
+                system_obs.values(obs_num + 1),
+                system_obs.freq(obs_num),
+                system_obs.freq(obs_num + 1),
             )
-
-            if type_ == "geometry_free":
-                linear_comb[obs_code]["val"][idx] = func[type_](dset.obs[obs_1][idx], dset.obs[obs_2][idx])
-            else:
-                f1 = getattr(enums, "gnss_freq_" + sys)["f" + obs_1[1]]  # Frequency of 1st band
-                f2 = getattr(enums, "gnss_freq_" + sys)["f" + obs_2[1]]  # Frequency of 2nd band
-                log.debug(
-                    f"Frequencies for {type_} combination: f1 = {f1} Hz ({obs_1}), f2 = {f2} Hz ({obs_2})."
-                )
-
-                try:
-                    linear_comb[obs_code]["val"][idx] = func[type_](dset.obs[obs_1][idx], dset.obs[obs_2][idx], f1, f2)
-                except KeyError:
-                    log.fatal(f"Linear combination 'type_' is not defined.")
-
-            obs_num += 2
+        linear_comb[obs_code] = dict(val=val, sys_obs=sys_obs)
 
     return linear_comb
 
 
-def linear_combination_cmc(dset: "Dataset") -> Tuple[Dict[str, Any], Dict[str, Any]]:
+def linear_combination_cmc(
+    dset: "Dataset", system_obs: SystemObservations = None
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
     """Calculate code multipath linear combination (CMC) based on code and phase observations
 
     Args:
-        dset:    Dataset
+        dset:        Dataset
+        system_obs:  Observations gathered for all GNSS, can be shared between several linear combinations.
 
     Returns:
         Tuple with code multipath linear combination for frequency 1 and 2 in [m]. Each code linear combination is
         saved in a dictionary with value of linear combination and name of combined observations.
     """
-    cmc1 = dict(val = np.zeros(dset.num_obs))
-    cmc2 = dict(val = np.zeros(dset.num_obs))
-
-    for sys in dset.unique("system"):
-        
-        if len(dset.meta["obstypes"][sys]) < 4:
-            raise ValueError(f"Dual-frequency code and phase observations are needed for code multipath linear "
-                             f"combination.")
-        
-        idx = dset.filter(system=sys)
-        
-        # Get observations for the 1st and 2nd frequency
-        #
-        # NOTE: The GNSS observation types defined in meta variable 'obstypes' has a defined order, which is determined
-        #       by the given observation types for each GNSS and the priority list.
-        #
-        code1 = dset.meta["obstypes"][sys][0]
-        code2 = dset.meta["obstypes"][sys][1]
-        phase1 = dset.meta["obstypes"][sys][2]
-        phase2 = dset.meta["obstypes"][sys][3]
-        cmc1.setdefault("sys_obs", dict()).update({sys: [code1, phase1, phase2]})
-        cmc2.setdefault("sys_obs", dict()).update({sys: [code2, phase2, phase1]})
-
-        f1 = getattr(enums, "gnss_freq_" + sys)["f" + code1[1]]  # Frequency of 1st band
-        f2 = getattr(enums, "gnss_freq_" + sys)["f" + code2[1]]  # Frequency of 2nd band
-
-        cmc1["val"][idx], cmc2["val"][idx] = code_multipath_linear_combination(
-            dset.obs[code1][idx], dset.obs[code2][idx], dset.obs[phase1][idx], dset.obs[phase2][idx], f1, f2
-        )
+    system_obs = SystemObservations(dset) if system_obs is None else system_obs
+    system_obs.require(
+        4, "Dual-frequency code and phase observations are needed for code multipath linear combination."
+    )
+    code1, code2, phase1, phase2 = (system_obs.obstypes(num) for num in range(4))
 
+    val1, val2 = code_multipath_linear_combination(
+        *(system_obs.values(num) for num in range(4)), system_obs.freq(0), system_obs.freq(1)
+    )
+    cmc1 = dict(val=val1, sys_obs={sys: [code1[sys], phase1[sys], phase2[sys]] for sys in system_obs.systems})
+    cmc2 = dict(val=val2, sys_obs={sys: [code2[sys], phase2[sys], phase1[sys]] for sys in system_obs.systems})
     return cmc1, cmc2
 
 
-def code_phase_difference(dset: "Dataset") -> Tuple[Dict[str, Any], Dict[str, Any]]:
+def code_phase_difference(
+    dset: "Dataset", system_obs: SystemObservations = None
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
     """Calculate code-phase difference based on code and phase observations
 
     Args:
-        dset:    Dataset
+        dset:        Dataset
+        system_obs:  Observations gathered for all GNSS, can be shared between several linear combinations.
 
     Returns:
         Tuple with code-phase difference for frequency 1 and 2 in [m]. Each code-phase difference is saved in a 
         dictionary with value of linear combination and name of combined observations.
     """
-    code_phase_1 = dict(val = np.zeros(dset.num_obs))
-    code_phase_2 = dict(val = np.zeros(dset.num_obs))
-
-    for sys in dset.unique("system"):
-        
-        # TODO: This is not correct for single-frequency solutions. 
-        if len(dset.meta["obstypes"][sys]) < 4:
-            raise ValueError(f"Dual-frequency code and phase observations are needed for code-phase difference.")
-        
-        idx = dset.filter(system=sys)
-        
-        # Get observations for the 1st and 2nd frequency
-        #
-        # NOTE: The GNSS observation types defined in meta variable 'obstypes' has a defined order, which is determined
-        #       by the given observation types for each GNSS and the priority list.
-        #
-        code1 = dset.meta["obstypes"][sys][0]
-        code2 = dset.meta["obstypes"][sys][1]
-        phase1 = dset.meta["obstypes"][sys][2]
-        phase2 = dset.meta["obstypes"][sys][3]
-        code_phase_1.setdefault("sys_obs", dict()).update({sys: [code1, phase1]})
-        code_phase_2.setdefault("sys_obs", dict()).update({sys: [code2, phase2]})
-
-        code_phase_1["val"][idx] = dset.obs[code1][idx] - dset.obs[phase1][idx]
-        code_phase_2["val"][idx] = dset.obs[code1][idx] - dset.obs[phase1][idx]
-
+    system_obs = SystemObservations(dset) if system_obs is None else system_obs
+    # TODO: This is not correct for single-frequency solutions.
+    system_obs.require(4, "Dual-frequency code and phase observations are needed for code-phase difference.")
+    code1, code2, phase1, phase2 = (system_obs.obstypes(num) for num in range(4))
+
+    code_phase_1 = dict(
+        val=system_obs.values(0) - system_obs.values(2),
+        sys_obs={sys: [code1[sys], phase1[sys]] for sys in system_obs.systems},
+    )
+    code_phase_2 = dict(
+        val=system_obs.values(1) - system_obs.values(3),
+        sys_obs={sys: [code2[sys], phase2[sys]] for sys in system_obs.systems},
+    )
     return code_phase_1, code_phase_2
 
 
-def linear_combination_melbourne(dset: "Dataset") -> Dict[str, Any]:
+def linear_combination_melbourne(dset: "Dataset", system_obs: SystemObservations = None) -> Dict[str, Any]:
     """Calculate Melbourne-Wübbena linear combination based on code and phase observations
 
     Args:
-        dset:    Dataset
+        dset:        Dataset
+        system_obs:  Observations gathered for all GNSS, can be shared between several linear combinations.
 
     Returns:
         Melbourne-Wübbena linear combination
     """
-    linear_comb = dict(val = np.zeros(dset.num_obs))
+    system_obs = SystemObservations(dset) if system_obs is None else system_obs
+    system_obs.require(4, "Two code and two phase observations are needed for Melbourne-Wübbena linear combination.")
+    obstypes = [system_obs.obstypes(num) for num in range(4)]
 
-    for sys in dset.unique("system"):
-        idx = dset.filter(system=sys)
-        
-        if len(dset.meta["obstypes"][sys]) < 4:
-            raise ValueError("Two code and two phase observations are needed for Melbourne-Wübbena linear combination.")
-
-        # Get observations for the 1st and 2nd frequency
-        #
-        # NOTE: The GNSS observation types defined in meta variable 'obstypes' has a defined order, which is determined
-        #       by the given observation types for each GNSS and the priority list.
-        #
-        code1 = dset.meta["obstypes"][sys][0]
-        code2 = dset.meta["obstypes"][sys][1]
-        phase1 = dset.meta["obstypes"][sys][2]
-        phase2 = dset.meta["obstypes"][sys][3]
-        linear_comb.setdefault("sys_obs", dict()).update({sys: [code1, code2, phase1, phase2]})
-
-        f1 = getattr(enums, "gnss_freq_" + sys)["f" + code1[1]]  # Frequency of 1st band
-        f2 = getattr(enums, "gnss_freq_" + sys)["f" + code2[1]]  # Frequency of 2nd band
-
-        linear_comb["val"][idx] = melbourne_linear_combination(
-            dset.obs[code1][idx], dset.obs[code2][idx], dset.obs[phase1][idx], dset.obs[phase2][idx], f1, f2
-        )
+    val = melbourne_linear_combination(
+        *(system_obs.values(num) for num in range(4)), system_obs.freq(0), system_obs.freq(1)
+    )
+    return dict(val=val, sys_obs={sys: [o[sys] for o in obstypes] for sys in system_obs.systems})
 
-    return linear_comb
+
+def satellite_arcs(dset: "Dataset", max_gap: float = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Sort observations by satellite and time, and detect breaks in the arc of each satellite
+
+    Args:
+        dset:     Dataset
+        max_gap:  Maximal time between consecutive observations of a satellite within an arc in [s]. No limit if None.
+
+    Returns:
+        Tuple with sort order of the observations, and boolean array which for each observation in sorted order is
+        True if the observation continues the arc of the previous observation.
+    """
+    time = dset.time.gps.mjd
+    order = np.lexsort((time, dset.satellite, dset.system))
+    satellite, system, time = dset.satellite[order], dset.system[order], time[order]
+
+    is_continued = np.zeros(dset.num_obs, dtype=bool)
+    is_continued[1:] = (satellite[1:] == satellite[:-1]) & (system[1:] == system[:-1])
+    if max_gap is not None:
+        is_continued[1:] &= np.diff(time) * 86400 <= max_gap
+
+    return order, is_continued
+
+
+def epoch_by_epoch_difference(values: np.ndarray, order: np.ndarray, is_continued: np.ndarray) -> np.ndarray:
+    """Difference between consecutive observations of the same satellite arc
+
+    The first observation of each arc is not differenced, and set to NaN.
+
+    Args:
+        values:        Observation array, either with one value or one row of values for each observation.
+        order:         Sort order of observations by satellite and time, see `satellite_arcs`.
+        is_continued:  True for observations in sorted order continuing the arc of the previous observation.
+
+    Returns:
+        Epoch by epoch differences in the original order of the observations.
+    """
+    sorted_values = np.asarray(values, dtype=float)[order]
+    sorted_diff = np.full(sorted_values.shape, np.nan)
+    sorted_diff[1:] = sorted_values[1:] - sorted_values[:-1]
+    sorted_diff[~is_continued] = np.nan
+
+    diff = np.empty(sorted_diff.shape)
+    diff[order] = sorted_diff
+    return diff
 
 
 def code_multipath_linear_combination(
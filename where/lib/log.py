@@ -37,6 +37,22 @@ for level in enums.get_enum("log_level"):
     globals()[level.name] = functools.partial(mg_log.log, level=level.name)
 
 
+def flush():
+    """Flush the files of all active file loggers"""
+    for logger in mg_log._ACTIVE_LOGGERS.values():
+        if hasattr(logger, "fid"):
+            logger.fid.flush()
+
+
+def reset():
+    """Deactivate all loggers
+
+    Used in forked processes, which should not write to the log files of the parent process. Call `flush` in the
+    parent before forking.
+    """
+    mg_log._ACTIVE_LOGGERS.clear()
+
+
 # Overwrite log.fatal to raise an exception
 def fatal(log_text):
     mg_log.log(log_text, "fatal")
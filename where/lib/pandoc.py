@@ -0,0 +1,215 @@
+"""Where library module for converting markdown reports with pandoc
+
+Example:
+--------
+
+    >>> from where.lib import pandoc
+    >>> pandoc.queue_markdown(path)    # Convert in background or defer conversion to end of where_runner batch
+    >>> pandoc.wait()                  # Wait until all queued conversions are finished
+
+Description:
+------------
+
+Report writers produce markdown files, which are converted to PDF (or HTML) with pandoc. The conversion is done by
+calling pandoc with a proper argument list, capturing the output of pandoc for error messages. How the conversion is
+done is configured in the [report] section of the Where configuration:
+
+    conversion         How markdown files are converted:
+                         direct:      Convert immediately and wait for pandoc to finish.
+                         background:  Convert by a bounded pool of worker threads, while Where continues. The
+                                      program waits for outstanding conversions before it exits.
+                         batch:       Defer conversion to the end of a where_runner batch. If Where is not started
+                                      by where_runner, the conversion is done in the background.
+    conversion_processes  Maximal number of pandoc processes running at the same time.
+    format             Output format of the reports, either 'pdf' or 'html' (fast preview without LaTeX).
+
+In batch mode, where_runner defines the environment variable given by BATCH_QUEUE_ENV, which points to a directory
+where each Where process stores a small JSON job file for each report. The runner converts all jobs when the batch is
+finished using `convert_batch`.
+"""
+
+# Standard library imports
+import atexit
+from concurrent import futures
+import json
+import os
+import pathlib
+import subprocess
+import threading
+import time
+from typing import List, Union
+
+# Where imports
+from where.lib import config
+from where.lib import log
+
+PROGRAM = "pandoc"
+BATCH_QUEUE_ENV = "WHERE_REPORT_QUEUE"
+
+# Background conversion pool, created when first needed
+_EXECUTOR = None
+_FUTURES = list()
+_LOCK = threading.Lock()
+
+
+def pandoc_args(markdown_path: Union[str, pathlib.PosixPath], to: str = "pdf") -> List[str]:
+    """Command line arguments for converting a markdown file with pandoc
+
+    Args:
+        markdown_path:  Path to markdown file.
+        to:             Output format, 'pdf' or 'html'.
+
+    Returns:
+        Argument list, including the program name.
+    """
+    markdown_path = pathlib.Path(markdown_path)
+    output_path = markdown_path.with_suffix(f".{to}")
+    if to == "pdf":
+        options = ["-V", "classoption:twoside", "-N"]
+    elif to == "html":
+        options = ["-s", "-N"]
+    else:
+        log.fatal(f"Report format {to!r} is unknown. Use 'pdf' or 'html'.")
+
+    return [PROGRAM, "-f", "markdown", *options, "-o", str(output_path), str(markdown_path)]
+
+
+def convert(markdown_path: Union[str, pathlib.PosixPath], to: Union[str, None] = None) -> bool:
+    """Convert a markdown file with pandoc and wait for the conversion to finish
+
+    Args:
+        markdown_path:  Path to markdown file.
+        to:             Output format, 'pdf' or 'html'. Default is read from configuration.
+
+    Returns:
+        True if the conversion succeeded, False otherwise.
+    """
+    to = _report_format() if to is None else to
+    args = pandoc_args(markdown_path, to=to)
+    log.info(f"Start: {' '.join(args)}")
+    try:
+        process = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    except OSError as err:
+        log.error(f"{PROGRAM} could not be started ({' '.join(args)}): {err}")
+        return False
+
+    if process.returncode:
+        error_msg = process.stderr.strip().split("\n")[-1] if process.stderr.strip() else ""
+        log.error(f"{PROGRAM} failed with error code {process.returncode} ({' '.join(args)}): {error_msg}")
+        return False
+
+    log.info(f"Finish: {args[args.index('-o') + 1]}")
+    return True
+
+
+def queue_markdown(markdown_path: Union[str, pathlib.PosixPath], to: Union[str, None] = None) -> None:
+    """Queue a markdown file for conversion with pandoc
+
+    Depending on the configured conversion mode the file is converted directly, in the background or at the end of a
+    where_runner batch.
+
+    Args:
+        markdown_path:  Path to markdown file.
+        to:             Output format, 'pdf' or 'html'. Default is read from configuration.
+    """
+    to = _report_format() if to is None else to
+    mode = config.where.report.get("conversion", default="background").str
+
+    if mode == "direct":
+        convert(markdown_path, to=to)
+    elif mode == "batch" and os.environ.get(BATCH_QUEUE_ENV):
+        _write_batch_job(pathlib.Path(os.environ[BATCH_QUEUE_ENV]), markdown_path, to)
+    elif mode in ("background", "batch"):
+        _submit(markdown_path, to)
+    else:
+        log.fatal(f"Report conversion mode {mode!r} is unknown. Use 'direct', 'background' or 'batch'.")
+
+
+def wait() -> int:
+    """Wait for all background conversions to finish
+
+    Returns:
+        Number of failed conversions.
+    """
+    with _LOCK:
+        pending, _FUTURES[:] = list(_FUTURES), list()
+
+    return sum(not future.result() for future in pending)
+
+
+def convert_batch(queue_dir: Union[str, pathlib.PosixPath], num_processes: Union[int, None] = None) -> int:
+    """Convert all markdown files queued in a batch directory
+
+    The job files are removed after conversion.
+
+    Args:
+        queue_dir:      Directory containing JSON job files.
+        num_processes:  Maximal number of pandoc processes running at the same time.
+
+    Returns:
+        Number of failed conversions.
+    """
+    job_paths = sorted(pathlib.Path(queue_dir).glob("*.json"))
+    if not job_paths:
+        return 0
+
+    jobs = list()
+    for job_path in job_paths:
+        try:
+            with open(job_path, mode="rt") as fid:
+                jobs.append(json.load(fid))
+        except (OSError, ValueError) as err:
+            log.error(f"Could not read report job {job_path}: {err}")
+        job_path.unlink()
+
+    num_processes = _num_processes() if num_processes is None else num_processes
+    log.info(f"Converting {len(jobs)} queued reports with {num_processes} {PROGRAM} processes")
+    with futures.ThreadPoolExecutor(max_workers=num_processes) as executor:
+        results = list(executor.map(lambda j: convert(j["markdown_path"], to=j["to"]), jobs))
+
+    return results.count(False)
+
+
+def _submit(markdown_path: Union[str, pathlib.PosixPath], to: str) -> None:
+    """Submit conversion to the background pool
+
+    Args:
+        markdown_path:  Path to markdown file.
+        to:             Output format, 'pdf' or 'html'.
+    """
+    global _EXECUTOR
+
+    with _LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = futures.ThreadPoolExecutor(max_workers=_num_processes(), thread_name_prefix=PROGRAM)
+            atexit.register(wait)
+        _FUTURES.append(_EXECUTOR.submit(convert, markdown_path, to))
+
+
+def _write_batch_job(queue_dir: pathlib.PosixPath, markdown_path: Union[str, pathlib.PosixPath], to: str) -> None:
+    """Store a conversion job, which is done at the end of the where_runner batch
+
+    Args:
+        queue_dir:      Directory containing JSON job files.
+        markdown_path:  Path to markdown file.
+        to:             Output format, 'pdf' or 'html'.
+    """
+    markdown_path = pathlib.Path(markdown_path).resolve()
+    job_path = queue_dir / f"{os.getpid()}_{time.time_ns()}_{markdown_path.stem}.json"
+    tmp_path = job_path.with_suffix(".tmp")
+
+    queue_dir.mkdir(parents=True, exist_ok=True)
+    with open(tmp_path, mode="wt") as fid:
+        json.dump(dict(markdown_path=str(markdown_path), to=to), fid)
+    os.replace(tmp_path, job_path)
+    log.info(f"Queued {markdown_path} for conversion at end of batch")
+
+
+def _num_processes() -> int:
+    """Maximal number of pandoc processes running at the same time"""
+    return max(config.where.report.get("conversion_processes", default=2).int, 1)
+
+
+def _report_format() -> str:
+    """Output format of reports"""
+    return config.where.report.get("format", default="pdf").str
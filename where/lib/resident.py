@@ -0,0 +1,179 @@
+"""Where library module for running analyses in forked worker processes
+
+Example:
+--------
+
+    >>> from where.lib import resident
+    >>> resident.preload(["where.apriori", "where.parsers"])
+    >>> resident.run(["where", "2015", "8", "4", "--vlbi", "--session_code=R1699"], check=True)
+
+Description:
+------------
+
+Starting a new Python interpreter for each analysis means that NumPy, SciPy, Midgard and all Where plugins are
+imported again for each session. For short analyses (VLBI intensives, hourly GNSS runs) this startup is often more
+expensive than the processing itself.
+
+In resident mode, where_runner works as a fork server: the runner imports the Where modules and plugins once, and
+each analysis runs in a child process forked from the runner. The child gets a copy of the warm runner process, but
+all changes done by the analysis (configuration, log files, caches) are local to the child and disappear when the
+child exits. Analyses are therefore isolated from each other in the same way as when started as separate programs.
+
+Data shared between analyses, like parsed apriori files, are reused through the persistent parse and apriori caches
+(see :mod:`where.parsers._parse_cache` and :mod:`where.apriori._cache`).
+"""
+
+# Standard library imports
+import atexit
+import importlib
+import os
+import subprocess
+import sys
+import tempfile
+import traceback
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Midgard imports
+from midgard.dev import plugins
+
+# Where imports
+from where.lib import log
+
+
+def is_available() -> bool:
+    """Check if resident mode is available on this platform"""
+    return hasattr(os, "fork")
+
+
+def preload(package_names: List[str]) -> None:
+    """Import the Where program and packages with all their plugins
+
+    Packages that fail to import are skipped with a warning, the analyses will report the error when they need them.
+
+    Args:
+        package_names:  Names of packages, for instance where.models.delay.
+    """
+    importlib.import_module("where.__main__")  # Imported at run time to avoid circular import
+    for package_name in package_names:
+        try:
+            importlib.import_module(package_name)
+            num_plugins = len(plugins.names(package_name=package_name))
+        except Exception as err:
+            log.warn(f"Could not preload {package_name}: {err}")
+        else:
+            log.debug(f"Preloaded {package_name} with {num_plugins} plugins")
+
+
+def run(cmd: List[str], env: Optional[Dict[str, str]] = None, check: bool = False) -> subprocess.CompletedProcess:
+    """Run a Where analysis in a forked child process
+
+    The interface mimics `subprocess.run` with captured stdout and stderr.
+
+    Args:
+        cmd:    Command line of the analysis, including the program name.
+        env:    Environment of the analysis. Default is the environment of the runner.
+        check:  Raise CalledProcessError if the analysis fails.
+
+    Returns:
+        Completed process with return code, stdout and stderr (as bytes).
+    """
+    with tempfile.TemporaryFile() as stdout, tempfile.TemporaryFile() as stderr:
+        # Flush buffers, so that the child does not write copies of buffered output
+        log.flush()
+        sys.stdout.flush()
+        sys.stderr.flush()
+
+        pid = os.fork()
+        if pid == 0:
+            _run_child(cmd, env, stdout.fileno(), stderr.fileno())  # Never returns
+
+        _, status = os.waitpid(pid, 0)
+        returncode = os.waitstatus_to_exitcode(status)
+        stdout.seek(0)
+        stderr.seek(0)
+        process = subprocess.CompletedProcess(cmd, returncode, stdout.read(), stderr.read())
+
+    if check:
+        process.check_returncode()
+    return process
+
+
+def _run_child(cmd: List[str], env: Optional[Dict[str, str]], stdout_fd: int, stderr_fd: int) -> None:
+    """Run Where in the forked child process and exit
+
+    Args:
+        cmd:        Command line, including the program name.
+        env:        Environment of the analysis.
+        stdout_fd:  File descriptor where stdout is written.
+        stderr_fd:  File descriptor where stderr is written.
+    """
+    returncode = 1
+    try:
+        os.dup2(stdout_fd, sys.stdout.fileno())
+        os.dup2(stderr_fd, sys.stderr.fileno())
+        if env is not None:
+            os.environ.clear()
+            os.environ.update(env)
+
+        # Start with a clean slate: no runner loggers. Exit handlers of the runner are not run, since the child exits
+        # with os._exit, while exit handlers registered by the analysis are run before exiting
+        log.reset()
+        exit_funcs = _track_exit_funcs()
+        sys.argv = list(cmd)
+
+        from where import __main__ as where_main  # Local import to avoid circular import
+
+        try:
+            where_main.main()
+            returncode = 0
+        except SystemExit as err:
+            returncode = err.code if isinstance(err.code, int) else (0 if err.code is None else 1)
+            if err.code is not None and not isinstance(err.code, int):
+                print(err.code, file=sys.stderr)
+        finally:
+            _run_exit_funcs(exit_funcs)
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        log.flush()
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(returncode)
+
+
+def _track_exit_funcs() -> List[Tuple[Callable, Tuple[Any, ...], Dict[str, Any]]]:
+    """Keep track of exit handlers registered by the analysis
+
+    Handlers registered with atexit are only run when the interpreter exits normally. The child exits with os._exit,
+    so handlers registered by the analysis are recorded instead, and run by :func:`_run_exit_funcs`.
+
+    Returns:
+        List that registered handlers are added to, with arguments.
+    """
+    exit_funcs = list()
+
+    def register(func: Callable, *args: Any, **kwargs: Any) -> Callable:
+        exit_funcs.append((func, args, kwargs))
+        return func
+
+    def unregister(func: Callable) -> None:
+        exit_funcs[:] = [exit_func for exit_func in exit_funcs if exit_func[0] != func]
+
+    atexit.register = register
+    atexit.unregister = unregister
+    return exit_funcs
+
+
+def _run_exit_funcs(exit_funcs: List[Tuple[Callable, Tuple[Any, ...], Dict[str, Any]]]) -> None:
+    """Run exit handlers in the opposite order of registration, like atexit does at interpreter exit
+
+    Args:
+        exit_funcs:  Handlers with arguments, as recorded by :func:`_track_exit_funcs`.
+    """
+    while exit_funcs:
+        func, args, kwargs = exit_funcs.pop()
+        try:
+            func(*args, **kwargs)
+        except Exception:
+            print("Error in exit handler:", file=sys.stderr)
+            traceback.print_exc()
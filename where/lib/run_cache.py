@@ -0,0 +1,365 @@
+"""Content-based dependency checks and cache of stage results
+
+Description:
+------------
+
+Each stage of a pipeline records its dependencies (input files, the configuration and the dependencies of the
+previous stage) in a depends file. A stage is only run again if one of these dependencies has changed. With the
+`content_hash` option in the [run_cache] section of the Where configuration, md5 checksums are stored in addition to
+the timestamps, and a file with a new timestamp only counts as changed if its content has changed. Copying or
+touching files does then not force a rerun.
+
+If the `enabled` option is set, stages that do have to run are first looked up in the run cache, a directory that can
+be shared by several users and work directories. A cache entry contains the dataset files written by a stage, and is
+keyed by
+
+    * the Where version, pipeline, stage, rundate and dataset variables (except user and analysis id),
+    * the content of the analysis configuration,
+    * the key of the previous stage, so that the key identifies the whole chain of stages up to this stage,
+    * the names and md5 checksums of the input files read by the stage.
+
+The input files of a stage are only known after the stage has run. They are therefore stored in a manifest keyed by
+the first three parts above, and their current checksums are used to complete the key before the next lookup. Paths in
+the manifest are stored relative to the path variables of the file configuration, like `{path_data}`, so that each
+user looks up the cache with the checksums of their own input files. The key of each stage is stored in the analysis
+directory, and used by the following stages.
+
+Stages listed in the `skip_stages` option, typically stages writing output files, are never restored from the cache.
+When the cache grows beyond the `max_size` option, the entries that were least recently stored or restored are
+deleted.
+"""
+
+# Standard library imports
+import hashlib
+import json
+import os
+import pathlib
+import shutil
+from typing import Any, Dict, List, Optional, Tuple
+
+# Third party imports
+import h5py
+
+# Midgard imports
+from midgard.config.config import Configuration
+from midgard.files import dependencies
+
+# Where imports
+import where
+from where.lib import config
+from where.lib import log
+
+# Bump if the layout of the cache entries change
+CACHE_VERSION = "1"
+
+# Labels of dependencies that are not input files of a stage
+_NOT_INPUTS = {"depends", "config", "CRASHED"}
+
+
+def use_content_hash() -> bool:
+    """Whether dependencies are checked using md5 checksums of the file contents"""
+    return config.where.run_cache.get("content_hash", default=True).bool
+
+
+def changed(dep_path: pathlib.Path, all_reasons: bool = False) -> List[str]:
+    """Check if the dependencies of a stage have changed
+
+    Files whose timestamp have changed are compared by md5 checksum if a checksum was stored in the depends file.
+
+    Args:
+        dep_path:     Path to depends file.
+        all_reasons:  Check all dependencies, instead of stopping at the first changed one.
+
+    Returns:
+        Descriptions of the changed dependencies, empty if no dependency has changed.
+    """
+    dep_path = pathlib.Path(dep_path)
+    if not dep_path.exists():
+        return [f"Dependency file {dep_path} does not exist"]
+
+    reasons = list()
+    deps = Configuration.read_from_file("dependencies", dep_path)
+    for file_path in deps.section_names:
+        info = deps[file_path].as_dict()
+        if file_path == "CRASHED":
+            reasons.append(f"Previous run crashed at {info.get('timestamp')}")
+        elif dependencies.get_timestamp(file_path) != info.get("timestamp"):
+            checksum = info.get("checksum")
+            if checksum == info.get("timestamp") or dependencies.get_md5(file_path) != checksum:
+                reasons.append(f"Dependency {file_path} ({info.get('label') or 'no label'}) changed")
+
+        if reasons and not all_reasons:
+            break
+
+    return reasons
+
+
+class StageCache:
+    """Cache of the results of one stage
+
+    Args:
+        rundate:     Rundate of analysis.
+        pipeline:    Pipeline used for analysis.
+        stage:       Name of stage.
+        prev_stage:  Name of previous stage, None for the first stage.
+        dset_args:   Dataset variables, for instance session_code or station.
+    """
+
+    def __init__(self, rundate, pipeline: str, stage: str, prev_stage: Optional[str], **dset_args: str) -> None:
+        self.rundate = rundate
+        self.pipeline = pipeline
+        self.stage = stage
+        self.dset_args = dset_args
+        self.key = None
+        self.reasons: List[str] = list()
+
+        # Key before inputs are known. This is None if the key of the previous stage is unknown
+        self.pre_key = self._pre_key(prev_stage)
+
+    @property
+    def enabled(self) -> bool:
+        """Whether results of this stage are stored in and restored from the cache"""
+        skip_stages = config.where.run_cache.get("skip_stages", default="").list
+        return config.where.run_cache.get("enabled", default=False).bool and self.stage not in skip_stages
+
+    def restore(self) -> bool:
+        """Restore the dataset files of the stage from the cache
+
+        Reasons for not finding the stage in the cache are stored in `self.reasons`.
+
+        Returns:
+            True if the stage was restored, False otherwise.
+        """
+        if not self.enabled:
+            self.reasons.append(f"Stage {self.stage} is not cached")
+            return False
+        if self.pre_key is None:
+            self.reasons.append("Run cache key of previous stage is unknown")
+            return False
+
+        manifest = _read_json(self._manifest_path())
+        if manifest is None:
+            self.reasons.append(f"No cached {self.stage} stage with this configuration, Where version and input data")
+            return False
+
+        input_paths = {_absolute_path(p): p for p in manifest}
+        inputs = {p: (manifest[r]["label"], dependencies.get_md5(p)) for p, r in input_paths.items()}
+        entry_path = self._entry_path(self._key(inputs))
+        if not entry_path.exists():
+            changed_inputs = [f"{p} ({i[0]})" for p, i in inputs.items() if i[1] != manifest[input_paths[p]]["md5"]]
+            if changed_inputs:
+                self.reasons.append(f"Input files differ from latest cached run: {', '.join(changed_inputs)}")
+            self.reasons.append(f"No cached {self.stage} stage with this input data")
+            return False
+
+        try:
+            for label, cached_path in _read_json(entry_path / "labels.json").items():
+                file_path = config.files.path(
+                    "dataset", file_vars={**self.dset_args, "stage": self.stage, "label": label}
+                )
+                _atomic_copy(entry_path / cached_path, file_path)
+        except (OSError, AttributeError) as err:
+            self.reasons.append(f"Could not restore cached {self.stage} stage: {err}")
+            return False
+
+        # Record dependencies and key as if the stage had run, and mark the entry as recently used
+        os.utime(entry_path)
+        self.key = self._key(inputs)
+        self._write_key()
+        for file_path, (label, _) in inputs.items():
+            dependencies.add(file_path, label=label)
+        log.info(f"Restored {self.stage} stage from run cache {entry_path}")
+        return True
+
+    def store(self, dep_path: pathlib.Path) -> None:
+        """Store the key and dataset files of a stage that has run
+
+        Args:
+            dep_path:  Path to depends file, listing the input files of the stage.
+        """
+        if self.pre_key is None:
+            key_path = self._key_path(self.stage)
+            key_path.unlink(missing_ok=True)  # Following stages can not use a cached result
+            return
+
+        deps = Configuration.read_from_file("dependencies", dep_path)
+        inputs = {
+            p: (deps[p].label.str, _md5(p, deps[p].as_dict()))
+            for p in deps.section_names
+            if deps[p].as_dict().get("label", "") not in _NOT_INPUTS
+        }
+        self.key = self._key(inputs)
+        self._write_key()
+        if not self.enabled:
+            return
+
+        manifest = {_relative_path(p): dict(label=label, md5=md5) for p, (label, md5) in inputs.items()}
+        entry_path = self._entry_path(self.key)
+        tmp_path = entry_path.with_name(f".{entry_path.name}.{os.getpid()}")
+        try:
+            tmp_path.mkdir(parents=True, exist_ok=True)
+            file_vars = {**self.dset_args, "stage": self.stage}
+            labels = config.files.glob_variable("dataset", variable="label", pattern=r"[\w]+", file_vars=file_vars)
+            for label in labels:
+                file_path = config.files.path("dataset", file_vars={**file_vars, "label": label})
+                _copy_dataset(file_path, tmp_path / f"{label}.hdf5")
+            _write_json(tmp_path / "labels.json", {label: f"{label}.hdf5" for label in labels})
+            if entry_path.exists():
+                shutil.rmtree(entry_path)
+            os.rename(tmp_path, entry_path)
+            _write_json(self._manifest_path(), manifest)
+            log.debug(f"Stored {self.stage} stage in run cache {entry_path}")
+        except OSError as err:
+            log.warn(f"Could not store {self.stage} stage in run cache: {err}")
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            return
+
+        max_size = config.where.run_cache.get("max_size", default=10000).float * 2 ** 20
+        _evict(config.files.path("run_cache"), max_size)
+
+    def _pre_key(self, prev_stage: Optional[str]) -> Optional[str]:
+        """Key of the stage, without the input files"""
+        if prev_stage is None:
+            prev_key = ""
+        else:
+            try:
+                prev_key = self._key_path(prev_stage).read_text().strip()
+            except OSError:
+                return None
+
+        dset_args = {k: v for k, v in self.dset_args.items() if k not in ("user", "id")}
+        key_parts = (
+            CACHE_VERSION,
+            where.__version__,
+            self.pipeline,
+            self.stage,
+            self.rundate.isoformat(),
+            sorted(dset_args.items()),
+            prev_key,
+            _config_content(),
+        )
+        return hashlib.sha256(repr(key_parts).encode()).hexdigest()
+
+    def _key(self, inputs: Dict[str, Any]) -> str:
+        """Full key of the stage, identifying input files by name and checksum"""
+        input_parts = sorted((label, pathlib.Path(p).name, md5) for p, (label, md5) in inputs.items())
+        return hashlib.sha256(repr((self.pre_key, input_parts)).encode()).hexdigest()
+
+    def _write_key(self) -> None:
+        """Store the key of the stage in the analysis directory"""
+        key_path = self._key_path(self.stage)
+        key_path.parent.mkdir(parents=True, exist_ok=True)
+        key_path.write_text(f"{self.key}\n")
+
+    def _key_path(self, stage: str) -> pathlib.Path:
+        return config.files.path("run_cache_key", file_vars={**self.dset_args, "stage": stage})
+
+    def _manifest_path(self) -> pathlib.Path:
+        return config.files.path("run_cache") / self.pipeline / self.stage / f"{self.pre_key}.json"
+
+    def _entry_path(self, key: str) -> pathlib.Path:
+        return config.files.path("run_cache") / self.pipeline / self.stage / key
+
+
+def _md5(file_path: str, info: Dict[str, str]) -> str:
+    """Md5 checksum of a dependency, reusing the checksum in the depends file if it is a content checksum"""
+    checksum = info.get("checksum")
+    if checksum and checksum != info.get("timestamp"):
+        return checksum
+    return dependencies.get_md5(file_path)
+
+
+def _path_vars() -> List[Tuple[str, str]]:
+    """Path variables of the file configuration, and their values, the longest values first"""
+    path_vars = list()
+    for name, value in config.files.vars.items():
+        if not name.startswith("path_"):
+            continue
+        try:
+            path_vars.append((name, str(pathlib.Path(value.format(**config.files.vars)).resolve())))
+        except (KeyError, IndexError, ValueError):
+            continue
+    return sorted(path_vars, key=lambda name_value: len(name_value[1]), reverse=True)
+
+
+def _relative_path(file_path: str) -> str:
+    """Path with the longest matching path variable as a placeholder, for instance {path_data}/..."""
+    resolved = pathlib.Path(file_path).resolve()
+    for name, value in _path_vars():
+        try:
+            return f"{{{name}}}/{resolved.relative_to(value).as_posix()}"
+        except ValueError:
+            continue
+    return str(file_path)
+
+
+def _absolute_path(relative_path: str) -> str:
+    """Path in the current configuration, replacing a path variable placeholder"""
+    for name, value in _path_vars():
+        placeholder = f"{{{name}}}/"
+        if relative_path.startswith(placeholder):
+            return str(pathlib.Path(value) / relative_path[len(placeholder) :])
+    return relative_path
+
+
+def _evict(cache_path: pathlib.Path, max_size: float) -> None:
+    """Delete the least recently used cache entries until the cache is smaller than the given size in bytes"""
+    entries = list()
+    for entry_path in cache_path.glob("*/*/*"):
+        if not entry_path.is_dir() or entry_path.name.startswith("."):
+            continue
+        try:
+            size = sum(p.stat().st_size for p in entry_path.iterdir())
+            entries.append((entry_path.stat().st_mtime, size, entry_path))
+        except OSError:
+            continue
+
+    total_size = sum(size for _, size, _ in entries)
+    for _, size, entry_path in sorted(entries):
+        if total_size <= max_size:
+            break
+        log.debug(f"Remove {entry_path} from run cache")
+        shutil.rmtree(entry_path, ignore_errors=True)
+        total_size -= size
+
+
+def _config_content() -> str:
+    """Content of the analysis configuration, independent of where the configuration file is stored"""
+    return repr(sorted((s, sorted(v.items())) for s, v in config.tech.as_dict().items()))
+
+
+def _copy_dataset(from_path: pathlib.Path, to_path: pathlib.Path) -> None:
+    """Copy a dataset file, replacing external links to other dataset files with the linked data"""
+    with h5py.File(from_path, mode="r") as h5_source, h5py.File(to_path, mode="w") as h5_target:
+        for name, value in h5_source.attrs.items():
+            h5_target.attrs[name] = value
+        for name in h5_source:
+            h5_source.copy(h5_source[name], h5_target, name=name, expand_external=True)
+
+
+def _atomic_copy(from_path: pathlib.Path, to_path: pathlib.Path) -> None:
+    """Copy a file, so that other processes never see a partly written file"""
+    to_path = pathlib.Path(to_path)
+    to_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = to_path.with_name(f".{to_path.name}.{os.getpid()}")
+    try:
+        shutil.copyfile(from_path, tmp_path)
+        os.replace(tmp_path, to_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def _read_json(file_path: pathlib.Path) -> Optional[Dict[str, Any]]:
+    try:
+        with open(file_path, mode="rt") as fid:
+            return json.load(fid)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(file_path: pathlib.Path, data: Dict[str, Any]) -> None:
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = file_path.with_name(f".{file_path.name}.{os.getpid()}")
+    with open(tmp_path, mode="wt") as fid:
+        json.dump(data, fid, indent=2, sort_keys=True)
+    os.replace(tmp_path, file_path)
@@ -0,0 +1,264 @@
+"""Performance telemetry of pipeline stages, models, estimators and writers
+
+Example:
+--------
+
+    >>> from where.lib import telemetry
+    >>> with telemetry.measure("model", "vlbi_vacuum_delay", dset=dset):
+    ...     vlbi_vacuum_delay(dset)
+
+Description:
+------------
+
+Wall time, CPU time, peak resident memory (RSS) and number of observations are recorded for each measured part of an
+analysis. The peak memory is recorded as the increase of the peak RSS of the process during the measured block over
+the RSS at the start of the block, and is only available on Linux. The peak is reset at the start of each block, so
+that earlier peaks of the process are not counted, unless resetting is not permitted. Measurements may be nested, the
+name of the enclosing measurements (typically the stage) is stored as the parent of a measurement. The overhead is
+some tens of microseconds for each measurement, so telemetry is always on unless it is turned off in the telemetry
+section of the Where configuration.
+
+The records of an analysis are appended to the telemetry file (see files.conf) as CSV after each stage. The runner
+aggregates the telemetry files of all analyses it runs, see :func:`aggregate`, and writes a summary of where the time
+is spent.
+"""
+
+# Standard library imports
+import contextlib
+import csv
+import os
+import pathlib
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Midgard imports
+from midgard.dev import plugins as mg_plugins
+
+# Where imports
+from where.lib import config
+
+# Columns of the telemetry file
+FIELDS = ("kind", "name", "parent", "status", "wall_time", "cpu_time", "peak_rss_increase", "num_obs")
+
+# Columns of the aggregated telemetry file
+SUMMARY_FIELDS = ("kind", "name", "count", "wall_time", "cpu_time", "peak_rss_increase", "num_obs")
+
+# Measurements not yet written to file, and names and peak RSS so far of the enclosing measurements
+_RECORDS: List[Dict[str, Any]] = list()
+_PARENTS: List[str] = list()
+_PEAKS: List[float] = list()
+
+
+def is_enabled() -> bool:
+    """Check if telemetry is turned on in the configuration"""
+    return config.where.get("enabled", section="telemetry", default=True).bool
+
+
+@contextlib.contextmanager
+def measure(kind: str, name: str, dset: Optional["Dataset"] = None) -> Iterator[Dict[str, Any]]:
+    """Measure the resources used by a block of code
+
+    The record of the measurement is returned, and the status (default 'run', or 'failed' if an exception is raised)
+    and the number of observations (default from `dset` at the end of the block) can be updated inside the block.
+
+    Args:
+        kind:  Kind of measured part, for instance 'stage', 'model' or 'writer'.
+        name:  Name of the measured part, for instance the name of the stage or plugin.
+        dset:  Dataset that the number of observations are taken from.
+
+    Returns:
+        Record of the measurement.
+    """
+    record = dict(kind=kind, name=name, parent="/".join(_PARENTS), status="run")
+    if not is_enabled():
+        yield record
+        return
+
+    # The peak of the enclosing measurement is stored before the peak is reset for this measurement
+    if _PEAKS:
+        _PEAKS[-1] = max(_PEAKS[-1], peak_rss())
+    reset_peak_rss()
+    _PARENTS.append(name)
+    wall_start, cpu_start, rss_start = time.perf_counter(), time.process_time(), current_rss()
+    _PEAKS.append(rss_start)
+    try:
+        yield record
+    except BaseException:
+        record["status"] = "failed"
+        raise
+    finally:
+        record["wall_time"] = time.perf_counter() - wall_start
+        record["cpu_time"] = time.process_time() - cpu_start
+        peak = max(_PEAKS.pop(), peak_rss())
+        record["peak_rss_increase"] = peak - rss_start
+        if "num_obs" not in record:
+            record["num_obs"] = "" if dset is None else dset.num_obs
+        if _PEAKS:
+            _PEAKS[-1] = max(_PEAKS[-1], peak)
+        _PARENTS.pop()
+        _RECORDS.append(record)
+
+
+def call_all(
+    kind: str, package_name: str, plugins: Optional[List[str]] = None, prefix: Optional[str] = None, **plugin_args: Any
+) -> Dict[str, Any]:
+    """Call all plug-ins in a package and measure each of them
+
+    Works like `midgard.dev.plugins.call_all`. If a `dset` is passed on to the plug-ins, its number of observations is
+    recorded.
+
+    Args:
+        kind:          Kind of plug-ins, for instance 'model' or 'remover'.
+        package_name:  Name of package containing plug-ins.
+        plugins:       List of plug-in names that should be used (optional).
+        prefix:        Prefix of the plug-in names, used for a plug-in if it is not found (optional).
+        plugin_args:   Named arguments passed on to all the plug-ins.
+
+    Returns:
+        Dictionary of all results from the plug-ins.
+    """
+    results = dict()
+    for plugin_name in mg_plugins.names(package_name, plugins=plugins, prefix=prefix):
+        with measure(kind, plugin_name, dset=plugin_args.get("dset")):
+            results[plugin_name] = mg_plugins.call(package_name, plugin_name, **plugin_args)
+
+    return results
+
+
+def current_rss() -> float:
+    """Current resident set size of the process in MB, NaN if it is not available"""
+    try:
+        with open("/proc/self/statm", mode="rt") as fid:
+            resident_pages = int(fid.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return float("nan")  # /proc is only available on Linux
+
+    return resident_pages * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+
+
+def peak_rss() -> float:
+    """Peak resident set size of the process in MB since the last reset, NaN if it is not available"""
+    try:
+        with open("/proc/self/status", mode="rt") as fid:
+            peak_kb = next(int(line.split()[1]) for line in fid if line.startswith("VmHWM:"))
+    except (OSError, IndexError, ValueError, StopIteration):
+        return float("nan")  # /proc is only available on Linux
+
+    return peak_kb / 2 ** 10
+
+
+def reset_peak_rss() -> bool:
+    """Reset the peak resident set size of the process to the current resident set size
+
+    Returns:
+        True if the peak was reset, False if it is not supported or not permitted.
+    """
+    try:
+        with open("/proc/self/clear_refs", mode="wt") as fid:
+            fid.write("5")  # Reset the peak RSS, see proc(5)
+    except OSError:
+        return False
+
+    return True
+
+
+def reset(file_path: Optional[pathlib.Path] = None) -> None:
+    """Forget unwritten measurements and delete the telemetry file of a previous run of the analysis
+
+    Args:
+        file_path:  Path to telemetry file, default is the telemetry file of the current analysis.
+    """
+    _RECORDS.clear()
+    file_path = config.files.path("telemetry") if file_path is None else file_path
+    if file_path.exists():
+        file_path.unlink()
+
+
+def write(file_path: Optional[pathlib.Path] = None) -> None:
+    """Append the measurements recorded since the last write to the telemetry file
+
+    Args:
+        file_path:  Path to telemetry file, default is the telemetry file of the current analysis.
+    """
+    if not _RECORDS:
+        return
+
+    file_path = config.files.path("telemetry") if file_path is None else file_path
+    _write_csv(file_path, FIELDS, _RECORDS, append=True)
+    _RECORDS.clear()
+
+
+def read(file_path: pathlib.Path) -> List[Dict[str, Any]]:
+    """Read a telemetry file
+
+    Args:
+        file_path:  Path to telemetry file.
+
+    Returns:
+        Records of the measurements, with numbers converted to floats (NaN if not available).
+    """
+    with open(file_path, mode="rt", newline="") as fid:
+        records = list(csv.DictReader(fid))
+
+    for record in records:
+        for field in ("wall_time", "cpu_time", "peak_rss_increase", "num_obs"):
+            record[field] = float(record[field]) if record[field] else float("nan")
+
+    return records
+
+
+def aggregate(
+    records: List[Dict[str, Any]], summary: Optional[Dict[Tuple[str, str], Dict[str, Any]]] = None
+) -> Dict[Tuple[str, str], Dict[str, Any]]:
+    """Aggregate measurements for each kind and name
+
+    Times and number of observations are summed, while the largest peak memory increase is kept. Skipped stages and
+    stages restored from the run cache are not counted.
+
+    Args:
+        records:  Records of measurements, as returned by read().
+        summary:  Aggregated measurements that will be updated, a new summary is started if not given.
+
+    Returns:
+        Aggregated measurements with (kind, name) as key.
+    """
+    summary = dict() if summary is None else summary
+    for record in records:
+        if record["status"] not in ("run", "failed"):
+            continue
+
+        key = (record["kind"], record["name"])
+        if key not in summary:
+            summary[key] = dict(
+                kind=key[0], name=key[1], count=0, wall_time=0.0, cpu_time=0.0, peak_rss_increase=0.0, num_obs=0
+            )
+        entry = summary[key]
+        entry["count"] += 1
+        entry["wall_time"] += record["wall_time"]
+        entry["cpu_time"] += record["cpu_time"]
+        entry["peak_rss_increase"] = max(entry["peak_rss_increase"], record["peak_rss_increase"])
+        entry["num_obs"] += 0 if record["num_obs"] != record["num_obs"] else int(record["num_obs"])  # Skip NaN
+
+    return summary
+
+
+def write_summary(summary: Dict[Tuple[str, str], Dict[str, Any]], file_path: pathlib.Path) -> None:
+    """Write aggregated measurements to file, sorted with the most time consuming first
+
+    Args:
+        summary:    Aggregated measurements, as returned by aggregate().
+        file_path:  Path to summary file.
+    """
+    entries = sorted(summary.values(), key=lambda e: e["wall_time"], reverse=True)
+    _write_csv(file_path, SUMMARY_FIELDS, entries, append=False)
+
+
+def _write_csv(file_path: pathlib.Path, fields: Tuple[str, ...], rows: List[Dict[str, Any]], append: bool) -> None:
+    """Write rows to a CSV file, with a header if the file is new"""
+    write_header = not append or not file_path.exists() or file_path.stat().st_size == 0
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(file_path, mode="at" if append else "wt", newline="") as fid:
+        writer = csv.DictWriter(fid, fieldnames=fields, extrasaction="ignore")
+        if write_header:
+            writer.writeheader()
+        writer.writerows(rows)
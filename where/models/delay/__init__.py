@@ -25,6 +25,8 @@ from midgard.dev import plugins
 # Where imports
 from where.lib import config
 from where.lib import log
+from where.lib import telemetry
+from where.models import inputs
 
 
 def calculate_delay(config_key, dset_in, dset_out=None, write_levels=None, **kwargs):
@@ -53,7 +55,10 @@ def _calculate_model(calculate_func, config_key, dset_in, dset_out, write_levels
     dset_out = dset_in if dset_out is None else dset_out
     write_levels = dict() if write_levels is None else write_levels
 
-    model_output = calculate_func(config_key, dset_in, **kwargs)
+    prefix = dset_in.vars["pipeline"]
+    model_names = plugins.names(package_name=__name__, plugins=config.tech[config_key].list, prefix=prefix)
+    skipped = inputs.unchanged_models(__name__, config_key, model_names, dset_in, dset_out, **kwargs)
+    model_output = calculate_func(config_key, dset_in, models=[m for m in model_names if m not in skipped], **kwargs)
 
     for model_name, values in sorted(model_output.items()):
         field_name = f"{config_key}.{model_name}"
@@ -64,6 +69,9 @@ def _calculate_model(calculate_func, config_key, dset_in, dset_out, write_levels
             dset_out.add_float(field_name, values, write_level=write_levels.get(model_name, "analysis"), unit=unit)
         log.info(f"Average correction = {dset_out.rms(f'{config_key}.{model_name}'):14.5f} in {model_name} model")
 
+    inputs.record(__name__, config_key, list(model_output), dset_in, **kwargs)
+    inputs.log_evaluated(config_key, model_output, skipped)
+
 
 def add(config_key, dset):
     delay_fields = [f for f in dset[config_key]._fields]
@@ -74,6 +82,7 @@ def add(config_key, dset):
     return delta_delay
 
 
-def calculate(config_key, dset, **kwargs):
+def calculate(config_key, dset, models=None, **kwargs):
     prefix = dset.vars["pipeline"]
-    return plugins.call_all(package_name=__name__, plugins=config.tech[config_key].list, prefix=prefix, dset=dset, **kwargs)
+    models = config.tech[config_key].list if models is None else models
+    return telemetry.call_all("model", package_name=__name__, plugins=models, prefix=prefix, dset=dset, **kwargs)
@@ -11,9 +11,11 @@ from midgard.dev import plugins
 
 # Where imports
 from where import apriori
+from where.models import inputs
 
 
 @plugins.register
+@inputs.uses("sat_posvel", "system")
 def gnss_relativistic_clock(dset):
     """Determine relativistic clock correction due to orbit eccentricity
 
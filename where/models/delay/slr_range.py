@@ -15,9 +15,11 @@ from midgard.dev import plugins
 
 # Where imports
 from midgard.math.constant import constant
+from where.models import inputs
 
 
 @plugins.register
+@inputs.uses("up_leg")
 def slr_range(dset):
     """Calculate the distance between station and satellite
 
@@ -10,8 +10,12 @@ Unit: meters
 # Midgard imports
 from midgard.dev import plugins
 
+# Where imports
+from where.models import inputs
+
 
 @plugins.register
+@inputs.uses("range_bias")
 def slr_range_bias(dset):
     """Calculate the station dependent range bias
 
@@ -23,8 +23,12 @@ import numpy as np
 from midgard.dev import plugins
 from midgard.math.constant import constant
 
+# Where imports
+from where.models import inputs
+
 
 @plugins.register
+@inputs.uses("sat_pos", "site_pos")
 def slr_relativistic(dset):
     """Calculate relativistic delay for all observations
 
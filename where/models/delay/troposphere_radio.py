@@ -1239,19 +1239,21 @@ def vmf1_gridded_mapping_function(latitude, longitude, height, time, zenith_dist
     mh = np.full(num_obs, fill_value=np.nan)
     mw = np.full(num_obs, fill_value=np.nan)
 
-    for obs in range(num_obs):
-        try:
-            mh[obs], mw[obs] = iers.vmf1_ht(
-                vmf1["ah"](time[obs], longitude[obs], latitude[obs]),
-                vmf1["aw"](time[obs], longitude[obs], latitude[obs]),
-                time.utc.mjd_int[obs],
-                latitude[obs],
-                height[obs],
-                zenith_distance[obs],
-            )
-        except KeyError:
-            # mh[obs] already set to nan
-            pass
+    # Observations without the VMF1 grids they need keep mh and mw set to nan
+    available = vmf1["ah"].is_available(time) & vmf1["aw"].is_available(time)
+    if not np.any(available):
+        return mh, mw
+    (obs_idx,) = np.nonzero(available)
+
+    # Interpolation in time and space in VMF1 grid for all observations at once
+    ah = vmf1["ah"](time[obs_idx], longitude[obs_idx], latitude[obs_idx])
+    aw = vmf1["aw"](time[obs_idx], longitude[obs_idx], latitude[obs_idx])
+
+    mjd_int = time.utc.mjd_int[obs_idx]
+    for idx, obs in enumerate(obs_idx):
+        mh[obs], mw[obs] = iers.vmf1_ht(
+            ah[idx], aw[idx], mjd_int[idx], latitude[obs], height[obs], zenith_distance[obs]
+        )
 
     return mh, mw
 
@@ -12,11 +12,15 @@ import numpy as np
 # Midgard imports
 from midgard.dev import plugins
 
+# Where imports
+from where.models import inputs
+
 # Name of section in configuration
 _SECTION = "_".join(__name__.split(".")[-1:])
 
 
 @plugins.register
+@inputs.uses("cable_delay")
 def cable_calibration(dset):
     """Calculate total delay due to cable calibration
 
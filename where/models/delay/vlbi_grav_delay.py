@@ -30,9 +30,11 @@ from where import apriori
 from midgard.math.constant import constant
 from where.lib import log
 from where.data.time import TimeDelta
+from where.models import inputs
 
 
 @plugins.register
+@inputs.uses("time", "site_pos", "src_dir")
 def vlbi_grav_delay(dset):
     """Calculate the gravitational delay
 
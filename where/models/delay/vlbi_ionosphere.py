@@ -15,8 +15,12 @@ import numpy as np
 # Midgard imports
 from midgard.dev import plugins
 
+# Where imports
+from where.models import inputs
+
 
 @plugins.register
+@inputs.uses("iono_delay", "ref_freq", "dtec")
 def ionosphere(dset):
     """Returns the total ionospheric delay for each baseline
 
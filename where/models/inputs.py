@@ -0,0 +1,143 @@
+"""Declaration of the input fields of models
+
+Description:
+------------
+
+Site and delay models are recalculated in every iteration of the GNSS and VLBI analyses, even though many of them only
+depend on fields that do not change between iterations, like time, satellite and station. A model can declare which
+dataset fields it depends on with the :func:`uses` decorator::
+
+    from midgard.dev import plugins
+    from where.models import inputs
+
+    @plugins.register
+    @inputs.uses("time", "site_pos")
+    def solid_pole_tides(dset):
+        ...
+
+The dataset records a fingerprint of the declared input fields each time the model is evaluated. If none of the
+inputs have changed at the next evaluation, and the output of the model is still stored in the dataset, the model is
+skipped and the previous output is reused. Removing observations with `dset.subset` does not invalidate the inputs,
+since the output of the model is subset together with the inputs.
+
+Input fields match fields with station suffixes as well, so that `site_pos` covers `site_pos_1` and `site_pos_2`.
+Models without declared inputs are always evaluated. Skipping can be turned off with the `skip_unchanged_models`
+configuration option.
+"""
+# Standard library imports
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Midgard imports
+from midgard.dev import plugins
+
+# Where imports
+from where.lib import config
+from where.lib import log
+
+
+def uses(*field_names: str) -> Callable:
+    """Decorator declaring the dataset fields a model depends on
+
+    Args:
+        field_names:  Names of dataset fields read by the model.
+
+    Returns:
+        Decorator that stores the field names on the model function.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        func.input_fields = field_names
+        return func
+
+    return decorator
+
+
+def input_fields(package_name: str, model_name: str) -> Optional[Tuple[str, ...]]:
+    """Input fields declared by a model
+
+    Args:
+        package_name:  Name of package containing the model plug-in.
+        model_name:    Name of the model plug-in.
+
+    Returns:
+        Names of input fields, or None if the model does not declare its inputs.
+    """
+    return getattr(plugins.get(package_name, model_name).function, "input_fields", None)
+
+
+def unchanged_models(
+    package_name: str, config_key: str, model_names: List[str], dset_in: "Dataset", dset_out: "Dataset", **kwargs: Any
+) -> List[str]:
+    """Find models that do not need to be evaluated again
+
+    Args:
+        package_name:  Name of package containing the model plug-ins.
+        config_key:    Key in config with list of models, also table the model output is stored in.
+        model_names:   Names of models that should be calculated.
+        dset_in:       Dataset to read data from.
+        dset_out:      Dataset the model output is stored in.
+        kwargs:        Other arguments passed on to the models.
+
+    Returns:
+        Names of models with unchanged inputs and stored output.
+    """
+    if dset_out is not dset_in or not hasattr(dset_in, "inputs_changed"):
+        return []
+    if not config.tech.get("skip_unchanged_models", default=True).bool:
+        return []
+
+    extra = repr(sorted((k, repr(v)) for k, v in kwargs.items()))
+    unchanged = list()
+    for model_name in model_names:
+        field_names = input_fields(package_name, model_name)
+        if field_names is None or not _has_output(dset_out, config_key, model_name):
+            continue
+        if not dset_in.inputs_changed(_key(config_key, model_name), field_names, extra):
+            unchanged.append(model_name)
+    return unchanged
+
+
+def record(package_name: str, config_key: str, model_names: List[str], dset: "Dataset", **kwargs: Any) -> None:
+    """Record the inputs of evaluated models
+
+    Args:
+        package_name:  Name of package containing the model plug-ins.
+        config_key:    Key in config with list of models, also table the model output is stored in.
+        model_names:   Names of models that were evaluated.
+        dset:          Dataset the models read data from.
+        kwargs:        Other arguments passed on to the models.
+    """
+    if not hasattr(dset, "record_inputs"):
+        return
+
+    extra = repr(sorted((k, repr(v)) for k, v in kwargs.items()))
+    for model_name in model_names:
+        field_names = input_fields(package_name, model_name)
+        if field_names is not None:
+            dset.record_inputs(_key(config_key, model_name), field_names, extra)
+
+
+def log_evaluated(config_key: str, evaluated: Dict[str, Any], skipped: List[str]) -> None:
+    """Report which models were evaluated and which were skipped
+
+    Args:
+        config_key:  Key in config with list of models.
+        evaluated:   Output of the evaluated models, keyed by model name.
+        skipped:     Names of models that were skipped.
+    """
+    log.info(
+        f"Calculated {len(evaluated)} of {len(evaluated) + len(skipped)} {config_key} models, "
+        f"reused unchanged: {', '.join(sorted(skipped)) or 'none'}"
+    )
+
+
+def _has_output(dset: "Dataset", config_key: str, model_name: str) -> bool:
+    """Check if the output of a model is stored in the dataset"""
+    pattern = re.compile(rf"{re.escape(config_key)}\.{re.escape(model_name)}(_\d+)?")
+    return any(pattern.fullmatch(f) for f in dset.fields)
+
+
+def _key(config_key: str, model_name: str) -> str:
+    """Identifier of a model evaluation"""
+    return f"models:{config_key}.{model_name}"
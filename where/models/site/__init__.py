@@ -26,12 +26,15 @@ from midgard.dev import plugins
 # Where imports
 from where.lib import config
 from where.lib import log
+from where.lib import telemetry
+from where.models import inputs
 from where.data import position
 
 
-def calculate(config_key, dset):
+def calculate(config_key, dset, models=None):
     prefix = dset.vars["pipeline"]
-    return plugins.call_all(package_name=__name__, plugins=config.tech[config_key].list, prefix=prefix, dset=dset)
+    models = config.tech[config_key].list if models is None else models
+    return telemetry.call_all("model", package_name=__name__, plugins=models, prefix=prefix, dset=dset)
 
 
 def _calculate_model(calculate_func, config_key, dset_in, dset_out, write_levels=None):
@@ -49,7 +52,10 @@ def _calculate_model(calculate_func, config_key, dset_in, dset_out, write_levels
     dset_out = dset_in if dset_out is None else dset_out
     write_levels = dict() if write_levels is None else write_levels
 
-    model_output = calculate_func(config_key, dset_in)
+    prefix = dset_in.vars["pipeline"]
+    model_names = plugins.names(package_name=__name__, plugins=config.tech[config_key].list, prefix=prefix)
+    skipped = inputs.unchanged_models(__name__, config_key, model_names, dset_in, dset_out)
+    model_output = calculate_func(config_key, dset_in, models=[m for m in model_names if m not in skipped])
 
     for model_name, values in sorted(model_output.items()):
         for multiplier, pos_delta in zip(dset_out.for_each_suffix("station"), values):
@@ -73,6 +79,9 @@ def _calculate_model(calculate_func, config_key, dset_in, dset_out, write_levels
                     )
         log.info(f"Average correction = {dset_out.rms(f'{config_key}.{model_name}'):14.5f} in {model_name} model")
 
+    inputs.record(__name__, config_key, list(model_output), dset_in)
+    inputs.log_evaluated(config_key, model_output, skipped)
+
 
 def add(config_key, dset):
     delta_pos = list()
@@ -31,9 +31,11 @@ from where import apriori
 from where.lib import config
 from where.lib import log
 from where.data import position
+from where.models import inputs
 
 
 @plugins.register
+@inputs.uses("time", "site_pos")
 def atmospheric_tides(dset):
     """Calculate atmospheric tide corrections at both stations
 
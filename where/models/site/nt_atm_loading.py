@@ -16,8 +16,10 @@ from midgard.dev import plugins
 from where import apriori
 from where.data import position
 from where.lib import log
+from where.models import inputs
 
 @plugins.register
+@inputs.uses("time", "site_pos", "station")
 def non_tidal_atmospheric_loading(dset):
     """Apply non tidal atmospheric loading displacements at all stations.
 
@@ -29,9 +29,11 @@ from midgard.math.unit import Unit
 # Where imports
 from where import apriori
 from where.data import position
+from where.models import inputs
 
 
 @plugins.register
+@inputs.uses("time", "site_pos")
 def ocean_pole_tides(dset):
     """Calculate ocean pole tide corrections at all stations
 
@@ -36,11 +36,13 @@ from where.data import position
 from where.ext import iers_2010 as iers
 from where.lib import config
 from where.lib import log
+from where.models import inputs
 
 _WARNED_MISSING = set()
 
 
 @plugins.register
+@inputs.uses("time", "site_pos", "station", "site_id")
 def ocean_tides(dset):
     """Calculate ocean tide corrections at both stations
 
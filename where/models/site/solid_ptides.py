@@ -27,9 +27,11 @@ from midgard.math.unit import Unit
 # Where imports
 from where import apriori
 from where.data import position
+from where.models import inputs
 
 
 @plugins.register
+@inputs.uses("time", "site_pos")
 def solid_pole_tides(dset):
     """Calculate solid pole tide corrections at both stations
 
@@ -26,9 +26,11 @@ from where import apriori
 from where.data import position
 from where.ext import iers_2010 as iers
 from where.lib import log
+from where.models import inputs
 
 
 @plugins.register
+@inputs.uses("time", "site_pos", "station")
 def solid_tides(dset):
     """Calculate solid tide corrections at both stations
 
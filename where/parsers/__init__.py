@@ -21,10 +21,16 @@ To use a parser, you will typically use the :func:`parse_key`- or :func:`parse_f
 
 The name used in `parse_file` to call the parser is the name of the module (file) containing the parser.
 
+Parsed data of the parsers listed in the `parse_cache_parsers` option in the [files] section of the Where configuration
+are stored in a persistent parse cache (see :mod:`where.parsers._parse_cache`), which is shared between processes.
+
 """
+# Standard library imports
+import contextlib
 
 # Midgard imports
-from midgard.parsers import names, parse_file  # noqa
+from midgard.parsers import names  # noqa
+from midgard.parsers import parse_file as mg_parse_file
 from midgard import parsers as mg_parsers
 from midgard.dev import plugins
 from midgard.files import dependencies
@@ -32,10 +38,62 @@ from midgard.files import dependencies
 # Where imports
 from where.lib import config
 from where.lib import log
+from where.parsers import _parse_cache
 
 # Add Where parsers to Midgard parsers
 plugins.add_alias(mg_parsers.__name__, __name__)
 
+# Sets of file paths that are recorded by parse_file, see record_parsed_files
+_RECORDERS = list()
+
+
+@contextlib.contextmanager
+def record_parsed_files():
+    """Record the paths of all files parsed by parse_file within a with-block
+
+    Example:
+        > with parsers.record_parsed_files() as file_paths:
+        >     eop = apriori.get("eop", time=dset.time)
+        > print(file_paths)
+
+    Yields:
+        Set:  Paths of the parsed files, filled in while the with-block runs.
+    """
+    file_paths = set()
+    _RECORDERS.append(file_paths)
+    try:
+        yield file_paths
+    finally:
+        _RECORDERS.remove(file_paths)
+
+
+def parse_file(parser_name, file_path, encoding=None, timer_logger=None, use_cache=True, **parser_args):
+    """Use the given parser on a file and return parsed data
+
+    Parsed data are read from the persistent parse cache if the cache is enabled for the given parser, otherwise the
+    Midgard `parse_file` function is used.
+
+    Args:
+        parser_name (String):   Name of parser.
+        file_path (Path):       Path to file that should be parsed.
+        encoding (String):      Encoding in file that is parsed.
+        timer_logger:           Logging function that will be used to log timing information.
+        use_cache (Boolean):    Whether to use the parse cache to avoid parsing the same file several times.
+        parser_args:            Input arguments to the parser.
+
+    Returns:
+        Parser:  Parser with the parsed data
+    """
+    for file_paths in _RECORDERS:
+        file_paths.add(str(file_path))
+
+    if use_cache and _parse_cache.is_enabled(parser_name):
+        return _parse_cache.parse_file(
+            parser_name, file_path, encoding=encoding, timer_logger=timer_logger, **parser_args
+        )
+
+    return mg_parse_file(parser_name, file_path, encoding=encoding, timer_logger=timer_logger, **parser_args)
+
 
 def setup_parser(parser_name=None, file_key=None, **kwargs):
     """Set up the given parser.
@@ -0,0 +1,378 @@
+"""Persistent cache of parsed data files
+
+Description:
+------------
+
+Apriori files like ITRF SINEX files, ANTEX files and ocean tide files are parsed in every Where process. The parse cache
+stores the state of a parser after parsing in a directory under the work directory, so that other processes can reuse
+the parsed data instead of reading the text file again.
+
+Each cache entry is a directory containing
+
+    state.pickle     Parser attributes, where larger NumPy arrays are replaced by references to .npy-files.
+    arrays/<n>.npy   NumPy arrays, which are memory-mapped (copy-on-write) when the entry is read.
+
+The cache entries are keyed by a hash of the file content, the parser name, the parser arguments and the version of
+the parser (a hash of the parser source code together with the Where and Midgard versions). To avoid hashing the file
+content in every process, an index from file path, size and modification time to the content key is kept as well.
+
+Entries are written to a temporary directory first and then renamed, so that several processes can safely populate
+the cache concurrently. Which parsers use the cache is configured by the `parse_cache` and `parse_cache_parsers`
+options in the [files] section of the Where configuration. When the cache grows beyond the `parse_cache_max_size`
+option, the entries that were least recently stored or read are deleted, together with their index files.
+
+"""
+# Standard library imports
+from datetime import date, timedelta
+import functools
+import hashlib
+import inspect
+import os
+import pathlib
+import pickle
+import shutil
+from typing import Any, Callable, Dict, Optional, Union
+
+# External library imports
+import numpy as np
+
+# Midgard imports
+import midgard
+from midgard import parsers as mg_parsers
+from midgard.dev import plugins
+from midgard.dev.timer import Timer
+from midgard.parsers._parser import Parser
+
+# Where imports
+import where
+from where.lib import config
+from where.lib import log
+
+# Bump if the layout of the cache entries change
+CACHE_VERSION = "1"
+
+# Arrays smaller than this (in bytes) are stored together with the parser state instead of in separate files
+MIN_ARRAY_BYTES = 4096
+
+# Parser attributes that are set from the arguments, and not stored in the cache
+_SKIP_ATTRIBUTES = {"file_path", "file_encoding"}
+
+
+# Types that can be stored in the parser state. Parsers with other types in their state are not cached
+_PLAIN_TYPES = (str, bytes, int, float, complex, bool, type(None), np.generic, date, timedelta, pathlib.PurePath)
+
+
+class _ArrayRef:
+    """Reference to an array stored in a separate .npy-file of a cache entry"""
+
+    def __init__(self, idx: int) -> None:
+        self.idx = idx
+
+
+class _TimeRef:
+    """Reference to a time array stored as Julian days in separate .npy-files of a cache entry"""
+
+    def __init__(self, cls: type, fmt: str, jd1: "_ArrayRef", jd2: "_ArrayRef") -> None:
+        self.cls = cls
+        self.fmt = fmt
+        self.jd1 = jd1
+        self.jd2 = jd2
+
+
+def is_enabled(parser_name: str) -> bool:
+    """Check if the parse cache is used for a given parser
+
+    Args:
+        parser_name:  Name of parser.
+
+    Returns:
+        True if parsed data of the parser should be cached.
+    """
+    if not config.where.files.get("parse_cache", default=False).bool:
+        return False
+    return parser_name in config.where.files.get("parse_cache_parsers", default="").list
+
+
+def parse_file(
+    parser_name: str,
+    file_path: Union[str, pathlib.PosixPath],
+    encoding: Optional[str] = None,
+    timer_logger: Optional[Callable[[str], None]] = None,
+    **parser_args: Any,
+) -> Parser:
+    """Parse a file, reusing cached parsed data if available
+
+    Has the same interface as Midgard's `parse_file`.
+
+    Args:
+        parser_name:    Name of parser.
+        file_path:      Path to file that should be parsed.
+        encoding:       Encoding in file that is parsed.
+        timer_logger:   Logging function that will be used to log timing information.
+        parser_args:    Input arguments to the parser.
+
+    Returns:
+        Parser with the parsed data.
+    """
+    parser = plugins.call(
+        package_name=mg_parsers.__name__, plugin_name=parser_name, file_path=file_path, encoding=encoding, **parser_args
+    )
+    if not isinstance(parser, Parser) or not parser.data_available:
+        return parser
+
+    cache_dir = config.files.path("parse_cache") / parser_name
+    try:
+        entry_dir = cache_dir / _content_key(cache_dir, parser, encoding, parser_args)
+    except OSError as err:
+        log.debug(f"Parse cache not available for {parser.file_path}: {err}")
+        entry_dir = None
+
+    # Use cached data
+    if entry_dir is not None and entry_dir.exists():
+        try:
+            with Timer(f"Finish {parser_name} (parse cache) - {parser.file_path} in", logger=timer_logger):
+                _read_entry(entry_dir, parser)
+            _touch(entry_dir)
+            return parser
+        except (OSError, EOFError, pickle.UnpicklingError, ValueError) as err:
+            log.warn(f"Ignoring corrupt parse cache entry {entry_dir}: {err}")
+            shutil.rmtree(entry_dir, ignore_errors=True)
+
+    # Parse file and store result in cache
+    with Timer(f"Finish {parser_name} ({mg_parsers.__name__}) - {parser.file_path} in", logger=timer_logger):
+        parser.parse()
+    if entry_dir is not None and parser.data_available:
+        _write_entry(entry_dir, parser)
+        max_size = config.where.files.get("parse_cache_max_size", default=2000).float * 2 ** 20
+        _evict(config.files.path("parse_cache"), max_size)
+
+    return parser
+
+
+def _content_key(cache_dir: pathlib.PosixPath, parser: Parser, encoding: Optional[str], parser_args: Dict) -> str:
+    """Key of cache entry based on file content, parser version and parser arguments
+
+    The key is looked up in an index based on file path, size and modification time. Only if the index does not
+    contain the file, the file content is hashed.
+
+    Args:
+        cache_dir:    Cache directory of the parser.
+        parser:       Parser object, not parsed yet.
+        encoding:     Encoding in file that is parsed.
+        parser_args:  Input arguments to the parser.
+
+    Returns:
+        Hexadecimal hash string.
+    """
+    file_path = parser.file_path.resolve()
+    file_stat = file_path.stat()
+    parser_key = _hash_strings(
+        CACHE_VERSION,
+        where.__version__,
+        midgard.__version__,
+        _source_hash(type(parser)),
+        repr(encoding),
+        repr(sorted((k, repr(v)) for k, v in parser_args.items())),
+    )
+    stat_key = _hash_strings(parser_key, str(file_path), str(file_stat.st_size), str(file_stat.st_mtime_ns))
+    index_path = cache_dir / "index" / stat_key
+    try:
+        return index_path.read_text().strip()
+    except OSError:
+        pass
+
+    content_hasher = hashlib.sha256(parser_key.encode())
+    with open(file_path, mode="rb") as fid:
+        for chunk in iter(lambda: fid.read(1 << 20), b""):
+            content_hasher.update(chunk)
+    content_key = content_hasher.hexdigest()
+
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = index_path.with_name(f".{stat_key}.{os.getpid()}")
+    tmp_path.write_text(content_key)
+    os.replace(tmp_path, index_path)
+    return content_key
+
+
+def _read_entry(entry_dir: pathlib.PosixPath, parser: Parser) -> None:
+    """Read parser state from a cache entry
+
+    Args:
+        entry_dir:  Directory of cache entry.
+        parser:     Parser object, which is updated with the cached state.
+    """
+    with open(entry_dir / "state.pickle", mode="rb") as fid:
+        state = pickle.load(fid)
+
+    array_dir = entry_dir / "arrays"
+    state = _restore_arrays(state, lambda idx: np.load(array_dir / f"{idx}.npy", mmap_mode="c"))
+    parser.__dict__.update(state)
+    if isinstance(parser.meta, dict) and "__data_path__" in parser.meta:
+        parser.meta["__data_path__"] = str(parser.file_path)
+
+
+def _write_entry(entry_dir: pathlib.PosixPath, parser: Parser) -> None:
+    """Write parser state to a cache entry
+
+    The entry is written to a temporary directory which is renamed when complete. If another process has written the
+    same entry in the meantime, the temporary directory is discarded.
+
+    Args:
+        entry_dir:  Directory of cache entry.
+        parser:     Parsed parser object.
+    """
+    arrays = list()
+    try:
+        state = _extract_arrays({k: v for k, v in parser.__dict__.items() if k not in _SKIP_ATTRIBUTES}, arrays)
+    except TypeError as err:
+        log.debug(f"Parsed data of {parser.file_path} are not stored in parse cache: {err}")
+        return
+
+    tmp_dir = entry_dir.with_name(f".{entry_dir.name}.{os.getpid()}")
+    try:
+        (tmp_dir / "arrays").mkdir(parents=True, exist_ok=True)
+        with open(tmp_dir / "state.pickle", mode="wb") as fid:
+            pickle.dump(state, fid, protocol=pickle.HIGHEST_PROTOCOL)
+        for idx, array in enumerate(arrays):
+            np.save(tmp_dir / "arrays" / f"{idx}.npy", array, allow_pickle=False)
+        os.rename(tmp_dir, entry_dir)
+        log.debug(f"Stored parsed data of {parser.file_path} in parse cache {entry_dir}")
+    except (OSError, pickle.PicklingError, TypeError, AttributeError) as err:
+        log.debug(f"Could not store parsed data of {parser.file_path} in parse cache: {err}")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def _touch(entry_dir: pathlib.PosixPath) -> None:
+    """Mark a cache entry as recently used, which fails silently for a read-only cache
+
+    Args:
+        entry_dir:  Directory of cache entry.
+    """
+    try:
+        os.utime(entry_dir)
+    except OSError:
+        pass
+
+
+def _evict(cache_dir: pathlib.PosixPath, max_size: float) -> None:
+    """Delete the least recently used cache entries until the cache is smaller than the given size
+
+    Index files referring to deleted entries are deleted as well.
+
+    Args:
+        cache_dir:  Directory of the parse cache, containing one directory for each parser.
+        max_size:   Maximal size of the cache in bytes.
+    """
+    entries = list()
+    for entry_dir in cache_dir.glob("*/*"):
+        if not entry_dir.is_dir() or entry_dir.name.startswith(".") or entry_dir.name == "index":
+            continue
+        try:
+            size = sum(p.stat().st_size for p in entry_dir.rglob("*") if p.is_file())
+            entries.append((entry_dir.stat().st_mtime, size, entry_dir))
+        except OSError:
+            continue
+
+    total_size = sum(size for _, size, _ in entries)
+    removed = dict()
+    for _, size, entry_dir in sorted(entries):
+        if total_size <= max_size:
+            break
+        log.debug(f"Remove {entry_dir} from parse cache")
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        removed.setdefault(entry_dir.parent, set()).add(entry_dir.name)
+        total_size -= size
+
+    for parser_dir, keys in removed.items():
+        for index_path in (parser_dir / "index").glob("*"):
+            try:
+                if index_path.read_text().strip() in keys:
+                    index_path.unlink()
+            except OSError:
+                continue
+
+
+def _extract_arrays(value: Any, arrays: list) -> Any:
+    """Replace larger NumPy arrays in a nested structure with references
+
+    Args:
+        value:   Nested structure of dicts, lists and tuples.
+        arrays:  List where the extracted arrays are appended.
+
+    Returns:
+        Structure where arrays are replaced by _ArrayRef or _TimeRef objects.
+
+    Raises:
+        TypeError:  If the structure contains values that can not be stored safely.
+    """
+    if isinstance(value, np.ndarray) and hasattr(type(value), "from_jds") and hasattr(value, "jd1"):  # Time arrays
+        arrays.extend([np.asarray(value.jd1), np.asarray(value.jd2)])
+        return _TimeRef(type(value), value.fmt, _ArrayRef(len(arrays) - 2), _ArrayRef(len(arrays) - 1))
+    elif type(value) is np.ndarray:
+        if value.dtype == object:
+            for item in value.flat:
+                _extract_arrays(item, arrays)
+            return value
+        elif value.nbytes >= MIN_ARRAY_BYTES:
+            arrays.append(value)
+            return _ArrayRef(len(arrays) - 1)
+        return value
+    elif type(value) is dict:
+        return {k: _extract_arrays(v, arrays) for k, v in value.items()}
+    elif type(value) in (list, tuple):
+        return type(value)(_extract_arrays(v, arrays) for v in value)
+    elif isinstance(value, _PLAIN_TYPES):
+        return value
+    raise TypeError(f"Values of type {type(value).__name__!r} are not supported")
+
+
+def _restore_arrays(value: Any, load_array: Callable[[int], np.ndarray]) -> Any:
+    """Replace array references in a nested structure with the arrays
+
+    Args:
+        value:       Nested structure of dicts, lists and tuples.
+        load_array:  Function returning the array with the given index.
+
+    Returns:
+        Structure where _ArrayRef objects are replaced by arrays.
+    """
+    if isinstance(value, _ArrayRef):
+        return load_array(value.idx)
+    elif isinstance(value, _TimeRef):
+        return value.cls.from_jds(np.array(load_array(value.jd1.idx)), np.array(load_array(value.jd2.idx)), value.fmt)
+    elif type(value) is dict:
+        return {k: _restore_arrays(v, load_array) for k, v in value.items()}
+    elif type(value) in (list, tuple):
+        return type(value)(_restore_arrays(v, load_array) for v in value)
+    return value
+
+
+@functools.lru_cache()
+def _source_hash(cls: type) -> str:
+    """Hash of the source code of a parser class and its base classes
+
+    Args:
+        cls:  Parser class.
+
+    Returns:
+        Hexadecimal hash string.
+    """
+    hasher = hashlib.sha256()
+    for base in inspect.getmro(cls):
+        try:
+            hasher.update(pathlib.Path(inspect.getfile(base)).read_bytes())
+        except (TypeError, OSError):
+            hasher.update(base.__qualname__.encode())
+    return hasher.hexdigest()
+
+
+def _hash_strings(*strings: str) -> str:
+    """Hash a sequence of strings
+
+    Args:
+        strings:  Strings to hash.
+
+    Returns:
+        Hexadecimal hash string.
+    """
+    return hashlib.sha256("\x1f".join(strings).encode()).hexdigest()
@@ -0,0 +1,27 @@
+"""A parser for reading normal equations from SINEX files
+
+Description:
+------------
+
+Reads the unconstrained normal equations, the apriori values and the statistics of a solution from a SINEX file. The
+blocks are stored in `self.data` with the SINEX block markers as keys, see :mod:`midgard.parsers._parser_sinex`.
+
+"""
+
+# Midgard imports
+from midgard.dev import plugins
+from midgard.parsers._parser_sinex import SinexParser
+
+
+@plugins.register
+class SinexNeqParser(SinexParser):
+    """A parser for reading normal equations from SINEX files"""
+
+    def setup_parser(self):
+        return (
+            self.solution_statistics,
+            self.solution_estimate,
+            self.solution_apriori,
+            self.solution_normal_equation_vector,
+            self.solution_normal_equation_matrix,
+        )
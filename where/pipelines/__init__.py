@@ -26,6 +26,8 @@ from where.data import dataset3 as dataset
 from where.lib import config
 from where.lib import exceptions
 from where.lib import log
+from where.lib import run_cache
+from where.lib import telemetry
 from where.lib import util
 
 
@@ -244,6 +246,7 @@ def run(rundate, pipeline, *args, **kwargs):
     # Update analysis config and file variables
     config.set_analysis(rundate, pipeline=pipeline, **kwargs)
     config.set_file_vars(file_vars())
+    telemetry.reset()
 
     log.blank()  # Empty line for visual clarity
 
@@ -307,11 +310,45 @@ def run(rundate, pipeline, *args, **kwargs):
 
 
 def run_stage(rundate, pipeline, dset, stage, prev_stage, **kwargs):
+    """Run one stage of a pipeline, and write the telemetry of the stage to file"""
+    try:
+        with telemetry.measure("stage", stage) as record:
+            return _run_stage(rundate, pipeline, dset, stage, prev_stage, record, **kwargs)
+    finally:
+        telemetry.write()
+
+
+def _run_stage(rundate, pipeline, dset, stage, prev_stage, telemetry_record, **kwargs):
     # Skip stages where no dependencies have changed
     dep_path = config.files.path("depends", file_vars={**kwargs, "stage": stage})
-    if not (dependencies.changed(dep_path) or util.check_options("-F", "--force")):
+    force = util.check_options("-F", "--force")
+    explain = util.check_options("--explain-rerun")
+    reasons = [f"Option {force} is used"] if force else run_cache.changed(dep_path, all_reasons=bool(explain))
+    if not reasons:
         log.info(f"Not necessary to run {stage} for {pipeline.upper()} {rundate.strftime(config.FMT_date)}")
+        telemetry_record["status"] = "skipped"
         return
+    if explain:
+        for reason in reasons:
+            log.info(f"Rerun {stage}: {reason}")
+
+    # Set up dependencies. Add dependencies to previous stage and config file
+    dependencies.init(dep_path, fast_check=not run_cache.use_content_hash())
+    if prev_stage is not None:
+        dependencies.add(config.files.path("depends", file_vars={**kwargs, "stage": prev_stage}), label="depends")
+    dependencies.add(*config.tech.sources, label="config")
+    # Delete old datasets for this stage
+    dataset.Dataset.delete_stage(stage, **kwargs)
+
+    # Restore the results of the stage from the run cache if possible. The next stage reads the dataset from disk
+    stage_cache = run_cache.StageCache(rundate, pipeline, stage, prev_stage, **kwargs)
+    if not force and stage_cache.restore():
+        dependencies.write()
+        telemetry_record["status"] = "cached"
+        return
+    if explain:
+        for reason in stage_cache.reasons:
+            log.info(f"Not restored {stage} from run cache: {reason}")
 
     if dset is None:
         try:
@@ -321,19 +358,14 @@ def run_stage(rundate, pipeline, dset, stage, prev_stage, **kwargs):
             # Create emtpy dataset
             dset = dataset.Dataset(rundate=rundate, pipeline=pipeline, **kwargs)
 
-    # Set up dependencies. Add dependencies to previous stage and config file
-    dependencies.init(dep_path)
-    if prev_stage is not None:
-        dependencies.add(config.files.path("depends", file_vars={**kwargs, "stage": prev_stage}), label="depends")
-    dependencies.add(*config.tech.sources, label="config")
-    # Delete old datasets for this stage
-    dset.delete_stage(stage, **kwargs)
-
     # Call the current stage. Skip rest of stages if current stage returns False (compare with is since by
     # default stages return None)
     plugins.call(
         package_name=__name__, plugin_name=pipeline, part=stage, stage=stage, dset=dset, plugin_logger=log.info
     )
+    dataset.Dataset.flush_writes()
     dependencies.write()
+    stage_cache.store(dep_path)
+    telemetry_record["num_obs"] = dset.num_obs
 
     return dset
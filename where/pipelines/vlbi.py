@@ -467,15 +467,25 @@ def estimate(stage, dset):
         dset (Dataset):  Dataset for the analysis
     """
     max_iterations = config.tech.estimate_max_iterations.int
+    incremental = config.tech.get("estimate_incremental", default=False).bool
     delay_unit = "meter"
 
+    solution, keep_idx = None, None
     for iter_num in itertools.count(start=1):
-        partial_vectors = estimation.partial_vectors(dset, "estimate_method")
+        # Partial derivatives are subset together with the observations, and are only recalculated when necessary
+        can_reuse = incremental and solution is not None
+        if not (can_reuse and estimation.can_reuse_partial_vectors(dset, partial_vectors, time_span)):
+            partial_vectors = estimation.partial_vectors(dset, "estimate_method")
+            time_span = (dset.time.utc.mjd.min(), dset.time.utc.mjd.max())
+            keep_idx = None
         obs_noise = dset.observed_delay_ferr ** 2 + np.nan_to_num(dset.iono_delay_ferr) ** 2 + 0.01 ** 2
         log.info(
             f"Estimating parameters for iteration {iter_num} using Kalman Filter and continuous piecewise linear functions"
         )
-        estimation.call("estimate_method", dset=dset, partial_vectors=partial_vectors, obs_noise=obs_noise)
+        estimator_args = dict(previous=solution, keep_idx=keep_idx, keep_solution=True) if incremental else dict()
+        solution = estimation.call(
+            "estimate_method", dset=dset, partial_vectors=partial_vectors, obs_noise=obs_noise, **estimator_args
+        )
         rms = dset.rms("residual")
         log.info(f"{dset.num_obs} observations, rms of postfit residuals = {rms:.4f} {delay_unit}")
         
@@ -487,12 +497,15 @@ def estimate(stage, dset):
         # Detect and remove outliers
         num_obs_before = dset.num_obs
         independent = config.tech.estimate_obs_rejectors_independent.bool
-        dset = estimation.apply_observation_rejectors("estimate_obs_rejectors", dset, independent)
+        dset, keep_idx = estimation.apply_observation_rejectors(
+            "estimate_obs_rejectors", dset, independent, return_keep_idx=True
+        )
         log.blank()
         if dset.num_obs == num_obs_before or dset.num_obs == 0:
             break
         
-        
+    if incremental and solution is not None:
+        solution.cleanup()
 
     log.blank()
     if dset.num_obs > 0:
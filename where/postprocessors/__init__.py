@@ -13,12 +13,10 @@ needs to be decorated with the :func:`~midgard.dev.plugins.register` decorator a
         ...
 
 """
-# Midgard imports
-from midgard.dev import plugins
-
 # Where imports
 from where.lib import config
 from where.lib import log
+from where.lib import telemetry
 
 
 def apply_postprocessors(config_key, dset):
@@ -31,4 +29,4 @@ def apply_postprocessors(config_key, dset):
     prefix = dset.vars["pipeline"]
     postprocessors = config.tech[config_key].list
     log.info(f"Applying postprocessors")
-    return plugins.call_all(package_name=__name__, plugins=postprocessors, prefix=prefix, dset=dset)
+    return telemetry.call_all("postprocessor", package_name=__name__, plugins=postprocessors, prefix=prefix, dset=dset)
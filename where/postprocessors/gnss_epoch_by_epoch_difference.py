@@ -3,6 +3,9 @@
 Description:
 ------------
 
+The observations are sorted once by satellite and time, and the differences of all observation fields are computed
+together as shifted differences within each satellite arc. A new arc starts if the time since the previous observation
+of the satellite is larger than the `max_gap` option.
 """
 # External imports
 import numpy as np
@@ -11,6 +14,8 @@ import numpy as np
 from midgard.dev import plugins
 
 # Where imports
+from where.lib import config
+from where.lib import gnss
 from where.lib import log
 
 # Name of section in configuration
@@ -24,26 +29,12 @@ def gnss_epoch_by_epoch_difference(dset: "Dataset") -> None:
     Args:
         dset:     A Dataset containing model data.
     """
-    for field in dset.obs.fields:
-
-        log.debug(f"Add epoch by epoch difference for observation field '{field}' to dataset.")        
-        diff = np.full(dset.num_obs, float('nan'))
-        
-        for sys in dset.unique("system"):      
-            idx_sys = dset.filter(system=sys)
-            sys_tmp = dset.obs[field][idx_sys]
-                      
-            for sat in set(dset.satellite[idx_sys]):          
-                idx_sat = dset.satellite[idx_sys] == sat
-                sys_tmp[idx_sat] = np.insert(
-                                        np.diff(dset.obs[field][idx_sys][idx_sat]), 
-                                        0, 
-                                        float('nan'),
-                ) # first epoch is not differenced, therefore NaN has to be inserted as first element.
-                
-            diff[idx_sys] = sys_tmp
-            
-        dset.add_float(f"diff_epo.{field}", val=diff, unit=dset.unit(f"obs.{field}"))
-        
-
-            
\ No newline at end of file
+    max_gap = config.tech.get("max_gap", section=_SECTION, default="").str
+    order, is_continued = gnss.satellite_arcs(dset, max_gap=float(max_gap) if max_gap else None)
+
+    fields = dset.obs.fields
+    log.debug(f"Add epoch by epoch difference for observation fields {', '.join(fields)} to dataset.")
+    diff = gnss.epoch_by_epoch_difference(np.stack([dset.obs[f] for f in fields], axis=1), order, is_continued)
+
+    for num, field in enumerate(fields):
+        dset.add_float(f"diff_epo.{field}", val=diff[:, num], unit=dset.unit(f"obs.{field}"))
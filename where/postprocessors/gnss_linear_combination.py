@@ -11,7 +11,8 @@ Depending on the configuration, following linear combination can be added:
     melbourne_wuebbena
     narrow_lane
     wide_lane
-    
+
+The observations of all GNSS are gathered once, and shared by all linear combinations.
 """
 # Midgard imports
 from midgard.dev import plugins
@@ -19,7 +20,13 @@ from midgard.dev import plugins
 # Where imports
 from where.lib import config
 from where.lib import log
-from where.lib.gnss import code_phase_difference, linear_combination, linear_combination_cmc, linear_combination_melbourne
+from where.lib.gnss import (
+    SystemObservations,
+    code_phase_difference,
+    linear_combination,
+    linear_combination_cmc,
+    linear_combination_melbourne,
+)
 
 # Name of section in configuration
 _SECTION = "_".join(__name__.split(".")[-1:])
@@ -42,7 +49,8 @@ def gnss_linear_combination(dset: "Dataset") -> None:
         "narrow_lane": linear_combination,
         "wide_lane": linear_combination,
     }
-    
+    system_obs = SystemObservations(dset)
+
     for comb_name in config.tech[_SECTION].linear_combination.list:
         
         log.debug(f"Add {comb_name} combination to dataset.")
@@ -50,7 +58,7 @@ def gnss_linear_combination(dset: "Dataset") -> None:
         # Code-multipath linear combination
         if comb_name == "code_multipath":
             try:
-                cmc1, cmc2 = func[comb_name](dset)
+                cmc1, cmc2 = func[comb_name](dset, system_obs=system_obs)
             except ValueError:
                 log.warn(f"Code multipath linear combination is not added to dataset. Dual-frequency code and phase "
                          f"observations are needed.")
@@ -64,7 +72,7 @@ def gnss_linear_combination(dset: "Dataset") -> None:
         # Code-phase difference
         elif comb_name == "code_phase":
             try:
-                code_phase_1, code_phase_2 = func[comb_name](dset)
+                code_phase_1, code_phase_2 = func[comb_name](dset, system_obs=system_obs)
             except ValueError:
                 log.warn(f"Code-phase difference is not added to dataset. Dual-frequency code and phase observations "
                          f"are needed.")
@@ -78,7 +86,7 @@ def gnss_linear_combination(dset: "Dataset") -> None:
         # Melbourne-Wuebbena linear combination
         elif comb_name == "melbourne_wuebbena":
             try:
-                linear_comb = func[comb_name](dset)
+                linear_comb = func[comb_name](dset, system_obs=system_obs)
             except ValueError:
                 log.warn(f"Melbourne-Wübbena linear combination is not added to dataset. Dual-frequency code and "
                          f"phase observations are needed.")
@@ -92,7 +100,7 @@ def gnss_linear_combination(dset: "Dataset") -> None:
             dset.meta.setdefault("linear_combination", dict()).update({f"{comb_name}": linear_comb["sys_obs"]})
         
         else:
-            linear_comb = func[comb_name](comb_name, dset)
+            linear_comb = func[comb_name](comb_name, dset, system_obs=system_obs)
             for obs_code in linear_comb.keys():
                 dset.add_float(
                         f"lin.{comb_name}_{obs_code}", 
@@ -21,6 +21,8 @@ Option               Description
 --doy                Specify from- and to-dates as Day-Of-Year
 --stop-on-error      Stop runner if one analysis crashes.
 --continue-on-error  Continue runner even if one analysis crashes.
+--resident           Run each analysis in a process forked from the runner,
+                     instead of starting a new Where program.
 --version            Show version information and exit.
 -h, --help           Show this help message and exit.
 ===================  ===========================================================
@@ -36,6 +38,15 @@ Description:
 
 This program is used to run several Where analyses.
 
+By default, each analysis is run as a separate Where program. With the option `--resident` (or `resident = True` in
+the [runner] section of the configuration), the runner imports Where and its plugins once, and runs each analysis in
+a child process forked from the runner (see :mod:`where.lib.resident`). This avoids the startup cost of each analysis,
+while keeping configuration and logging of the analyses isolated.
+
+The telemetry of each analysis (see :mod:`where.lib.telemetry`) is collected by the runner. When all analyses are
+finished, the runner logs the most time consuming stages, models, estimators and writers, and writes the aggregated
+telemetry to the telemetry_runner file.
+
 
 Examples:
 ---------
@@ -56,6 +67,8 @@ Version: {version}
 # Standard library imports
 import atexit
 from datetime import datetime, timedelta
+import os
+import shutil
 import subprocess
 import sys
 
@@ -68,10 +81,14 @@ from where import pipelines
 from where import setup
 from where.lib import config
 from where.lib import log
+from where.lib import pandoc
+from where.lib import resident
+from where.lib import telemetry
 from where.lib import util
 from where.lib.enums import LogLevel
 
 _STATISTICS = {"Number of analyses": 0, "Successful analyses": 0, "Failed analyses": 0}
+_TELEMETRY = dict()
 
 
 @Timer(f"Finish {util.get_program_name()} in")
@@ -125,27 +142,58 @@ def main():
     stop_on_error = config.where.get("stop_on_error", section="runner", value=stop_on_error_opts).bool
     error_logger = log.fatal if stop_on_error else log.error
 
-    # Loop over dates
-    rundate = from_date
-    while rundate <= to_date:
-        args = remove_runner_args(sys.argv[1:])
-        where_args = set(pipelines.get_args(rundate, pipeline, input_args=args))
-
-        for arg in sorted(where_args):
-            cmd = f"{where.__executable__} {rundate:%Y %m %d} ".split() + arg.split()
-            log.info(f"Running '{' '.join(cmd)}'")
-            count("Number of analyses")
-            try:
-                subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            except subprocess.CalledProcessError as err:
-                count("Failed analyses")
-                error_msg = err.stderr.decode().strip().split("\n")[-1]
-                error_logger(f"Command '{' '.join(cmd)}' failed: {error_msg}")
-            else:
-                count("Successful analyses")
-            copy_log_from_where(rundate, pipeline, arg)
-
-        rundate += timedelta(days=1)
+    # Run analyses in processes forked from the runner?
+    resident_opts = True if util.check_options("--resident") else None
+    use_resident = config.where.get("resident", section="runner", value=resident_opts, default=False).bool
+    if use_resident and not resident.is_available():
+        log.warn("Resident mode is not available on this platform, running analyses as separate programs")
+        use_resident = False
+    if use_resident:
+        with Timer("Preload Where modules in", logger=log.time):
+            resident.preload(config.where.runner.get("resident_preload", default="").list)
+
+    # Reports of the individual analyses are converted at the end of the batch, if conversion mode is 'batch'
+    report_queue = config.files.path("report_queue", file_vars=file_vars)
+    env = dict(os.environ, **{pandoc.BATCH_QUEUE_ENV: str(report_queue)})
+
+    # Loop over dates. Reports queued during the batch are converted also if the batch is stopped by an error
+    try:
+        rundate = from_date
+        while rundate <= to_date:
+            args = remove_runner_args(sys.argv[1:])
+            where_args = set(pipelines.get_args(rundate, pipeline, input_args=args))
+
+            for arg in sorted(where_args):
+                cmd = f"{where.__executable__} {rundate:%Y %m %d} ".split() + arg.split()
+                log.info(f"Running '{' '.join(cmd)}'")
+                count("Number of analyses")
+                try:
+                    if use_resident:
+                        resident.run(cmd, check=True, env=env)
+                    else:
+                        subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env)
+                except subprocess.CalledProcessError as err:
+                    count("Failed analyses")
+                    error_msg = err.stderr.decode().strip().split("\n")[-1]
+                    error_logger(f"Command '{' '.join(cmd)}' failed: {error_msg}")
+                else:
+                    count("Successful analyses")
+                copy_log_from_where(rundate, pipeline, arg)
+                collect_telemetry(rundate, pipeline, arg)
+
+            rundate += timedelta(days=1)
+
+        # Summarize where the time of the analyses is spent
+        if _TELEMETRY:
+            telemetry.write_summary(_TELEMETRY, config.files.path("telemetry_runner", file_vars=file_vars))
+            log_telemetry(config.where.get("runner_summary", section="telemetry", default=10).int)
+    finally:
+        # Convert reports queued during the batch
+        if report_queue.exists():
+            num_failed = pandoc.convert_batch(report_queue)
+            if num_failed:
+                log.error(f"Conversion of {num_failed} reports failed")
+            shutil.rmtree(report_queue, ignore_errors=True)
 
 
 def remove_runner_args(args):
@@ -160,16 +208,19 @@ def remove_runner_args(args):
     return list(args - runner_args)
 
 
-def copy_log_from_where(rundate, pipeline, args):
+def analysis_file_vars(rundate, pipeline, args):
+    """File variables of one analysis run by the runner"""
     kwargs = dict()
     for a in args.split():
         if "=" in a:
             a = a.split("=", maxsplit=1)
             kwargs[a[0].lstrip("-")] = a[1]
 
-    file_vars = dict(
-        **config.program_vars(rundate, pipeline, use_options=False, **kwargs), **config.date_vars(rundate)
-    )
+    return dict(**config.program_vars(rundate, pipeline, use_options=False, **kwargs), **config.date_vars(rundate))
+
+
+def copy_log_from_where(rundate, pipeline, args):
+    file_vars = analysis_file_vars(rundate, pipeline, args)
     log_level = config.where.runner.log_level.str
     current_level = "none"
     try:
@@ -186,6 +237,25 @@ def copy_log_from_where(rundate, pipeline, args):
         log.warn(f"'{err}'")
 
 
+def collect_telemetry(rundate, pipeline, args):
+    """Add the telemetry of one analysis to the telemetry of all analyses"""
+    file_path = config.files.path("telemetry", file_vars=analysis_file_vars(rundate, pipeline, args))
+    if file_path.exists():
+        telemetry.aggregate(telemetry.read(file_path), summary=_TELEMETRY)
+
+
+def log_telemetry(num_entries):
+    """Log the most time consuming stages, models, estimators and writers of all analyses"""
+    log.blank()
+    log.info("Most time consuming parts of the analyses:")
+    entries = sorted(_TELEMETRY.values(), key=lambda e: e["wall_time"], reverse=True)
+    for entry in entries[:num_entries]:
+        log.info(
+            f"{entry['kind']:>13s} {entry['name']:<30s} {entry['count']:6d} runs {entry['wall_time']:10.1f} s wall "
+            f"{entry['cpu_time']:10.1f} s CPU {entry['peak_rss_increase']:8.0f} MB peak {entry['num_obs']:12d} obs"
+        )
+
+
 def count(statistic):
     _STATISTICS[statistic] += 1
 
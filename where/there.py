@@ -90,6 +90,7 @@ from where import setup
 from where.data import dataset3 as dataset
 from where.data.time import Time, is_time
 from where.lib import config
+from where.lib import exceptions as where_exceptions
 from where.lib import log
 from where.lib import util
 from where.tools import delete
@@ -97,6 +98,7 @@ from where.tools import delete
 
 PLOT_TYPES = dict()  # Dynamically set by plot_type()
 TABS = dict()  # Dynamically set by register_tab()
+PLOTS = list()  # Set when each plot is created
 DROPDOWNS = dict()  # Dynamically set by register_dropdown()
 KEY_EVENTS = dict()  # Read from config by set_up_key_events()
 
@@ -114,6 +116,12 @@ class CallWrapperReportingException(tk.CallWrapper):
             return self.func(*args)
         except SystemExit:
             raise
+        except where_exceptions.DatasetFileChangedError as err:
+            # Fields are read from the dataset file when first used, which fails after the file has been rewritten,
+            # for instance by a new analysis. Reading the datasets again shows the new data.
+            log.warn(f"{err}. Reading the datasets again")
+            for plot in PLOTS:
+                plot.update_dataset()
         except:  # noqa
             import traceback
             from tkinter import messagebox
@@ -756,6 +764,7 @@ class Plot(FigureCanvasTkAgg, UpdateMixin):
         self.cmap = config.there.colormap.str
         self.event_colors = dict()
         self.draw()
+        PLOTS.append(self)
 
     def add_filter(self, filter_):
         self.filters.append(filter_.name.replace("filter_", ""))
@@ -772,7 +781,7 @@ class Plot(FigureCanvasTkAgg, UpdateMixin):
         for var in config.there.general.dataset_variables.list:
             if var is not None:
                 dset_vars[var] = self.vars[var]
-        self.dataset = dataset.Dataset.read(use_options=False, **dset_vars)
+        self.dataset = dataset.Dataset.read(use_options=False, lazy=True, **dset_vars)
 
         # Add event interval field
         events = self.dataset.meta.get_events()
@@ -792,6 +801,10 @@ class Plot(FigureCanvasTkAgg, UpdateMixin):
         self.update_next()
 
     def remember_data(self):
+        # The remembered dataset is filtered later, so the filter fields are read before the dataset file may change
+        for field in self.filters:
+            if field in self.dataset.fields:
+                self.dataset[field]
         self.other_dataset = self.dataset
         self.vars["x_axis_other"] = self.vars.get("x_axis_data")
         self.vars["y_axis_other"] = self.vars.get("y_axis_data")
@@ -111,7 +111,7 @@ def compare(date: "datedoy", pipeline: "pipeline", items: "option", specifier: "
         for id_ in items_:
             try:
                 dset = dataset.Dataset().read(
-                    rundate=date, pipeline=pipeline, stage=stage, label=label, id=id_, station=station
+                    rundate=date, pipeline=pipeline, stage=stage, label=label, id=id_, station=station, lazy=True
                 )
             except OSError:
                 log.warn(f"No data to read for Dataset id '{id_}'.")
@@ -126,7 +126,7 @@ def compare(date: "datedoy", pipeline: "pipeline", items: "option", specifier: "
 
             try:
                 dset = dataset.Dataset().read(
-                    rundate=date, pipeline=pipeline, stage=stage, label=label, id=id_, station=station
+                    rundate=date, pipeline=pipeline, stage=stage, label=label, id=id_, station=station, lazy=True
                 )
             except OSError:
                 log.warn(f"No data to read for Dataset station '{station}'.")
@@ -141,7 +141,7 @@ def compare(date: "datedoy", pipeline: "pipeline", items: "option", specifier: "
 
             try:
                 dset = dataset.Dataset().read(
-                    rundate=date, pipeline=pipeline, stage=stage, label=label, id=id_, station=station
+                    rundate=date, pipeline=pipeline, stage=stage, label=label, id=id_, station=station, lazy=True
                 )
             except OSError:
                 log.warn(f"No data to read for Dataset stage '{stage}'.")
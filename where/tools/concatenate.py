@@ -27,11 +27,14 @@ Furthermore, the following options are recognized:
 Option               Description
 ===================  ===========================================================
 --doy                Specify date as <year day-of-year>.
+--fields=            Comma separated list of top-level fields to read, for
+                     instance time,satellite,obs (Default: all fields).
 --label=             Dataset label (Default: 'last').
 --id=                Analysis identifier (Default: '').
 --only_for_rundate   Concatenate only data for given run date. Data are removed
                      from Datasets, which exceeds run date boundaries.
 --station=           Station name (Default: '').
+--threads=           Number of days read concurrently (Default: 4).
 --writers=           List with writers.
 -h, --help           Show this help message and exit.
 ===================  ===========================================================
@@ -56,12 +59,17 @@ Concatenate datasets from GNSS VEL analysis for a given period:
 Concatenate datasets from SISRE analysis for a given period:
   {exe:tools} concatenate 2018 2 1 2018 2 3 --sisre --stage=calculate --id=mgex_fnav_e1e5a_5min --label=2
 
+Concatenate only a few fields of 1 Hz GNSS datasets for a month:
+  {exe:tools} concatenate 2019 1 1 2019 1 31 --gnss --station=vegs --stage=edit --fields=time,satellite,system,obs
+
 Concatenate datasets from RINEX_NAV analysis for a given period:
   {exe:tools} concatenate 2018 2 1 2018 2 3 --rinex_nav --stage=edit --only_for_rundate --rinex_nav_report:only_for_rundate=False 
 """
 # Standard library imports
+import collections
+from concurrent import futures
 from datetime import date, datetime, timedelta
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Sequence, Tuple
 import sys
 
 # External library imports
@@ -91,12 +99,14 @@ def concatenate(from_date: "datedoy", to_date: "datedoy", pipeline: "pipeline",
     only_for_rundate = True if util.check_options("--only_for_rundate") else False
     station = util.read_option_value("--station", default="")
     writers = util.read_option_value("--writers", default="").replace(",", " ").split()
+    fields = util.read_option_value("--fields", default="").replace(",", " ").split() or None
+    threads = int(util.read_option_value("--threads", default="4"))
 
     # Update configuration of analysis
     config.tech.update_from_options(_clean_sys_argv(pipeline))
 
     dset_vars = dict(pipeline=pipeline, stage=stage, station=station, label=label, id=id_)
-    dset = _concatenate_datasets(from_date, to_date, dset_vars, only_for_rundate)
+    dset = _concatenate_datasets(from_date, to_date, dset_vars, only_for_rundate, fields=fields, threads=threads)
     if dset.num_obs == 0:
         log.fatal(f"No data to read period from {from_date} to {to_date}.")
     dset.write()
@@ -112,67 +122,90 @@ def concatenate(from_date: "datedoy", to_date: "datedoy", pipeline: "pipeline",
 def _clean_sys_argv(pipeline: str) -> List[str]:
     """Values in sys.argv that are not valid option values in Where
     """
-    reserved_opts = {pipeline, "label", "id", "only_for_rundate", "stage", "station", "writers"}
+    reserved_opts = {pipeline, "fields", "label", "id", "only_for_rundate", "stage", "station", "threads", "writers"}
     return [o for o in sys.argv[1:] if o.startswith("--") and o[2:].split("=")[0] not in reserved_opts]
 
 
 def _concatenate_datasets(
-    from_date: date, to_date: date, dset_vars: Dict[str, str], only_for_rundate: bool
-) -> np.ndarray:
+    from_date: date,
+    to_date: date,
+    dset_vars: Dict[str, str],
+    only_for_rundate: bool,
+    fields: Optional[Sequence[str]] = None,
+    threads: int = 1,
+) -> "Dataset":
     """Concatenate datasets
 
+    The days are read concurrently by a pool of threads, with at most `threads` days read ahead. The datasets are
+    merged pairwise, like in a merge sort: A merged dataset is only extended with a dataset covering at least as many
+    days. Each observation is therefore copied about log2(number of days) times, instead of once for every following
+    day when extending a single merged dataset day by day.
+
     Args:
         from_date:         Start date for reading Dataset.
         to_date:           End date for reading Dataset.
         dset_vars:         Common Dataset variables.
         only_for_rundate:  Concatenate only data for given rundate.
+        fields:            Top-level fields to read, all fields are read if None.
+        threads:           Number of threads reading datasets.
     """
-    dset_merged = None
 
     def read_dset(rundate):
         with Timer(f"Finish read of day {rundate} in", logger=log.time):
             try:
                 log.info(f"Reading data for {rundate}")
-                return dataset.Dataset.read(**dict(dset_vars, rundate=rundate))
-            except OSError as err:
+                dset = dataset.Dataset.read(**dict(dset_vars, rundate=rundate), fields=fields)
+            except (OSError, ValueError) as err:
                 log.warn(f"Unable to read data for {rundate}: {err}")
                 return dataset.Dataset()
 
-    date_to_read = from_date
-    while date_to_read <= to_date:
-
-        dset = read_dset(date_to_read)
-        if dset: # Skip extension if dataset is empty
-            
-            if only_for_rundate:
-                _keep_data_only_for_rundate(dset)
-
-                if dset.num_obs == 0:
-                    log.warn(f"No data to for {date_to_read} in dataset")
-
-            # Initialize merged dataset
-            if dset_merged is None:  
-
-                dset_merged = dset
-
-                # Merged dataset should be related to start date
-                if date_to_read != from_date:
-                    dset.vars["rundate"] = from_date.strftime("%Y-%m-%d")
-                    dset.analysis["rundate"] = from_date
-                    dset.analysis.update(config.date_vars(from_date))
-
-                date_to_read += timedelta(days=1)
+        if only_for_rundate:
+            _keep_data_only_for_rundate(dset)
+            if dset.num_obs == 0:
+                log.warn(f"No data to for {rundate} in dataset")
+        return dset
+
+    # Stack of merged datasets, with the number of days in each. The number of days decreases towards the top
+    merge_stack = list()
+
+    rundates = iter(from_date + timedelta(days=d) for d in range((to_date - from_date).days + 1))
+    threads = max(threads, 1)
+    with futures.ThreadPoolExecutor(max_workers=threads) as executor:
+        pending = collections.deque((d, executor.submit(read_dset, d)) for _, d in zip(range(threads), rundates))
+        while pending:
+            rundate, future = pending.popleft()
+            next_date = next(rundates, None)
+            if next_date is not None:
+                pending.append((next_date, executor.submit(read_dset, next_date)))
+
+            dset = future.result()
+            if not dset:  # Skip extension if dataset is empty
                 continue
 
-            with Timer(f"Finish extend for day {date_to_read} in", logger=log.time):
-                dset_merged.extend(dset)
-
-        date_to_read += timedelta(days=1)
-
-    if not dset_merged:
+            # Merged dataset should be related to start date
+            if not merge_stack and rundate != from_date:
+                dset.vars["rundate"] = from_date.strftime("%Y-%m-%d")
+                dset.analysis["rundate"] = from_date
+                dset.analysis.update(config.date_vars(from_date))
+
+            num_days = 1
+            while merge_stack and merge_stack[-1][0] <= num_days:
+                prev_days, prev_dset = merge_stack.pop()
+                with Timer(f"Finish extend with day {rundate} in", logger=log.time):
+                    prev_dset.extend(dset)
+                dset, num_days = prev_dset, prev_days + num_days
+            merge_stack.append((num_days, dset))
+
+    if not merge_stack:
+        return dataset.Dataset()
+
+    # Merge the remaining datasets, starting with the latest ones
+    _, dset_merged = merge_stack.pop()
+    while merge_stack:
+        _, dset = merge_stack.pop()
+        dset.extend(dset_merged)
         dset_merged = dset
-    else:
-        dset_merged.analysis.update(id=f"{dset_merged.analysis['id']}_concatenated")
+    dset_merged.analysis.update(id=f"{dset_merged.analysis['id']}_concatenated")
 
     return dset_merged
 
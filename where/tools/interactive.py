@@ -61,7 +61,7 @@ def interactive(rundate: "date", pipeline: "pipeline", **kwargs):  # typing: ign
             var_name = config.files.path("dataset", file_vars=file_vars)
             short_var_name = pipeline[0] + str(len([v for v in datasets if v.lstrip().startswith(pipeline[0])]))
             globals()[var_name] = dataset.Dataset.read(
-                rundate=rundate, pipeline=pipeline, stage=stage, label=label, **vars_dict[pipeline]
+                rundate=rundate, pipeline=pipeline, stage=stage, label=label, lazy=True, **vars_dict[pipeline]
             )
             globals()[short_var_name] = globals()[var_name]
             datasets.append("{:>6s}, {}".format(short_var_name, var_name))
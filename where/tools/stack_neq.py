@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+"""Stack normal equations from several sessions and solve them
+
+Usage::
+
+    {exe:tools} stack_neq <from_date> <to_date> --<pipeline> [options]
+
+The program requires dates. Typically, the date is given in the format
+`<year month day>` (for example 2015 8 4). However, it is also possible to
+specify the date as `<year day-of-year>` (for example 2015 216) by also adding
+the option `--doy`.
+
+The normal equations of all sessions in the given period are read one at a
+time, either from Where datasets or from SINEX files. Session-local parameters
+are eliminated, and the remaining global parameters are stacked into one
+normal equation system, see :mod:`where.estimation.stacking`. The stacked
+normal equations are solved with the minimum constraints configured by
+`neq_constraints`, `minimum_trf` and `minimum_crf`.
+
+The following commands are required:
+
+===================  ===========================================================
+Command              Description
+===================  ===========================================================
+from_date            The starting date in the format ``<year month day>``.
+to_date              The ending date in the format ``<year month day>``.
+{pipelines_doc:Stack normal equations from}
+===================  ===========================================================
+
+Furthermore, the following options are recognized:
+
+===================  ===========================================================
+Option               Description
+===================  ===========================================================
+--doy                Specify date as <year day-of-year>.
+--stage=             Stage of analysis (Default: 'estimate').
+--label=             Dataset label (Default: 'last').
+--id=                Analysis identifier (Default: '').
+--user=              User name of the analysis (Default: current user).
+--parameters=        Parameter types that are stacked, other parameters are
+                     eliminated (Default: '*site_pos, *src_dir').
+--velocities         Estimate station velocities. Positions are referred to
+                     the middle of the period, or --reference_epoch.
+--reference_epoch=   Reference epoch of positions as decimal year.
+--sinex=             Read normal equations from SINEX files instead of
+                     datasets. The value is a file path that may contain date
+                     variables like {{yyyy}} and {{doy}}, and wildcards.
+-h, --help           Show this help message and exit.
+===================  ===========================================================
+
+Parameters other than station positions and source positions are stacked per
+session, that is they are tagged with the date of the session.
+
+Example:
+--------
+Stack station and source positions from VLBI sessions of 2018:
+  {exe:tools} stack_neq 2018 1 1 2018 12 31 --vlbi --id=trf
+
+Estimate station positions and velocities from daily SINEX files:
+  {exe:tools} stack_neq 2018 1 1 2018 12 31 --vlbi --velocities --parameters=site_pos --sinex=/data/snx/{{yyyy}}/*{{yy}}{{doy}}*.snx
+"""
+
+# Standard library imports
+from datetime import date, datetime, time, timedelta
+import pathlib
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# External library imports
+import numpy as np
+
+# Midgard imports
+from midgard.dev import plugins
+from midgard.dev.timer import Timer
+from midgard.math.unit import Unit
+
+# Where imports
+from where import parsers
+from where.data import dataset3 as dataset
+from where.data.time import Time
+from where.estimation.stacking import NeqStack
+from where.lib import config
+from where.lib import log
+from where.lib import util
+
+# Parameter types that are stacked without epoch, other parameters are stacked per session
+_EPOCH_FREE_TYPES = ("site_pos", "site_vel", "src_dir")
+
+# Names of SINEX parameter types, mapped to parameter type and component of Where
+_SINEX_PARAMETERS = {
+    "STAX": ("site_pos", "x"),
+    "STAY": ("site_pos", "y"),
+    "STAZ": ("site_pos", "z"),
+    "VELX": ("site_vel", "x"),
+    "VELY": ("site_vel", "y"),
+    "VELZ": ("site_vel", "z"),
+    "RS_RA": ("src_dir", "ra"),
+    "RS_DE": ("src_dir", "dec"),
+}
+
+
+@plugins.register
+def stack_neq(from_date: "datedoy", to_date: "datedoy", pipeline: "pipeline"):
+    log.init(log_level="info")
+
+    # Get options
+    stage = util.read_option_value("--stage", default="estimate")
+    label = util.read_option_value("--label", default="last")
+    id_ = util.read_option_value("--id", default="")
+    user = util.read_option_value("--user", default="")
+    parameters = util.read_option_value("--parameters", default="*site_pos, *src_dir").replace(",", " ").split()
+    sinex = util.read_option_value("--sinex", default="")
+    reference_epoch = None
+    if util.check_options("--velocities"):
+        reference_epoch = float(
+            util.read_option_value("--reference_epoch", default="")
+            or (_decimal_year(from_date) + _decimal_year(to_date + timedelta(days=1))) / 2
+        )
+
+    stack = NeqStack(
+        parameters,
+        velocity_name=None if reference_epoch is None else _velocity_name,
+        reference_epoch=reference_epoch,
+    )
+    if sinex:
+        sessions = _read_sinex(from_date, to_date, sinex)
+    else:
+        dset_vars = dict(pipeline=pipeline, stage=stage, label=label, user=user, id=id_)
+        sessions = _read_datasets(from_date, to_date, dset_vars)
+
+    with Timer("Finish stacking normal equations in", logger=log.time):
+        for session_neq in sessions:
+            stack.add(**session_neq)
+    if not stack.num_sessions:
+        log.fatal(f"No normal equations found for period from {from_date} to {to_date}")
+    log.info(
+        f"Stacked {stack.num_sessions} sessions with {len(stack.names)} global parameters, "
+        f"{stack.num_eliminated} session parameters eliminated"
+    )
+
+    H, H_sigma = _minimum_constraints(stack)
+    try:
+        x, Q_xx, _ = stack.solve(H, H_sigma)
+    except np.linalg.LinAlgError as err:
+        log.fatal(f"Unable to solve stacked normal equations: {err}")
+
+    file_vars = dict(
+        config.create_file_vars(from_date, pipeline, id=id_, **({"user": user} if user else {})),
+        from_date=from_date.strftime("%Y%m%d"),
+        to_date=to_date.strftime("%Y%m%d"),
+    )
+    _write_solution(stack, x, Q_xx, file_vars)
+
+
+#
+# AUXILIARY FUNCTIONS
+#
+def _read_datasets(from_date: date, to_date: date, dset_vars: Dict[str, str]) -> Iterator[Dict[str, Any]]:
+    """Read normal equations from datasets, one session at a time
+
+    Args:
+        from_date:  Start date for reading datasets.
+        to_date:    End date for reading datasets.
+        dset_vars:  Common dataset variables.
+
+    Returns:
+        Generator of arguments to NeqStack.add for each session.
+    """
+    rundate = from_date
+    while rundate <= to_date:
+        try:
+            dset = dataset.Dataset.read(**dict(dset_vars, rundate=rundate))
+        except (OSError, ValueError) as err:
+            log.debug(f"No dataset for {rundate}: {err}")
+            rundate += timedelta(days=1)
+            continue
+
+        if "normal equation" not in dset.meta:
+            log.warn(f"Dataset for {rundate} does not contain normal equations")
+        else:
+            log.info(f"Reading normal equations for {rundate}")
+            names = dset.meta["normal equation"]["names"]
+            statistics = dset.meta.get("statistics", dict())
+            apriori = _dataset_apriori(dset)
+            yield dict(
+                names=[_session_name(n, rundate) for n in names],
+                N=np.array(dset.meta["normal equation"]["matrix"]),
+                b=np.array(dset.meta["normal equation"]["vector"]),
+                epoch=_decimal_year(rundate) + 0.5 / 365.25,
+                num_obs=statistics.get("number of observations"),
+                ltpl=statistics.get("weighted square sum of o-c"),
+                apriori=[apriori.get(n, np.nan) for n in names],
+            )
+        del dset
+        rundate += timedelta(days=1)
+
+
+def _dataset_apriori(dset: "Dataset") -> Dict[str, float]:
+    """Apriori station positions and source directions used in a dataset
+
+    Args:
+        dset:  Dataset with normal equations.
+
+    Returns:
+        Apriori values keyed by parameter name.
+    """
+    apriori = dict()
+    for name in dset.meta["normal equation"]["names"]:
+        parameter, _, subparameter = name.partition("-")
+        item, _, component = subparameter.rpartition("_")
+        if parameter.endswith("_site_pos"):
+            for suffix in ("", "_1", "_2"):
+                idx = dset[f"station{suffix}"] == item if f"station{suffix}" in dset.fields else []
+                if np.any(idx):
+                    pos = np.mean(np.asarray(dset[f"site_pos{suffix}"].trs)[idx], axis=0)
+                    apriori[name] = pos["xyz".index(component)]
+                    break
+        elif parameter.endswith("_src_dir") and "src_dir" in dset.fields:
+            idx = dset.source == item.replace("dot", ".")
+            if np.any(idx):
+                src_dir = dset.src_dir[idx]
+                value = src_dir.right_ascension if component == "ra" else src_dir.declination
+                apriori[name] = np.mean(value)
+    return apriori
+
+
+def _read_sinex(from_date: date, to_date: date, path_pattern: str) -> Iterator[Dict[str, Any]]:
+    """Read normal equations from SINEX files, one file at a time
+
+    Args:
+        from_date:     Start date for finding files.
+        to_date:       End date for finding files.
+        path_pattern:  Path to the files, possibly with date variables and wildcards.
+
+    Returns:
+        Generator of arguments to NeqStack.add for each file.
+    """
+    rundate = from_date
+    read_paths = set()
+    while rundate <= to_date:
+        path = pathlib.Path(path_pattern.format(**config.date_vars(rundate)))
+        file_paths = sorted(path.parent.glob(path.name)) if path.parent.exists() else []
+        for file_path in file_paths:
+            if file_path in read_paths:
+                continue
+            read_paths.add(file_path)
+            neq = _sinex_neq(file_path)
+            if neq is not None:
+                yield neq
+        rundate += timedelta(days=1)
+
+
+def _sinex_neq(file_path: pathlib.Path) -> Optional[Dict[str, Any]]:
+    """Normal equations of one SINEX file
+
+    Args:
+        file_path:  Path to SINEX file.
+
+    Returns:
+        Arguments to NeqStack.add, or None if the file does not contain normal equations.
+    """
+    log.info(f"Reading normal equations from {file_path}")
+    data = parsers.parse_file("sinex_neq", file_path=file_path).as_dict()
+    if "SOLUTION/NORMAL_EQUATION_MATRIX" not in data or "SOLUTION/NORMAL_EQUATION_VECTOR" not in data:
+        log.warn(f"No normal equations in {file_path}")
+        return None
+
+    estimate = data["SOLUTION/ESTIMATE"]
+    epochs = estimate["ref_epoch"]
+    names = list()
+    for param_name, site_code, point_code, epoch in zip(
+        estimate["param_name"], estimate["site_code"], estimate["point_code"], epochs
+    ):
+        param_name, site_code, point_code = param_name.strip(), site_code.strip(), point_code.strip()
+        if param_name in _SINEX_PARAMETERS:
+            parameter, component = _SINEX_PARAMETERS[param_name]
+            item = f"{site_code}_{point_code}" if parameter.startswith("site") else site_code.replace(".", "dot")
+            names.append(f"{parameter}-{item}_{component}")
+        else:
+            names.append(_session_name(f"{param_name.lower()}-{site_code.strip('-') or 'all'}", epoch))
+
+    apriori = np.full(len(names), np.nan)
+    if "SOLUTION/APRIORI" in data:
+        apriori[data["SOLUTION/APRIORI"]["param_idx"] - 1] = data["SOLUTION/APRIORI"]["apriori"]
+
+    statistics = dict()
+    if "SOLUTION/STATISTICS" in data:
+        stats = data["SOLUTION/STATISTICS"]
+        statistics = {k.strip(): v for k, v in zip(stats["info_type"], stats["info"])}
+    num_obs = statistics.get("NUMBER OF OBSERVATIONS")
+
+    return dict(
+        names=names,
+        N=data["SOLUTION/NORMAL_EQUATION_MATRIX"]["matrix"],
+        b=data["SOLUTION/NORMAL_EQUATION_VECTOR"]["value"],
+        epoch=np.mean([_decimal_year(e) for e in epochs]),
+        num_obs=None if num_obs is None else int(num_obs),
+        ltpl=statistics.get("WEIGHTED SQUARE SUM OF O-C"),
+        apriori=apriori,
+    )
+
+
+def _session_name(name: str, epoch: date) -> str:
+    """Name of a parameter in the stacked normal equations
+
+    Station and source positions are common to all sessions. Other parameters, like EOP, are tagged with the epoch
+    of the session.
+    """
+    if name.split("-", maxsplit=1)[0].endswith(_EPOCH_FREE_TYPES):
+        return name
+    return f"{name}:{epoch.isoformat()}"
+
+
+def _velocity_name(name: str) -> Optional[str]:
+    """Name of the velocity parameter of a station position parameter"""
+    parameter, _, subparameter = name.partition("-")
+    if not parameter.endswith("site_pos"):
+        return None
+    return f"{parameter[: -len('site_pos')]}site_vel-{subparameter}"
+
+
+def _decimal_year(epoch: date) -> float:
+    """Convert a date or datetime to decimal year"""
+    if not isinstance(epoch, datetime):
+        epoch = datetime.combine(epoch, time())
+    return Time(epoch, scale="utc", fmt="datetime").decimalyear
+
+
+def _minimum_constraints(stack: NeqStack) -> Tuple[np.ndarray, np.ndarray]:
+    """Minimum constraints on the stacked station and source positions
+
+    The constraints are configured in the `neq_constraints`, `minimum_trf` and `minimum_crf` configuration options.
+
+    Args:
+        stack:  Stacked normal equations.
+
+    Returns:
+        Tuple with condition equations and standard deviation of each condition.
+    """
+    constraints = config.tech.get("neq_constraints", default="").list
+    apriori = dict(zip(stack.names, stack.apriori))
+    H, H_sigma = [np.zeros((0, len(stack.names)))], [np.zeros(0)]
+
+    if "minimum_trf" in constraints:
+        cfg = config.tech.minimum_trf
+        skip_stations = cfg.get("skip_stations", default="").list
+        positions = dict()
+        for name in stack.names:
+            parameter, _, subparameter = name.partition("-")
+            station = subparameter.rsplit("_", maxsplit=1)[0]
+            if not (parameter.endswith("site_pos") and name.endswith("_x")) or station in skip_stations:
+                continue
+            xyz_names = [name[:-1] + c for c in "xyz"]
+            xyz = np.array([apriori.get(n, np.nan) for n in xyz_names])
+            if not np.isnan(xyz).any():
+                positions[station] = (xyz_names, xyz)
+
+        if len(positions) < 3:
+            log.warn("Too few stations to use minimum constraints on station positions")
+        else:
+            nnt, nnr, nns = cfg.nnt.bool, cfg.nnr.bool, cfg.nns.bool
+            sigma = np.concatenate(
+                [
+                    np.full(3 * nnt, cfg.nnt_sigma.float * Unit(cfg.nnt_unit.str, "meter")),
+                    np.full(1 * nns, cfg.nns_sigma.float * Unit(cfg.nns_unit.str, "unit")),
+                    np.full(3 * nnr, cfg.nnr_sigma.float * Unit(cfg.nnr_unit.str, "rad")),
+                ]
+            )
+            H_trf = stack.minimum_trf_matrix(positions, nnt=nnt, nnr=nnr, nns=nns)
+            H.append(H_trf)
+            H_sigma.append(np.tile(sigma, len(H_trf) // max(len(sigma), 1)))
+            applied = [c for c, use in (("NNT", nnt), ("NNR", nnr), ("NNS", nns)) if use]
+            log.info(f"Applying {'/'.join(applied)} with {len(positions)} stations")
+
+    if "minimum_crf" in constraints:
+        cfg = config.tech.minimum_crf
+        skip_sources = cfg.get("skip_sources", default="").list
+        directions = dict()
+        for name in stack.names:
+            parameter, _, subparameter = name.partition("-")
+            source = subparameter.rsplit("_", maxsplit=1)[0]
+            if not (parameter.endswith("src_dir") and name.endswith("_ra")) or source in skip_sources:
+                continue
+            ra_dec_names = (name, name[: -len("ra")] + "dec")
+            ra_dec = tuple(apriori.get(n, np.nan) for n in ra_dec_names)
+            if not np.isnan(ra_dec).any():
+                directions[source] = (ra_dec_names, ra_dec)
+
+        if directions:
+            H.append(stack.nnr_crf_matrix(directions))
+            H_sigma.append(np.full(3, cfg.sigma.float * Unit(cfg.unit.str, "rad")))
+            log.info(f"Applying NNR to CRF with {len(directions)} sources")
+
+    return np.concatenate(H), np.concatenate(H_sigma)
+
+
+def _write_solution(stack: NeqStack, x: np.ndarray, Q_xx: np.ndarray, file_vars: Dict[str, str]) -> None:
+    """Write the solution of the stacked normal equations to file
+
+    Args:
+        stack:      Stacked normal equations.
+        x:          Solution, corrections to the apriori values.
+        Q_xx:       Covariance matrix of the solution.
+        file_vars:  File variables used to find the output file.
+    """
+    lines: List[str] = [f"{'Parameter':<40} {'Apriori':>22} {'Correction':>16} {'Sigma':>16}"]
+    for name, apriori, correction, variance in zip(stack.names, stack.apriori, x, np.diag(Q_xx)):
+        lines.append(f"{name:<40} {apriori:22.10f} {correction:16.10f} {np.sqrt(np.abs(variance)):16.10f}")
+
+    with config.files.open("output_stack_neq", file_vars=file_vars, create_dirs=True, mode="wt") as fid:
+        fid.write("\n".join(lines) + "\n")
+    log.info(f"Solution written to {config.files.path('output_stack_neq', file_vars=file_vars)}")
+    log.out(f"Solution of stacked normal equations for {stack.num_sessions} sessions:\n" + "\n".join(lines[:21]))
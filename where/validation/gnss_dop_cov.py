@@ -15,11 +15,15 @@ from midgard.dev import plugins
 
 # Where imports
 from where.lib import config
+from where.lib import epochs
 from where.lib import log
 
 # Name of section in configuration
 _SECTION = "_".join(__name__.split(".")[-1:])
 
+# Elements of the 3x3 covariance matrix of site positions, row by row
+_COV_COMPONENTS = ("xx", "xy", "xz", "xy", "yy", "yz", "xz", "yz", "zz")
+
 
 @plugins.register
 def gnss_dop_cov(dset: "Dataset") -> None:
@@ -81,28 +85,18 @@ def gnss_dop_cov(dset: "Dataset") -> None:
 
     else:
         if config.tech.estimate_epochwise.bool:
-            hdop = np.zeros(dset.num_obs)
-            vdop = np.zeros(dset.num_obs)
-
-            for epoch in sorted(set(dset.time.gps.mjd)):
-                cov_xyz = np.zeros((3, 3))
-                idx = dset.time.gps.mjd == epoch
-
-                cov_xyz[0][0] = dset.estimate_cov_site_pos_xx[idx][0]
-                cov_xyz[0][1] = dset.estimate_cov_site_pos_xy[idx][0]
-                cov_xyz[1][0] = dset.estimate_cov_site_pos_xy[idx][0]
-                cov_xyz[0][2] = dset.estimate_cov_site_pos_xz[idx][0]
-                cov_xyz[2][0] = dset.estimate_cov_site_pos_xz[idx][0]
-                cov_xyz[1][1] = dset.estimate_cov_site_pos_yy[idx][0]
-                cov_xyz[1][2] = dset.estimate_cov_site_pos_yz[idx][0]
-                cov_xyz[2][1] = dset.estimate_cov_site_pos_yz[idx][0]
-                cov_xyz[2][2] = dset.estimate_cov_site_pos_zz[idx][0]
-
-                R = dset.site_pos._enu2itrs[idx][0]
-                sigma0 = dset.estimate_variance_factor[idx][0]
-                q_enu = R.T @ (cov_xyz / sigma0) @ R
-                hdop[idx] = np.sqrt(q_enu[0][0] + q_enu[1][1])
-                vdop[idx] = np.sqrt(q_enu[2][2])
+            groups = epochs.EpochGroups(dset.time)
+            idx = groups.first
+            cov_xyz = np.stack(
+                [dset[f"estimate_cov_site_pos_{c}"][idx] for c in _COV_COMPONENTS],
+                axis=1,
+            ).reshape(-1, 3, 3)
+
+            R = dset.site_pos._enu2itrs[idx]
+            sigma0 = dset.estimate_variance_factor[idx]
+            q_enu = np.transpose(R, (0, 2, 1)) @ (cov_xyz / sigma0[:, None, None]) @ R
+            hdop = groups.broadcast(np.sqrt(q_enu[:, 0, 0] + q_enu[:, 1, 1]))
+            vdop = groups.broadcast(np.sqrt(q_enu[:, 2, 2]))
 
         else:
             cov_xyz = np.zeros((3, 3))
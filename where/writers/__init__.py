@@ -30,6 +30,7 @@ from midgard.writers import names, write as write_one  # noqa
 # Where imports
 from where.lib import config
 from where.lib import log
+from where.lib import telemetry
 from where.data import dataset3 as dataset
 
 # Add Where writers to Midgard writers
@@ -67,9 +68,11 @@ def write(default_dset):
             stage = stage if stage else default_dset.vars["stage"]
             label = label if label else "last"
             dset = dataset.Dataset.read(stage=stage, label=label, **dset_vars)
-            plugins.call(package_name=mg_writers.__name__, plugin_name=writer, prefix=prefix, dset=dset)
         else:
-            plugins.call(package_name=mg_writers.__name__, plugin_name=writer, prefix=prefix, dset=default_dset)
+            dset = default_dset
+
+        with telemetry.measure("writer", writer, dset=dset):
+            plugins.call(package_name=mg_writers.__name__, plugin_name=writer, prefix=prefix, dset=dset)
 
     publish_files()
 
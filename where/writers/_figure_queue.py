@@ -0,0 +1,311 @@
+"""Queue for rendering report figures in parallel
+
+Description:
+------------
+
+Report writers generate a large number of figures with the Midgard MatPlotExt class. Instead of rendering each figure
+directly, the figures can be added as jobs to a FigureQueue. The jobs are rendered together with the `render` method,
+which distributes the figures over a pool of processes using the non-interactive Agg backend of matplotlib. The
+processes are started with the forkserver (or spawn) method, so that they do not inherit the state of the analysis,
+like open files, threads and the matplotlib backend, from the process running the writers. Figures rendered in the
+process running the writers also use the Agg backend, and the previous backend is restored afterwards.
+
+A content hash of the input arrays and plotting options is calculated for each figure. If the hash matches the hash
+of the existing figure file, the figure is not rendered again. The hashes are stored in a hidden index file in the
+figure directory.
+
+Following options can be set in the [report] section of the Where configuration:
+
+    figure_processes       Number of processes used for rendering figures (0 means number of CPUs).
+    figure_skip_unchanged  Skip rendering of figures, if the input of the figure is unchanged.
+
+Example:
+--------
+
+    >>> figure_queue = FigureQueue()
+    >>> figure_queue.add("plot", x_arrays=[x], y_arrays=[y], figure_path=figure_path, options={"plot_to": "file"})
+    >>> figure_queue.render()
+
+"""
+
+# Standard library imports
+from concurrent import futures
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import date, datetime
+import hashlib
+import json
+import multiprocessing
+import os
+import pathlib
+import time
+from typing import Any, Dict, Iterator, List, Union
+
+# External library imports
+import matplotlib
+import numpy as np
+
+# Midgard imports
+import midgard
+from midgard.plot.matplotext import MatPlotExt
+
+# Where imports
+from where.lib import config
+from where.lib import log
+
+HASH_INDEX_NAME = ".figure_hash.json"
+
+
+@dataclass
+class FigureJob:
+    """A figure, which should be rendered by a MatPlotExt plot method
+
+    Args:
+        method:       Name of MatPlotExt plot method (e.g. 'plot' or 'plot_subplots').
+        figure_path:  Path of the figure file.
+        kwargs:       Keyword arguments passed to the MatPlotExt plot method.
+        hash:         Content hash of the figure input.
+    """
+
+    method: str
+    figure_path: pathlib.PosixPath
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+    hash: str = ""
+
+
+class FigureQueue:
+    """Queue of figures, which are rendered together in a process pool"""
+
+    def __init__(self, num_processes: Union[int, None] = None, skip_unchanged: Union[bool, None] = None) -> None:
+        """Set up a new figure queue
+
+        Args:
+            num_processes:   Number of processes used for rendering. Default is read from configuration.
+            skip_unchanged:  Skip figures with unchanged input. Default is read from configuration.
+        """
+        if num_processes is None:
+            num_processes = config.where.report.get("figure_processes", default=0).int
+        if skip_unchanged is None:
+            skip_unchanged = config.where.report.get("figure_skip_unchanged", default=True).bool
+
+        self.num_processes = num_processes if num_processes > 0 else (os.cpu_count() or 1)
+        self.skip_unchanged = skip_unchanged
+        self.jobs: List[FigureJob] = list()
+
+    def __len__(self) -> int:
+        """Number of figures waiting to be rendered"""
+        return len(self.jobs)
+
+    def add(self, method: str, **kwargs: Any) -> pathlib.PosixPath:
+        """Add a figure job to the queue
+
+        Figures, which are not plotted to file, are rendered immediately.
+
+        Args:
+            method:  Name of MatPlotExt plot method.
+            kwargs:  Keyword arguments passed to the MatPlotExt plot method.
+
+        Returns:
+            Path of figure.
+        """
+        figure_path = pathlib.Path(kwargs.get("figure_path", kwargs.get("path", "plot.png")))
+        options = kwargs.get("options") or dict()
+        if options.get("plot_to", "console") != "file":
+            getattr(MatPlotExt(), method)(**kwargs)
+            return figure_path
+
+        self.jobs.append(
+            FigureJob(method=method, figure_path=figure_path, kwargs=kwargs, hash=_hash_job(method, kwargs))
+        )
+        return figure_path
+
+    def render(self) -> None:
+        """Render all figures in the queue
+
+        Figures with unchanged input are skipped. The queue is empty afterwards.
+        """
+        jobs, self.jobs = self.jobs, list()
+        if not jobs:
+            return
+
+        # Skip figures where the figure file already exists with the same content hash
+        hash_indices = {d: _read_hash_index(d) for d in {j.figure_path.parent for j in jobs}}
+        if self.skip_unchanged:
+            todo = [
+                j
+                for j in jobs
+                if not (
+                    j.figure_path.exists() and hash_indices[j.figure_path.parent].get(j.figure_path.name) == j.hash
+                )
+            ]
+            if len(todo) < len(jobs):
+                log.debug(f"Skip {len(jobs) - len(todo)} of {len(jobs)} figures with unchanged input")
+        else:
+            todo = jobs
+
+        # Render figures, in a process pool if more than one process is available
+        time_start = time.perf_counter()
+        num_processes = min(self.num_processes, len(todo))
+        if num_processes > 1:
+            with futures.ProcessPoolExecutor(
+                max_workers=num_processes, mp_context=_pool_context(), initializer=_init_worker
+            ) as executor:
+                results = executor.map(_render_job, [(j.method, j.kwargs) for j in todo])
+                rendered = list(zip(todo, results))
+        else:
+            with _agg_backend():
+                rendered = [(j, _render_job((j.method, j.kwargs))) for j in todo]
+
+        # Log timing of figures and update hash index
+        for job, (elapsed, error) in rendered:
+            index = hash_indices[job.figure_path.parent]
+            if error:
+                log.warn(f"Figure {job.figure_path} could not be plotted: {error}")
+                index.pop(job.figure_path.name, None)
+                continue
+            log.time(f"Finish figure {job.figure_path.name} in {elapsed:.4f} seconds")
+            index[job.figure_path.name] = job.hash
+
+        for figure_dir, index in hash_indices.items():
+            _write_hash_index(figure_dir, index)
+
+        log.time(
+            f"Finish {len(todo)} figures ({len(jobs) - len(todo)} skipped) with {max(num_processes, 1)} processes "
+            f"in {time.perf_counter() - time_start:.4f} seconds"
+        )
+
+
+def _pool_context() -> multiprocessing.context.BaseContext:
+    """Context for starting new rendering processes, forkserver if it is available, otherwise spawn"""
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(method)
+
+
+def _init_worker() -> None:
+    """Use the non-interactive Agg backend of matplotlib for rendering"""
+    import matplotlib.pyplot as plt
+
+    plt.switch_backend("Agg")
+
+
+@contextmanager
+def _agg_backend() -> Iterator[None]:
+    """Use the Agg backend of matplotlib for rendering in this process, and restore the previous backend afterwards
+
+    Switching the backend closes all open figures, so the backend is only switched if it is not Agg already.
+    """
+    import matplotlib.pyplot as plt
+
+    backend = matplotlib.get_backend()
+    if backend.lower() == "agg":
+        yield
+        return
+
+    plt.switch_backend("Agg")
+    try:
+        yield
+    finally:
+        plt.switch_backend(backend)
+
+
+def _render_job(job: tuple) -> tuple:
+    """Render one figure
+
+    Args:
+        job:   Tuple with name of MatPlotExt plot method and keyword arguments.
+
+    Returns:
+        Tuple with elapsed time in seconds and error message (empty if rendering succeeded).
+    """
+    method, kwargs = job
+    time_start = time.perf_counter()
+    try:
+        getattr(MatPlotExt(), method)(**kwargs)
+    except Exception as err:
+        return time.perf_counter() - time_start, f"{type(err).__name__}: {err}"
+    return time.perf_counter() - time_start, ""
+
+
+def _hash_job(method: str, kwargs: Dict[str, Any]) -> str:
+    """Calculate content hash of a figure job
+
+    Args:
+        method:  Name of MatPlotExt plot method.
+        kwargs:  Keyword arguments passed to the MatPlotExt plot method.
+
+    Returns:
+        Hexadecimal SHA-256 digest.
+    """
+    hasher = hashlib.sha256()
+    hasher.update(f"midgard {midgard.__version__} {method}".encode())
+    _update_hash(hasher, kwargs)
+    return hasher.hexdigest()
+
+
+def _update_hash(hasher: "hashlib._Hash", value: Any) -> None:
+    """Update hash object recursively with a value
+
+    Args:
+        hasher:  Hash object.
+        value:   Value added to hash, can be nested dicts, lists and NumPy arrays.
+    """
+    if isinstance(value, dict):
+        hasher.update(b"{")
+        for key in sorted(value, key=str):
+            hasher.update(str(key).encode())
+            _update_hash(hasher, value[key])
+        hasher.update(b"}")
+    elif isinstance(value, (list, tuple)):
+        hasher.update(b"[")
+        for item in value:
+            _update_hash(hasher, item)
+        hasher.update(b"]")
+    elif isinstance(value, np.ndarray):
+        hasher.update(f"{value.dtype.str}{value.shape}".encode())
+        if value.dtype == object:
+            # Object arrays contain pointers, hash a stable representation instead (e.g. of datetime objects)
+            if value.size and isinstance(value.flat[0], (datetime, date)):
+                value = value.astype("datetime64[us]")
+            else:
+                hasher.update("\x1f".join(str(v) for v in value.flat).encode())
+                return
+        hasher.update(np.ascontiguousarray(value).tobytes())
+    elif hasattr(value, "to_numpy") and hasattr(value, "columns"):  # Pandas DataFrame
+        _update_hash(hasher, [list(value.columns), list(value.index), value.to_numpy()])
+    else:
+        hasher.update(repr(value).encode())
+
+
+def _read_hash_index(figure_dir: pathlib.PosixPath) -> Dict[str, str]:
+    """Read hash index of a figure directory
+
+    Args:
+        figure_dir:  Figure directory.
+
+    Returns:
+        Dictionary with figure file names as keys and content hashes as values.
+    """
+    try:
+        with open(figure_dir / HASH_INDEX_NAME, mode="rt") as fid:
+            return json.load(fid)
+    except (OSError, ValueError):
+        return dict()
+
+
+def _write_hash_index(figure_dir: pathlib.PosixPath, index: Dict[str, str]) -> None:
+    """Write hash index of a figure directory
+
+    The index is written to a temporary file first, so that concurrent readers never see a partly written file.
+
+    Args:
+        figure_dir:  Figure directory.
+        index:       Dictionary with figure file names as keys and content hashes as values.
+    """
+    index_path = figure_dir / HASH_INDEX_NAME
+    tmp_path = index_path.with_name(f"{HASH_INDEX_NAME}.{os.getpid()}")
+    try:
+        with open(tmp_path, mode="wt") as fid:
+            json.dump(index, fid, indent=1, sort_keys=True)
+        os.replace(tmp_path, index_path)
+    except OSError as err:
+        log.warn(f"Could not write figure hash index {index_path}: {err}")
@@ -26,6 +26,7 @@ from where.data import dataset3 as dataset
 from where.lib import config
 from where.lib import log
 from where.lib.util import get_day_limits
+from where.writers._figure_queue import FigureQueue
     
 
 
@@ -52,6 +53,7 @@ class GnssPlot:
         dset: "Dataset",
         figure_dir: pathlib.PosixPath,
         figure_format: str="png",
+        figure_queue: Union[FigureQueue, None]=None,
     ) -> None:
         """Set up a new GNSS plot object
 
@@ -59,10 +61,24 @@ class GnssPlot:
             dset:          A dataset containing the data.
             figure_dir:    Figure directory.
             figure_format: Figure format.
+            figure_queue:  Figure queue used for rendering the figures. If not given, figures are rendered directly.
         """
         self.dset = dset
         self.figure_dir = figure_dir
         self.figure_format = figure_format
+        self.figure_queue = figure_queue
+
+
+    def _plot(self, **kwargs) -> None:
+        """Plot figure with MatPlotExt or add it to figure queue
+
+        Args:
+            kwargs:  Keyword arguments passed to MatPlotExt.plot.
+        """
+        if self.figure_queue is None:
+            MatPlotExt().plot(**kwargs)
+        else:
+            self.figure_queue.add("plot", **kwargs)
         
         
     def plot_dop(self,
@@ -76,8 +92,7 @@ class GnssPlot:
         figure_path = self.figure_dir / figure_name.replace("{FIGURE_FORMAT}", self.figure_format)
         log.debug(f"Plot {figure_path}.")
     
-        plt = MatPlotExt()
-        plt.plot(
+        self._plot(
             x_arrays=[
                 self.dset.time.gps.datetime,
                 self.dset.time.gps.datetime,
@@ -143,8 +158,7 @@ class GnssPlot:
                     labels.append(sat)  
                 
                 # Plot scatter plot
-                plt = MatPlotExt()
-                plt.plot(
+                self._plot(
                     x_arrays=x_arrays,
                     y_arrays=y_arrays,
                     xlabel="Time [GPS]",
@@ -300,8 +314,7 @@ class GnssPlot:
                 ylabel = f"Field ({field})"
 
             # Plot scatter plot
-            plt = MatPlotExt()
-            plt.plot(
+            self._plot(
                 x_arrays=x_arrays,
                 y_arrays=y_arrays,
                 xlabel="Time [GPS]",
@@ -402,8 +415,7 @@ class GnssPlot:
                     title = f"{enums.gnss_id_to_name[sys].value.upper()} signal-in-space status ({nav_type})"
                     
                 # Generate plot
-                plt = MatPlotExt()
-                plt.plot(
+                self._plot(
                     x_arrays=x_arrays,
                     y_arrays=y_arrays,
                     xlabel="Time [GPS]",
@@ -470,8 +482,7 @@ class GnssPlot:
         day_start, day_end = get_day_limits(self.dset)
     
         # Generate plot
-        plt = MatPlotExt()
-        plt.plot(
+        self._plot(
             x_arrays=x_arrays,
             y_arrays=y_arrays,
             xlabel="Time [GPS]",
@@ -548,8 +559,7 @@ class GnssPlot:
                         labels.append(sat)  
                     
                     # Plot scatter plot
-                    plt = MatPlotExt()
-                    plt.plot(
+                    self._plot(
                         x_arrays=x_arrays,
                         y_arrays=y_arrays,
                         xlabel="Time [GPS]",
@@ -594,8 +604,7 @@ class GnssPlot:
                         labels.append(sat)  
 
                     # Plot scatter plot
-                    plt = MatPlotExt()
-                    plt.plot(
+                    self._plot(
                         x_arrays=x_arrays,
                         y_arrays=y_arrays,
                         xlabel="Time [GPS]",
@@ -641,8 +650,7 @@ class GnssPlot:
                         labels.append(sat)  
 
                     # Plot scatter plot
-                    plt = MatPlotExt()
-                    plt.plot(
+                    self._plot(
                         x_arrays=x_arrays,
                         y_arrays=y_arrays,
                         xlabel="Time [GPS]",
@@ -692,8 +700,7 @@ class GnssPlot:
                     ylabel = f"{name1.capitalize()}-{name2} ({obscode})"
                     
                     # Plot scatter plot
-                    plt = MatPlotExt()
-                    plt.plot(
+                    self._plot(
                         x_arrays=x_arrays,
                         y_arrays=y_arrays,
                         xlabel="Time [GPS]",
@@ -747,8 +754,7 @@ class GnssPlot:
             labels.append(enums.gnss_id_to_name[sys].value)
     
         # Plot scatter plot
-        plt = MatPlotExt()
-        plt.plot(
+        self._plot(
             x_arrays=x_arrays,
             y_arrays=y_arrays,
             xlabel="Time [GPS]",
@@ -796,8 +802,7 @@ class GnssPlot:
                 write_level="operational",
             )
     
-        plt = MatPlotExt()
-        plt.plot(
+        self._plot(
             x_arrays=[self.dset.time.gps.datetime, self.dset.time.gps.datetime],
             y_arrays=[self.dset.num_satellite_available, self.dset.num_satellite_used],
             xlabel="Time [GPS]",
@@ -862,8 +867,7 @@ class GnssPlot:
                         x_arrays.append(self.dset.time.gps.datetime[keep_idx])
                         y_arrays.append(np.full(num_obs, f"{sat}_{obstype}"))
 
-            plt = MatPlotExt()
-            plt.plot(
+            self._plot(
                 x_arrays=x_arrays,
                 y_arrays=y_arrays,
                 xlabel="Time [GPS]",
@@ -914,8 +918,7 @@ class GnssPlot:
             
         # Plot scatter plot
         num_sat = len(self.dset.unique("satellite"))
-        plt = MatPlotExt()
-        plt.plot(
+        self._plot(
             x_arrays=x_arrays,
             y_arrays=y_arrays,
             xlabel="Time [GPS]",
@@ -986,8 +989,7 @@ class GnssPlot:
         
             # Plot with polar projection
             # TODO: y-axis labels are overwritten after second array plot. Why? What to do?
-            plt = MatPlotExt()
-            plt.plot(
+            self._plot(
                 x_arrays=x_arrays,
                 y_arrays=y_arrays,
                 xlabel="",
@@ -1059,8 +1061,7 @@ class GnssPlot:
                 labels.append(sat)
         
             # Plot with scatter plot
-            plt = MatPlotExt()
-            plt.plot(
+            self._plot(
                 x_arrays=x_arrays,
                 y_arrays=y_arrays,
                 xlabel="Time [GPS]",
@@ -1126,8 +1127,7 @@ class GnssPlot:
             return None
     
         # Generate plot
-        plt = MatPlotExt()
-        plt.plot(
+        self._plot(
             x_arrays=[time_read.tolist(), time_orbit.tolist(), time_edit.tolist()],
             y_arrays=[satellite_read.tolist(), satellite_orbit.tolist(), satellite_edit.tolist()],
             xlabel="Time [GPS]",
@@ -1230,8 +1230,7 @@ class GnssPlot:
                 figure_paths.append(figure_path)
                 log.debug(f"Plot {figure_path}.")
                          
-                plt = MatPlotExt()
-                plt.plot(
+                self._plot(
                     x_arrays= [satellites, satellites],
                     y_arrays=[tgd_sat_mean, dcb_sat_mean],
                     xlabel="Satellite",
@@ -1257,8 +1256,7 @@ class GnssPlot:
                 figure_path = self.figure_dir / figure_name.replace("{FIGURE_FORMAT}", self.figure_format).replace("{solution}", f"{sys}_{field}_dcb_diff")
                 figure_paths.append(figure_path)
                 log.debug(f"Plot {figure_path}.")
-                plt = MatPlotExt()
-                plt.plot(
+                self._plot(
                     x_arrays= [satellites],
                     y_arrays=[tgd_dcb_sat_mean],
                     yerr_arrays=[tgd_dcb_sat_std],
@@ -1284,8 +1282,7 @@ class GnssPlot:
                 figure_path = self.figure_dir / figure_name.replace("{FIGURE_FORMAT}", self.figure_format).replace("{solution}", f"{sys}_{field}_dcb_diff_rms")
                 figure_paths.append(figure_path)
                 log.debug(f"Plot {figure_path}.")
-                plt = MatPlotExt()
-                plt.plot(
+                self._plot(
                     x_arrays= [satellites],
                     y_arrays=[tgd_dcb_sat_rms],
                     xlabel="Satellite",
@@ -1308,8 +1305,7 @@ class GnssPlot:
                 figure_path = self.figure_dir / figure_name.replace("{FIGURE_FORMAT}", self.figure_format).replace("{solution}", f"{sys}_{field}_dcb_diff_percentile")
                 figure_paths.append(figure_path)
                 log.debug(f"Plot {figure_path}.")
-                plt = MatPlotExt()
-                plt.plot(
+                self._plot(
                     x_arrays= [satellites],
                     y_arrays=[tgd_dcb_sat_percentile],
                     xlabel="Satellite",
@@ -1405,7 +1401,7 @@ class GnssPlot:
         file_vars = {**self.dset.vars, **self.dset.analysis}
         file_vars["stage"] = stage
         try:
-            dset_out = dataset.Dataset.read(**file_vars)
+            dset_out = dataset.Dataset.read(lazy=True, **file_vars)
         except OSError:
             log.warn("Could not read dataset {config.files.path('dataset', file_vars=file_vars)}.")
             return enums.ExitStatus.error
@@ -1417,7 +1413,7 @@ class GnssPlot:
             for sys in systems:
                 idx = dset_out.filter(system=sys)
                 keep_idx[idx] = True
-            dset_out.subset(keep_idx)
+            dset_out = dset_out.view(keep_idx)
     
         return dset_out
     
@@ -7,14 +7,15 @@ TODO
 """
 # Standard liberay imports
 from datetime import date, datetime
-import os
 from typing import Union
 
 # Where imports
 import where
 from where.lib import config
 from where.lib import log
+from where.lib import pandoc
 from where.lib import util
+from where.writers._figure_queue import FigureQueue
 
 
 class Report:
@@ -39,32 +40,27 @@ class Report:
         self.rundate = rundate
         self.path = path
         self.description = description
+        self.figure_queue = FigureQueue()
 
 
     def markdown_to_pdf(self) -> None:
         """Convert markdown file to pdf format
+
+        The conversion is done with pandoc, either directly, in the background or deferred to the end of a
+        where_runner batch depending on the [report] section of the Where configuration. The output format can also
+        be changed to HTML for fast previews.
         """
         # Close file object
         self.fid.close()
 
+        # Figures referenced in the markdown file have to be available before conversion
+        self.figure_queue.render()
+
         if self.path.stat().st_size == 0:
             log.warn(f"Markdown file {self.path} is empty.")
             return 1
 
-        pdf_path = str(self.path).replace(".md", ".pdf")
-        program = "pandoc"
-
-        # Convert markdown to pdf with pandoc
-        pandoc_args = ["-f markdown", "-V classoption:twoside", "-N", "-o " + pdf_path, str(self.path)]
-        log.info(f"Start: {program} {' '.join(pandoc_args)}")
-        status = os.system(f"{program} {' '.join(pandoc_args)}")
-        if status != 0:
-            log.error(f"{program} failed with error code {status} ({' '.join([program] + pandoc_args)})")
-
-        # TODO: pandoc subprocess call does not work. Why?
-        # process = subprocess.run([program] + pandoc_args, shell=True)
-        # if process.returncode:
-        #    log.error(f"{program} failed with error code {process.returncode} ({' '.join(process.args)})")
+        pandoc.queue_markdown(self.path)
 
 
     def write_config(self) -> None:
@@ -323,8 +323,8 @@ class SinexBlocks:
                     "A",
                     1,
                     _TECH[self.dset.meta["tech"]],
-                    self.dset.time.yydddsssss[0],
-                    self.dset.time.yydddsssss[-1],
+                    time.yydddsssss_str(self.dset.time[0]),
+                    time.yydddsssss_str(self.dset.time[-1]),
                     ecc[tuple(key)]["coord_type"],
                     ecc[tuple(key)]["vector"][0],
                     ecc[tuple(key)]["vector"][1],
@@ -358,8 +358,8 @@ class SinexBlocks:
                     "A",
                     1,
                     _TECH[self.dset.meta["tech"]],
-                    self.dset.time.yydddsssss[0],
-                    self.dset.time.yydddsssss[-1],
+                    time.yydddsssss_str(self.dset.time[0]),
+                    time.yydddsssss_str(self.dset.time[-1]),
                     self.dset.time.mean.yydddsssss,
                 )
             )
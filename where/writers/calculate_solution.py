@@ -17,6 +17,7 @@ from midgard.writers._writers import get_existing_fields, get_field, get_header
 
 # Where imports
 import where
+from where.data import time
 from where.lib import config
 from where.lib import util
 
@@ -416,7 +417,7 @@ def calculate_solution(dset: "Dataset") -> None:
     
     # Add date field to dataset
     if "date" not in dset.fields:
-        dset.add_text("date", val=[d.strftime("%Y/%m/%d %H:%M:%S") for d in dset.time.datetime], write_level="detail")
+        dset.add_text("date", val=time.strftime(dset.time, "%Y/%m/%d %H:%M:%S"), write_level="detail")
 
     # Select fields available in Dataset
     fields = get_existing_fields(dset, fields_def)
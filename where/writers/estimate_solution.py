@@ -18,6 +18,7 @@ from midgard.writers._writers import get_header
 
 # Where imports
 import where
+from where.data import time
 from where.lib import config
 from where.lib import log
 from where.lib import util
@@ -88,7 +89,7 @@ def estimate_solution(dset: "Dataset") -> None:
 
     # Add date field to dataset
     if "date" not in dset.fields:
-        dset.add_text("date", val=[d.strftime("%Y/%m/%d %H:%M:%S") for d in dset.time.datetime], write_level="detail")
+        dset.add_text("date", val=time.strftime(dset.time, "%Y/%m/%d %H:%M:%S"), write_level="detail")
         
     # Add states to WriterField depending on used pipeline
     fields_def = list(FIELDS)
@@ -19,6 +19,7 @@ from midgard.writers._writers import get_field, get_header
 # Where imports
 import where
 from where.cleaners.editors.gnss_dop import gnss_dop
+from where.data import time
 from where.lib import config
 from where.lib import util
 
@@ -113,7 +114,7 @@ def gnss_position(dset: "Dataset") -> None:
     if "date" not in dset.fields:
         dset.add_text(
             "date", 
-            val=[d.strftime("%Y/%m/%d %H:%M:%S") for d in dset.time.datetime], 
+            val=time.strftime(dset.time, "%Y/%m/%d %H:%M:%S"), 
             unit="YYYY/MM/DD hh:mm:ss",
             write_level="detail",
         )
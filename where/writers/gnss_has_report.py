@@ -70,7 +70,7 @@ def _add_to_report(dset: "Dataset", rpt: "Report", figure_dir: PosixPath) -> Non
     #
     rpt.add_text("\n# Galileo HAS corrections\n\n")
     
-    for figure_path in _plot_has_correction(dset, figure_dir):
+    for figure_path in _plot_has_correction(dset, figure_dir, figure_queue=rpt.figure_queue):
         rpt.add_figure(
                 figure_path=figure_path, 
                 caption=f"HAS message entry for {enums.gnss_id_to_name[figure_path.stem.split('_')[2]].value}", 
@@ -106,7 +106,7 @@ def _add_to_report(dset: "Dataset", rpt: "Report", figure_dir: PosixPath) -> Non
         )
     
         rpt.add_text("\n## GNSS signal-in-space (SIS) status\n\n")
-        plt = GnssPlot(orbit.dset_edit, figure_dir, figure_format=FIGURE_FORMAT)
+        plt = GnssPlot(orbit.dset_edit, figure_dir, figure_format=FIGURE_FORMAT, figure_queue=rpt.figure_queue)
 
         # Plot GNSS SIS status (except if only Galileo system is available)
         if not (len(orbit.dset_edit.unique("system")) == 1 and orbit.dset_edit.unique("system")[0] == "E"):
@@ -493,14 +493,16 @@ def _plot_has_correction(
                         dset: "Dataset",
                         figure_dir: PosixPath,
                         figure_name: str="plot_{solution}.{FIGURE_FORMAT}",
+                        figure_queue: Union["FigureQueue", None]=None,
 
 ) -> List[PosixPath]:
     """Plot Galileo HAS correction results
     
     Args:
-        dset:        A dataset containing the data.
-        figure_dir:  Figure directory.
-        figure_name: File name of figure.
+        dset:         A dataset containing the data.
+        figure_dir:   Figure directory.
+        figure_name:  File name of figure.
+        figure_queue: Figure queue used for rendering the figures.
     
     Returns:
         List with figure path for Galileo HAS correction plots. File name includes GNSS identifier
@@ -508,7 +510,7 @@ def _plot_has_correction(
     """          
     figure_paths = list()
     
-    gnss_plt = GnssPlot(dset, figure_dir, figure_format=FIGURE_FORMAT)
+    gnss_plt = GnssPlot(dset, figure_dir, figure_format=FIGURE_FORMAT, figure_queue=figure_queue)
            
     # Define fields to plot
     fields_without_labels={"age_of_data", "iod"}
@@ -18,6 +18,7 @@ from midgard.writers._writers import get_existing_fields, get_field, get_header
 
 # Where imports
 import where
+from where.data import time
 from where.lib import config
 from where.lib import util
 
@@ -204,22 +205,20 @@ def gnss_satellite_position(dset: "Dataset") -> None:
 
     # Add date field to dataset
     if "date" not in dset.fields:
-        dset.add_text("date", val=[d.strftime("%Y/%m/%d %H:%M:%S") for d in dset.time.datetime], write_level="detail")
+        dset.add_text("date", val=time.strftime(dset.time, "%Y/%m/%d %H:%M:%S"), write_level="detail")
    
     # Add fields in case of broadcast ephemeris
     if "broadcast" in config.tech.apriori_orbit.list:
         if not "trans_time_gpsweek" in dset.fields:
             dset.add_text(
                 "trans_time_gpsweek",
-                val=[
-                    f"{t.gps_ws.week:04.0f}{t.gps_ws.day:1.0f}:{t.gps_ws.seconds:06.0f}" for t in dset.used_transmission_time
-                ],
+                val=time.gps_ws_str(dset.used_transmission_time),
                 write_level="detail",
             )
         if not "toe_gpsweek" in dset.fields:
             dset.add_text(
                 "toe_gpsweek",
-                val=[f"{t.gps_ws.week:04.0f}{t.gps_ws.day:1.0f}:{t.gps_ws.seconds:06.0f}" for t in dset.used_toe],
+                val=time.gps_ws_str(dset.used_toe),
                 write_level="detail",
             )
         if not "diff_trans_toe" in dset.fields:
@@ -111,7 +111,7 @@ def _add_to_report(dset: "Dataset", rpt: "Report", figure_dir: "pathlib.PosixPat
         rpt:         Report object.
         figure_dir:  Figure directory.
     """
-    plt = GnssPlot(dset, figure_dir)
+    plt = GnssPlot(dset, figure_dir, figure_queue=rpt.figure_queue)
 
     #
     # Position
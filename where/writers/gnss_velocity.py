@@ -17,6 +17,7 @@ from midgard.writers._writers import get_field, get_header
 
 # Where imports
 import where
+from where.data import time
 from where.lib import config
 from where.lib import util
 from where.postprocessors.gnss_velocity_fields import gnss_velocity_fields
@@ -285,7 +286,7 @@ def gnss_velocity(dset: "Dataset") -> None:
     if "date" not in dset.fields:
         dset.add_text(
             "date", 
-            val=[d.strftime("%Y/%m/%d %H:%M:%S") for d in dset.time.datetime],
+            val=time.strftime(dset.time, "%Y/%m/%d %H:%M:%S"),
             write_level="detail",
         )
 
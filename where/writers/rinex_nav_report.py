@@ -79,7 +79,7 @@ def _add_to_report(dset: "Dataset", rpt: "Report", figure_dir: "pathlib.PosixPat
     #
     if "sis_status" not in config.tech[_SECTION].skip_sections.list:
         rpt.add_text("\n# GNSS signal-in-space (SIS) status\n\n")
-        plt = GnssPlot(dset, figure_dir, figure_format=FIGURE_FORMAT)
+        plt = GnssPlot(dset, figure_dir, figure_format=FIGURE_FORMAT, figure_queue=rpt.figure_queue)
 
         # Plot GNSS SIS status (except if only Galileo system is available)
         if not (len(dset.unique("system")) == 1 and dset.unique("system")[0] == "E"):
@@ -187,7 +187,7 @@ def _add_to_report(dset: "Dataset", rpt: "Report", figure_dir: "pathlib.PosixPat
             gnss_compare_tgd(dset)
 
         if set(dset.fields).intersection(bias_comp_def):
-            plt = GnssPlot(dset, figure_dir, figure_format=FIGURE_FORMAT)
+            plt = GnssPlot(dset, figure_dir, figure_format=FIGURE_FORMAT, figure_queue=rpt.figure_queue)
             for figure_path in plt.plot_tgd_comparison():
                 words = figure_path.stem.split("_")
                 gnss = words[2] if words[1] == "field" else words[1]
@@ -18,6 +18,7 @@ from midgard.math.unit import Unit
 
 # Where imports
 import where
+from where.data import time
 from where.lib import config
 from where.lib import util
 
@@ -118,23 +119,20 @@ def rinex_nav_writer(dset: "Dataset") -> None:
     file_path = config.files.path(f"output_rinex_nav", file_vars={**dset.vars, **dset.analysis})
 
     # Add additional fields used by the writer
-    dset.add_text("date", val=[d.strftime("%Y/%m/%d %H:%M:%S") for d in dset.time.datetime])
+    dset.add_text("date", val=time.strftime(dset.time, "%Y/%m/%d %H:%M:%S"))
     dset.add_text(
         "time_gpsweek",
-        val=[f"{t.gps.gps_ws.week:04.0f}{t.gps.gps_ws.day:1.0f}:{t.gps.gps_ws.seconds:06.0f}" for t in dset.time],
+        val=time.gps_ws_str(dset.time),
         write_level="detail",
     )
     dset.add_text(
         "trans_time_gpsweek",
-        val=[
-            f"{t.gps.gps_ws.week:04.0f}{t.gps.gps_ws.day:1.0f}:{t.gps.gps_ws.seconds:06.0f}"
-            for t in dset.transmission_time
-        ],
+        val=time.gps_ws_str(dset.transmission_time),
         write_level="detail",
     )
     dset.add_text(
         "toe_gpsweek",
-        val=[f"{t.gps.gps_ws.week:04.0f}{t.gps.gps_ws.day:1.0f}:{t.gps.gps_ws.seconds:06.0f}" for t in dset.toe],
+        val=time.gps_ws_str(dset.toe),
         write_level="detail",
     )
 
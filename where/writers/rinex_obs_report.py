@@ -53,7 +53,7 @@ def rinex_obs_report(dset: "Dataset") -> None:
     figure_dir.mkdir(parents=True, exist_ok=True)
 
     # Get 'read' Dataset
-    dset_read = dataset.Dataset.read(**dict(file_vars, stage="read"))
+    dset_read = dataset.Dataset.read(lazy=True, **dict(file_vars, stage="read"))
 
     # Generate plots based on 'read' stage data
     df_system, df_obstype = _generate_dataframes(dset_read)
@@ -90,8 +90,8 @@ def _add_to_report(
         df_obstype:  Dataframe with GNSS observation overview in relation to observation type. Indices are combination
                      of GNSS identifier and observation type, e.g. 'G C1C' or 'E L8X'.
     """
-    plt_read = GnssPlot(dset_read, figure_dir)
-    plt_edit = GnssPlot(dset_edit, figure_dir)
+    plt_read = GnssPlot(dset_read, figure_dir, figure_queue=rpt.figure_queue)
+    plt_edit = GnssPlot(dset_edit, figure_dir, figure_queue=rpt.figure_queue)
 
     #
     # Observation overview
@@ -144,6 +144,9 @@ def sisre_report(dset):
         _add_to_report(dset, rpt, figure_dir)
         
         _satellite_statistics_and_plot(fid, figure_dir, dset, rpt) #TODO: move to _add_to_report
+
+    # Render queued figures
+    rpt.figure_queue.render()
                 
     # Generate PDF from Markdown file
     if config.where.sisre_report.get("markdown_to_pdf", default=False).bool:
@@ -159,7 +162,7 @@ def _add_to_report(dset: "Dataset", rpt: "Report", figure_dir: "pathlib.PosixPat
         figure_dir:  Figure directory.
     """
 
-    plt = GnssPlot(dset, figure_dir)
+    plt = GnssPlot(dset, figure_dir, figure_queue=rpt.figure_queue)
     
     #
     # Field plots
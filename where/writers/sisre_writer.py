@@ -19,6 +19,7 @@ from midgard.writers._writers import get_existing_fields, get_field, get_header
 
 # Where imports
 import where
+from where.data import time
 from where.lib import config, log, util
 from where import pipelines
 from where.writers import sisre_output_buffer
@@ -313,10 +314,10 @@ def sisre_writer(dset: "Dataset") -> None:
         dset:   A dataset containing the data.
     """
     # Add additional fields used by the writer
-    dset.add_text("date", val=[d.strftime("%Y/%m/%d %H:%M:%S") for d in dset.time.datetime])
+    dset.add_text("date", val=time.strftime(dset.time, "%Y/%m/%d %H:%M:%S"))
     dset.add_text(
         "time_gpsweek", 
-        val=[f"{t.gps_ws.week:04.0f}{t.gps_ws.day:1.0f}:{t.gps_ws.seconds:06.0f}" for t in dset.time],
+        val=time.gps_ws_str(dset.time),
         write_level="detail",
     )
     if "used_transmission_time" not in dset.fields:
@@ -324,9 +325,7 @@ def sisre_writer(dset: "Dataset") -> None:
     else:
         dset.add_text(
             "trans_time_gpsweek",
-            val=[
-                f"{t.gps_ws.week:04.0f}{t.gps_ws.day:1.0f}:{t.gps_ws.seconds:06.0f}" for t in dset.used_transmission_time
-            ],
+            val=time.gps_ws_str(dset.used_transmission_time),
             write_level="detail",
         )
     if "used_toe" not in dset.fields:
@@ -334,7 +333,7 @@ def sisre_writer(dset: "Dataset") -> None:
     else:
         dset.add_text(
             "toe_gpsweek",
-            val=[f"{t.gps_ws.week:04.0f}{t.gps_ws.day:1.0f}:{t.gps_ws.seconds:06.0f}" for t in dset.used_toe],
+            val=time.gps_ws_str(dset.used_toe),
             write_level="detail",
         )
     # dset.add_float("diff_time_trans", val=(dset.time.mjd - dset.used_transmission_time.mjd) * Unit.day2second, Unit="second")
@@ -361,14 +360,12 @@ def sisre_writer(dset: "Dataset") -> None:
     if "has_reception_time_of_message_orb" in dset.fields:
         dset.add_text(
             "has_reception_time_of_message_orb_gpsweek", 
-            val=[f"{t.gps_ws.week:04.0f}{t.gps_ws.day:1.0f}:{t.gps_ws.seconds:06.0f}" for t in dset.has_reception_time_of_message_orb],
+            val=time.gps_ws_str(dset.has_reception_time_of_message_orb),
             write_level="detail",
         )
         dset.add_text(
             "has_time_of_message_orb_gpsweek",
-            val=[
-                f"{t.gps_ws.week:04.0f}{t.gps_ws.day:1.0f}:{t.gps_ws.seconds:06.0f}" for t in dset.has_time_of_message_orb
-            ],
+            val=time.gps_ws_str(dset.has_time_of_message_orb),
             write_level="detail",
         )
         dset.add_float(
@@ -95,6 +95,7 @@ def add_to_full_timeseries(dset):
                     label=label,
                     id=dset.analysis["id"],
                     user=dset.analysis["user"],
+                    lazy=True,
                 )
 
             val, adder, unit = method_func(dsets[dset_str], field_in, idx_values, func)